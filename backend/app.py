@@ -14,7 +14,7 @@ from datetime import datetime
 from config import config
 from models import db
 # 路由導入
-from routes import auth_bp, projects_bp, papers_bp, network_bp, analysis_bp, search_bp, settings_bp
+from routes import auth_bp, projects_bp, papers_bp, network_bp, analysis_bp, search_bp, settings_bp, jobs_bp
 
 
 def create_app(config_name=None):
@@ -29,9 +29,8 @@ def create_app(config_name=None):
 
     app.config.from_object(config[config_name])
 
-    # 生產環境檢查
-    if config_name == 'production':
-        config[config_name].init_app(app)
+    # 配置檢查（生產環境另外檢查必要的環境變數）
+    config[config_name].init_app(app)
 
     # 初始化擴展
     db.init_app(app)
@@ -43,7 +42,9 @@ def create_app(config_name=None):
          supports_credentials=True,
          allow_headers=['Content-Type', 'Authorization'],
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-         expose_headers=['Content-Type', 'Authorization', 'Content-Disposition', 'Content-Length'],
+         # 二進位網絡格式以回應標頭傳回網絡版本、節點總數與佈局是否仍在背景計算
+         expose_headers=['Content-Type', 'Authorization', 'Content-Disposition', 'Content-Length',
+                         'X-Network-Revision', 'X-Network-Total-Nodes', 'X-Network-Layout-Pending'],
          max_age=3600)
 
     migrate = Migrate(app, db)
@@ -56,6 +57,7 @@ def create_app(config_name=None):
     app.register_blueprint(analysis_bp)
     app.register_blueprint(search_bp)
     app.register_blueprint(settings_bp)
+    app.register_blueprint(jobs_bp)
 
     # 健康檢查端點
     @app.route('/health')
@@ -79,7 +81,8 @@ def create_app(config_name=None):
                 'projects': '/api/projects',
                 'papers': '/api/papers',
                 'network': '/api/network',
-                'analysis': '/api/analysis'
+                'analysis': '/api/analysis',
+                'jobs': '/api/jobs'
             },
             'features': [
                 '文獻導入和時間軸排序',
@@ -135,6 +138,15 @@ def create_app(config_name=None):
                 app._tables_created = True
             except Exception as e:
                 app.logger.warning(f"無法創建資料庫表：{e}")
+                return
+
+            # 程序重啟前中斷的 AI 分析不會再完成，標記為失敗
+            try:
+                from services.analysis_jobs import fail_stale_analyses
+                fail_stale_analyses(app.config.get('ANALYSIS_STALE_JOB_SECONDS', 600))
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"無法清理中斷的 AI 分析：{e}")
 
     return app
 
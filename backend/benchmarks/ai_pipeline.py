@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+AI 分析流程效能基準測試
+以模擬 Anthropic API 伺服器（benchmarks/mock_anthropic.py）測量 AIAnalysisService 的端到端延遲、
+分段並行的並行數效果，以及注入錯誤時 SDK 重試的成功率與延遲；不需要 API Key，也不產生費用
+
+- latency：單次串流分析的首字時間與總耗時（第二次起讀取提示快取）
+- concurrency：六個段落在不同並行數下的總耗時，以及伺服器觀察到的同時請求數
+- retries：多個執行緒同時送出分析請求、伺服器隨機返回錯誤時，不同重試次數的成功率與延遲
+
+用法：
+    python benchmarks/ai_pipeline.py
+    python benchmarks/ai_pipeline.py --papers 80 --latency 0.5 --chunk-delay 0.02 --runs 10
+    python benchmarks/ai_pipeline.py --scenarios retries --error-rate 0.3 --retries 0 2 4 --load 16
+    python benchmarks/ai_pipeline.py --scenarios concurrency --max-concurrency 4
+    python benchmarks/ai_pipeline.py --base-url http://127.0.0.1:8765  # 使用另外啟動的模擬伺服器（不統計伺服器端數據）
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import anthropic
+
+# 確保可以導入 services 模組
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_anthropic import MockAnthropicServer
+from services.ai_analysis import AIAnalysisService
+from services.ai_sections import SECTION_KEYS, build_section_prompts
+
+_TOPICS = ['graph neural networks', 'contrastive learning', 'citation analysis', 'topic modeling',
+           'transformer architectures', 'knowledge graphs', 'few-shot learning', 'bibliometrics']
+
+
+def build_papers(count: int, seed: int) -> List[Dict]:
+    """
+    生成模擬的論文集（AIAnalysisService 使用的字典格式）
+
+    Args:
+        count: 論文數量
+        seed: 隨機種子
+
+    Returns:
+        論文列表（按年份排序）
+    """
+    rng = random.Random(seed)
+    papers = []
+    for paper_id in range(1, count + 1):
+        topic = rng.choice(_TOPICS)
+        sentences = [
+            f'We study {topic} on {rng.randint(2, 40)} benchmark datasets.',
+            f'Our method improves accuracy by {rng.randint(1, 15)} points over strong baselines.',
+            f'We further analyze the effect of {rng.choice(_TOPICS)} on {topic}.',
+            'Limitations include scalability and the cost of annotation.',
+        ]
+        papers.append({
+            'id': paper_id,
+            'title': f'{topic.title()} study {paper_id}',
+            'year': 2000 + rng.randint(0, 24),
+            'authors': [f'Author {rng.randint(1, 500)}' for _ in range(rng.randint(1, 5))],
+            'journal': 'Journal of Simulated Research',
+            'abstract': ' '.join(sentences * rng.randint(1, 3)),
+            'digest': None,
+            'citation_count': rng.randint(0, 500),
+            'doi': None,
+            'url': None
+        })
+    return sorted(papers, key=lambda paper: (paper['year'], paper['id']))
+
+
+def make_service(base_url: str, max_retries: int) -> AIAnalysisService:
+    """連接到模擬伺服器的 AIAnalysisService"""
+    service = AIAnalysisService(api_key='sk-ant-mock')
+    service.client = service.client.with_options(base_url=base_url, max_retries=max_retries)
+    service.cached_messages = service.client.beta.prompt_caching.messages
+    return service
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """最近秩百分位數（values 為空時返回 0）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def bench_latency(base_url: str, papers: List[Dict], runs: int):
+    """單次串流分析：首字時間、總耗時、輸出字數與提示快取讀取量"""
+    service = make_service(base_url, max_retries=2)
+    project_info = {'name': '模擬領域', 'description': '', 'domain': '模擬領域'}
+    tokens = service.estimate_prompt_tokens(papers, project_info)
+
+    print(f"\n[latency] {len(papers)} 篇論文，提示約 {tokens} tokens")
+    print(f"{'次數':>4} {'首字(s)':>9} {'總耗時(s)':>10} {'輸出字數':>8} {'快取讀取':>8}")
+    print('-' * 46)
+
+    first_tokens, totals = [], []
+    for run in range(1, runs + 1):
+        start = time.perf_counter()
+        first = []
+
+        def on_text(text):
+            if not first:
+                first.append(time.perf_counter() - start)
+
+        result = service.stream_research_gap(papers, project_info, on_text)
+        total = time.perf_counter() - start
+        first_tokens.append(first[0] if first else total)
+        totals.append(total)
+        print(f"{run:>4} {first_tokens[-1]:>9.3f} {total:>10.3f} {len(result['analysis']['full_text']):>8} "
+              f"{result['usage'].get('cache_read_input_tokens', 0):>8}")
+
+    print(f"{'p50':>4} {percentile(first_tokens, 0.5):>9.3f} {percentile(totals, 0.5):>10.3f}")
+    print(f"{'p95':>4} {percentile(first_tokens, 0.95):>9.3f} {percentile(totals, 0.95):>10.3f}")
+
+
+def bench_concurrency(base_url: str, papers: List[Dict], levels: List[int], server: Optional[MockAnthropicServer]):
+    """分段並行：六個段落在各並行數下的總耗時（並行上限下被拒絕的請求由 SDK 重試）"""
+    service = make_service(base_url, max_retries=5)
+    prompts = build_section_prompts(
+        service._prepare_papers_text(papers), '模擬領域', [paper['year'] for paper in papers], list(SECTION_KEYS)
+    )
+
+    print(f"\n[concurrency] {len(prompts)} 個段落")
+    print(f"{'並行數':>6} {'總耗時(s)':>10} {'伺服器最大同時':>14} {'429 次數':>8}")
+    print('-' * 44)
+
+    for level in levels:
+        if server:
+            server.reset_stats()
+        start = time.perf_counter()
+        try:
+            service.run_concurrent(prompts, lambda key, text: None, lambda key, text: None, level)
+            elapsed = f'{time.perf_counter() - start:.3f}'
+        except anthropic.APIError as e:
+            # 超出伺服器並行上限且重試用盡：任一段落失敗即整份分析失敗
+            elapsed = f'失敗（{type(e).__name__}）'
+        in_flight = server.stats['max_in_flight'] if server else '-'
+        limited = server.stats['rate_limited'] if server else '-'
+        print(f"{level:>6} {elapsed:>10} {in_flight:>14} {limited:>8}")
+
+
+def bench_retries(base_url: str, papers: List[Dict], retry_counts: List[int], load: int, requests: int,
+                  server: Optional[MockAnthropicServer]):
+    """注入錯誤下的非串流分析：各重試次數的成功率、實際送出的請求數與延遲"""
+    project_info = {'name': '模擬領域', 'description': '', 'domain': '模擬領域'}
+
+    print(f"\n[retries] {requests} 個分析請求，{load} 個執行緒同時送出")
+    print(f"{'重試':>4} {'成功率':>7} {'伺服器請求':>10} {'注入錯誤':>8} {'p50(s)':>8} {'p95(s)':>8} {'總耗時(s)':>10}")
+    print('-' * 64)
+
+    for max_retries in retry_counts:
+        service = make_service(base_url, max_retries=max_retries)
+        if server:
+            server.reset_stats()
+
+        def analyze(_):
+            start = time.perf_counter()
+            result = service.analyze_research_gap(papers, project_info)
+            return result['success'], time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=load) as executor:
+            outcomes = list(executor.map(analyze, range(requests)))
+        elapsed = time.perf_counter() - start
+
+        latencies = [seconds for _, seconds in outcomes]
+        success = sum(1 for ok, _ in outcomes if ok) / len(outcomes)
+        sent = server.stats['requests'] if server else '-'
+        injected = server.stats['injected_errors'] + server.stats['rate_limited'] if server else '-'
+        print(f"{max_retries:>4} {success:>7.0%} {sent:>10} {injected:>8} "
+              f"{percentile(latencies, 0.5):>8.3f} {percentile(latencies, 0.95):>8.3f} {elapsed:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI 分析流程效能基準測試')
+    parser.add_argument('--scenarios', nargs='+', choices=['latency', 'concurrency', 'retries'],
+                        default=['latency', 'concurrency', 'retries'])
+    parser.add_argument('--base-url', help='使用另外啟動的模擬伺服器（預設在本程序內啟動）')
+    parser.add_argument('--papers', type=int, default=40, help='論文數量')
+    parser.add_argument('--runs', type=int, default=5, help='latency 的執行次數')
+    parser.add_argument('--latency', type=float, default=0.3, help='伺服器回應前的延遲（秒）')
+    parser.add_argument('--chunk-delay', type=float, default=0.01, help='串流每段之間的間隔（秒）')
+    parser.add_argument('--chunk-chars', type=int, default=20, help='串流每段的字元數')
+    parser.add_argument('--output-chars', type=int, default=2000, help='每個回應的字數')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 3, 6], help='分段並行的並行數')
+    parser.add_argument('--max-concurrency', type=int, default=None, help='伺服器同時處理的請求上限')
+    parser.add_argument('--error-rate', type=float, default=0.3, help='retries 情境中伺服器返回錯誤的比例')
+    parser.add_argument('--error-status', type=int, default=529, help='注入的錯誤狀態碼')
+    parser.add_argument('--retry-after', type=float, default=0.1,
+                        help='錯誤回應建議的重試間隔（秒，負數表示不送出、由 SDK 指數退避）')
+    parser.add_argument('--retries', type=int, nargs='+', default=[0, 2, 4], help='SDK 的最大重試次數')
+    parser.add_argument('--load', type=int, default=8, help='retries 情境同時送出請求的執行緒數')
+    parser.add_argument('--requests', type=int, default=40, help='retries 情境的請求總數')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = MockAnthropicServer(
+            latency=args.latency,
+            chunk_chars=args.chunk_chars,
+            chunk_delay=args.chunk_delay,
+            output_chars=args.output_chars,
+            max_concurrency=args.max_concurrency,
+            error_status=args.error_status,
+            retry_after=args.retry_after if args.retry_after >= 0 else None,
+            seed=args.seed
+        ).start()
+        base_url = server.url
+    print(f'模擬伺服器：{base_url}')
+
+    papers = build_papers(args.papers, args.seed)
+    try:
+        if 'latency' in args.scenarios:
+            bench_latency(base_url, papers, args.runs)
+        if 'concurrency' in args.scenarios:
+            bench_concurrency(base_url, papers, args.concurrency, server)
+        if 'retries' in args.scenarios:
+            if server:
+                server.error_rate = args.error_rate
+            bench_retries(base_url, papers, args.retries, args.load, args.requests, server)
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
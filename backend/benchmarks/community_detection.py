@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+社群檢測效能基準測試
+比較 Louvain 與舊的 greedy modularity 算法在 1k / 10k / 100k 節點合作網絡上的耗時與模組度
+
+用法：
+    python benchmarks/community_detection.py
+    python benchmarks/community_detection.py --sizes 1000 10000 --greedy-limit 10000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import networkx as nx
+
+# 確保可以導入 services 模組
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.network_analyzer import AuthorNetworkAnalyzer
+
+
+def build_analyzer(author_count: int, seed: int) -> AuthorNetworkAnalyzer:
+    """
+    生成模擬的合作網絡：作者分屬若干研究團隊，論文作者大多來自同一團隊
+
+    Args:
+        author_count: 作者數量
+        seed: 隨機種子
+
+    Returns:
+        已加入模擬論文的 AuthorNetworkAnalyzer
+    """
+    rng = random.Random(seed)
+    analyzer = AuthorNetworkAnalyzer()
+
+    team_size = 25
+    teams = [list(range(start, min(start + team_size, author_count)))
+             for start in range(1, author_count + 1, team_size)]
+
+    paper_id = 0
+    for _ in range(author_count // 2):
+        paper_id += 1
+        team = rng.choice(teams)
+        authors = rng.sample(team, min(len(team), rng.randint(2, 5)))
+
+        # 約 10% 的論文有跨團隊合作者
+        if rng.random() < 0.1:
+            authors.append(rng.randint(1, author_count))
+
+        authors = list(dict.fromkeys(authors))
+        analyzer.add_paper(
+            paper_id,
+            {'year': 2000 + paper_id % 25, 'citation_count': rng.randint(0, 200)},
+            [{'id': author_id, 'name': f'Author {author_id}', 'position': position}
+             for position, author_id in enumerate(authors, start=1)]
+        )
+
+    return analyzer
+
+
+def run_method(analyzer: AuthorNetworkAnalyzer, method: str):
+    """執行一次社群檢測，返回 (耗時秒數, 社群數, 模組度)"""
+    start = time.perf_counter()
+    community_map = analyzer.detect_communities(method=method, seed=42)
+    elapsed = time.perf_counter() - start
+
+    communities = {}
+    for author_id, community_id in community_map.items():
+        communities.setdefault(community_id, set()).add(author_id)
+
+    modularity = nx.community.modularity(analyzer.graph, communities.values(), weight='weight')
+    return elapsed, len(communities), modularity
+
+
+def main():
+    parser = argparse.ArgumentParser(description='社群檢測效能基準測試')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='測試的作者數量')
+    parser.add_argument('--greedy-limit', type=int, default=10000,
+                        help='greedy 算法只在不超過此節點數的網絡上執行（過大時耗時以小時計）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'節點數':>8} {'邊數':>9} {'算法':>8} {'耗時(s)':>10} {'社群數':>7} {'模組度':>8}")
+    print('-' * 58)
+
+    for size in args.sizes:
+        analyzer = build_analyzer(size, args.seed)
+        nodes = analyzer.graph.number_of_nodes()
+        edges = analyzer.graph.number_of_edges()
+
+        for method in ('louvain', 'greedy'):
+            if method == 'greedy' and size > args.greedy_limit:
+                print(f"{nodes:>8} {edges:>9} {method:>8} {'略過':>10}")
+                continue
+
+            elapsed, count, modularity = run_method(analyzer, method)
+            print(f"{nodes:>8} {edges:>9} {method:>8} {elapsed:>10.2f} {count:>7} {modularity:>8.4f}")
+
+
+if __name__ == '__main__':
+    main()
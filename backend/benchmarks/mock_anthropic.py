@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+模擬 Anthropic API 伺服器
+本機替身：實作 messages（含串流）與 Message Batches API 的子集，以 anthropic.Anthropic(base_url=...) 或
+ANTHROPIC_BASE_URL 接上，開發、測試與效能基準測試時不必呼叫真正的 API、不產生費用
+
+- POST /v1/messages：返回錄製的回應（見 --recordings）或根據提示生成的固定格式回應；stream=true 時以 SSE 逐段送出
+- POST /v1/messages/batches：建立批次，各請求在 --batch-seconds 秒內平均陸續完成
+- GET /v1/messages/batches/:id、POST /v1/messages/batches/:id/cancel、GET /v1/messages/batches/:id/results
+
+可模擬的狀況：首字延遲（--latency、--latency-jitter）、串流速度與長度（--chunk-chars、--chunk-delay、--output-chars）、
+隨機錯誤（--error-rate、--error-status、--retry-after）、串流中途中斷（--stream-error-rate）、
+並行上限（--max-concurrency，超出時返回 429）以及 system 區塊的提示快取（cache_control）。
+
+錄製的回應為 JSONL，每行 {"match": "提示中包含的文字（可省略）", "text": "回應全文"}：
+優先使用 match 出現在提示中的第一筆，沒有符合的錄製時依序輪流使用不含 match 的錄製。
+
+用法：
+    python benchmarks/mock_anthropic.py --port 8765 --latency 0.5 --chunk-delay 0.02
+    python benchmarks/mock_anthropic.py --error-rate 0.2 --error-status 529 --max-concurrency 4
+    python benchmarks/mock_anthropic.py --recordings recordings.jsonl --batch-seconds 30
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 python app.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+_BATCH_PATH = re.compile(r'^/v1/messages/batches/([\w-]+)(/cancel|/results)?$')
+
+# 錯誤狀態碼對應的錯誤類型
+_ERROR_TYPES = {
+    400: 'invalid_request_error',
+    429: 'rate_limit_error',
+    500: 'api_error',
+    529: 'overloaded_error',
+}
+
+
+def _block_text(content) -> str:
+    """字串或內容區塊列表中的文字"""
+    if isinstance(content, str):
+        return content
+    return '\n'.join(block.get('text', '') for block in content or [])
+
+
+def _prompt_text(params: Dict) -> str:
+    """請求中的所有提示文字（system 與 messages）"""
+    parts = [_block_text(params.get('system') or [])]
+    parts.extend(_block_text(message.get('content')) for message in params.get('messages', []))
+    return '\n'.join(parts)
+
+
+def _cached_prefix(params: Dict) -> str:
+    """system 中最後一個標記 cache_control 的區塊之前（含）的文字；沒有標記時為空字串"""
+    system = params.get('system')
+    if not isinstance(system, list):
+        return ''
+    marked = [i for i, block in enumerate(system) if block.get('cache_control')]
+    return _block_text(system[:marked[-1] + 1]) if marked else ''
+
+
+def _tokens(text: str) -> int:
+    """以字元數粗估 token 數"""
+    return max(1, len(text) // 2) if text else 0
+
+
+def generated_text(params: Dict) -> str:
+    """沒有錄製的回應時，根據提示生成的固定格式回應（相同的提示得到相同的回應）"""
+    prompt = _prompt_text(params)
+    return (
+        f'# 模擬分析報告\n\n'
+        f'收到 {len(prompt)} 字的提示（{len(params.get("messages", []))} 則訊息）。\n\n'
+        f'## 一、領域發展史\n\n模擬內容。\n\n## 二、核心研究問題\n\n模擬內容。\n'
+    )
+
+
+def mock_message(params: Dict, text: Optional[str] = None, usage: Optional[Dict] = None) -> Dict:
+    """
+    messages API 回應物件
+
+    Args:
+        params: 請求參數
+        text: 回應全文（None 表示使用 generated_text()）
+        usage: token 用量（None 表示以提示與回應的字元數粗估）
+    """
+    text = generated_text(params) if text is None else text
+    return {
+        'id': f'msg_mock_{uuid.uuid4().hex[:24]}',
+        'type': 'message',
+        'role': 'assistant',
+        'model': params.get('model', 'mock-model'),
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn',
+        'stop_sequence': None,
+        'usage': usage or {'input_tokens': _tokens(_prompt_text(params)), 'output_tokens': _tokens(text)}
+    }
+
+
+def _error(error_type: str, message: str) -> Dict:
+    return {'type': 'error', 'error': {'type': error_type, 'message': message}}
+
+
+def load_recordings(path: str) -> List[Dict]:
+    """讀取錄製的回應（JSONL，每行 {'match'?, 'text'}）"""
+    recordings = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                recording = json.loads(line)
+                if 'text' not in recording:
+                    raise ValueError(f'錄製的回應缺少 text：{line[:80]}')
+                recordings.append(recording)
+    return recordings
+
+
+class MockBatch:
+    """一個模擬批次：請求按提交順序在 duration 秒內平均完成，error_rate 比例的請求返回錯誤"""
+
+    def __init__(self, server: 'MockAnthropicServer', requests: List[Dict], duration: float, error_rate: float):
+        self.server = server
+        self.id = f'msgbatch_mock_{uuid.uuid4().hex[:20]}'
+        self.created = time.monotonic()
+        self.created_at = datetime.utcnow()
+        self.requests = requests
+        self.done_at = [self.created + duration * (i + 1) / len(requests) for i in range(len(requests))]
+        self.errored = [server.chance(error_rate) for _ in requests]
+        self.cancelled_at: Optional[float] = None
+
+    def outcome(self, index: int, now: float) -> str:
+        """請求目前的狀態：processing / succeeded / errored / canceled"""
+        if now >= self.done_at[index] and (self.cancelled_at is None or self.done_at[index] <= self.cancelled_at):
+            return 'errored' if self.errored[index] else 'succeeded'
+        return 'canceled' if self.cancelled_at is not None else 'processing'
+
+    def to_dict(self) -> Dict:
+        now = time.monotonic()
+        counts = {'processing': 0, 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0}
+        for i in range(len(self.requests)):
+            counts[self.outcome(i, now)] += 1
+        ended = counts['processing'] == 0
+        return {
+            'id': self.id,
+            'type': 'message_batch',
+            'processing_status': 'ended' if ended else ('canceling' if self.cancelled_at else 'in_progress'),
+            'request_counts': counts,
+            'created_at': self.created_at.isoformat() + 'Z',
+            'expires_at': (self.created_at + timedelta(hours=24)).isoformat() + 'Z',
+            'ended_at': datetime.utcnow().isoformat() + 'Z' if ended else None,
+            'cancel_initiated_at': datetime.utcnow().isoformat() + 'Z' if self.cancelled_at else None,
+            'results_url': f'/v1/messages/batches/{self.id}/results' if ended else None
+        }
+
+    def results(self) -> str:
+        """JSONL 結果（只在批次結束後可用）"""
+        now = time.monotonic()
+        lines = []
+        for i, request in enumerate(self.requests):
+            outcome = self.outcome(i, now)
+            if outcome == 'succeeded':
+                result = {'type': 'succeeded', 'message': self.server.respond(request['params'])}
+            elif outcome == 'errored':
+                result = {'type': 'errored', 'error': _error('invalid_request_error', '模擬的請求錯誤')}
+            else:
+                result = {'type': outcome}
+            lines.append(json.dumps({'custom_id': request['custom_id'], 'result': result}, ensure_ascii=False))
+        return '\n'.join(lines) + '\n'
+
+
+class MockAnthropicServer:
+    """
+    在背景執行緒中執行的模擬伺服器（屬性可在執行中修改，下一個請求即生效）
+
+    Args:
+        port: 監聽埠（0 表示自動選擇）
+        latency: 每個 messages 請求開始回應前的延遲（秒）
+        latency_jitter: 延遲另加 0 到此秒數的隨機值
+        chunk_chars: 串流時每個 text_delta 的字元數
+        chunk_delay: 串流時每個 text_delta 之間的間隔（秒）
+        output_chars: 生成的回應以重複內容補足到此字數（模擬長篇報告；錄製的回應不受影響）
+        error_rate: messages 請求直接返回錯誤的比例
+        error_status: 注入的錯誤狀態碼（429 / 500 / 529 等，SDK 會自動重試）
+        retry_after: 錯誤回應的 retry-after 秒數（None 表示不送出，由 SDK 以指數退避重試）
+        stream_error_rate: 串流請求在送出一半內容後以 error 事件中斷的比例
+        max_concurrency: 同時處理的 messages 請求上限，超出時返回 429（None 表示不限制）
+        recordings: 錄製的回應（見 load_recordings）
+        batch_seconds: 批次中所有請求完成所需的秒數
+        batch_error_rate: 批次請求返回錯誤的比例
+        seed: 隨機種子
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, latency_jitter: float = 0.0,
+                 chunk_chars: int = 20, chunk_delay: float = 0.0, output_chars: int = 0, error_rate: float = 0.0,
+                 error_status: int = 529, retry_after: Optional[float] = None, stream_error_rate: float = 0.0,
+                 max_concurrency: Optional[int] = None, recordings: Optional[List[Dict]] = None,
+                 batch_seconds: float = 5.0, batch_error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.output_chars = output_chars
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.stream_error_rate = stream_error_rate
+        self.max_concurrency = max_concurrency
+        self.recordings = recordings or []
+        self.batch_seconds = batch_seconds
+        self.batch_error_rate = batch_error_rate
+
+        self.rng = random.Random(seed)
+        self.batches: Dict[str, MockBatch] = {}
+        self.cached_prefixes = set()
+        self.request_log: List[tuple] = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats: Dict[str, int] = {}
+        self.reset_stats()
+        self._fallback_index = 0
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """base_url，例如 http://127.0.0.1:8765"""
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'MockAnthropicServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        """
+        清除統計：
+        requests（messages 請求數）、streamed、succeeded、injected_errors、stream_errors、
+        rate_limited（超出並行上限）、max_in_flight（同時處理的最大請求數）
+        """
+        with self.lock:
+            self.stats = dict.fromkeys(
+                ('requests', 'streamed', 'succeeded', 'injected_errors', 'stream_errors', 'rate_limited',
+                 'max_in_flight'), 0
+            )
+
+    def random(self) -> float:
+        """共用隨機數產生器的下一個值（執行緒安全）"""
+        with self.lock:
+            return self.rng.random()
+
+    def chance(self, rate: float) -> bool:
+        """以 rate 的機率返回 True"""
+        return self.random() < rate
+
+    def respond(self, params: Dict) -> Dict:
+        """messages 請求的回應物件（錄製的回應或生成的回應；含提示快取的寫入與讀取量）"""
+        prompt = _prompt_text(params)
+        text = self._recorded_text(prompt)
+        if text is None:
+            text = generated_text(params)
+            if len(text) < self.output_chars:
+                text = (text * (self.output_chars // len(text) + 1))[:self.output_chars]
+
+        prefix = _cached_prefix(params)
+        usage = {'input_tokens': _tokens(prompt) - _tokens(prefix), 'output_tokens': _tokens(text)}
+        if prefix:
+            with self.lock:
+                hit = prefix in self.cached_prefixes
+                self.cached_prefixes.add(prefix)
+            usage['cache_creation_input_tokens'] = 0 if hit else _tokens(prefix)
+            usage['cache_read_input_tokens'] = _tokens(prefix) if hit else 0
+        return mock_message(params, text, usage)
+
+    def _recorded_text(self, prompt: str) -> Optional[str]:
+        """符合提示的錄製回應（沒有錄製時返回 None）"""
+        for recording in self.recordings:
+            if recording.get('match') and recording['match'] in prompt:
+                return recording['text']
+        fallbacks = [recording for recording in self.recordings if not recording.get('match')]
+        if not fallbacks:
+            return None
+        with self.lock:
+            recording = fallbacks[self._fallback_index % len(fallbacks)]
+            self._fallback_index += 1
+        return recording['text']
+
+    def handle(self, method: str, path: str, body: Optional[Dict]):
+        """
+        處理 messages 以外的請求（批次 API）
+
+        Returns:
+            (狀態碼, JSON 物件或 JSONL 字串)
+        """
+        if method == 'POST' and path == '/v1/messages/batches':
+            requests = body.get('requests') or []
+            custom_ids = [request.get('custom_id') for request in requests]
+            if not requests or len(set(custom_ids)) != len(custom_ids):
+                return 400, _error('invalid_request_error', 'requests 不可為空，custom_id 不可重複')
+            batch = MockBatch(self, requests, self.batch_seconds, self.batch_error_rate)
+            with self.lock:
+                self.batches[batch.id] = batch
+            return 200, batch.to_dict()
+
+        match = _BATCH_PATH.match(path)
+        batch = self.batches.get(match.group(1)) if match else None
+        if batch is None:
+            return 404, _error('not_found_error', f'找不到 {path}')
+
+        action = match.group(2)
+        if method == 'GET' and action is None:
+            return 200, batch.to_dict()
+        if method == 'POST' and action == '/cancel':
+            with self.lock:
+                if batch.cancelled_at is None:
+                    batch.cancelled_at = time.monotonic()
+            return 200, batch.to_dict()
+        if method == 'GET' and action == '/results':
+            if batch.to_dict()['processing_status'] != 'ended':
+                return 400, _error('invalid_request_error', '批次尚未結束')
+            return 200, batch.results()
+        return 404, _error('not_found_error', f'找不到 {method} {path}')
+
+    def _enter(self) -> Optional[int]:
+        """
+        開始處理一個 messages 請求
+
+        Returns:
+            要注入的錯誤狀態碼（超出並行上限或隨機錯誤），None 表示正常處理
+        """
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.max_concurrency is not None and self.in_flight >= self.max_concurrency:
+                self.stats['rate_limited'] += 1
+                return 429
+            if self.rng.random() < self.error_rate:
+                self.stats['injected_errors'] += 1
+                return self.error_status
+            self.in_flight += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.in_flight)
+            return None
+
+    def _leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server.lock:
+                    server.request_log.append(('GET', self.path))
+                self._respond(*server.handle('GET', self.path.split('?')[0], None))
+
+            def do_POST(self):
+                path = self.path.split('?')[0]
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                with server.lock:
+                    server.request_log.append(('POST', self.path))
+
+                if path != '/v1/messages':
+                    self._respond(*server.handle('POST', path, body))
+                    return
+
+                status = server._enter()
+                if status is not None:
+                    self._respond(status, _error(_ERROR_TYPES.get(status, 'api_error'), '模擬的錯誤'),
+                                  retry=True)
+                    return
+                try:
+                    time.sleep(server.latency + server.latency_jitter * server.random())
+                    message = server.respond(body)
+                    if body.get('stream'):
+                        self._stream(message)
+                    else:
+                        self._respond(200, message)
+                        with server.lock:
+                            server.stats['succeeded'] += 1
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    server._leave()
+
+            def _respond(self, status: int, payload, retry: bool = False):
+                if isinstance(payload, str):
+                    data, content_type = payload.encode('utf-8'), 'application/x-jsonl'
+                else:
+                    data, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('request-id', f'req_mock_{uuid.uuid4().hex[:16]}')
+                if retry and server.retry_after is not None:
+                    self.send_header('retry-after-ms', str(int(server.retry_after * 1000)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _event(self, event: str, data: Dict):
+                self.wfile.write(f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'.encode('utf-8'))
+                self.wfile.flush()
+
+            def _stream(self, message: Dict):
+                """以 SSE 送出回應（message_start、text_delta 片段、message_delta、message_stop）"""
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                with server.lock:
+                    server.stats['streamed'] += 1
+
+                text = message['content'][0]['text']
+                usage = message['usage']
+                start = dict(message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))
+                self._event('message_start', {'type': 'message_start', 'message': start})
+                self._event('content_block_start', {
+                    'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}
+                })
+
+                chunks = [text[i:i + server.chunk_chars] for i in range(0, len(text), server.chunk_chars)]
+                fail_at = len(chunks) // 2 if server.chance(server.stream_error_rate) else None
+                for i, chunk in enumerate(chunks):
+                    if i == fail_at:
+                        with server.lock:
+                            server.stats['stream_errors'] += 1
+                        self._event('error', _error('overloaded_error', '模擬的串流中斷'))
+                        return
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                    self._event('content_block_delta', {
+                        'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': chunk}
+                    })
+
+                self._event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+                self._event('message_delta', {
+                    'type': 'message_delta',
+                    'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                    'usage': {'output_tokens': usage['output_tokens']}
+                })
+                self._event('message_stop', {'type': 'message_stop'})
+                with server.lock:
+                    server.stats['succeeded'] += 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模擬 Anthropic API 伺服器')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='回應前的延遲（秒）')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='延遲另加的隨機秒數上限')
+    parser.add_argument('--chunk-chars', type=int, default=20, help='串流時每段的字元數')
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help='串流時每段之間的間隔（秒）')
+    parser.add_argument('--output-chars', type=int, default=0, help='生成的回應補足到此字數')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='直接返回錯誤的請求比例')
+    parser.add_argument('--error-status', type=int, default=529, help='注入的錯誤狀態碼')
+    parser.add_argument('--retry-after', type=float, default=None, help='錯誤回應建議的重試間隔（秒）')
+    parser.add_argument('--stream-error-rate', type=float, default=0.0, help='串流中途中斷的請求比例')
+    parser.add_argument('--max-concurrency', type=int, default=None, help='同時處理的請求上限，超出時返回 429')
+    parser.add_argument('--recordings', help='錄製的回應（JSONL）')
+    parser.add_argument('--batch-seconds', type=float, default=30.0, help='批次中所有請求完成所需的秒數')
+    parser.add_argument('--batch-error-rate', type=float, default=0.0, help='批次請求返回錯誤的比例')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockAnthropicServer(
+        args.port,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        chunk_chars=args.chunk_chars,
+        chunk_delay=args.chunk_delay,
+        output_chars=args.output_chars,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        stream_error_rate=args.stream_error_rate,
+        max_concurrency=args.max_concurrency,
+        recordings=load_recordings(args.recordings) if args.recordings else None,
+        batch_seconds=args.batch_seconds,
+        batch_error_rate=args.batch_error_rate,
+        seed=args.seed
+    )
+    print(f'模擬 Anthropic API 伺服器：{server.url}（設定 ANTHROPIC_BASE_URL={server.url}）')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
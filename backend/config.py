@@ -25,6 +25,48 @@ class Config:
     # Anthropic API
     ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
 
+    # 網絡分析：作者數超過門檻的大型合作論文改用 star / cap / fractional 策略，避免 clique 爆炸
+    NETWORK_LARGE_PAPER_THRESHOLD = int(os.environ.get('NETWORK_LARGE_PAPER_THRESHOLD', 50))
+    NETWORK_LARGE_PAPER_STRATEGY = os.environ.get('NETWORK_LARGE_PAPER_STRATEGY', 'star')
+
+    # 網絡分析：背景任務計算介數／接近中心性時使用的行程數（預設為 CPU 核心數）
+    NETWORK_CENTRALITY_PROCESSES = int(os.environ.get('NETWORK_CENTRALITY_PROCESSES', os.cpu_count() or 1))
+
+    # 網絡分析：節點數不超過此值時在請求中計算缺少的佈局，超過時排程背景任務並先返回上一版本的座標
+    NETWORK_LAYOUT_SYNC_NODE_LIMIT = int(os.environ.get('NETWORK_LAYOUT_SYNC_NODE_LIMIT', 300))
+
+    # 網絡分析：路徑與鄰域查詢在記憶體中快取的專案合作關係圖數量（LRU）
+    NETWORK_ADJACENCY_CACHE_SIZE = int(os.environ.get('NETWORK_ADJACENCY_CACHE_SIZE', 8))
+
+    # 引用網絡：Crossref 參考文獻每個請求包含的 DOI 數與同時進行的請求數
+    CITATION_FETCH_BATCH_SIZE = int(os.environ.get('CITATION_FETCH_BATCH_SIZE', 20))
+    CITATION_FETCH_CONCURRENCY = int(os.environ.get('CITATION_FETCH_CONCURRENCY', 4))
+
+    # AI 分析串流：部分結果寫入資料庫的間隔、SSE 輪詢間隔與單一 SSE 連線的最長時間（秒，逾時後客戶端從已收到的位置重連）
+    ANALYSIS_STREAM_FLUSH_INTERVAL = float(os.environ.get('ANALYSIS_STREAM_FLUSH_INTERVAL', 0.5))
+    ANALYSIS_STREAM_POLL_INTERVAL = float(os.environ.get('ANALYSIS_STREAM_POLL_INTERVAL', 0.25))
+    ANALYSIS_STREAM_MAX_SECONDS = int(os.environ.get('ANALYSIS_STREAM_MAX_SECONDS', 60))
+
+    # AI 分析：啟動時將超過此秒數未更新的執行中分析視為已中斷（程序重啟後背景執行緒不會繼續）
+    ANALYSIS_STALE_JOB_SECONDS = int(os.environ.get('ANALYSIS_STALE_JOB_SECONDS', 600))
+
+    # AI 分析：單次提示的 token 上限（超出時自動改用 map-reduce）、每批論文文本的 token 預算與同時進行的摘要請求數
+    ANALYSIS_SINGLE_PASS_MAX_TOKENS = int(os.environ.get('ANALYSIS_SINGLE_PASS_MAX_TOKENS', 150000))
+    ANALYSIS_MAP_BATCH_TOKENS = int(os.environ.get('ANALYSIS_MAP_BATCH_TOKENS', 40000))
+    ANALYSIS_MAP_CONCURRENCY = int(os.environ.get('ANALYSIS_MAP_CONCURRENCY', 4))
+
+    # AI 分析：分段並行模式同時進行的段落請求數（預設六個段落同時生成）
+    ANALYSIS_SECTION_CONCURRENCY = int(os.environ.get('ANALYSIS_SECTION_CONCURRENCY', 6))
+
+    # 批次分析：輪詢批次狀態的初始間隔與最長間隔（秒，每次放大 1.5 倍）及單一批次的專案數上限
+    ANALYSIS_BATCH_POLL_INTERVAL = float(os.environ.get('ANALYSIS_BATCH_POLL_INTERVAL', 60))
+    ANALYSIS_BATCH_POLL_MAX_INTERVAL = float(os.environ.get('ANALYSIS_BATCH_POLL_MAX_INTERVAL', 600))
+    ANALYSIS_BATCH_MAX_PROJECTS = int(os.environ.get('ANALYSIS_BATCH_MAX_PROJECTS', 200))
+
+    # 論文結構化摘要：導入時是否自動生成，以及所有摘要任務合計同時進行的請求數
+    PAPER_DIGEST_ON_IMPORT = os.environ.get('PAPER_DIGEST_ON_IMPORT', 'true').lower() == 'true'
+    PAPER_DIGEST_CONCURRENCY = int(os.environ.get('PAPER_DIGEST_CONCURRENCY', 4))
+
     # 上傳配置
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOAD_FOLDER = 'uploads'
@@ -33,7 +75,14 @@ class Config:
     @staticmethod
     def init_app(app):
         """初始化應用配置"""
-        pass
+        # 不支援的大型論文策略改用 cap（否則建立作者網絡分析器時才會失敗）
+        from services.network_analyzer import HYPEREDGE_STRATEGIES
+        strategy = app.config.get('NETWORK_LARGE_PAPER_STRATEGY')
+        if strategy not in HYPEREDGE_STRATEGIES:
+            app.logger.warning(
+                f"不支援的 NETWORK_LARGE_PAPER_STRATEGY: {strategy}（可用：{', '.join(HYPEREDGE_STRATEGIES)}），改用 cap"
+            )
+            app.config['NETWORK_LARGE_PAPER_STRATEGY'] = 'cap'
 
 
 class DevelopmentConfig(Config):
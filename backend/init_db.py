@@ -11,9 +11,13 @@ from pathlib import Path
 # 確保可以導入 app 模組
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from flask_migrate import upgrade
+
 from app import app
 from models import db
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
 
 def init_database():
     """初始化數據庫"""
@@ -28,6 +32,10 @@ def init_database():
             db.create_all()
             print("✓ 數據庫表已創建")
 
+            # 既有的表不會被 create_all() 修改，新增的欄位以遷移補上
+            upgrade(directory=MIGRATIONS_DIR)
+            print("✓ 數據庫遷移已套用")
+
             # 驗證數據庫連接
             db.session.execute(db.text('SELECT 1'))
             print("✓ 數據庫連接正常")
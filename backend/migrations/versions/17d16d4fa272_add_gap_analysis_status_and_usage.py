@@ -0,0 +1,87 @@
+"""add gap analysis status and usage columns
+
+分析報告的生成狀態、背景任務與批次關聯、結果快取命中與 token 用量；
+既有報告都是同步生成完成的，狀態填入 completed（否則報告列表與匯出會把它們視為未完成）
+
+Revision ID: 17d16d4fa272
+Revises: 8f9232ec84e9
+Create Date: 2026-10-19 08:18:30.362672
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '17d16d4fa272'
+down_revision = '8f9232ec84e9'
+branch_labels = None
+depends_on = None
+
+# 外鍵引用的 background_jobs 與 analysis_batches 是新表，由 db.create_all() 先行建立（見 init_db.py）
+COLUMNS = [
+    sa.Column('status', sa.String(length=20), nullable=True, server_default='completed'),
+    sa.Column('job_id', sa.Integer(),
+              sa.ForeignKey('background_jobs.id', name='fk_gap_analyses_job_id', ondelete='SET NULL'),
+              nullable=True),
+    sa.Column('batch_id', sa.Integer(),
+              sa.ForeignKey('analysis_batches.id', name='fk_gap_analyses_batch_id', ondelete='SET NULL'),
+              nullable=True),
+    sa.Column('cache_hit', sa.Boolean(), nullable=True, server_default=sa.false()),
+    sa.Column('input_tokens', sa.Integer(), nullable=True),
+    sa.Column('output_tokens', sa.Integer(), nullable=True),
+    sa.Column('cache_creation_input_tokens', sa.Integer(), nullable=True),
+    sa.Column('cache_read_input_tokens', sa.Integer(), nullable=True),
+]
+INDEXES = {
+    'ix_gap_analyses_status': 'status',
+    'ix_gap_analyses_job_id': 'job_id',
+    'ix_gap_analyses_batch_id': 'batch_id',
+}
+
+
+def _existing_columns(table):
+    """已存在的欄位名稱（表不存在時返回 None，之後由 db.create_all() 建立完整的表）"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _existing_indexes(table):
+    """已存在的索引名稱"""
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    existing = _existing_columns('gap_analyses')
+    if existing is None:
+        return
+    with op.batch_alter_table('gap_analyses') as batch_op:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch_op.add_column(column)
+
+    indexes = _existing_indexes('gap_analyses')
+    for name, column in INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'gap_analyses', [column])
+
+    # 手動新增、沒有預設值的欄位也一併補上
+    gap_analyses = sa.table('gap_analyses', sa.column('status', sa.String), sa.column('cache_hit', sa.Boolean))
+    op.execute(gap_analyses.update().where(gap_analyses.c.status.is_(None)).values(status='completed'))
+    op.execute(gap_analyses.update().where(gap_analyses.c.cache_hit.is_(None)).values(cache_hit=False))
+
+
+def downgrade():
+    existing = _existing_columns('gap_analyses') or set()
+    if not existing:
+        return
+    indexes = _existing_indexes('gap_analyses')
+    for name in INDEXES:
+        if name in indexes:
+            op.drop_index(name, table_name='gap_analyses')
+    with op.batch_alter_table('gap_analyses') as batch_op:
+        for column in reversed(COLUMNS):
+            if column.name in existing:
+                batch_op.drop_column(column.name)
@@ -0,0 +1,51 @@
+"""add paper digest columns
+
+論文的 AI 結構化摘要欄位（既有資料庫的 papers 表由 db.create_all() 建立，不會自動新增欄位）
+
+Revision ID: 4a73df97382e
+Revises:
+Create Date: 2026-10-19 08:17:01.173103
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a73df97382e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column('digest', sa.JSON(), nullable=True),
+    sa.Column('digest_hash', sa.String(length=64), nullable=True),
+    sa.Column('digest_model', sa.String(length=100), nullable=True),
+    sa.Column('digested_at', sa.DateTime(), nullable=True),
+]
+
+
+def _existing_columns(table):
+    """已存在的欄位名稱（表不存在時返回 None，之後由 db.create_all() 建立完整的表）"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    existing = _existing_columns('papers')
+    if existing is None:
+        return
+    with op.batch_alter_table('papers') as batch_op:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch_op.add_column(column)
+
+
+def downgrade():
+    existing = _existing_columns('papers') or set()
+    with op.batch_alter_table('papers') as batch_op:
+        for column in COLUMNS:
+            if column.name in existing:
+                batch_op.drop_column(column.name)
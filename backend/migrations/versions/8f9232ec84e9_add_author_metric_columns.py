@@ -0,0 +1,62 @@
+"""add author metric columns
+
+作者的 g-index、i10-index 與指標計算時間；既有作者的指標以 0 填入，
+metrics_computed_at 為空時由增量的作者指標任務重新計算
+
+Revision ID: 8f9232ec84e9
+Revises: 4a73df97382e
+Create Date: 2026-10-19 08:17:47.879638
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f9232ec84e9'
+down_revision = '4a73df97382e'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column('g_index', sa.Integer(), nullable=True, server_default='0'),
+    sa.Column('i10_index', sa.Integer(), nullable=True, server_default='0'),
+    sa.Column('metrics_computed_at', sa.DateTime(), nullable=True),
+]
+INDEX = 'ix_authors_metrics_computed_at'
+
+
+def _existing_columns(table):
+    """已存在的欄位名稱（表不存在時返回 None，之後由 db.create_all() 建立完整的表）"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _existing_indexes(table):
+    """已存在的索引名稱"""
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    existing = _existing_columns('authors')
+    if existing is None:
+        return
+    with op.batch_alter_table('authors') as batch_op:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch_op.add_column(column)
+
+    if INDEX not in _existing_indexes('authors'):
+        op.create_index(INDEX, 'authors', ['metrics_computed_at'])
+
+
+def downgrade():
+    existing = _existing_columns('authors') or set()
+    if existing and INDEX in _existing_indexes('authors'):
+        op.drop_index(INDEX, table_name='authors')
+    with op.batch_alter_table('authors') as batch_op:
+        for column in COLUMNS:
+            if column.name in existing:
+                batch_op.drop_column(column.name)
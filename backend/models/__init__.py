@@ -11,5 +11,10 @@ db = SQLAlchemy()
 from .user import User
 from .project import Project
 from .paper import Paper
-from .author import Author, PaperAuthor, Collaboration
+from .author import Author, PaperAuthor, Collaboration, ProjectAuthorCommunity, ProjectAuthorMetric
 from .gap_analysis import GapAnalysis
+from .network_state import NetworkState, NetworkArtifact
+from .citation import ReferenceCache, PaperCitation
+from .background_job import BackgroundJob
+from .ai_cache import AIResultCache, AIUsageStat
+from .analysis_batch import AnalysisBatch
@@ -0,0 +1,87 @@
+"""
+AI 結果快取模型
+AI Cache Models - 按提示輸入內容雜湊保存的 AI 回應，以及每位用戶的快取命中與 token 用量統計
+"""
+
+from . import db
+from datetime import datetime
+
+
+class AIResultCache(db.Model):
+    """AI 回應快取（跨用戶共用：相同的論文集、提示模板版本、模型與溫度得到同一筆結果）"""
+
+    __tablename__ = 'ai_result_caches'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # 快取鍵：正規化提示輸入的 SHA-256
+    cache_key = db.Column(db.String(64), nullable=False, unique=True, index=True)
+
+    model = db.Column(db.String(100))
+    template_version = db.Column(db.String(50))
+
+    # AI 回應全文
+    response_text = db.Column(db.Text, nullable=False)
+
+    # 產生此回應時的 token 數（輸入含提示快取讀寫的部分；命中時即為節省的用量）
+    input_tokens = db.Column(db.Integer, default=0)
+    output_tokens = db.Column(db.Integer, default=0)
+
+    # 命中統計
+    hit_count = db.Column(db.Integer, default=0)
+    last_hit_at = db.Column(db.DateTime)
+
+    # 時間戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AIResultCache {self.cache_key[:12]} {self.model}>'
+
+
+class AIUsageStat(db.Model):
+    """每位用戶的 AI 分析用量與快取命中統計"""
+
+    __tablename__ = 'ai_usage_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True, index=True)
+
+    # 分析次數與快取命中次數
+    analyses = db.Column(db.Integer, default=0, nullable=False)
+    cache_hits = db.Column(db.Integer, default=0, nullable=False)
+
+    # 實際計費的 token 數
+    input_tokens = db.Column(db.Integer, default=0, nullable=False)
+    output_tokens = db.Column(db.Integer, default=0, nullable=False)
+
+    # 因快取命中而節省的 token 數
+    saved_input_tokens = db.Column(db.Integer, default=0, nullable=False)
+    saved_output_tokens = db.Column(db.Integer, default=0, nullable=False)
+
+    # 服務端提示快取寫入與讀取的輸入 token 數（不含在 input_tokens 內）
+    cache_creation_input_tokens = db.Column(db.Integer, default=0, nullable=False)
+    cache_read_input_tokens = db.Column(db.Integer, default=0, nullable=False)
+
+    # 時間戳
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """轉換為字典"""
+        prompt_input = self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+        return {
+            'analyses': self.analyses,
+            'cache_hits': self.cache_hits,
+            'hit_rate': round(self.cache_hits / self.analyses, 4) if self.analyses else 0.0,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'saved_input_tokens': self.saved_input_tokens,
+            'saved_output_tokens': self.saved_output_tokens,
+            'saved_tokens': self.saved_input_tokens + self.saved_output_tokens,
+            'cache_creation_input_tokens': self.cache_creation_input_tokens,
+            'cache_read_input_tokens': self.cache_read_input_tokens,
+            'prompt_cache_read_rate': round(self.cache_read_input_tokens / prompt_input, 4) if prompt_input else 0.0,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<AIUsageStat user={self.user_id} {self.cache_hits}/{self.analyses}>'
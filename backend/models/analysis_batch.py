@@ -0,0 +1,73 @@
+"""
+批次分析模型
+Analysis Batch Model - 記錄以 Message Batches API 離線分析多個專案的批次與各專案的結果
+"""
+
+from . import db
+from datetime import datetime
+
+
+class AnalysisBatch(db.Model):
+    """批次分析（一次提交多個專案的綜合分析，結果在數分鐘至 24 小時內陸續完成）"""
+
+    __tablename__ = 'analysis_batches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    # 提交與輪詢此批次的背景任務（重新開始輪詢時更新）
+    job_id = db.Column(db.Integer, db.ForeignKey('background_jobs.id', ondelete='SET NULL'), index=True)
+
+    # 服務端的批次 ID（提交前為空；所有專案都命中結果快取時不提交）
+    provider_batch_id = db.Column(db.String(100), index=True)
+
+    # 狀態：pending（準備提交）, in_progress, canceling, ended（服務端已完成、結果寫入中）,
+    # completed, failed（提交失敗）, cancelled（提交前取消）
+    status = db.Column(db.String(20), default='pending', nullable=False, index=True)
+    analysis_type = db.Column(db.String(50), default='comprehensive')
+    force_refresh = db.Column(db.Boolean, default=False)
+
+    # 要分析的專案 ID 列表
+    project_ids = db.Column(db.JSON)
+    # 已提交的請求：{custom_id: {'project_id', 'title', 'cache_key', 'papers_analyzed', 'compaction'}}
+    requests = db.Column(db.JSON)
+    # 各專案的結果：{project_id: {'status', 'analysis_id', 'cache_hit', 'error'}}
+    results = db.Column(db.JSON)
+    # 服務端回報的請求數：{'processing', 'succeeded', 'errored', 'canceled', 'expired'}
+    request_counts = db.Column(db.JSON)
+    error = db.Column(db.Text)
+
+    # 時間戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    submitted_at = db.Column(db.DateTime)
+    ended_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def is_finished(self):
+        """批次是否已結束（所有結果已寫入，或未能提交）"""
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def to_dict(self):
+        """轉換為字典"""
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'provider_batch_id': self.provider_batch_id,
+            'status': self.status,
+            'analysis_type': self.analysis_type,
+            'force_refresh': self.force_refresh,
+            'project_ids': self.project_ids or [],
+            'requests': len(self.requests or {}),
+            'results': self.results or {},
+            'request_counts': self.request_counts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
+            'ended_at': self.ended_at.isoformat() if self.ended_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<AnalysisBatch {self.id}: {self.status}>'
@@ -32,8 +32,11 @@ class Author(db.Model):
     total_papers = db.Column(db.Integer, default=0)  # 論文總數
     total_citations = db.Column(db.Integer, default=0)  # 引用總數
     h_index = db.Column(db.Integer, default=0)
+    g_index = db.Column(db.Integer, default=0, server_default='0')
+    i10_index = db.Column(db.Integer, default=0, server_default='0')  # 引用數 >= 10 的論文數
     first_author_count = db.Column(db.Integer, default=0)  # 第一作者論文數
     corresponding_author_count = db.Column(db.Integer, default=0)  # 通訊作者論文數
+    metrics_computed_at = db.Column(db.DateTime, index=True)  # 統計數據的計算時間（增量更新用）
 
     # 網絡分析結果
     is_key_person = db.Column(db.Boolean, default=False)  # 是否為關鍵人物
@@ -68,6 +71,8 @@ class Author(db.Model):
             'total_papers': self.total_papers,
             'total_citations': self.total_citations,
             'h_index': self.h_index,
+            'g_index': self.g_index,
+            'i10_index': self.i10_index,
             'first_author_count': self.first_author_count,
             'corresponding_author_count': self.corresponding_author_count,
             'is_key_person': self.is_key_person,
@@ -101,7 +106,7 @@ class PaperAuthor(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # 關聯
-    paper = db.relationship('Paper', backref='paper_authors')
+    paper = db.relationship('Paper', backref=db.backref('paper_authors', cascade='all, delete-orphan'))
     author = db.relationship('Author', back_populates='paper_authors')
 
     def to_dict(self):
@@ -157,3 +162,101 @@ class Collaboration(db.Model):
             'last_collaboration_year': self.last_collaboration_year,
             'collaboration_strength': self.collaboration_strength
         }
+
+
+class ProjectAuthorCommunity(db.Model):
+    """專案內作者的研究社群（學術陣營）"""
+
+    __tablename__ = 'project_author_communities'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('authors.id'), nullable=False, index=True)
+
+    # 社群檢測結果
+    community_id = db.Column(db.Integer, nullable=False)  # 社群編號（0 為最大社群）
+    community_size = db.Column(db.Integer, default=1)  # 該社群的作者數
+
+    # 時間戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 關聯
+    project = db.relationship(
+        'Project',
+        backref=db.backref('author_communities', lazy='dynamic', cascade='all, delete-orphan')
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'author_id', name='unique_project_author_community'),
+    )
+
+    def to_dict(self):
+        """轉換為字典"""
+        return {
+            'project_id': self.project_id,
+            'author_id': self.author_id,
+            'community_id': self.community_id,
+            'community_size': self.community_size
+        }
+
+
+class ProjectAuthorMetric(db.Model):
+    """專案內作者的網絡分析指標（每個專案獨立，互不覆蓋）"""
+
+    __tablename__ = 'project_author_metrics'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('authors.id'), nullable=False, index=True)
+
+    # 專案內的統計
+    papers_in_project = db.Column(db.Integer, default=0)  # 專案內的論文數
+    citations_in_project = db.Column(db.Integer, default=0)  # 專案內論文的引用總數
+    first_author_count = db.Column(db.Integer, default=0)  # 專案內第一作者論文數
+    degree = db.Column(db.Integer, default=0)  # 合作者數量
+
+    # 網絡分析結果
+    degree_centrality = db.Column(db.Float, default=0.0)
+    betweenness_centrality = db.Column(db.Float, default=0.0)
+    closeness_centrality = db.Column(db.Float, default=0.0)
+    pagerank = db.Column(db.Float, default=0.0)
+    influence_score = db.Column(db.Float, default=0.0)
+    is_key_person = db.Column(db.Boolean, default=False)
+
+    # 分析後專案新增或刪除了論文（指標仍為上次分析的結果，需重新分析）
+    is_stale = db.Column(db.Boolean, default=False, nullable=False)
+
+    # 時間戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 關聯
+    author = db.relationship('Author')
+    project = db.relationship(
+        'Project',
+        backref=db.backref('author_metrics', lazy='dynamic', cascade='all, delete-orphan')
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'author_id', name='unique_project_author_metric'),
+        # 關鍵人物排序與統計查詢使用
+        db.Index('ix_project_author_metrics_influence', 'project_id', 'influence_score'),
+        db.Index('ix_project_author_metrics_papers', 'project_id', 'papers_in_project'),
+    )
+
+    def to_dict(self):
+        """轉換為字典"""
+        return {
+            'project_id': self.project_id,
+            'author_id': self.author_id,
+            'papers_in_project': self.papers_in_project,
+            'citations_in_project': self.citations_in_project,
+            'first_author_count': self.first_author_count,
+            'degree': self.degree,
+            'degree_centrality': self.degree_centrality,
+            'betweenness_centrality': self.betweenness_centrality,
+            'closeness_centrality': self.closeness_centrality,
+            'pagerank': self.pagerank,
+            'influence_score': self.influence_score,
+            'is_key_person': self.is_key_person,
+            'is_stale': self.is_stale
+        }
@@ -0,0 +1,69 @@
+"""
+背景任務模型
+Background Job Model - 記錄長時間運行任務的狀態與進度
+"""
+
+from . import db
+from datetime import datetime
+
+
+class BackgroundJob(db.Model):
+    """背景任務"""
+
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), index=True)
+
+    # 任務類型：network_analysis 等
+    job_type = db.Column(db.String(50), nullable=False, index=True)
+
+    # 狀態：queued, running, succeeded, failed, cancelled
+    status = db.Column(db.String(20), default='queued', nullable=False, index=True)
+    progress = db.Column(db.Float, default=0.0)  # 0.0 - 1.0
+    message = db.Column(db.String(500))  # 目前進度說明
+    cancel_requested = db.Column(db.Boolean, default=False)
+
+    # 任務參數與結果
+    params = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+
+    # 時間戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # 關聯
+    project = db.relationship(
+        'Project',
+        backref=db.backref('background_jobs', lazy='dynamic', cascade='all, delete-orphan')
+    )
+
+    @property
+    def is_finished(self):
+        """任務是否已結束"""
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def to_dict(self):
+        """轉換為字典"""
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'cancel_requested': self.cancel_requested,
+            'params': self.params,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.id}: {self.job_type} {self.status}>'
@@ -0,0 +1,76 @@
+"""
+引用網絡模型
+Citation Models - 按 DOI 快取的參考文獻列表，以及專案內論文之間的引用關係
+"""
+
+from . import db
+from datetime import datetime
+
+
+class ReferenceCache(db.Model):
+    """參考文獻列表快取（跨專案共用，同一 DOI 只抓取一次）"""
+
+    __tablename__ = 'reference_caches'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # 快取鍵：正規化後的 DOI；沒有 DOI 的論文以 paper:<id> 保存從 PDF 文本解析的結果
+    cache_key = db.Column(db.String(255), nullable=False, unique=True, index=True)
+
+    # 來源：crossref / pdf
+    source = db.Column(db.String(20), nullable=False)
+
+    # 狀態：ok / not_found（Crossref 沒有此 DOI 或沒有參考文獻）
+    status = db.Column(db.String(20), default='ok', nullable=False)
+
+    # 參考文獻列表 [{doi, title, year, raw}]
+    references = db.Column(db.JSON)
+
+    # 時間戳
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ReferenceCache {self.cache_key} {self.source} {self.status}>'
+
+
+class PaperCitation(db.Model):
+    """專案內論文之間的引用關係（citing 引用 cited）"""
+
+    __tablename__ = 'paper_citations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    citing_paper_id = db.Column(db.Integer, db.ForeignKey('papers.id'), nullable=False, index=True)
+    cited_paper_id = db.Column(db.Integer, db.ForeignKey('papers.id'), nullable=False, index=True)
+
+    # 比對方式：doi / title
+    matched_by = db.Column(db.String(20))
+
+    # 時間戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 關聯（論文刪除時一併刪除引用關係）
+    citing_paper = db.relationship(
+        'Paper', foreign_keys=[citing_paper_id],
+        backref=db.backref('outgoing_citations', cascade='all, delete-orphan')
+    )
+    cited_paper = db.relationship(
+        'Paper', foreign_keys=[cited_paper_id],
+        backref=db.backref('incoming_citations', cascade='all, delete-orphan')
+    )
+    project = db.relationship(
+        'Project',
+        backref=db.backref('paper_citations', lazy='dynamic', cascade='all, delete-orphan')
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint('citing_paper_id', 'cited_paper_id', name='unique_paper_citation'),
+    )
+
+    def to_dict(self):
+        """轉換為字典"""
+        return {
+            'citing_paper_id': self.citing_paper_id,
+            'cited_paper_id': self.cited_paper_id,
+            'matched_by': self.matched_by
+        }
@@ -41,6 +41,20 @@ class GapAnalysis(db.Model):
     papers_analyzed = db.Column(db.Integer, default=0)  # 分析的論文數量
     confidence_score = db.Column(db.Float)  # 分析可信度（可選）
 
+    # 生成狀態：generating（串流生成中，full_text 為已生成的部分）/ completed / failed（程序重啟而中斷）
+    status = db.Column(db.String(20), default='completed', server_default='completed', index=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('background_jobs.id', ondelete='SET NULL'), index=True)  # 生成此報告的背景任務
+    batch_id = db.Column(db.Integer, db.ForeignKey('analysis_batches.id', ondelete='SET NULL'), index=True)  # 批次分析的報告
+
+    # 用量：cache_hit 表示直接使用快取的 AI 回應（此時 token 數為原本計費、本次節省的用量）
+    cache_hit = db.Column(db.Boolean, default=False, server_default=db.false())
+    input_tokens = db.Column(db.Integer)
+    output_tokens = db.Column(db.Integer)
+
+    # 提示快取：寫入與讀取的輸入 token 數（不含在 input_tokens 內；讀取按較低費率計費）
+    cache_creation_input_tokens = db.Column(db.Integer)
+    cache_read_input_tokens = db.Column(db.Integer)
+
     # 時間戳
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -65,6 +79,14 @@ class GapAnalysis(db.Model):
             'model_used': self.model_used,
             'papers_analyzed': self.papers_analyzed,
             'confidence_score': self.confidence_score,
+            'status': self.status,
+            'job_id': self.job_id,
+            'batch_id': self.batch_id,
+            'cache_hit': self.cache_hit,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'cache_creation_input_tokens': self.cache_creation_input_tokens,
+            'cache_read_input_tokens': self.cache_read_input_tokens,
             'generated_at': self.generated_at.isoformat() if self.generated_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
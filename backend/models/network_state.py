@@ -0,0 +1,69 @@
+"""
+網絡狀態模型
+Network State Models - 持久化專案的作者網絡分析器狀態（支援增量更新）與衍生結果快取
+"""
+
+from . import db
+from datetime import datetime
+
+
+class NetworkState(db.Model):
+    """專案作者網絡狀態"""
+
+    __tablename__ = 'network_states'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, unique=True, index=True)
+
+    # 版本號：每次論文新增或刪除時遞增，用於判斷衍生快取是否過期
+    revision = db.Column(db.Integer, default=1, nullable=False)
+
+    # AuthorNetworkAnalyzer.to_state() 的輸出
+    state = db.Column(db.JSON)
+
+    # 時間戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # 關聯
+    project = db.relationship(
+        'Project',
+        backref=db.backref('network_state', uselist=False, cascade='all, delete-orphan')
+    )
+
+    def __repr__(self):
+        return f'<NetworkState project={self.project_id} rev={self.revision}>'
+
+
+class NetworkArtifact(db.Model):
+    """按網絡版本快取的衍生分析結果（時間序列、佈局等）"""
+
+    __tablename__ = 'network_artifacts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+
+    # 結果類型（timeline 等）與參數鍵（同類型不同參數分別快取）
+    kind = db.Column(db.String(50), nullable=False)
+    params_key = db.Column(db.String(255), nullable=False, default='')
+
+    # 計算時的 NetworkState.revision，不一致時視為過期
+    revision = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.JSON)
+
+    # 時間戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # 關聯
+    project = db.relationship(
+        'Project',
+        backref=db.backref('network_artifacts', lazy='dynamic', cascade='all, delete-orphan')
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'kind', 'params_key', name='unique_network_artifact'),
+    )
+
+    def __repr__(self):
+        return f'<NetworkArtifact project={self.project_id} {self.kind} rev={self.revision}>'
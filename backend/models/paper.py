@@ -30,6 +30,12 @@ class Paper(db.Model):
     conclusion = db.Column(db.Text)  # 結論/討論（後幾段）
     full_text = db.Column(db.Text)  # 完整文本（可選）
 
+    # AI 結構化摘要（研究問題、方法、資料、發現、限制），導入時由背景任務生成一次，供每次分析重用
+    digest = db.Column(db.JSON)
+    digest_hash = db.Column(db.String(64))  # 生成時的內容雜湊，標題、摘要或引言結論改變後摘要失效
+    digest_model = db.Column(db.String(100))
+    digested_at = db.Column(db.DateTime)
+
     # 元數據
     pdf_path = db.Column(db.String(500))  # PDF 文件路徑
     bibtex = db.Column(db.Text)  # BibTeX 格式
@@ -67,6 +73,7 @@ class Paper(db.Model):
             'abstract': self.abstract,
             'introduction': self.introduction,
             'conclusion': self.conclusion,
+            'digest': self.digest,
             'pdf_path': self.pdf_path,
             'bibtex': self.bibtex,
             'tags': self.tags.split(',') if self.tags else [],
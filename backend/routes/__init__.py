@@ -11,5 +11,6 @@ from .network import network_bp
 from .analysis import analysis_bp
 from .search import search_bp
 from .settings import settings_bp
+from .jobs import jobs_bp
 
-__all__ = ['auth_bp', 'projects_bp', 'papers_bp', 'network_bp', 'analysis_bp', 'search_bp', 'settings_bp']
+__all__ = ['auth_bp', 'projects_bp', 'papers_bp', 'network_bp', 'analysis_bp', 'search_bp', 'settings_bp', 'jobs_bp']
@@ -3,10 +3,19 @@ AI 分析 API
 Analysis Routes - AI 輔助研究缺口識別
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Project, Paper, GapAnalysis, User
+from models import db, Project, Paper, GapAnalysis, User, BackgroundJob, AnalysisBatch
+from services.analysis_jobs import (
+    ANALYSIS_MODES, MIN_PAPERS_FOR_ANALYSIS, analysis_stream_events, gap_analysis_job, plan_analysis,
+    resolve_api_key
+)
 from services.ai_analyzer import AIAnalyzer
+from services.ai_cache import get_usage_stats
+from services.ai_sections import ANALYSIS_TYPES
+from services.analysis_batches import cancel_analysis_batch, resume_analysis_batch, start_analysis_batch
+from services.background_jobs import submit_job, cancel_job
+from services.paper_digest import paper_digest_job
 import os
 import re
 from docx import Document
@@ -21,13 +30,19 @@ analysis_bp = Blueprint('analysis', __name__, url_prefix='/api/analysis')
 @jwt_required()
 def analyze_project(project_id):
     """
-    執行專案的 AI 分析
+    在背景執行專案的 AI 分析，請求立即返回任務
     POST /api/analysis/projects/:id/analyze
 
     Body: {
-        "analysis_type": "comprehensive" | "domain_history" | "core_problems" | ...,
-        "title": "分析報告標題（可選）"
+        "analysis_type": "comprehensive" | "domain_history" | "core_problems" | ...,  // 單一段落類型只生成該段
+        "title": "分析報告標題（可選）",
+        "force_refresh": false,  // 忽略快取的結果，重新呼叫 Claude
+        "mode": "auto" | "single" | "map_reduce" | "sections"
+        // auto：論文集超出單次上下文時分批摘要後合併；sections：各段落並行生成後合併
     }
+
+    以 GET /api/analysis/jobs/:job_id 查詢進度，完成後返回分析報告；
+    或以 GET /api/analysis/jobs/:job_id/stream 即時接收生成中的內容
     """
     user_id = int(get_jwt_identity())
 
@@ -40,73 +55,405 @@ def analyze_project(project_id):
     data = request.get_json() or {}
     analysis_type = data.get('analysis_type', 'comprehensive')
     title = data.get('title', f'{project.name} - AI 分析報告')
+    force_refresh = bool(data.get('force_refresh', False))
+    mode = data.get('mode', 'auto')
+    if mode not in ANALYSIS_MODES:
+        return jsonify({'error': f'mode 必須是 {", ".join(ANALYSIS_MODES)} 之一'}), 400
+    if analysis_type not in ANALYSIS_TYPES:
+        return jsonify({'error': f'analysis_type 必須是 {", ".join(ANALYSIS_TYPES)} 之一'}), 400
 
     # 獲取用戶的 API Key
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': '用戶不存在'}), 404
 
-    api_key = user.get_anthropic_api_key()
-    if not api_key:
-        # 如果用戶沒有設定，嘗試使用環境變數（向後相容）
-        api_key = os.environ.get('ANTHROPIC_API_KEY')
-        if not api_key:
-            return jsonify({
-                'error': '未配置 AI API 金鑰',
-                'message': '請在設定頁面設置您的 Anthropic API Key'
-            }), 403
+    if not resolve_api_key(user):
+        return jsonify({
+            'error': '未配置 AI API 金鑰',
+            'message': '請在設定頁面設置您的 Anthropic API Key'
+        }), 403
 
     try:
-        # 獲取專案的所有論文
-        papers = Paper.query.filter_by(project_id=project_id).order_by(Paper.year).all()
+        paper_count = Paper.query.filter_by(project_id=project_id).count()
 
-        if not papers:
+        if paper_count == 0:
             return jsonify({'error': '專案中沒有論文'}), 400
 
-        if len(papers) < 3:
+        if paper_count < MIN_PAPERS_FOR_ANALYSIS:
             return jsonify({
                 'error': '論文數量不足',
-                'message': '建議至少有 3 篇論文才能進行有效分析'
+                'message': f'建議至少有 {MIN_PAPERS_FOR_ANALYSIS} 篇論文才能進行有效分析'
             }), 400
 
-        # 創建 AI 分析器
-        analyzer = AIAnalyzer(api_key=api_key)
+        job = submit_job(
+            'gap_analysis', user_id, gap_analysis_job,
+            project_id=project_id,
+            params={
+                'project_id': project_id,
+                'user_id': user_id,
+                'analysis_type': analysis_type,
+                'title': title,
+                'force_refresh': force_refresh,
+                'mode': mode
+            }
+        )
+
+        return jsonify({
+            'success': True,
+            'message': 'AI 分析已加入背景任務',
+            'job': job.to_dict()
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'分析失敗: {str(e)}'}), 500
+
+
+@analysis_bp.route('/projects/<int:project_id>/estimate', methods=['GET'])
+@jwt_required()
+def estimate_analysis(project_id):
+    """
+    在分析前估算提示各段落的 token 數與分析方式（不呼叫 AI API）
+    GET /api/analysis/projects/:id/estimate?mode=auto&analysis_type=comprehensive
+
+    Returns:
+        {
+            "plan": {
+                "mode": "single" | "map_reduce" | "sections",
+                "prompt": {"sections": {"instructions", "project", "papers"}, "total", "max_output_tokens"},
+                    // sections 模式另含 "requests": {段落: tokens} 與 "largest_request"
+                "max_prompt_tokens": 150000,
+                "compaction": {...} | null,  // single / sections 模式下超出上限時挑選論文的結果
+                "batches": [{"label", "papers", "tokens"}] | null,
+                "sections": ["domain_history", ...] | null
+            }
+        }
+    """
+    user_id = int(get_jwt_identity())
+
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
 
-        # 執行分析
-        result = analyzer.analyze_with_context(
-            papers=papers,
-            domain_name=project.domain or project.name,
-            analysis_type=analysis_type
+    mode = request.args.get('mode', 'auto')
+    if mode not in ANALYSIS_MODES:
+        return jsonify({'error': f'mode 必須是 {", ".join(ANALYSIS_MODES)} 之一'}), 400
+    analysis_type = request.args.get('analysis_type', 'comprehensive')
+    if analysis_type not in ANALYSIS_TYPES:
+        return jsonify({'error': f'analysis_type 必須是 {", ".join(ANALYSIS_TYPES)} 之一'}), 400
+
+    api_key = resolve_api_key(User.query.get(user_id))
+    if not api_key:
+        return jsonify({
+            'error': '未配置 AI API 金鑰',
+            'message': '請在設定頁面設置您的 Anthropic API Key'
+        }), 403
+
+    try:
+        papers = Paper.query.filter_by(project_id=project_id).order_by(Paper.year, Paper.id).all()
+        _, _, plan = plan_analysis(
+            AIAnalyzer(api_key=api_key), papers, project.domain or project.name, mode, current_app.config,
+            analysis_type
         )
 
-        # 保存分析結果
-        gap_analysis = GapAnalysis(
+        return jsonify({
+            'success': True,
+            'papers': len(papers),
+            'plan': plan
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'估算失敗: {str(e)}'}), 500
+
+
+@analysis_bp.route('/projects/<int:project_id>/digests', methods=['POST'])
+@jwt_required()
+def generate_paper_digests(project_id):
+    """
+    為專案中尚未生成（或內容已改變）的論文生成結構化摘要（背景任務）
+    POST /api/analysis/projects/:id/digests
+
+    適用於開啟自動摘要前導入的論文，或導入時沒有 API Key 的專案
+
+    Returns:
+        {"job": {...}}  // 以 GET /api/jobs/:id 查詢進度
+    """
+    user_id = int(get_jwt_identity())
+
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    if not resolve_api_key(User.query.get(user_id)):
+        return jsonify({
+            'error': '未配置 AI API 金鑰',
+            'message': '請在設定頁面設置您的 Anthropic API Key'
+        }), 403
+
+    try:
+        job = submit_job(
+            'paper_digest', user_id, paper_digest_job,
             project_id=project_id,
-            title=title,
-            analysis_type=analysis_type,
-            full_text=result.get('full_text') or result.get('content', ''),
-            model_used=result.get('model'),
-            papers_analyzed=len(papers)
+            params={'project_id': project_id, 'user_id': user_id, 'paper_ids': None}
         )
 
-        # 如果是綜合分析，嘗試解析結構化內容
-        if analysis_type == 'comprehensive' and 'full_text' in result:
-            gap_analysis.summary = result.get('full_text')
+        return jsonify({
+            'success': True,
+            'message': '論文摘要已加入背景任務',
+            'job': job.to_dict()
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'生成摘要失敗: {str(e)}'}), 500
 
-        db.session.add(gap_analysis)
-        db.session.commit()
+
+@analysis_bp.route('/batches', methods=['POST'])
+@jwt_required()
+def create_analysis_batch():
+    """
+    以批次 API 離線分析多個專案的綜合分析（不佔用互動式分析，按批次價格計費）
+    POST /api/analysis/batches
+
+    Body: {
+        "project_ids": [1, 2, ...],  // 可選，預設為用戶的所有專案
+        "force_refresh": false  // 忽略快取的結果，所有專案都重新分析
+    }
+
+    結果通常在一小時內完成（最長 24 小時），完成的專案各新增一份分析報告；
+    以 GET /api/analysis/batches/:id 查詢進度
+
+    Returns:
+        {"batch": {...}, "job": {...}}
+    """
+    user_id = int(get_jwt_identity())
+
+    if not resolve_api_key(User.query.get(user_id)):
+        return jsonify({
+            'error': '未配置 AI API 金鑰',
+            'message': '請在設定頁面設置您的 Anthropic API Key'
+        }), 403
+
+    data = request.get_json() or {}
+    project_ids = data.get('project_ids')
+    force_refresh = bool(data.get('force_refresh', False))
+
+    query = Project.query.filter_by(user_id=user_id)
+    if project_ids is not None:
+        if not isinstance(project_ids, list) or not all(isinstance(pid, int) for pid in project_ids):
+            return jsonify({'error': 'project_ids 必須是專案 ID 列表'}), 400
+        query = query.filter(Project.id.in_(project_ids))
+    owned_ids = sorted(project.id for project in query.all())
+
+    if project_ids is not None and len(owned_ids) != len(set(project_ids)):
+        return jsonify({'error': '專案不存在或無權限'}), 404
+    if not owned_ids:
+        return jsonify({'error': '沒有可分析的專案'}), 400
+
+    max_projects = current_app.config.get('ANALYSIS_BATCH_MAX_PROJECTS', 200)
+    if len(owned_ids) > max_projects:
+        return jsonify({'error': f'單一批次最多 {max_projects} 個專案'}), 400
+
+    try:
+        batch = start_analysis_batch(user_id, owned_ids, force_refresh=force_refresh)
 
         return jsonify({
             'success': True,
-            'message': 'AI 分析完成',
-            'analysis': gap_analysis.to_dict()
-        }), 201
+            'message': f'{len(owned_ids)} 個專案已加入批次分析',
+            'batch': batch.to_dict(),
+            'job': BackgroundJob.query.get(batch.job_id).to_dict()
+        }), 202
 
-    except ValueError as e:
-        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'分析失敗: {str(e)}'}), 500
+        return jsonify({'error': f'建立批次分析失敗: {str(e)}'}), 500
+
+
+@analysis_bp.route('/batches', methods=['GET'])
+@jwt_required()
+def get_analysis_batches():
+    """
+    獲取用戶最近的批次分析
+    GET /api/analysis/batches
+    """
+    user_id = int(get_jwt_identity())
+
+    batches = AnalysisBatch.query.filter_by(user_id=user_id)\
+        .order_by(AnalysisBatch.created_at.desc()).limit(20).all()
+
+    return jsonify({
+        'success': True,
+        'batches': [batch.to_dict() for batch in batches]
+    }), 200
+
+
+@analysis_bp.route('/batches/<int:batch_id>', methods=['GET'])
+@jwt_required()
+def get_analysis_batch(batch_id):
+    """
+    獲取批次分析的狀態與各專案的結果
+    GET /api/analysis/batches/:id
+
+    Returns:
+        {"batch": {..., "results": {project_id: {"status", "analysis_id", "cache_hit", "error"}}}, "job": {...}}
+    """
+    user_id = int(get_jwt_identity())
+
+    batch = AnalysisBatch.query.filter_by(id=batch_id, user_id=user_id).first()
+    if not batch:
+        return jsonify({'error': '批次不存在或無權限'}), 404
+
+    job = BackgroundJob.query.get(batch.job_id) if batch.job_id else None
+
+    return jsonify({
+        'success': True,
+        'batch': batch.to_dict(),
+        'job': job.to_dict() if job else None
+    }), 200
+
+
+@analysis_bp.route('/batches/<int:batch_id>/resume', methods=['POST'])
+@jwt_required()
+def resume_batch(batch_id):
+    """
+    重新開始輪詢批次（輪詢任務被取消、失敗或伺服器重啟後使用；已寫入的報告不會重複）
+    POST /api/analysis/batches/:id/resume
+    """
+    user_id = int(get_jwt_identity())
+
+    batch = AnalysisBatch.query.filter_by(id=batch_id, user_id=user_id).first()
+    if not batch:
+        return jsonify({'error': '批次不存在或無權限'}), 404
+
+    if batch.is_finished:
+        return jsonify({'error': '批次已結束', 'batch': batch.to_dict()}), 409
+
+    job = BackgroundJob.query.get(batch.job_id) if batch.job_id else None
+    if job and not job.is_finished:
+        return jsonify({'error': '批次正在處理中', 'batch': batch.to_dict()}), 409
+
+    try:
+        batch = resume_analysis_batch(batch)
+
+        return jsonify({
+            'success': True,
+            'batch': batch.to_dict(),
+            'job': BackgroundJob.query.get(batch.job_id).to_dict()
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'重新開始批次失敗: {str(e)}'}), 500
+
+
+@analysis_bp.route('/batches/<int:batch_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_batch(batch_id):
+    """
+    取消批次分析（已完成的專案仍會寫入報告）
+    POST /api/analysis/batches/:id/cancel
+    """
+    user_id = int(get_jwt_identity())
+
+    batch = AnalysisBatch.query.filter_by(id=batch_id, user_id=user_id).first()
+    if not batch:
+        return jsonify({'error': '批次不存在或無權限'}), 404
+
+    if batch.is_finished or batch.status in ('canceling', 'ended'):
+        return jsonify({'error': '批次已結束，無法取消', 'batch': batch.to_dict()}), 409
+
+    try:
+        batch = cancel_analysis_batch(batch)
+
+        return jsonify({
+            'success': True,
+            'message': '已請求取消批次',
+            'batch': batch.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'取消批次失敗: {str(e)}'}), 500
+
+
+@analysis_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_analysis_job(job_id):
+    """
+    獲取 AI 分析任務的狀態，完成時一併返回分析報告
+    GET /api/analysis/jobs/:id
+    """
+    user_id = int(get_jwt_identity())
+
+    job = BackgroundJob.query.filter_by(id=job_id, user_id=user_id, job_type='gap_analysis').first()
+    if not job:
+        return jsonify({'error': '任務不存在或無權限'}), 404
+
+    analysis = None
+    if job.status == 'succeeded' and job.result:
+        analysis = GapAnalysis.query.get(job.result.get('analysis_id'))
+
+    return jsonify({
+        'success': True,
+        'job': job.to_dict(),
+        'analysis': analysis.to_dict() if analysis else None
+    }), 200
+
+
+@analysis_bp.route('/jobs/<int:job_id>/stream', methods=['GET'])
+@jwt_required()
+def stream_analysis_job(job_id):
+    """
+    以 Server-Sent Events 即時接收 AI 分析生成的內容
+    GET /api/analysis/jobs/:id/stream?offset=0
+
+    Query Parameters:
+        offset: 已收到的字元數，斷線後從此位置續傳（也接受 Last-Event-ID 標頭）
+
+    事件：status, delta, done, error, reconnect（見 analysis_stream_events）
+    """
+    user_id = int(get_jwt_identity())
+
+    job = BackgroundJob.query.filter_by(id=job_id, user_id=user_id, job_type='gap_analysis').first()
+    if not job:
+        return jsonify({'error': '任務不存在或無權限'}), 404
+
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        offset = request.headers.get('Last-Event-ID', 0, type=int)
+    if offset < 0:
+        return jsonify({'error': 'offset 不可為負數'}), 400
+
+    return Response(
+        stream_with_context(analysis_stream_events(job_id, offset)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@analysis_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_analysis_job(job_id):
+    """
+    取消 AI 分析任務（執行中的任務在下一次寫入生成內容時停止）
+    POST /api/analysis/jobs/:id/cancel
+    """
+    user_id = int(get_jwt_identity())
+
+    job = BackgroundJob.query.filter_by(id=job_id, user_id=user_id, job_type='gap_analysis').first()
+    if not job:
+        return jsonify({'error': '任務不存在或無權限'}), 404
+
+    if job.is_finished:
+        return jsonify({'error': '任務已結束，無法取消', 'job': job.to_dict()}), 409
+
+    job = cancel_job(job)
+
+    return jsonify({
+        'success': True,
+        'message': '已請求取消任務',
+        'job': job.to_dict()
+    }), 200
 
 
 @analysis_bp.route('/projects/<int:project_id>/analyses', methods=['GET'])
@@ -124,8 +471,8 @@ def get_project_analyses(project_id):
         return jsonify({'error': '專案不存在或無權限'}), 404
 
     try:
-        # 獲取所有分析報告
-        analyses = GapAnalysis.query.filter_by(project_id=project_id).order_by(
+        # 獲取已完成的分析報告（生成中的報告以 /jobs/:id/stream 接收）
+        analyses = GapAnalysis.query.filter_by(project_id=project_id, status='completed').order_by(
             GapAnalysis.generated_at.desc()
         ).all()
 
@@ -227,6 +574,34 @@ def check_api_key():
     }), 200
 
 
+@analysis_bp.route('/usage', methods=['GET'])
+@jwt_required()
+def get_analysis_usage():
+    """
+    獲取用戶的 AI 分析用量與快取命中統計
+    GET /api/analysis/usage
+
+    Returns:
+        {
+            "usage": {
+                "analyses", "cache_hits", "hit_rate",
+                "input_tokens", "output_tokens",
+                "saved_input_tokens", "saved_output_tokens", "saved_tokens"
+            }
+        }
+    """
+    user_id = int(get_jwt_identity())
+
+    try:
+        return jsonify({
+            'success': True,
+            'usage': get_usage_stats(user_id)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'獲取用量統計失敗: {str(e)}'}), 500
+
+
 @analysis_bp.route('/analyses/<int:analysis_id>/export/docx', methods=['POST'])
 @jwt_required()
 def export_analysis_docx(analysis_id):
@@ -246,6 +621,9 @@ def export_analysis_docx(analysis_id):
     if not project or project.user_id != user_id:
         return jsonify({'error': '無權訪問此分析報告'}), 403
 
+    if analysis.status != 'completed':
+        return jsonify({'error': '分析報告尚未生成完成，無法匯出'}), 409
+
     try:
         # 創建 Word 文檔
         doc = Document()
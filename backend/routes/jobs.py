@@ -0,0 +1,55 @@
+"""
+背景任務 API
+Background Job Routes - 查詢任務狀態與取消任務
+"""
+
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import BackgroundJob
+from services.background_jobs import cancel_job
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """
+    獲取任務狀態與進度
+    GET /api/jobs/:id
+    """
+    user_id = int(get_jwt_identity())
+
+    job = BackgroundJob.query.filter_by(id=job_id, user_id=user_id).first()
+    if not job:
+        return jsonify({'error': '任務不存在或無權限'}), 404
+
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    }), 200
+
+
+@jobs_bp.route('/<int:job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel(job_id):
+    """
+    取消任務
+    POST /api/jobs/:id/cancel
+    """
+    user_id = int(get_jwt_identity())
+
+    job = BackgroundJob.query.filter_by(id=job_id, user_id=user_id).first()
+    if not job:
+        return jsonify({'error': '任務不存在或無權限'}), 404
+
+    if job.is_finished:
+        return jsonify({'error': '任務已結束，無法取消', 'job': job.to_dict()}), 409
+
+    job = cancel_job(job)
+
+    return jsonify({
+        'success': True,
+        'message': '已請求取消任務',
+        'job': job.to_dict()
+    }), 200
@@ -3,11 +3,25 @@
 Network Analysis Routes - 作者網絡分析和關鍵人物識別
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Project, Paper, Author, PaperAuthor, Collaboration
-from services.network_analyzer import AuthorNetworkAnalyzer
-from sqlalchemy import func
+from models import (
+    db, Project, Paper, Author, PaperAuthor, Collaboration, ProjectAuthorCommunity, ProjectAuthorMetric
+)
+from services.network_state import (
+    load_project_analyzer, run_project_analysis, get_or_compute_artifact, get_cached_layout,
+    read_cached_layout, schedule_layout, get_community_overview, get_community_members
+)
+from services.background_jobs import submit_job
+from services.collaboration_graph import get_collaboration_graph, shortest_collaboration_path, ego_network
+from services.institution_network import get_institution_network
+from services.citation_network import citation_sync_job, get_citation_network
+from services.citation_similarity import SIMILARITY_KINDS, SIMILARITY_MEASURES, get_citation_similarity
+from services.author_metrics import author_metrics_job
+from services.network_export import compact_network, encode_network_binary
+from sqlalchemy import and_, case, func, literal, or_
+import base64
+import json
 
 network_bp = Blueprint('network', __name__, url_prefix='/api/network')
 
@@ -19,11 +33,19 @@ def analyze_project_network(project_id):
     分析專案的作者網絡
     POST /api/network/projects/:id/analyze
 
+    Body（可選）: {
+        "resolution": 1.0,   // 社群檢測解析度
+        "seed": 42,          // 社群檢測隨機種子
+        "background": true,  // 以背景任務執行（返回 202 與任務 ID，進度見 /api/jobs/:id）
+        "processes": 8       // 背景任務的行程數（上限為 NETWORK_CENTRALITY_PROCESSES）
+    }
+
     這會：
     1. 分析專案中所有論文的作者關係
     2. 計算中心性指標
     3. 識別關鍵人物
-    4. 更新資料庫中的統計資訊
+    4. 檢測研究社群
+    5. 更新資料庫中的統計資訊
     """
     user_id = int(get_jwt_identity())
 
@@ -32,98 +54,46 @@ def analyze_project_network(project_id):
     if not project:
         return jsonify({'error': '專案不存在或無權限'}), 404
 
-    try:
-        # 獲取專案的所有論文
-        papers = Paper.query.filter_by(project_id=project_id).all()
-
-        if not papers:
-            return jsonify({'error': '專案中沒有論文'}), 400
-
-        # 創建網絡分析器
-        analyzer = AuthorNetworkAnalyzer()
-
-        # 添加論文和作者到網絡
-        for paper in papers:
-            # 獲取論文的作者
-            paper_authors = PaperAuthor.query.filter_by(paper_id=paper.id).all()
-
-            authors_data = []
-            for pa in paper_authors:
-                authors_data.append({
-                    'id': pa.author_id,
-                    'name': pa.author.name,
-                    'position': pa.author_position,
-                    'is_corresponding': pa.is_corresponding
-                })
-
-            # 添加到網絡分析器
-            analyzer.add_paper(
-                paper.id,
-                {
-                    'year': paper.year,
-                    'citation_count': paper.citation_count or 0,
-                    'title': paper.title
-                },
-                authors_data
-            )
-
-        # 計算中心性指標
-        metrics = analyzer.calculate_centrality_metrics()
+    data = request.get_json(silent=True) or {}
 
-        # 更新作者的網絡指標
-        for author_id, author_metrics in metrics.items():
-            author = Author.query.get(author_id)
-            if author:
-                author.degree_centrality = author_metrics['degree_centrality']
-                author.betweenness_centrality = author_metrics['betweenness_centrality']
-                author.closeness_centrality = author_metrics['closeness_centrality']
-                author.influence_score = author_metrics['influence_score']
-                author.is_key_person = author_metrics['influence_score'] > 20  # 閾值可調整
-
-        # 識別關鍵人物
-        key_people = analyzer.identify_key_people(top_n=10)
-
-        # 更新或創建合作關係
-        for author1_id, author2_id, edge_data in analyzer.graph.edges(data=True):
-            # 確保 author1_id < author2_id
-            if author1_id > author2_id:
-                author1_id, author2_id = author2_id, author1_id
-
-            collaboration = Collaboration.query.filter_by(
-                author1_id=author1_id,
-                author2_id=author2_id,
-                project_id=project_id
-            ).first()
+    try:
+        resolution = float(data.get('resolution', 1.0))
+        seed = int(data['seed']) if data.get('seed') is not None else 42
+        max_processes = current_app.config.get('NETWORK_CENTRALITY_PROCESSES', 1)
+        processes = min(int(data.get('processes') or max_processes), max_processes)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'resolution、seed 或 processes 參數格式錯誤'}), 400
 
-            if collaboration:
-                collaboration.collaboration_count = edge_data['weight']
-            else:
-                # 獲取論文年份
-                paper_ids = edge_data['papers']
-                years = [Paper.query.get(pid).year for pid in paper_ids if Paper.query.get(pid) and Paper.query.get(pid).year]
-
-                collaboration = Collaboration(
-                    author1_id=author1_id,
-                    author2_id=author2_id,
-                    project_id=project_id,
-                    collaboration_count=edge_data['weight'],
-                    first_collaboration_year=min(years) if years else None,
-                    last_collaboration_year=max(years) if years else None,
-                    collaboration_strength=edge_data['weight']
-                )
-                db.session.add(collaboration)
+    if not Paper.query.filter_by(project_id=project_id).first():
+        return jsonify({'error': '專案中沒有論文'}), 400
 
-        db.session.commit()
+    # 背景模式：在行程池中計算精確中心性，請求立即返回任務 ID
+    if data.get('background'):
+        job = submit_job(
+            'network_analysis',
+            user_id,
+            _network_analysis_job,
+            project_id=project_id,
+            params={
+                'project_id': project_id,
+                'resolution': resolution,
+                'seed': seed,
+                'processes': processes
+            }
+        )
+        return jsonify({
+            'success': True,
+            'message': '網絡分析已加入背景任務',
+            'job': job.to_dict()
+        }), 202
 
-        # 獲取網絡統計
-        stats = analyzer.get_network_statistics()
+    try:
+        result = run_project_analysis(project_id, resolution=resolution, seed=seed)
 
         return jsonify({
             'success': True,
             'message': '網絡分析完成',
-            'statistics': stats,
-            'key_people_count': len(key_people),
-            'total_authors': len(metrics)
+            **result
         }), 200
 
     except Exception as e:
@@ -131,12 +101,43 @@ def analyze_project_network(project_id):
         return jsonify({'error': f'分析失敗: {str(e)}'}), 500
 
 
+def _network_analysis_job(context, project_id, resolution, seed, processes):
+    """背景網絡分析任務"""
+    context.report_progress(0.0, '載入網絡')
+
+    def on_progress(done, total):
+        # 中心性計算佔整體進度的 10% - 90%
+        context.report_progress(0.1 + 0.8 * done / total, f'計算中心性 {done}/{total}')
+
+    return run_project_analysis(
+        project_id,
+        resolution=resolution,
+        seed=seed,
+        processes=processes,
+        progress_callback=on_progress,
+        before_write=context.check_cancelled,
+        check_cancelled=context.check_cancelled
+    )
+
+
 @network_bp.route('/projects/<int:project_id>/network', methods=['GET'])
 @jwt_required()
 def get_network_data(project_id):
     """
     獲取專案的網絡數據（用於可視化）
-    GET /api/network/projects/:id/network
+    GET /api/network/projects/:id/network?format=json&layout=auto
+
+    format: json（預設，節點帶座標、連線帶論文列表）、compact（欄式 JSON，不含論文列表）、
+            binary（typed arrays，見 services/network_export.encode_network_binary）
+    layout: auto / spring / spectral / pivot_mds / none（伺服器端計算並按網絡版本快取；
+            大型網絡缺少目前版本的佈局時排程背景計算，先返回上一版本的座標並標記 layout_pending）
+
+    篩選參數（在伺服器端對已保存的網絡執行，座標沿用完整網絡的佈局）：
+    min_weight: 最小合作邊權重
+    year_from / year_to: 只以此年份範圍內的論文建立合作關係
+    min_papers: 作者最少論文數
+    k_core: 只保留 k-core
+    top_k / rank_by: 只保留前 K 位作者，rank_by 為 degree（預設）/ pagerank / influence
     """
     user_id = int(get_jwt_identity())
 
@@ -145,42 +146,69 @@ def get_network_data(project_id):
     if not project:
         return jsonify({'error': '專案不存在或無權限'}), 404
 
+    output_format = request.args.get('format', 'json')
+    layout = request.args.get('layout', 'auto')
+    if output_format not in ('json', 'compact', 'binary') or \
+            layout not in ('auto', 'spring', 'spectral', 'pivot_mds', 'none'):
+        return jsonify({'error': 'format 或 layout 參數無效'}), 400
+
+    filters, error = _parse_network_filters(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
     try:
-        # 重新構建網絡（用於可視化）
-        analyzer = AuthorNetworkAnalyzer()
-
-        papers = Paper.query.filter_by(project_id=project_id).all()
-        for paper in papers:
-            paper_authors = PaperAuthor.query.filter_by(paper_id=paper.id).all()
-
-            authors_data = []
-            for pa in paper_authors:
-                authors_data.append({
-                    'id': pa.author_id,
-                    'name': pa.author.name,
-                    'position': pa.author_position,
-                    'is_corresponding': pa.is_corresponding
-                })
-
-            analyzer.add_paper(
-                paper.id,
-                {'year': paper.year, 'citation_count': paper.citation_count or 0},
-                authors_data
-            )
+        # 載入持久化的網絡狀態（無需重新構建）
+        analyzer, network_state = load_project_analyzer(project_id)
+        positions, layout_pending = None, False
+        if layout != 'none':
+            positions, current = read_cached_layout(project_id, layout, network_state)
+            if not current:
+                sync_limit = current_app.config.get('NETWORK_LAYOUT_SYNC_NODE_LIMIT', 300)
+                if analyzer.graph.number_of_nodes() <= sync_limit:
+                    positions = get_cached_layout(project_id, layout, analyzer=analyzer, network_state=network_state)
+                else:
+                    # 大型網絡的佈局在背景計算，不佔用請求執行緒；沒有舊座標的節點由前端模擬
+                    schedule_layout(project_id, user_id, layout)
+                    layout_pending = True
+        db.session.commit()
+
+        graph = None
+        if filters:
+            if filters.get('top_k') is not None and filters.get('rank_by') == 'pagerank' and analyzer.metrics_stale:
+                # 中心性尚未重新分析時，PageRank 按網絡版本快取
+                rows = get_or_compute_artifact(
+                    project_id, 'ranking', {'rank_by': 'pagerank'},
+                    lambda a: [[node, score] for node, score in a.ranking_scores('pagerank').items()],
+                    analyzer=analyzer, network_state=network_state
+                )
+                db.session.commit()
+                filters['scores'] = {node: score for node, score in rows}
+            graph = analyzer.filter_network(**filters)
 
         # 導出網絡數據
-        network_data = analyzer.export_network_data()
+        network_data = analyzer.export_network_data(
+            positions=positions, include_papers=output_format == 'json', graph=graph
+        )
+        _attach_author_details(project_id, network_data)
+        total_nodes = analyzer.graph.number_of_nodes()
 
-        # 添加作者的詳細資訊
-        for node in network_data['nodes']:
-            author = Author.query.get(node['id'])
-            if author:
-                node['institution'] = author.institution
-                node['is_key_person'] = author.is_key_person
-                node['influence_score'] = author.influence_score
+        if output_format == 'binary':
+            response = make_response(encode_network_binary(network_data))
+            response.headers['Content-Type'] = 'application/octet-stream'
+            response.headers['X-Network-Revision'] = str(network_state.revision)
+            response.headers['X-Network-Total-Nodes'] = str(total_nodes)
+            response.headers['X-Network-Layout-Pending'] = '1' if layout_pending else '0'
+            return response
+
+        if output_format == 'compact':
+            network_data = compact_network(network_data)
 
         return jsonify({
             'success': True,
+            'format': output_format,
+            'revision': network_state.revision,
+            'total_nodes': total_nodes,
+            'layout_pending': layout_pending,
             'network': network_data
         }), 200
 
@@ -188,12 +216,12 @@ def get_network_data(project_id):
         return jsonify({'error': f'獲取網絡數據失敗: {str(e)}'}), 500
 
 
-@network_bp.route('/projects/<int:project_id>/key-people', methods=['GET'])
+@network_bp.route('/projects/<int:project_id>/collaborations/<int:author1_id>/<int:author2_id>/papers', methods=['GET'])
 @jwt_required()
-def get_key_people(project_id):
+def get_collaboration_papers(project_id, author1_id, author2_id):
     """
-    獲取專案的關鍵人物列表
-    GET /api/network/projects/:id/key-people
+    按需獲取兩位作者的共同論文（精簡格式的連線不含論文列表）
+    GET /api/network/projects/:id/collaborations/:author1_id/:author2_id/papers
     """
     user_id = int(get_jwt_identity())
 
@@ -203,108 +231,735 @@ def get_key_people(project_id):
         return jsonify({'error': '專案不存在或無權限'}), 404
 
     try:
-        # 獲取專案相關的所有作者
-        author_ids = db.session.query(PaperAuthor.author_id).join(Paper).filter(
-            Paper.project_id == project_id
-        ).distinct().all()
+        analyzer, _ = load_project_analyzer(project_id)
+        db.session.commit()
 
-        author_ids = [aid[0] for aid in author_ids]
+        if not analyzer.graph.has_edge(author1_id, author2_id):
+            return jsonify({'error': '兩位作者在此專案中沒有合作'}), 404
 
-        # 獲取作者詳細資訊並排序
-        authors = Author.query.filter(Author.id.in_(author_ids)).all()
+        paper_ids = analyzer.graph[author1_id][author2_id]['papers']
+        papers = Paper.query.filter(Paper.id.in_(paper_ids)).order_by(Paper.year.asc()).all()
 
-        # 按影響力分數排序
-        authors_sorted = sorted(authors, key=lambda a: a.influence_score or 0, reverse=True)
+        return jsonify({
+            'success': True,
+            'papers': [
+                {'id': p.id, 'title': p.title, 'year': p.year, 'journal': p.journal}
+                for p in papers
+            ]
+        }), 200
 
-        # 計算每個作者在該專案中的論文數
-        author_paper_counts = {}
-        for author in authors:
-            count = PaperAuthor.query.join(Paper).filter(
-                PaperAuthor.author_id == author.id,
-                Paper.project_id == project_id
-            ).count()
-            author_paper_counts[author.id] = count
+    except Exception as e:
+        return jsonify({'error': f'獲取合作論文失敗: {str(e)}'}), 500
+
+
+def _parse_network_filters(args):
+    """
+    解析網絡篩選參數
+
+    Returns:
+        (filters, error)：filters 為 filter_network() 的關鍵字參數，未設定任何條件時為空字典
+    """
+    filters = {}
+    for name, value_type, minimum in (
+        ('min_weight', float, 0),
+        ('year_from', int, None),
+        ('year_to', int, None),
+        ('min_papers', int, 1),
+        ('k_core', int, 1),
+        ('top_k', int, 1)
+    ):
+        if args.get(name) in (None, ''):
+            continue
+        value = args.get(name, type=value_type)
+        if value is None or (minimum is not None and value < minimum):
+            return None, f'{name} 參數無效'
+        filters[name] = value
+
+    rank_by = args.get('rank_by', 'degree')
+    if rank_by not in ('degree', 'pagerank', 'influence'):
+        return None, 'rank_by 必須是 degree、pagerank 或 influence'
+    if 'top_k' in filters:
+        filters['rank_by'] = rank_by
+
+    if filters.get('year_from') is not None and filters.get('year_to') is not None \
+            and filters['year_from'] > filters['year_to']:
+        return None, 'year_from 不能大於 year_to'
+
+    return filters, None
+
+
+def _attach_author_details(project_id, network_data, communities=True):
+    """為節點附加作者資訊、本專案的分析指標與社群結果（各一次查詢）"""
+    node_ids = [node['id'] for node in network_data['nodes'] if not node.get('is_paper_hub')]
+    rows = db.session.query(Author.id, Author.institution, ProjectAuthorMetric).outerjoin(
+        ProjectAuthorMetric,
+        and_(ProjectAuthorMetric.author_id == Author.id, ProjectAuthorMetric.project_id == project_id)
+    ).filter(Author.id.in_(node_ids)).all() if node_ids else []
+    authors = {author_id: (institution, metric) for author_id, institution, metric in rows}
+
+    for node in network_data['nodes']:
+        if node['id'] in authors:
+            institution, metric = authors[node['id']]
+            node['institution'] = institution
+            node['is_key_person'] = metric.is_key_person if metric else False
+            node['influence_score'] = metric.influence_score if metric else 0.0
+
+    if not communities:
+        return
+
+    community_rows = ProjectAuthorCommunity.query.filter_by(project_id=project_id).all()
+    author_communities = {row.author_id: row for row in community_rows}
+
+    for node in network_data['nodes']:
+        community = author_communities.get(node['id'])
+        node['community_id'] = community.community_id if community else None
+        node['community_size'] = community.community_size if community else None
+
+    network_data['communities'] = sorted(
+        [
+            {'community_id': community_id, 'size': size}
+            for community_id, size in {
+                (row.community_id, row.community_size) for row in community_rows
+            }
+        ],
+        key=lambda c: c['community_id']
+    )
+
+
+@network_bp.route('/projects/<int:project_id>/communities', methods=['GET'])
+@jwt_required()
+def get_community_network(project_id):
+    """
+    獲取社群超節點圖：每個研究社群收合為一個節點，社群間的合作權重相加
+    GET /api/network/projects/:id/communities?resolution=1.0&seed=42&min_size=1
+
+    resolution / seed: 社群檢測參數（與 analyze 相同時直接使用分析時預先計算的結果）
+    min_size: 只返回成員數不少於此值的超節點
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    resolution, seed, error = _parse_community_params(request.args)
+    min_size = request.args.get('min_size', 1, type=int)
+    if error or min_size < 1:
+        return jsonify({'error': error or 'min_size 必須大於 0'}), 400
+
+    try:
+        overview = get_community_overview(project_id, resolution, seed)
+        db.session.commit()
+
+        nodes = [node for node in overview['nodes'] if node['size'] >= min_size]
+        visible = {node['id'] for node in nodes}
+
+        return jsonify({
+            'success': True,
+            'total_communities': len(overview['nodes']),
+            'network': {
+                'nodes': nodes,
+                'links': [
+                    link for link in overview['links']
+                    if link['source'] in visible and link['target'] in visible
+                ]
+            }
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'獲取社群網絡失敗: {str(e)}'}), 500
+
+
+@network_bp.route('/projects/<int:project_id>/communities/<int:community_id>', methods=['GET'])
+@jwt_required()
+def get_community_detail(project_id, community_id):
+    """
+    展開單一社群超節點為成員作者的合作網絡
+    GET /api/network/projects/:id/communities/:community_id?resolution=1.0&seed=42
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    resolution, seed, error = _parse_community_params(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        network_data = get_community_members(project_id, community_id, resolution, seed)
+        db.session.commit()
+
+        if network_data is None:
+            return jsonify({'error': '社群不存在'}), 404
+
+        # 成員的社群即為展開的超節點，不使用最近一次分析保存的社群
+        _attach_author_details(project_id, network_data, communities=False)
+        for node in network_data['nodes']:
+            node['community_id'] = community_id
+
+        return jsonify({
+            'success': True,
+            'network': network_data
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'獲取社群成員失敗: {str(e)}'}), 500
+
+
+def _parse_community_params(args):
+    """解析社群檢測參數，返回 (resolution, seed, error)"""
+    resolution = args.get('resolution', 1.0, type=float)
+    seed = args.get('seed', 42, type=int)
+    if resolution is None or resolution <= 0:
+        return None, None, 'resolution 必須大於 0'
+    return resolution, seed, None
+
+
+@network_bp.route('/projects/<int:project_id>/institutions', methods=['GET'])
+@jwt_required()
+def get_institution_collaboration_network(project_id):
+    """
+    獲取機構層級的合作網絡（單位正規化後彙總作者合作關係）
+    GET /api/network/projects/:id/institutions?resolution=1.0&seed=42
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    resolution, seed, error = _parse_community_params(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        network_data = get_institution_network(project_id, resolution, seed)
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'network': network_data
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'獲取機構網絡失敗: {str(e)}'}), 500
+
+
+@network_bp.route('/projects/<int:project_id>/citations/sync', methods=['POST'])
+@jwt_required()
+def sync_citations(project_id):
+    """
+    在背景同步專案的引用關係（抓取參考文獻並比對專案內論文）
+    POST /api/network/projects/:id/citations/sync
+    Body: { "paper_ids": [1, 2] }（可選，只處理指定論文；省略時完整重建）
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    data = request.get_json(silent=True) or {}
+    paper_ids = data.get('paper_ids')
+    if paper_ids is not None and (
+            not isinstance(paper_ids, list) or not all(isinstance(pid, int) for pid in paper_ids)):
+        return jsonify({'error': 'paper_ids 必須是整數列表'}), 400
+
+    try:
+        job = submit_job(
+            'citation_sync', user_id, citation_sync_job,
+            project_id=project_id, params={'project_id': project_id, 'paper_ids': paper_ids}
+        )
+
+        return jsonify({
+            'success': True,
+            'message': '引用關係同步已在背景執行',
+            'job': job.to_dict()
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'同步引用關係失敗: {str(e)}'}), 500
+
+
+@network_bp.route('/projects/<int:project_id>/citations', methods=['GET'])
+@jwt_required()
+def get_citations(project_id):
+    """
+    獲取專案的引用網絡（被引次數、PageRank、主路徑、共被引）
+    GET /api/network/projects/:id/citations?top_n=20
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    top_n = request.args.get('top_n', 20, type=int)
+    if top_n is None or not 1 <= top_n <= 100:
+        return jsonify({'error': 'top_n 必須介於 1 到 100'}), 400
+
+    try:
+        citation_network = get_citation_network(project_id, top_n=top_n)
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'citations': citation_network
+        }), 200
 
-        # 轉換為字典
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'獲取引用網絡失敗: {str(e)}'}), 500
+
+
+@network_bp.route('/projects/<int:project_id>/citations/similarity', methods=['GET'])
+@jwt_required()
+def get_citation_similarity_network(project_id):
+    """
+    獲取書目耦合或共被引網絡（每個節點保留前 k 個最相似的鄰居）
+    GET /api/network/projects/:id/citations/similarity?kind=coupling&k=10&measure=cosine&min_citations=2
+
+    kind: coupling（論文之間共同的參考文獻）或 co_citation（參考文獻被同時引用）
+    measure: cosine（Salton 正規化，預設）或 count（共同次數）
+    min_citations: 共被引只納入被引次數不少於此值的參考文獻
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    kind = request.args.get('kind', 'coupling')
+    measure = request.args.get('measure', 'cosine')
+    k = request.args.get('k', 10, type=int)
+    min_citations = request.args.get('min_citations', 2, type=int)
+
+    if kind not in SIMILARITY_KINDS:
+        return jsonify({'error': f'kind 必須是 {", ".join(SIMILARITY_KINDS)} 之一'}), 400
+    if measure not in SIMILARITY_MEASURES:
+        return jsonify({'error': f'measure 必須是 {", ".join(SIMILARITY_MEASURES)} 之一'}), 400
+    if k is None or not 1 <= k <= 50:
+        return jsonify({'error': 'k 必須介於 1 到 50'}), 400
+    if min_citations is None or min_citations < 1:
+        return jsonify({'error': 'min_citations 必須是正整數'}), 400
+
+    try:
+        similarity = get_citation_similarity(
+            project_id, kind=kind, k=k, measure=measure, min_citations=min_citations
+        )
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'similarity': similarity
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'獲取引用相似度失敗: {str(e)}'}), 500
+
+
+@network_bp.route('/projects/<int:project_id>/path', methods=['GET'])
+@jwt_required()
+def get_collaboration_path(project_id):
+    """
+    查詢兩位作者之間的最短合作路徑
+    GET /api/network/projects/:id/path?source=1&target=2&weighted=false
+
+    weighted: false（預設，最少中間人）或 true（最緊密的合作鏈，邊長為合作強度的倒數）
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    source = request.args.get('source', type=int)
+    target = request.args.get('target', type=int)
+    weighted = request.args.get('weighted', 'false').lower() in ('1', 'true', 'yes')
+    if source is None or target is None:
+        return jsonify({'error': '請提供 source 和 target 作者 ID'}), 400
+
+    try:
+        graph = get_collaboration_graph(project_id)
+
+        missing = [author_id for author_id in (source, target) if author_id not in graph]
+        if missing:
+            return jsonify({'error': f'作者不在此專案的合作網絡中: {missing}'}), 404
+
+        path = shortest_collaboration_path(graph, source, target, weighted=weighted)
+
+        return jsonify({
+            'success': True,
+            'connected': path is not None,
+            'weighted': weighted,
+            'path': path
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'查詢合作路徑失敗: {str(e)}'}), 500
+
+
+@network_bp.route('/projects/<int:project_id>/authors/<int:author_id>/ego', methods=['GET'])
+@jwt_required()
+def get_ego_network(project_id, author_id):
+    """
+    查詢作者的 k 步合作鄰域
+    GET /api/network/projects/:id/authors/:author_id/ego?radius=2&max_nodes=500
+
+    radius: 步數（1-3）
+    max_nodes: 節點數上限（1-5000），超過時保留距離最近的節點
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    radius = request.args.get('radius', 1, type=int)
+    max_nodes = request.args.get('max_nodes', 500, type=int)
+    if radius is None or not 1 <= radius <= 3 or max_nodes is None or not 1 <= max_nodes <= 5000:
+        return jsonify({'error': 'radius 必須介於 1 到 3，max_nodes 必須介於 1 到 5000'}), 400
+
+    try:
+        graph = get_collaboration_graph(project_id)
+        if author_id not in graph:
+            return jsonify({'error': '作者不在此專案的合作網絡中'}), 404
+
+        return jsonify({
+            'success': True,
+            'center': author_id,
+            'radius': radius,
+            'network': ego_network(graph, author_id, radius=radius, max_nodes=max_nodes)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'查詢合作鄰域失敗: {str(e)}'}), 500
+
+
+@network_bp.route('/projects/<int:project_id>/timeline', methods=['GET'])
+@jwt_required()
+def get_network_timeline(project_id):
+    """
+    獲取專案網絡的年度演化序列（關鍵人物排名、連通分量等）
+    GET /api/network/projects/:id/timeline?window=5&top_n=10
+
+    window: 滑動視窗年數（省略為累積模式）
+    top_n: 每年返回的前 N 位作者（1-50）
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    window = request.args.get('window', type=int)
+    top_n = request.args.get('top_n', 10, type=int)
+    if (window is not None and window < 1) or not 1 <= top_n <= 50:
+        return jsonify({'error': 'window 或 top_n 參數超出範圍'}), 400
+
+    try:
+        # 按網絡版本快取，論文未變動時直接返回已保存的序列
+        snapshots = get_or_compute_artifact(
+            project_id, 'timeline', {'window': window, 'top_n': top_n},
+            lambda analyzer: analyzer.temporal_snapshots(window=window, top_n=top_n)
+        )
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'mode': 'sliding' if window else 'cumulative',
+            'window': window,
+            'timeline': snapshots
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'獲取網絡演化失敗: {str(e)}'}), 500
+
+
+@network_bp.route('/projects/<int:project_id>/key-people', methods=['GET'])
+@jwt_required()
+def get_key_people(project_id):
+    """
+    獲取專案的關鍵人物列表
+    GET /api/network/projects/:id/key-people
+    """
+    user_id = int(get_jwt_identity())
+
+    # 驗證專案所有權
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': '專案不存在或無權限'}), 404
+
+    try:
+        # 按影響力排序的前 20 位（單一查詢，總數以窗口函數一併取得）
+        rows = db.session.query(
+            ProjectAuthorMetric,
+            Author,
+            func.count().over().label('total_authors')
+        ).join(Author, Author.id == ProjectAuthorMetric.author_id).filter(
+            ProjectAuthorMetric.project_id == project_id
+        ).order_by(
+            ProjectAuthorMetric.influence_score.desc(), ProjectAuthorMetric.author_id
+        ).limit(20).all()
+
+        # 轉換為字典（網絡指標使用本專案的分析結果）
         key_people = []
-        for author in authors_sorted[:20]:  # 返回前 20 位
+        for metric, author, _ in rows:
             author_dict = author.to_dict()
-            author_dict['papers_in_project'] = author_paper_counts.get(author.id, 0)
+            author_dict.update(_project_metric_fields(metric))
             key_people.append(author_dict)
 
         return jsonify({
             'success': True,
             'key_people': key_people,
-            'total_authors': len(authors)
+            'total_authors': rows[0].total_authors if rows else 0,
+            # 分析後論文有增減：指標為上次分析的結果
+            'stale': any(metric.is_stale for metric, _, _ in rows)
         }), 200
 
     except Exception as e:
         return jsonify({'error': f'獲取關鍵人物失敗: {str(e)}'}), 500
 
 
+def _project_metric_fields(metric):
+    """專案作者指標中覆蓋 Author 全域欄位的部分"""
+    return {
+        'papers_in_project': metric.papers_in_project,
+        'citations_in_project': metric.citations_in_project,
+        'degree': metric.degree,
+        'pagerank': metric.pagerank,
+        'is_key_person': metric.is_key_person,
+        'influence_score': metric.influence_score,
+        'degree_centrality': metric.degree_centrality,
+        'betweenness_centrality': metric.betweenness_centrality,
+        'closeness_centrality': metric.closeness_centrality,
+        'metrics_stale': metric.is_stale
+    }
+
+
+@network_bp.route('/authors/metrics/refresh', methods=['POST'])
+@jwt_required()
+def refresh_author_metrics_job():
+    """
+    在背景重新計算作者指標（論文數、引用數、h-index、g-index、i10-index、影響力分數）
+    POST /api/network/authors/metrics/refresh
+    Body: { "full": false }（預設只處理論文在上次計算後有變動的作者；true 時重算全部作者）
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+
+    try:
+        job = submit_job(
+            'author_metrics', user_id, author_metrics_job,
+            params={'full': bool(data.get('full', False))}
+        )
+
+        return jsonify({
+            'success': True,
+            'message': '作者指標計算已加入背景任務',
+            'job': job.to_dict()
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'計算作者指標失敗: {str(e)}'}), 500
+
+
 @network_bp.route('/authors/<int:author_id>', methods=['GET'])
 @jwt_required()
 def get_author_details(author_id):
     """
     獲取作者詳細資訊
-    GET /api/network/authors/:id
+    GET /api/network/authors/:id?project_id=1&include=author,papers,collaborators
+
+    project_id: 限定在單一專案內（並使用該專案的網絡指標），省略時為用戶所有專案
+    include: 要返回的部分（預設全部），翻頁時可只請求 papers 或 collaborators
+    papers_cursor / papers_limit: 論文分頁（按年份、ID 排序，預設 50 筆）
+    collaborators_cursor / collaborators_limit: 合作者分頁（按合作次數排序，預設 10 筆）
+
+    回應帶有 ETag，內容未變時返回 304
     """
+    user_id = int(get_jwt_identity())
+
+    project_id = request.args.get('project_id', type=int)
+    include = set(request.args.get('include', 'author,papers,collaborators').split(','))
+    papers_limit = request.args.get('papers_limit', 50, type=int)
+    collaborators_limit = request.args.get('collaborators_limit', 10, type=int)
+    if not 1 <= papers_limit <= 200 or not 1 <= collaborators_limit <= 200:
+        return jsonify({'error': 'limit 必須介於 1 到 200'}), 400
+
     try:
-        author = Author.query.get(author_id)
-        if not author:
+        papers_cursor = _decode_cursor(request.args.get('papers_cursor'))
+        collaborators_cursor = _decode_cursor(request.args.get('collaborators_cursor'))
+    except ValueError:
+        return jsonify({'error': '分頁游標無效'}), 400
+
+    if project_id is not None:
+        project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+        if not project:
+            return jsonify({'error': '專案不存在或無權限'}), 404
+        project_filter = Paper.project_id == project_id
+    else:
+        project_filter = Paper.project_id.in_(
+            db.session.query(Project.id).filter(Project.user_id == user_id)
+        )
+
+    try:
+        # 作者與本專案的網絡指標（一次查詢）
+        if project_id is not None:
+            row = db.session.query(Author, ProjectAuthorMetric).outerjoin(
+                ProjectAuthorMetric,
+                and_(ProjectAuthorMetric.author_id == Author.id, ProjectAuthorMetric.project_id == project_id)
+            ).filter(Author.id == author_id).first()
+        else:
+            author = Author.query.get(author_id)
+            row = (author, None) if author else None
+        if not row:
             return jsonify({'error': '作者不存在'}), 404
 
-        # 獲取作者的論文列表
-        paper_authors = PaperAuthor.query.filter_by(author_id=author_id).all()
-        papers = []
-        for pa in paper_authors:
-            paper = pa.paper
-            papers.append({
-                'id': paper.id,
-                'title': paper.title,
-                'year': paper.year,
-                'journal': paper.journal,
-                'citation_count': paper.citation_count,
-                'position': pa.author_position,
-                'is_corresponding': pa.is_corresponding
-            })
-
-        # 按年份排序
-        papers.sort(key=lambda p: p['year'] or 0)
-
-        # 獲取合作者
-        collaborations = Collaboration.query.filter(
-            (Collaboration.author1_id == author_id) | (Collaboration.author2_id == author_id)
-        ).all()
-
-        collaborators = []
-        for collab in collaborations:
-            collaborator_id = collab.author2_id if collab.author1_id == author_id else collab.author1_id
-            collaborator = Author.query.get(collaborator_id)
-            if collaborator:
-                collaborators.append({
-                    'id': collaborator.id,
-                    'name': collaborator.name,
-                    'institution': collaborator.institution,
-                    'collaboration_count': collab.collaboration_count,
-                    'first_year': collab.first_collaboration_year,
-                    'last_year': collab.last_collaboration_year
-                })
-
-        # 按合作次數排序
-        collaborators.sort(key=lambda c: c['collaboration_count'], reverse=True)
+        author, metric = row
+        result = {'success': True}
 
-        return jsonify({
-            'success': True,
-            'author': author.to_dict(),
-            'papers': papers,
-            'collaborators': collaborators[:10]  # 前 10 位合作者
-        }), 200
+        if 'author' in include:
+            author_dict = author.to_dict()
+            if metric is not None:
+                author_dict.update(_project_metric_fields(metric))
+            result['author'] = author_dict
+
+        if 'papers' in include:
+            result['papers'], result['papers_next_cursor'] = _author_papers_page(
+                author_id, project_filter, papers_cursor, papers_limit
+            )
+
+        if 'collaborators' in include:
+            result['collaborators'], result['collaborators_next_cursor'] = _author_collaborators_page(
+                author_id, project_id, user_id, collaborators_cursor, collaborators_limit
+            )
+
+        response = make_response(jsonify(result), 200)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.add_etag()
+        return response.make_conditional(request)
 
     except Exception as e:
         return jsonify({'error': f'獲取作者資訊失敗: {str(e)}'}), 500
 
 
+def _encode_cursor(values):
+    """將排序鍵編碼為不透明的分頁游標"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """解碼分頁游標，無效時拋出 ValueError"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError('invalid cursor')
+    if not isinstance(values, list) or len(values) != 2 or not all(isinstance(v, int) for v in values):
+        raise ValueError('invalid cursor')
+    return values
+
+
+def _author_papers_page(author_id, project_filter, cursor, limit):
+    """作者的論文（單一 join 查詢，按年份、論文 ID 以 keyset 分頁）"""
+    year = func.coalesce(Paper.year, 0)
+    query = db.session.query(
+        Paper.id, Paper.title, Paper.year, Paper.journal, Paper.citation_count,
+        PaperAuthor.author_position, PaperAuthor.is_corresponding, year.label('sort_year')
+    ).join(PaperAuthor, PaperAuthor.paper_id == Paper.id).filter(
+        PaperAuthor.author_id == author_id,
+        project_filter
+    )
+    if cursor:
+        query = query.filter(or_(year > cursor[0], and_(year == cursor[0], Paper.id > cursor[1])))
+
+    rows = query.order_by(year, Paper.id).limit(limit + 1).all()
+
+    papers = [
+        {
+            'id': r.id,
+            'title': r.title,
+            'year': r.year,
+            'journal': r.journal,
+            'citation_count': r.citation_count,
+            'position': r.author_position,
+            'is_corresponding': r.is_corresponding
+        }
+        for r in rows[:limit]
+    ]
+    next_cursor = _encode_cursor([rows[limit - 1].sort_year, rows[limit - 1].id]) if len(rows) > limit else None
+    return papers, next_cursor
+
+
+def _author_collaborators_page(author_id, project_id, user_id, cursor, limit):
+    """
+    作者的合作者（單一查詢，合作者資訊以 join 取得）
+    未限定專案時合併多個專案中的同一位合作者，按合作次數與作者 ID 以 keyset 分頁
+    """
+    collaborator_id = case(
+        (Collaboration.author1_id == author_id, Collaboration.author2_id),
+        else_=Collaboration.author1_id
+    )
+    total_count = func.sum(Collaboration.collaboration_count)
+
+    query = db.session.query(
+        Author.id, Author.name, Author.institution,
+        total_count.label('collaboration_count'),
+        func.min(Collaboration.first_collaboration_year).label('first_year'),
+        func.max(Collaboration.last_collaboration_year).label('last_year')
+    ).select_from(Collaboration).join(Author, Author.id == collaborator_id).filter(
+        or_(Collaboration.author1_id == author_id, Collaboration.author2_id == author_id)
+    )
+    if project_id is not None:
+        query = query.filter(Collaboration.project_id == project_id)
+    else:
+        query = query.filter(Collaboration.project_id.in_(
+            db.session.query(Project.id).filter(Project.user_id == user_id)
+        ))
+
+    query = query.group_by(Author.id, Author.name, Author.institution)
+    if cursor:
+        query = query.having(or_(total_count < cursor[0], and_(total_count == cursor[0], Author.id > cursor[1])))
+
+    rows = query.order_by(total_count.desc(), Author.id).limit(limit + 1).all()
+
+    collaborators = [
+        {
+            'id': r.id,
+            'name': r.name,
+            'institution': r.institution,
+            'collaboration_count': r.collaboration_count,
+            'first_year': r.first_year,
+            'last_year': r.last_year
+        }
+        for r in rows[:limit]
+    ]
+    next_cursor = (
+        _encode_cursor([rows[limit - 1].collaboration_count, rows[limit - 1].id]) if len(rows) > limit else None
+    )
+    return collaborators, next_cursor
+
+
 @network_bp.route('/projects/<int:project_id>/statistics', methods=['GET'])
 @jwt_required()
 def get_network_statistics(project_id):
@@ -320,29 +975,43 @@ def get_network_statistics(project_id):
         return jsonify({'error': '專案不存在或無權限'}), 404
 
     try:
-        # 統計資訊
-        total_authors = db.session.query(func.count(func.distinct(PaperAuthor.author_id))).join(Paper).filter(
-            Paper.project_id == project_id
-        ).scalar()
-
-        total_collaborations = Collaboration.query.filter_by(project_id=project_id).count()
+        total_collaborations = db.session.query(func.count(Collaboration.id)).filter(
+            Collaboration.project_id == project_id
+        ).scalar_subquery()
 
-        key_people_count = db.session.query(func.count(Author.id)).join(PaperAuthor).join(Paper).filter(
-            Paper.project_id == project_id,
-            Author.is_key_person == True
-        ).distinct().scalar()
-
-        # 最活躍的作者
+        # 已分析的專案：從專案作者指標表以單一查詢取得總數、關鍵人物數與最活躍作者
         top_author = db.session.query(
             Author.id,
             Author.name,
-            func.count(PaperAuthor.paper_id).label('paper_count')
-        ).join(PaperAuthor).join(Paper).filter(
-            Paper.project_id == project_id
-        ).group_by(Author.id, Author.name).order_by(
-            func.count(PaperAuthor.paper_id).desc()
+            ProjectAuthorMetric.papers_in_project,
+            func.count().over().label('total_authors'),
+            func.sum(case((ProjectAuthorMetric.is_key_person == True, 1), else_=0)).over().label('key_people_count'),
+            total_collaborations.label('total_collaborations')
+        ).join(Author, Author.id == ProjectAuthorMetric.author_id).filter(
+            ProjectAuthorMetric.project_id == project_id
+        ).order_by(
+            ProjectAuthorMetric.papers_in_project.desc(), ProjectAuthorMetric.author_id
         ).first()
 
+        if top_author is None:
+            # 尚未分析：按論文作者關聯分組，同樣以單一查詢取得
+            top_author = db.session.query(
+                Author.id,
+                Author.name,
+                func.count(PaperAuthor.paper_id),
+                func.count().over().label('total_authors'),
+                literal(0).label('key_people_count'),
+                total_collaborations.label('total_collaborations')
+            ).join(PaperAuthor, PaperAuthor.author_id == Author.id).join(Paper).filter(
+                Paper.project_id == project_id
+            ).group_by(Author.id, Author.name).order_by(
+                func.count(PaperAuthor.paper_id).desc(), Author.id
+            ).first()
+
+        total_authors = top_author.total_authors if top_author else 0
+        key_people_count = top_author.key_people_count if top_author else 0
+        total_collaborations = top_author.total_collaborations if top_author else 0
+
         return jsonify({
             'success': True,
             'statistics': {
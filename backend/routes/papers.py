@@ -8,8 +8,12 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Paper, Project
 from services.parser import BibTeXParser, DOIResolver
 from services.extractor import PDFExtractor
-from services.author_service import link_paper_authors, update_author_statistics
+from services.author_service import link_paper_authors
+from services.author_metrics import refresh_author_metrics
 from services.pdf_processor import PDFProcessor
+from services.network_state import sync_papers_added, sync_paper_removed, sync_paper_updated
+from services.citation_network import clear_paper_citations, schedule_citation_sync
+from services.paper_digest import schedule_paper_digests
 from sqlalchemy import desc
 from werkzeug.utils import secure_filename
 import os
@@ -84,11 +88,19 @@ def import_bibtex():
 
             created_papers.append(paper)
 
+        # 增量更新作者網絡
+        sync_papers_added(project_id, created_papers)
+
+        # 批次更新所有作者的統計資訊
+        refresh_author_metrics(all_author_ids)
+
         db.session.commit()
 
-        # 更新所有作者的統計資訊
-        for author_id in all_author_ids:
-            update_author_statistics(author_id)
+        # 增量同步引用關係（專案曾同步過時才排程）
+        schedule_citation_sync(project_id, user_id, [paper.id for paper in created_papers])
+
+        # 生成論文結構化摘要，供之後的 AI 分析重用（用戶有 API Key 時才排程）
+        schedule_paper_digests(project_id, user_id, [paper.id for paper in created_papers])
 
         return jsonify({
             'success': True,
@@ -163,11 +175,19 @@ def import_doi():
             # 獲取作者 ID 並更新統計
             from models import PaperAuthor
             paper_authors = PaperAuthor.query.filter_by(paper_id=paper.id).all()
-            for pa in paper_authors:
-                update_author_statistics(pa.author_id)
+            refresh_author_metrics(pa.author_id for pa in paper_authors)
+
+        # 增量更新作者網絡
+        sync_papers_added(project_id, [paper])
 
         db.session.commit()
 
+        # 增量同步引用關係（專案曾同步過時才排程）
+        schedule_citation_sync(project_id, user_id, [paper.id])
+
+        # 生成論文結構化摘要，供之後的 AI 分析重用（用戶有 API Key 時才排程）
+        schedule_paper_digests(project_id, user_id, [paper.id])
+
         return jsonify({
             'success': True,
             'message': '論文導入成功',
@@ -233,6 +253,9 @@ def update_paper(paper_id):
             'read_status', 'highlights'
         ]
 
+        # 網絡分析使用的欄位（修改後需同步）
+        network_fields = {field: getattr(paper, field) for field in ('title', 'year', 'doi')}
+
         for field in updatable_fields:
             if field in data:
                 # 特殊處理標籤（數組轉逗號分隔字符串）
@@ -241,8 +264,20 @@ def update_paper(paper_id):
                 else:
                     setattr(paper, field, data[field])
 
+        changed = {field for field, value in network_fields.items() if getattr(paper, field) != value}
+        if changed:
+            # 更新作者網絡中的論文數據並遞增版本號（快取的時間線、引用網絡等結果失效）
+            sync_paper_updated(paper.project_id, paper)
+        resync_citations = bool(changed & {'title', 'doi'})
+        if resync_citations:
+            # 引用比對依據 DOI 與標題：移除此論文的引用關係，提交後重新增量同步
+            clear_paper_citations(paper.project_id, paper.id)
+
         db.session.commit()
 
+        if resync_citations:
+            schedule_citation_sync(paper.project_id, user_id, [paper.id])
+
         return jsonify({
             'success': True,
             'message': '論文更新成功',
@@ -273,7 +308,15 @@ def delete_paper(paper_id):
         return jsonify({'error': '無權限刪除此論文'}), 403
 
     try:
+        # 增量更新作者網絡（需在刪除前進行）
+        sync_paper_removed(paper.project_id, paper.id)
+        author_ids = [pa.author_id for pa in paper.paper_authors]
+
         db.session.delete(paper)
+        db.session.flush()
+
+        # 作者少了一篇論文，重新計算統計
+        refresh_author_metrics(author_ids)
         db.session.commit()
 
         return jsonify({
@@ -478,6 +521,9 @@ def extract_pdf_content(paper_id):
 
         db.session.commit()
 
+        # 內容改變後重新生成結構化摘要
+        schedule_paper_digests(paper.project_id, user_id, [paper.id])
+
         return jsonify({
             'success': True,
             'message': 'PDF 內容提取成功',
@@ -600,11 +646,21 @@ def add_paper_from_metadata(project_id):
                     })
 
             link_paper_authors(paper.id, authors_data)
+            db.session.flush()
 
-        db.session.commit()
+        # 增量更新作者網絡
+        sync_papers_added(project_id, [paper])
 
         # 更新作者統計
-        update_author_statistics(project_id)
+        refresh_author_metrics(pa.author_id for pa in paper.paper_authors)
+
+        db.session.commit()
+
+        # 增量同步引用關係（專案曾同步過時才排程）
+        schedule_citation_sync(project_id, user_id, [paper.id])
+
+        # 生成論文結構化摘要，供之後的 AI 分析重用（用戶有 API Key 時才排程）
+        schedule_paper_digests(project_id, user_id, [paper.id])
 
         return jsonify({
             'success': True,
@@ -731,7 +787,17 @@ def confirm_pdf():
             link_paper_authors(paper.id, authors, project_id)
 
         # 更新作者統計
-        update_author_statistics(project_id)
+        refresh_author_metrics(pa.author_id for pa in paper.paper_authors)
+
+        # 增量更新作者網絡
+        sync_papers_added(project_id, [paper])
+        db.session.commit()
+
+        # 增量同步引用關係（專案曾同步過時才排程）
+        schedule_citation_sync(project_id, user_id, [paper.id])
+
+        # 生成論文結構化摘要，供之後的 AI 分析重用（用戶有 API Key 時才排程）
+        schedule_paper_digests(project_id, user_id, [paper.id])
 
         return jsonify({
             'success': True,
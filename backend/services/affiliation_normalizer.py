@@ -0,0 +1,167 @@
+"""
+機構名稱正規化
+Affiliation Normalizer - 將論文中的單位字串正規化為機構，使用預先建立的別名索引
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 常見機構的別名（正規化後比對），key 為標準名稱
+INSTITUTION_ALIASES: Dict[str, List[str]] = {
+    'Massachusetts Institute of Technology': ['mit', 'massachusetts inst of technology'],
+    'Carnegie Mellon University': ['cmu', 'carnegie mellon univ'],
+    'Stanford University': ['stanford', 'stanford univ', 'leland stanford junior university'],
+    'University of California, Berkeley': ['uc berkeley', 'ucb', 'berkeley', 'university of california berkeley'],
+    'University of California, Los Angeles': ['ucla', 'university of california los angeles'],
+    'University of Oxford': ['oxford university', 'oxford univ'],
+    'University of Cambridge': ['cambridge university', 'cambridge univ'],
+    'ETH Zurich': ['eth zurich', 'swiss federal institute of technology zurich', 'eth'],
+    'EPFL': ['epfl', 'ecole polytechnique federale de lausanne'],
+    'University of Toronto': ['u of t', 'uoft', 'university of toronto'],
+    'Université de Montréal': ['universite de montreal', 'university of montreal'],
+    'New York University': ['nyu'],
+    'Tsinghua University': ['tsinghua', 'tsinghua univ'],
+    'Peking University': ['pku', 'peking univ', 'beijing university'],
+    'National Taiwan University': ['ntu taiwan', '國立臺灣大學', '國立台灣大學', '臺灣大學', '台灣大學', '台大'],
+    'National Tsing Hua University': ['nthu', '國立清華大學', '清華大學'],
+    'National Yang Ming Chiao Tung University': ['nycu', '國立陽明交通大學', '陽明交通大學'],
+    'Academia Sinica': ['中央研究院', '中研院'],
+    'Google': ['google research', 'google inc', 'google llc', 'google brain'],
+    'Google DeepMind': ['deepmind', 'deep mind'],
+    'Microsoft Research': ['msr', 'microsoft research asia', 'msra', 'microsoft'],
+    'Meta AI': ['facebook ai research', 'fair', 'facebook', 'meta'],
+    'OpenAI': ['openai'],
+}
+
+# 縮寫展開（比對前套用）
+_ABBREVIATIONS = {
+    'univ': 'university',
+    'uni': 'university',
+    'inst': 'institute',
+    'tech': 'technology',
+    'natl': 'national',
+    'nat': 'national',
+    'lab': 'laboratory',
+    'labs': 'laboratory',
+    'dept': 'department',
+    'sch': 'school',
+    'coll': 'college',
+    'ctr': 'center',
+    'centre': 'center',
+}
+
+# 判斷單位中哪一段是機構（而非系所、地址）：英文按單字比對，中文按子字串比對
+_INSTITUTION_WORDS = {
+    'university', 'institute', 'college', 'academy', 'laboratory', 'center', 'hospital',
+    'research', 'polytechnic', 'inc', 'corporation', 'company', 'ltd', 'llc',
+}
+_INSTITUTION_PHRASES = ('大學', '學院', '研究院', '研究所', '醫院', '公司')
+_DEPARTMENT_WORDS = {'department', 'faculty', 'division', 'school'}
+_DEPARTMENT_PHRASES = ('學系', '系所')
+
+# 多校區的大學系統：校區名稱寫在逗號後（如 "University of California, Davis"），必須保留才能區分機構
+_MULTI_CAMPUS_SYSTEMS = {
+    'university of california', 'university of texas', 'university of wisconsin', 'university of illinois',
+    'university of massachusetts', 'university of maryland', 'university of colorado', 'university of michigan',
+    'university of minnesota', 'university of missouri', 'university of nebraska', 'university of hawaii',
+    'university of north carolina', 'university of tennessee', 'university of alabama', 'university of london',
+    'state university of new york', 'city university of new york', 'california state university',
+    'indiana university', 'purdue university', 'rutgers university', 'pennsylvania state university',
+}
+# 常見的國家名稱，不是校區
+_COUNTRY_WORDS = {
+    'usa', 'us', 'united states', 'united states of america', 'uk', 'united kingdom', 'england',
+    'canada', 'china', 'taiwan', 'japan', 'germany', 'france', 'australia',
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s&]+", re.UNICODE)
+_WHITESPACE = re.compile(r'\s+')
+_SEGMENT_SEPARATORS = re.compile(r'[,;，；、]')
+
+
+def _fold(text: str) -> str:
+    """小寫、去除重音符號與標點、展開縮寫"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = _PUNCTUATION.sub(' ', text)
+    words = [_ABBREVIATIONS.get(word, word) for word in text.split()]
+    return _WHITESPACE.sub(' ', ' '.join(words)).strip()
+
+
+class AffiliationNormalizer:
+    """
+    機構名稱正規化器
+
+    建立時一次性展開別名索引（正規化字串 -> 標準名稱），之後每個單位字串只需切段與字典查找；
+    相同的原始字串以 LRU 快取結果。
+    """
+
+    def __init__(self, aliases: Optional[Dict[str, Iterable[str]]] = None):
+        self.alias_index: Dict[str, str] = {}
+        for canonical, names in (aliases if aliases is not None else INSTITUTION_ALIASES).items():
+            self.alias_index[_fold(canonical)] = canonical
+            for name in names:
+                self.alias_index[_fold(name)] = canonical
+
+        self.normalize = lru_cache(maxsize=65536)(self._normalize)
+
+    def _normalize(self, affiliation: Optional[str]) -> Optional[Tuple[str, str]]:
+        """
+        正規化單位字串
+
+        Args:
+            affiliation: 原始單位（如 "Dept. of CS, Stanford Univ., CA, USA"）
+
+        Returns:
+            (key, 顯示名稱)；無法辨識時返回 None
+        """
+        if not affiliation or not affiliation.strip():
+            return None
+
+        segments = [segment.strip() for segment in _SEGMENT_SEPARATORS.split(affiliation) if segment.strip()]
+        folded = [_fold(segment) for segment in segments]
+
+        # 任一段（或連同下一段，如 "University of California, Los Angeles"）命中別名索引即採用標準名稱
+        for index, segment in enumerate(folded):
+            for key in (f'{segment} {folded[index + 1]}' if index + 1 < len(folded) else None, segment):
+                if key in self.alias_index:
+                    canonical = self.alias_index[key]
+                    return _fold(canonical), canonical
+
+        # 否則選擇最像機構的一段：含機構關鍵字且不是系所 > 不是系所 > 第一段
+        candidates = [index for index, key in enumerate(folded) if key]
+        if not candidates:
+            return None
+
+        # min 在同分時保留較前面的一段
+        best = min(candidates, key=lambda index: self._segment_rank(folded[index]))
+        segment, key = segments[best], folded[best]
+        if key in _MULTI_CAMPUS_SYSTEMS and best + 1 < len(segments) and self._is_campus(segments[best + 1]):
+            segment = f'{segment}, {segments[best + 1]}'
+            key = f'{key} {folded[best + 1]}'
+        if key in self.alias_index:
+            canonical = self.alias_index[key]
+            return _fold(canonical), canonical
+        return key, _WHITESPACE.sub(' ', segment)
+
+    @staticmethod
+    def _is_campus(segment: str) -> bool:
+        """多校區系統後的片段是否為校區名稱（排除州縮寫、郵遞區號、國家與系所）"""
+        key = _fold(segment)
+        if len(key) <= 3 or any(ch.isdigit() for ch in key) or key in _COUNTRY_WORDS:
+            return False
+        return AffiliationNormalizer._segment_rank(key) == 1
+
+    @staticmethod
+    def _segment_rank(key: str) -> int:
+        """單位片段像機構的程度（越小越像）"""
+        words = set(key.split())
+        is_institution = bool(words & _INSTITUTION_WORDS) or any(p in key for p in _INSTITUTION_PHRASES)
+        is_department = bool(words & _DEPARTMENT_WORDS) or any(p in key for p in _DEPARTMENT_PHRASES)
+        if is_institution and not is_department:
+            return 0
+        if not is_department:
+            return 1
+        return 2
@@ -5,9 +5,26 @@ AI-Powered Research Gap Analysis Service
 """
 
 import anthropic
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+import asyncio
+import hashlib
 import json
 
+from services.ai_prompts import AIPromptTemplates
+from services.paper_digest import format_digest, parse_digest
+from services.prompt_budget import (
+    clean_abstract, clip_text, estimate_tokens, normalize_whitespace, select_within_budget, token_report
+)
+
+# 提示模板版本：修改 _generate_analysis_instructions 等分析提示的內容或結構時必須更新，使舊的快取結果失效
+PROMPT_TEMPLATE_VERSION = '2024-12-comprehensive-v2'
+
+# 分批摘要（map-reduce 的 map 階段）提示模板版本
+MAP_TEMPLATE_VERSION = '2024-11-batch-summary-v1'
+
+# API 回應的 token 用量欄位（cache_creation / cache_read 為提示快取寫入與讀取的輸入 token，不含在 input_tokens 內）
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+
 
 class AIAnalysisService:
     """AI 分析服務"""
@@ -18,8 +35,16 @@ class AIAnalysisService:
             raise ValueError("Anthropic API Key 未設置")
 
         self.client = anthropic.Anthropic(api_key=api_key)
+        # 支援 cache_control 的 messages API（提示快取），分析請求的固定指示放在可快取的 system 區塊
+        self.cached_messages = self.client.beta.prompt_caching.messages
         # 使用 Claude 3 Haiku (快速且經濟實惠)
         self.model = "claude-3-haiku-20240307"  # Claude 3 Haiku
+        self.max_tokens = 4096  # Haiku 最大支援 4096 tokens
+        self.temperature = 0.3  # 較低的溫度以獲得更一致的分析
+        self.map_max_tokens = 1500  # 分批摘要的輸出上限
+        self.abstract_max_tokens = 400  # 單篇摘要的 token 上限，超出時在句尾截斷
+        self.summary_prompt_tokens = 1500  # generate_summary 論文文本的 token 預算
+        self.digest_max_tokens = 400  # 單篇論文結構化摘要的輸出上限
 
     def analyze_research_gap(self, papers: List[Dict], project_info: Dict) -> Dict:
         """
@@ -38,25 +63,9 @@ class AIAnalysisService:
             - recommendations: 研究方向建議
         """
 
-        # 準備論文數據
-        papers_text = self._prepare_papers_text(papers)
-
-        # 生成分析提示
-        prompt = self._generate_analysis_prompt(papers_text, project_info)
-
         # 調用 Claude API
         try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=4096,  # Haiku 最大支援 4096 tokens
-                temperature=0.3,  # 較低的溫度以獲得更一致的分析
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
+            message = self.cached_messages.create(**self._build_request(papers, project_info))
 
             # 解析響應
             response_text = message.content[0].text
@@ -66,7 +75,8 @@ class AIAnalysisService:
                 "success": True,
                 "analysis": analysis_result,
                 "papers_analyzed": len(papers),
-                "model_used": self.model
+                "model_used": self.model,
+                "usage": self._usage(message)
             }
 
         except Exception as e:
@@ -75,6 +85,320 @@ class AIAnalysisService:
                 "error": str(e)
             }
 
+    def stream_research_gap(self, papers: List[Dict], project_info: Dict,
+                            on_text: Callable[[str], None]) -> Dict:
+        """
+        以串流 API 執行研究缺口分析，每收到一段文字即呼叫 on_text
+
+        on_text 拋出的例外（例如任務取消）會中斷串流並關閉連線；API 錯誤同樣直接拋出，
+        由呼叫方決定如何處理已生成的部分內容。
+
+        Args:
+            papers: 論文列表
+            project_info: 專案資訊
+            on_text: 文字片段回呼
+
+        Returns:
+            與 analyze_research_gap() 成功時相同格式的結果
+        """
+        response_text, message = self._stream(self._build_request(papers, project_info), on_text)
+
+        return {
+            "success": True,
+            "analysis": self._parse_analysis_result(response_text),
+            "papers_analyzed": len(papers),
+            "model_used": self.model,
+            "usage": self._usage(message)
+        }
+
+    def summarize_batch(self, papers: List[Dict], project_info: Dict, label: str) -> Dict:
+        """
+        摘要一批論文（map-reduce 的 map 階段），API 錯誤直接拋出
+
+        Args:
+            papers: 本批論文
+            project_info: 專案資訊
+            label: 批次說明（例如「2015–2018 年，共 40 篇」）
+
+        Returns:
+            {'text': 摘要, 'usage': token 用量}
+        """
+        prompt = self._generate_batch_summary_prompt(self._prepare_papers_text(papers), project_info, label)
+        message = self.client.messages.create(
+            model=self.model,
+            max_tokens=self.map_max_tokens,
+            temperature=self.temperature,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        text = ''.join(block.text for block in message.content if block.type == 'text')
+        return {"text": text, "usage": self._usage(message)}
+
+    def digest_paper(self, source: Dict) -> Dict:
+        """
+        生成單篇論文的結構化摘要，API 錯誤或回應無法解析時直接拋出
+
+        Args:
+            source: paper_digest.digest_source() 的結果（title, abstract, introduction, conclusion）
+
+        Returns:
+            {'digest': {problem, method, dataset, finding, limitation}, 'usage': token 用量}
+        """
+        message = self.client.messages.create(
+            model=self.model,
+            max_tokens=self.digest_max_tokens,
+            temperature=0,
+            messages=[{"role": "user", "content": AIPromptTemplates.paper_digest_prompt(**source)}]
+        )
+        text = ''.join(block.text for block in message.content if block.type == 'text')
+        return {"digest": parse_digest(text), "usage": self._usage(message)}
+
+    def stream_reduce(self, batch_summaries: List[Dict], project_info: Dict,
+                      on_text: Callable[[str], None]) -> Dict:
+        """
+        合併各批次摘要，以串流方式生成與單次分析相同結構的完整報告（map-reduce 的 reduce 階段）
+
+        Args:
+            batch_summaries: [{'label', 'text', 'paper_count'}]，按時間排序
+            project_info: 專案資訊
+            on_text: 文字片段回呼
+
+        Returns:
+            與 stream_research_gap() 相同格式的結果（不含 map 階段的用量）
+        """
+        response_text, message = self._stream(self.reduce_request(batch_summaries, project_info), on_text)
+
+        return {
+            "success": True,
+            "analysis": self._parse_analysis_result(response_text),
+            "papers_analyzed": sum(summary['paper_count'] for summary in batch_summaries),
+            "model_used": self.model,
+            "usage": self._usage(message)
+        }
+
+    def run_concurrent(self, prompts: Dict[str, str], on_delta: Callable[[str, str], None],
+                       on_complete: Callable[[str, str], None], concurrency: int) -> Dict:
+        """
+        以非同步 client 同時串流多個互相獨立的提示（每個提示一個請求，各有 max_tokens 的輸出上限）
+
+        回呼都在執行此方法的執行緒中呼叫。任一請求或回呼拋出例外（例如任務取消）時，
+        取消其餘請求並拋出該例外。
+
+        Args:
+            prompts: {鍵: 提示}
+            on_delta: 收到文字片段時呼叫 on_delta(鍵, 片段)
+            on_complete: 單一請求完成時呼叫 on_complete(鍵, 回應全文)
+            concurrency: 同時進行的請求數
+
+        Returns:
+            {'texts': {鍵: 回應全文}, 'usage': 合計 token 用量}
+        """
+        return asyncio.run(self._run_concurrent(prompts, on_delta, on_complete, concurrency))
+
+    async def _run_concurrent(self, prompts: Dict[str, str], on_delta, on_complete, concurrency: int) -> Dict:
+        """
+        run_concurrent 的非同步實作
+
+        每次呼叫建立自己的 AsyncAnthropic（連線不跨事件迴圈），重試次數與逾時沿用 self.client 的設定。
+        """
+        slots = asyncio.Semaphore(max(1, concurrency))
+        texts: Dict[str, str] = {}
+        usage = dict.fromkeys(USAGE_FIELDS, 0)
+
+        async with anthropic.AsyncAnthropic(api_key=self.client.api_key, base_url=self.client.base_url,
+                                            max_retries=self.client.max_retries,
+                                            timeout=self.client.timeout) as client:
+            async def run(key, prompt):
+                async with slots:
+                    async with client.messages.stream(
+                        model=self.model,
+                        max_tokens=self.max_tokens,
+                        temperature=self.temperature,
+                        messages=[{"role": "user", "content": prompt}]
+                    ) as stream:
+                        async for text in stream.text_stream:
+                            on_delta(key, text)
+                        message = await stream.get_final_message()
+
+                texts[key] = ''.join(block.text for block in message.content if block.type == 'text')
+                for field, value in self._usage(message).items():
+                    usage[field] += value
+                on_complete(key, texts[key])
+
+            tasks = [asyncio.create_task(run(key, prompt)) for key, prompt in prompts.items()]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        return {"texts": texts, "usage": usage}
+
+    def reduce_request(self, batch_summaries: List[Dict], project_info: Dict) -> Dict:
+        """構建 reduce 階段的 messages API 參數（與單次分析共用可快取的指示）"""
+        corpus = '\n\n'.join(
+            f"## {summary['label']}\n\n{summary['text'].strip()}" for summary in batch_summaries
+        )
+        return self._analysis_request(
+            corpus, project_info, corpus_heading='論文集分批摘要（按時間排序，每批由 AI 預先摘要）'
+        )
+
+    def estimate_prompt_tokens(self, papers: List[Dict], project_info: Dict) -> int:
+        """估算單次分析提示的 token 數（不呼叫 API）"""
+        return self.request_tokens(self._build_request(papers, project_info))
+
+    @staticmethod
+    def request_tokens(request: Dict) -> int:
+        """估算 messages API 參數中 system 與訊息內容的 token 數"""
+        system = request.get('system') or []
+        texts = [system] if isinstance(system, str) else [block['text'] for block in system]
+        texts += [message['content'] for message in request['messages']]
+        return sum(estimate_tokens(text) for text in texts)
+
+    def prompt_report(self, papers: List[Dict], project_info: Dict) -> Dict:
+        """
+        單次分析提示各段落的 token 估算（不呼叫 API）
+
+        Returns:
+            {'sections': {'instructions', 'project', 'papers'}, 'total', 'max_output_tokens'}
+        """
+        report = token_report({
+            'instructions': self._generate_analysis_instructions(),
+            'project': self._generate_project_context(project_info),
+            'papers': self._generate_corpus_message(self._prepare_papers_text(papers))
+        })
+        report['max_output_tokens'] = self.max_tokens
+        return report
+
+    def fit_to_budget(self, papers: List[Dict], project_info: Dict, budget: int):
+        """
+        挑選論文使單次分析提示不超出 token 預算（按引用數與年份覆蓋取捨，見 select_within_budget）
+
+        Args:
+            papers: 論文列表（含 citation_count）
+            project_info: 專案資訊
+            budget: 整個提示的 token 預算
+
+        Returns:
+            (保留的論文, {'papers_total', 'papers_kept', 'years_total', 'years_kept',
+                         'tokens_before', 'tokens_after'})
+        """
+        overhead = self.request_tokens(self._analysis_request('', project_info))
+        sizes = [estimate_tokens(self._prepare_papers_text([paper])) for paper in papers]
+        kept = [papers[i] for i in select_within_budget(papers, sizes, max(0, budget - overhead))]
+
+        return kept, {
+            'papers_total': len(papers),
+            'papers_kept': len(kept),
+            'years_total': len({paper.get('year') for paper in papers}),
+            'years_kept': len({paper.get('year') for paper in kept}),
+            'tokens_before': overhead + sum(sizes),
+            'tokens_after': self.estimate_prompt_tokens(kept, project_info)
+        }
+
+    def _stream(self, request: Dict, on_text: Callable[[str], None]):
+        """執行串流請求（支援提示快取），返回 (回應全文, 最終訊息)"""
+        with self.cached_messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                on_text(text)
+            message = stream.get_final_message()
+
+        response_text = ''.join(block.text for block in message.content if block.type == 'text')
+        return response_text, message
+
+    def cache_key(self, papers: List[Dict], project_info: Dict, variant: str = 'single') -> str:
+        """
+        研究缺口分析的快取鍵：正規化提示輸入（論文文本、專案資訊、模板版本、模型、溫度）的 SHA-256
+
+        空白差異不影響快取鍵；論文順序會影響提示內容，呼叫方應以固定順序傳入。
+
+        Args:
+            papers: 論文列表
+            project_info: 專案資訊
+            variant: single（單次分析）或 map_reduce（分批摘要後合併，結果不同，分開快取）
+        """
+        payload = {
+            'papers': self._normalize(self._prepare_papers_text(papers)),
+            'project': self._normalized_project(project_info),
+            'template_version': PROMPT_TEMPLATE_VERSION,
+            'model': self.model,
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens
+        }
+        if variant != 'single':
+            payload['variant'] = variant
+            payload['map_template_version'] = MAP_TEMPLATE_VERSION
+        return self._hash(payload)
+
+    def batch_cache_key(self, papers: List[Dict], project_info: Dict) -> str:
+        """分批摘要的快取鍵（同一批論文的摘要可在重試或其他分析中重用）"""
+        return self._hash({
+            'papers': self._normalize(self._prepare_papers_text(papers)),
+            'project': self._normalized_project(project_info),
+            'template_version': MAP_TEMPLATE_VERSION,
+            'model': self.model,
+            'temperature': self.temperature,
+            'max_tokens': self.map_max_tokens
+        })
+
+    @staticmethod
+    def _normalize(text) -> str:
+        """合併空白"""
+        return ' '.join(str(text or '').split())
+
+    def _normalized_project(self, project_info: Dict) -> Dict:
+        """正規化的專案資訊"""
+        return {field: self._normalize(project_info.get(field)) for field in ('name', 'description', 'domain')}
+
+    @staticmethod
+    def _hash(payload: Dict) -> str:
+        """JSON 內容的 SHA-256"""
+        encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    @staticmethod
+    def _usage(message) -> Dict:
+        """API 回應的 token 用量（含提示快取的寫入與讀取量，未使用快取時為 0）"""
+        usage = getattr(message, 'usage', None)
+        return {field: getattr(usage, field, 0) or 0 for field in USAGE_FIELDS}
+
+    def _build_request(self, papers: List[Dict], project_info: Dict) -> Dict:
+        """構建研究缺口分析的 messages API 參數"""
+        return self._analysis_request(self._prepare_papers_text(papers), project_info)
+
+    def _analysis_request(self, corpus_text: str, project_info: Dict,
+                          corpus_heading: str = '論文集（按時間排序）') -> Dict:
+        """
+        構建分析請求：固定的分析指示與專案資訊放在 system 區塊並標記 cache_control，論文集放在使用者訊息
+
+        指示對所有專案相同，專案資訊對同一專案的每次分析相同，兩者都在會變動的論文集之前，
+        因此重複分析（以及 map-reduce 的 reduce 階段）可以讀取服務端的提示快取。
+        """
+        return {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "system": [
+                {
+                    "type": "text",
+                    "text": self._generate_analysis_instructions(),
+                    "cache_control": {"type": "ephemeral"}
+                },
+                {
+                    "type": "text",
+                    "text": self._generate_project_context(project_info),
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            "messages": [
+                {
+                    "role": "user",
+                    "content": self._generate_corpus_message(corpus_text, corpus_heading)
+                }
+            ]
+        }
+
     def _prepare_papers_text(self, papers: List[Dict]) -> str:
         """準備論文文本用於分析"""
 
@@ -93,41 +417,55 @@ class AIAnalysisService:
             text_parts.append(f"\n## {year} 年\n")
 
             for paper in papers_by_year[year]:
-                title = paper.get('title', '無標題')
+                title = normalize_whitespace(paper.get('title')) or '無標題'
                 authors = paper.get('authors', [])
                 authors_str = ', '.join([a.get('name', a) if isinstance(a, dict) else str(a) for a in authors[:3]])
                 if len(authors) > 3:
                     authors_str += f" 等 {len(authors)} 人"
 
-                abstract = paper.get('abstract', '無摘要')
                 journal = paper.get('journal', '')
 
                 text_parts.append(f"### 論文：{title}\n")
                 text_parts.append(f"**作者**: {authors_str}\n")
                 if journal:
                     text_parts.append(f"**期刊**: {journal}\n")
-                text_parts.append(f"**摘要**: {abstract}\n")
+
+                # 有結構化摘要時使用摘要，否則移除樣板文字、過長的摘要在句尾截斷
+                if paper.get('digest'):
+                    text_parts.append(f"**重點**: {format_digest(paper['digest'])}\n")
+                else:
+                    abstract = clip_text(clean_abstract(paper.get('abstract')), self.abstract_max_tokens) or '無摘要'
+                    text_parts.append(f"**摘要**: {abstract}\n")
                 text_parts.append("\n---\n")
 
         return '\n'.join(text_parts)
 
-    def _generate_analysis_prompt(self, papers_text: str, project_info: Dict) -> str:
-        """生成分析提示"""
+    def _generate_project_context(self, project_info: Dict) -> str:
+        """生成專案資訊區塊"""
 
         project_name = project_info.get('name', '未命名專案')
         project_description = project_info.get('description', '')
         domain = project_info.get('domain', '')
 
-        prompt = f"""你是一位資深的學術研究顧問，擁有 20 年的研究經驗，專門幫助博碩士生進行深度文獻回顧和研究缺口識別。
-
-# 專案資訊
+        return f"""# 專案資訊
 - **研究主題**：{project_name}
 - **研究領域**：{domain}
-- **研究問題**：{project_description}
+- **研究問題**：{project_description}"""
 
-# 論文集（按時間排序）
+    def _generate_corpus_message(self, papers_text: str, corpus_heading: str = '論文集（按時間排序）') -> str:
+        """生成使用者訊息：論文集（放在可快取的指示之後）"""
+        return f"""# {corpus_heading}
 {papers_text}
 
+請依照上述分析任務與輸出要求，對以上論文提供完整的分析報告。"""
+
+    def _generate_analysis_instructions(self) -> str:
+        """生成分析指示（與論文集、專案無關的固定內容，作為可快取的 system 區塊）"""
+
+        return """你是一位資深的學術研究顧問，擁有 20 年的研究經驗，專門幫助博碩士生進行深度文獻回顧和研究缺口識別。
+
+使用者會提供一個研究專案的論文集（按時間排序），專案資訊列在本指示之後。
+
 # 分析任務
 
 請對這些論文進行**深度且批判性的分析**，提供詳細、具體且有洞察力的研究缺口識別。請按照以下結構提供分析：
@@ -383,7 +721,51 @@ class AIAnalysisService:
 
 請提供一份**博士水準的深度分析報告**，透過系統化的分析，幫助研究者找到真正有價值且可行的研究方向。"""
 
-        return prompt
+    def _generate_batch_summary_prompt(self, papers_text: str, project_info: Dict, label: str) -> str:
+        """生成分批摘要提示"""
+
+        project_name = project_info.get('name', '未命名專案')
+        domain = project_info.get('domain', '')
+
+        return f"""你是一位資深的學術研究顧問，正在協助分析一個大型文獻集。以下是其中一批論文（{label}），
+你的摘要之後會與其他批次的摘要合併，用於撰寫完整的研究缺口分析報告。
+
+# 專案資訊
+- **研究主題**：{project_name}
+- **研究領域**：{domain}
+
+# 本批論文
+{papers_text}
+
+# 任務
+
+請為本批論文撰寫 800-1200 字的結構化摘要，保留後續分析需要的具體資訊：
+
+## 研究主題與問題
+
+本批論文關注哪些研究問題？問題的定義有什麼變化？
+
+## 方法與技術
+
+使用了哪些方法？有哪些新方法出現、哪些方法被放棄？
+
+## 主要發現與貢獻
+
+列出最重要的發現與理論貢獻。
+
+## 局限與未解決的問題
+
+論文自述或明顯存在的限制、尚未解決的問題與爭議。
+
+## 關鍵論文與研究者
+
+列出本批最具代表性的 3-5 篇論文與研究者。
+
+# 輸出要求
+
+- 每個論述都標註作者與年份（如「Zhang et al., 2020」）
+- 只根據本批論文撰寫，不要推測其他時期的研究
+- 使用 Markdown 格式與全形標點符號"""
 
     def _parse_analysis_result(self, response_text: str) -> Dict:
         """解析 AI 響應為結構化數據"""
@@ -438,11 +820,14 @@ class AIAnalysisService:
         if not papers:
             return "沒有論文可供分析"
 
-        papers_text = self._prepare_papers_text(papers)
+        # 按引用數與年份覆蓋挑選論文，不在論文中間截斷
+        sizes = [estimate_tokens(self._prepare_papers_text([paper])) for paper in papers]
+        selected = [papers[i] for i in select_within_budget(papers, sizes, self.summary_prompt_tokens)]
+        papers_text = self._prepare_papers_text(selected or papers[:1])
 
         prompt = f"""請用 200 字以內簡要總結以下論文集的主要研究主題和趨勢：
 
-{papers_text[:3000]}  # 限制長度
+{papers_text}
 
 請用 1-2 段話總結：
 1. 主要研究的是什麼問題？
@@ -4,7 +4,14 @@ AI Analyzer - Wrapper class compatible with existing routes
 """
 
 from .ai_analysis import AIAnalysisService
-from typing import List, Dict
+from .ai_map_reduce import plan_batches, run_map_reduce
+from .ai_prompts import AIPromptTemplates
+from .ai_sections import (
+    SECTION_TEMPLATE_VERSION, build_section_prompts, merge_sections, run_sections, section_keys, split_sections
+)
+from .paper_digest import current_digest
+from .prompt_budget import estimate_tokens, select_within_budget
+from typing import Callable, List, Dict, Optional
 
 
 class AIAnalyzer:
@@ -21,13 +28,217 @@ class AIAnalyzer:
         Args:
             papers: Paper 模型列表
             domain_name: 研究領域名稱
-            analysis_type: 分析類型
+            analysis_type: 分析類型（comprehensive 以單次提示分析，其他類型只生成對應的段落）
 
         Returns:
             分析結果字典
         """
+        if analysis_type != 'comprehensive':
+            return self.sections_with_context(papers, domain_name, section_keys(analysis_type), on_text=lambda text: None)
+
+        # 執行分析
+        result = self.service.analyze_research_gap(self._papers_data(papers), self._project_info(domain_name))
+
+        if not result.get('success'):
+            raise ValueError(result.get('error', '分析失敗'))
+
+        return self._compatible_result(result)
+
+    def stream_with_context(self, papers: List, domain_name: str, on_text: Callable[[str], None],
+                            analysis_type: str = 'comprehensive') -> Dict:
+        """
+        以串流方式執行帶上下文的分析，每收到一段文字即呼叫 on_text
+
+        Args:
+            papers: Paper 模型列表
+            domain_name: 研究領域名稱
+            on_text: 文字片段回呼
+            analysis_type: 分析類型
+
+        Returns:
+            與 analyze_with_context() 相同格式的分析結果
+        """
+        result = self.service.stream_research_gap(
+            self._papers_data(papers), self._project_info(domain_name), on_text
+        )
+        return self._compatible_result(result)
+
+    def map_reduce_with_context(self, papers: List, domain_name: str, on_text: Callable[[str], None],
+                                context, batch_tokens: int, concurrency: int, max_prompt_tokens: int) -> Dict:
+        """
+        以 map-reduce 方式分析超出單次上下文的論文集（見 services.ai_map_reduce.run_map_reduce）
+
+        Returns:
+            與 analyze_with_context() 相同格式的分析結果，另含 'batches' 與 'batches_cached'
+        """
+        result = run_map_reduce(
+            self.service, self._papers_data(papers), self._project_info(domain_name), on_text, context,
+            batch_tokens=batch_tokens, concurrency=concurrency, max_prompt_tokens=max_prompt_tokens
+        )
+        compatible = self._compatible_result(result)
+        compatible['batches'] = result['batches']
+        compatible['batches_cached'] = result['batches_cached']
+        return compatible
+
+    def sections_with_context(self, papers: List, domain_name: str, keys: List[str], on_text: Callable[[str], None],
+                              context=None, concurrency: int = 6, interval: float = 0.5) -> Dict:
+        """
+        以 AIPromptTemplates 的各段提示並行分析（見 services.ai_sections.run_sections）
+
+        Returns:
+            與 analyze_with_context() 相同格式的分析結果，另含 'sections'（{段落: 內容}）
+        """
+        output = run_sections(
+            self.service, self.section_prompts(papers, domain_name, keys), on_text, context,
+            concurrency=concurrency, interval=interval
+        )
+        return self._sections_result(output['sections'], self.service.model, len(papers), output['usage'])
+
+    def section_prompts(self, papers: List, domain_name: str, keys: List[str]) -> Dict[str, str]:
+        """各段落的提示（論文以 AIPromptTemplates.format_papers_for_prompt 格式化，已生成摘要的論文使用摘要）"""
+        return build_section_prompts(
+            AIPromptTemplates.format_papers_for_prompt(papers), domain_name, [paper.year for paper in papers], keys
+        )
+
+    def section_report(self, papers: List, domain_name: str, keys: List[str]) -> Dict:
+        """
+        分段分析的 token 估算：每個段落一個請求，論文集在每個請求中各送出一次
+
+        Returns:
+            {'sections': {'instructions', 'project', 'papers'}, 'total', 'max_output_tokens',
+             'requests': {段落: token 數}, 'largest_request'}
+        """
+        papers_tokens = estimate_tokens(AIPromptTemplates.format_papers_for_prompt(papers))
+        requests = {
+            key: estimate_tokens(prompt) for key, prompt in self.section_prompts(papers, domain_name, keys).items()
+        }
+        overheads = self._section_overheads(papers, domain_name, keys)
+        project_tokens = estimate_tokens(domain_name) if 'domain_history' in keys else 0
+
+        sections = {
+            'instructions': sum(overheads.values()) - project_tokens,
+            'project': project_tokens,
+            'papers': sum(requests.values()) - sum(overheads.values())
+        }
+        return {
+            'sections': sections,
+            'total': sum(sections.values()),
+            'max_output_tokens': self.service.max_tokens * len(keys),
+            'requests': requests,
+            'largest_request': max(requests.values()) if requests else 0,
+            'papers_per_request': papers_tokens
+        }
+
+    def fit_sections_to_budget(self, papers: List, domain_name: str, keys: List[str], budget: int):
+        """
+        挑選論文使每個段落的請求都不超出預算（按引用數與年份覆蓋取捨，見 select_within_budget）
+
+        Returns:
+            (保留的 Paper 模型列表，維持原順序, 壓縮報告)
+        """
+        overhead = max(self._section_overheads(papers, domain_name, keys).values())
+        sizes = [estimate_tokens(AIPromptTemplates.format_papers_for_prompt([paper])) for paper in papers]
+        indices = select_within_budget(self._papers_data(papers), sizes, max(0, budget - overhead))
+        kept = [papers[i] for i in indices]
+
+        return kept, {
+            'papers_total': len(papers),
+            'papers_kept': len(kept),
+            'years_total': len({paper.year for paper in papers}),
+            'years_kept': len({paper.year for paper in kept}),
+            'tokens_before': overhead + sum(sizes),
+            'tokens_after': self.section_report(kept, domain_name, keys)['largest_request']
+        }
+
+    def sections_cache_key(self, papers: List, domain_name: str, keys: List[str]) -> str:
+        """分段分析結果的快取鍵：各段提示、模板版本、模型與生成參數的 SHA-256"""
+        service = self.service
+        prompts = self.section_prompts(papers, domain_name, keys)
+        return service._hash({
+            'prompts': {key: service._normalize(prompt) for key, prompt in prompts.items()},
+            'template_version': SECTION_TEMPLATE_VERSION,
+            'model': service.model,
+            'temperature': service.temperature,
+            'max_tokens': service.max_tokens
+        })
+
+    def sections_result_from_text(self, response_text: str, model: str, papers_analyzed: int,
+                                  keys: List[str]) -> Dict:
+        """由快取的分段報告構建與 sections_with_context() 相同格式的結果（用量為零）"""
+        return self._sections_result(split_sections(response_text, keys), model, papers_analyzed,
+                                     {'input_tokens': 0, 'output_tokens': 0})
+
+    def _section_overheads(self, papers: List, domain_name: str, keys: List[str]) -> Dict[str, int]:
+        """各段落提示中論文集以外的 token 數"""
+        return {
+            key: estimate_tokens(prompt)
+            for key, prompt in build_section_prompts('', domain_name, [paper.year for paper in papers], keys).items()
+        }
+
+    def _sections_result(self, sections: Dict[str, str], model: str, papers_analyzed: int,
+                         usage: Optional[Dict]) -> Dict:
+        """分段分析的兼容格式結果"""
+        full_text = merge_sections(sections)
+        return {
+            'model': model,
+            'full_text': full_text,
+            'content': full_text,
+            'development_history': sections.get('domain_history', ''),
+            'core_problems': sections.get('core_problems', ''),
+            'method_evolution': sections.get('method_evolution', ''),
+            'research_gaps': sections.get('research_gaps', ''),
+            'recommendations': sections.get('research_directions', ''),
+            'papers_analyzed': papers_analyzed,
+            'usage': usage or {},
+            'sections': sections
+        }
 
-        # 將 Paper 模型轉換為字典
+    def estimate_prompt_tokens(self, papers: List, domain_name: str) -> int:
+        """估算單次分析提示的 token 數"""
+        return self.service.estimate_prompt_tokens(self._papers_data(papers), self._project_info(domain_name))
+
+    def prompt_report(self, papers: List, domain_name: str) -> Dict:
+        """單次分析提示各段落的 token 估算（見 AIAnalysisService.prompt_report）"""
+        return self.service.prompt_report(self._papers_data(papers), self._project_info(domain_name))
+
+    def fit_to_budget(self, papers: List, domain_name: str, budget: int):
+        """
+        挑選論文使單次分析提示不超出預算（見 AIAnalysisService.fit_to_budget）
+
+        Returns:
+            (保留的 Paper 模型列表，維持原順序, 壓縮報告)
+        """
+        kept, report = self.service.fit_to_budget(self._papers_data(papers), self._project_info(domain_name), budget)
+        kept_ids = {paper['id'] for paper in kept}
+        return [paper for paper in papers if paper.id in kept_ids], report
+
+    def build_request(self, papers: List, domain_name: str) -> Dict:
+        """單次綜合分析的 messages API 參數（用於批次提交）"""
+        return self.service._build_request(self._papers_data(papers), self._project_info(domain_name))
+
+    def batch_report(self, papers: List, batch_tokens: int) -> List[Dict]:
+        """map-reduce 各批次的 token 估算：[{'label', 'papers', 'tokens'}]（papers 為篇數）"""
+        return [
+            {'label': batch['label'], 'papers': len(batch['papers']), 'tokens': batch['tokens']}
+            for batch in plan_batches(self.service, self._papers_data(papers), batch_tokens)
+        ]
+
+    def cache_key(self, papers: List, domain_name: str, variant: str = 'single') -> str:
+        """分析結果的快取鍵（見 AIAnalysisService.cache_key）"""
+        return self.service.cache_key(self._papers_data(papers), self._project_info(domain_name), variant)
+
+    def result_from_text(self, response_text: str, model: str, papers_analyzed: int) -> Dict:
+        """由快取的 AI 回應構建與 analyze_with_context() 相同格式的結果（用量為零）"""
+        return self._compatible_result({
+            'analysis': self.service._parse_analysis_result(response_text),
+            'model_used': model,
+            'papers_analyzed': papers_analyzed,
+            'usage': {'input_tokens': 0, 'output_tokens': 0}
+        })
+
+    @staticmethod
+    def _papers_data(papers: List) -> List[Dict]:
+        """將 Paper 模型轉換為字典"""
         papers_data = []
         for paper in papers:
             # 處理作者列表
@@ -46,25 +257,26 @@ class AIAnalyzer:
                 'authors': authors_list,
                 'journal': paper.journal,
                 'abstract': paper.abstract or '',
+                'digest': current_digest(paper),
+                'citation_count': paper.citation_count or 0,
                 'doi': paper.doi,
                 'url': paper.url
             }
             papers_data.append(paper_dict)
+        return papers_data
 
-        # 準備專案資訊
-        project_info = {
+    @staticmethod
+    def _project_info(domain_name: str) -> Dict:
+        """準備專案資訊"""
+        return {
             'name': domain_name,
             'description': '',
             'domain': domain_name
         }
 
-        # 執行分析
-        result = self.service.analyze_research_gap(papers_data, project_info)
-
-        if not result.get('success'):
-            raise ValueError(result.get('error', '分析失敗'))
-
-        # 轉換為兼容格式
+    @staticmethod
+    def _compatible_result(result: Dict) -> Dict:
+        """轉換為兼容格式"""
         analysis = result.get('analysis', {})
 
         return {
@@ -76,5 +288,6 @@ class AIAnalyzer:
             'method_evolution': analysis.get('method_evolution', ''),
             'research_gaps': analysis.get('research_gaps', ''),
             'recommendations': analysis.get('recommendations', ''),
-            'papers_analyzed': result.get('papers_analyzed', 0)
+            'papers_analyzed': result.get('papers_analyzed', 0),
+            'usage': result.get('usage', {})
         }
@@ -0,0 +1,116 @@
+"""
+AI 結果快取服務
+AI Cache Service - 以提示輸入內容雜湊查詢、保存 AI 回應，並累計每位用戶的命中率與節省的 token 數
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, AIResultCache, AIUsageStat
+
+
+def lookup_result(cache_key: str) -> Optional[AIResultCache]:
+    """
+    查詢快取的 AI 回應，命中時累計命中次數（不提交）
+
+    Args:
+        cache_key: AIAnalysisService.cache_key() 的結果
+
+    Returns:
+        AIResultCache 或 None
+    """
+    entry = AIResultCache.query.filter_by(cache_key=cache_key).first()
+    if entry:
+        AIResultCache.query.filter_by(id=entry.id).update({
+            AIResultCache.hit_count: AIResultCache.hit_count + 1,
+            AIResultCache.last_hit_at: datetime.utcnow()
+        }, synchronize_session=False)
+    return entry
+
+
+def store_result(cache_key: str, model: str, template_version: str,
+                 response_text: str, usage: Dict) -> None:
+    """
+    保存 AI 回應（同一鍵已存在時覆蓋，例如用戶強制重新生成）並提交
+
+    兩個相同的分析同時完成時，後寫入者遇到唯一鍵衝突，直接放棄（兩者內容等價）。
+
+    Args:
+        cache_key: 快取鍵
+        model: 模型名稱
+        template_version: 提示模板版本
+        response_text: AI 回應全文
+        usage: {'input_tokens', 'output_tokens'}（可含 cache_creation_input_tokens、cache_read_input_tokens）
+    """
+    values = {
+        'model': model,
+        'template_version': template_version,
+        'response_text': response_text,
+        'input_tokens': prompt_input_tokens(usage),
+        'output_tokens': usage.get('output_tokens', 0),
+        'created_at': datetime.utcnow()
+    }
+    updated = AIResultCache.query.filter_by(cache_key=cache_key).update(values, synchronize_session=False)
+    if not updated:
+        db.session.add(AIResultCache(cache_key=cache_key, **values))
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def prompt_input_tokens(usage: Dict) -> int:
+    """提示的輸入 token 總數（未快取、快取寫入與快取讀取三者之和）"""
+    return (usage.get('input_tokens', 0) + usage.get('cache_creation_input_tokens', 0)
+            + usage.get('cache_read_input_tokens', 0))
+
+
+def record_usage(user_id: int, cache_hit: bool, usage: Dict) -> None:
+    """
+    累計用戶的分析次數與 token 用量（以 SQL 遞增，並行任務不會互相覆蓋；不提交）
+
+    Args:
+        user_id: 用戶 ID
+        cache_hit: 是否命中結果快取
+        usage: {'input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens'}，
+               命中時為節省的用量，否則為實際計費的用量
+    """
+    if cache_hit:
+        increments = {
+            'cache_hits': 1,
+            'saved_input_tokens': prompt_input_tokens(usage),
+            'saved_output_tokens': usage.get('output_tokens', 0)
+        }
+    else:
+        increments = {
+            field: usage.get(field, 0)
+            for field in ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+        }
+    increments['analyses'] = 1
+
+    updated = AIUsageStat.query.filter_by(user_id=user_id).update({
+        getattr(AIUsageStat, field): getattr(AIUsageStat, field) + value
+        for field, value in increments.items()
+    }, synchronize_session=False)
+
+    if not updated:
+        stat = _empty_stat(user_id)
+        for field, value in increments.items():
+            setattr(stat, field, value)
+        db.session.add(stat)
+
+
+def get_usage_stats(user_id: int) -> Dict:
+    """用戶的 AI 分析用量與快取命中統計"""
+    stat = AIUsageStat.query.filter_by(user_id=user_id).first() or _empty_stat(user_id)
+    return stat.to_dict()
+
+
+def _empty_stat(user_id: int) -> AIUsageStat:
+    """所有計數為零的統計記錄"""
+    return AIUsageStat(user_id=user_id, analyses=0, cache_hits=0, input_tokens=0, output_tokens=0,
+                       saved_input_tokens=0, saved_output_tokens=0,
+                       cache_creation_input_tokens=0, cache_read_input_tokens=0)
@@ -0,0 +1,191 @@
+"""
+Map-Reduce AI 分析
+AI Map-Reduce - 論文集超出單次提示的上下文時，按年份切分為 token 預算內的批次，
+以有限並行數摘要各批次（結果逐批快取），再合併摘要生成完整的研究缺口分析報告
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+from models import db
+from services.ai_analysis import AIAnalysisService, MAP_TEMPLATE_VERSION, USAGE_FIELDS
+from services.ai_cache import lookup_result, store_result
+from services.background_jobs import JobCancelled
+from services.prompt_budget import estimate_tokens
+
+
+def partition_papers(papers: List[Dict], budget: int, measure: Callable[[Dict], int]) -> List[List[Dict]]:
+    """
+    按年份將論文切分為 token 數不超過預算的批次
+
+    論文按年份排列，同一年的論文盡量放在同一批；單一年份超出預算時才在年份內切分。
+    單篇論文超出預算時獨立成批。
+
+    Args:
+        papers: 論文列表（按年份排序）
+        budget: 每批的 token 上限
+        measure: 單篇論文的 token 估算函數
+
+    Returns:
+        批次列表
+    """
+    years: List[List[Dict]] = []
+    for paper in papers:
+        if years and years[-1][0].get('year') == paper.get('year'):
+            years[-1].append(paper)
+        else:
+            years.append([paper])
+
+    batches: List[List[Dict]] = []
+    current: List[Dict] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            batches.append(current)
+        current, current_tokens = [], 0
+
+    for year_papers in years:
+        sizes = [measure(paper) for paper in year_papers]
+        year_tokens = sum(sizes)
+
+        if current_tokens + year_tokens <= budget:
+            current.extend(year_papers)
+            current_tokens += year_tokens
+            continue
+
+        flush()
+        if year_tokens <= budget:
+            current, current_tokens = list(year_papers), year_tokens
+            continue
+
+        # 單一年份超出預算：逐篇切分
+        for paper, size in zip(year_papers, sizes):
+            if current and current_tokens + size > budget:
+                flush()
+            current.append(paper)
+            current_tokens += size
+
+    flush()
+    return batches
+
+
+def batch_label(batch: List[Dict]) -> str:
+    """批次說明，例如「2015–2018 年，共 40 篇」"""
+    years = sorted({paper.get('year') for paper in batch if paper.get('year')})
+    if not years:
+        period = '年份未知'
+    elif years[0] == years[-1]:
+        period = f'{years[0]} 年'
+    else:
+        period = f'{years[0]}–{years[-1]} 年'
+    return f'{period}，共 {len(batch)} 篇'
+
+
+def plan_batches(service: AIAnalysisService, papers: List[Dict], batch_tokens: int) -> List[Dict]:
+    """
+    切分批次並估算各批的 token 數（不呼叫 API）
+
+    Returns:
+        [{'label', 'papers', 'tokens'}]，papers 為本批論文列表
+    """
+    sizes = {id(paper): estimate_tokens(service._prepare_papers_text([paper])) for paper in papers}
+    batches = partition_papers(papers, batch_tokens, lambda paper: sizes[id(paper)])
+    return [
+        {'label': batch_label(batch), 'papers': batch, 'tokens': sum(sizes[id(paper)] for paper in batch)}
+        for batch in batches
+    ]
+
+
+def run_map_reduce(service: AIAnalysisService, papers: List[Dict], project_info: Dict,
+                   on_text: Callable[[str], None], context, batch_tokens: int,
+                   concurrency: int, max_prompt_tokens: int) -> Dict:
+    """
+    執行 map-reduce 分析
+
+    各批次摘要按內容快取：已摘要過的批次直接使用快取，完成的批次立即寫入快取，
+    因此部分批次失敗時，重新執行分析只會重試失敗的批次。
+
+    Args:
+        service: AIAnalysisService
+        papers: 論文列表（按年份排序）
+        project_info: 專案資訊
+        on_text: reduce 階段的文字片段回呼
+        context: JobContext（回報進度、檢查取消）
+        batch_tokens: 每批論文文本的 token 上限
+        concurrency: 同時進行的摘要請求數
+        max_prompt_tokens: reduce 提示的 token 上限
+
+    Returns:
+        與 AIAnalysisService.stream_research_gap() 相同格式的結果，另含 'batches' 與 'batches_cached'
+    """
+    planned = plan_batches(service, papers, batch_tokens)
+    batches = [batch['papers'] for batch in planned]
+    labels = [batch['label'] for batch in planned]
+    keys = [service.batch_cache_key(batch, project_info) for batch in batches]
+
+    summaries: List = [None] * len(batches)
+    for i, key in enumerate(keys):
+        cached = lookup_result(key)
+        if cached:
+            summaries[i] = cached.response_text
+    db.session.commit()
+
+    pending = [i for i, summary in enumerate(summaries) if summary is None]
+    usage = dict.fromkeys(USAGE_FIELDS, 0)
+    failures: Dict[int, str] = {}
+
+    context.report_progress(
+        0.1, f'分批摘要：{len(batches)} 批，{len(batches) - len(pending)} 批使用快取'
+    )
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(service.summarize_batch, batches[i], project_info, labels[i]): i
+            for i in pending
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                try:
+                    output = future.result()
+                except Exception as e:
+                    failures[i] = str(e)
+                    continue
+
+                summaries[i] = output['text']
+                for field in usage:
+                    usage[field] += output['usage'].get(field, 0)
+                store_result(keys[i], service.model, MAP_TEMPLATE_VERSION, output['text'], output['usage'])
+
+                context.report_progress(0.1 + 0.6 * done / len(pending), f'分批摘要 {done}/{len(pending)}')
+                context.check_cancelled()
+        except JobCancelled:
+            for future in futures:
+                future.cancel()
+            raise
+
+    if failures:
+        first = failures[min(failures)]
+        raise ValueError(
+            f'{len(failures)}/{len(batches)} 個批次摘要失敗（已完成的批次已快取，重新分析時只會重試失敗的批次）：{first}'
+        )
+
+    batch_summaries = [
+        {'label': label, 'text': summary, 'paper_count': len(batch)}
+        for label, summary, batch in zip(labels, summaries, batches)
+    ]
+    reduce_tokens = service.request_tokens(service.reduce_request(batch_summaries, project_info))
+    if reduce_tokens > max_prompt_tokens:
+        raise ValueError(f'分批摘要合併後仍超出上下文（約 {reduce_tokens} tokens），請減少論文數量')
+
+    context.report_progress(0.75, '合併分批摘要，生成完整報告')
+    result = service.stream_reduce(batch_summaries, project_info, on_text)
+
+    for field in usage:
+        usage[field] += result['usage'].get(field, 0)
+    result['usage'] = usage
+    result['batches'] = len(batches)
+    result['batches_cached'] = len(batches) - len(pending)
+    return result
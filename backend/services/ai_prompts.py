@@ -3,6 +3,8 @@ AI 提示詞模板
 AI Prompt Templates - 用於研究缺口識別和領域分析
 """
 
+from services.paper_digest import current_digest, format_digest
+
 
 class AIPromptTemplates:
     """AI 分析提示詞模板集合"""
@@ -12,6 +14,8 @@ class AIPromptTemplates:
         """
         格式化論文數據為提示詞輸入
 
+        已生成結構化摘要的論文以摘要取代原始摘要與引言結論節錄
+
         Args:
             papers: 論文列表
 
@@ -26,8 +30,14 @@ class AIPromptTemplates:
 作者: {', '.join([author.name for author in paper.authors]) if hasattr(paper, 'authors') else 'N/A'}
 年份: {paper.year or 'N/A'}
 期刊: {paper.journal or 'N/A'}
-摘要: {paper.abstract or '無摘要'}
 """
+            digest = current_digest(paper)
+            if digest:
+                paper_text += f"重點: {format_digest(digest)}\n"
+                formatted.append(paper_text)
+                continue
+
+            paper_text += f"摘要: {paper.abstract or '無摘要'}\n"
             if paper.introduction:
                 paper_text += f"引言節錄: {paper.introduction[:500]}...\n"
             if paper.conclusion:
@@ -301,4 +311,26 @@ class AIPromptTemplates:
 - 建議的切入點
 
 請用學術性但易懂的繁體中文撰寫，總字數約 2000-3000 字。
+"""
+
+    @staticmethod
+    def paper_digest_prompt(title, abstract="", introduction="", conclusion=""):
+        """單篇論文結構化摘要提示詞（輸出 JSON，供之後的分析重用）"""
+        sections = f"摘要: {abstract}\n" if abstract else ""
+        if introduction:
+            sections += f"引言節錄: {introduction}\n"
+        if conclusion:
+            sections += f"結論節錄: {conclusion}\n"
+
+        return f"""
+請閱讀以下論文資訊，整理成精簡的結構化摘要，供之後的文獻綜述分析使用。
+
+標題: {title}
+{sections}
+只輸出一個 JSON 物件，不要加任何說明，格式如下：
+{{"problem": "研究問題", "method": "研究方法", "dataset": "資料或研究對象", "finding": "主要發現", "limitation": "限制"}}
+
+要求：
+1. 每個欄位一句話，不超過 40 字，使用繁體中文，專有名詞與方法名稱保留原文
+2. 只根據上述內容撰寫，未提及的欄位填空字串，不要推測
 """
@@ -0,0 +1,182 @@
+"""
+分段並行 AI 分析
+AI Sections - 以 AIPromptTemplates 的各段提示（領域發展史、核心問題、方法演進、研究缺口、學術爭議、研究方向）
+透過非同步 client 同時生成，按報告順序合併為完整報告，並填入 GapAnalysis 的結構化欄位；
+耗時取決於最慢的一段，且每段各有完整的輸出上限
+"""
+
+import re
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from services.ai_analysis import AIAnalysisService
+from services.ai_prompts import AIPromptTemplates
+
+# 分段提示模板版本：修改 AIPromptTemplates 的各段提示或合併格式時必須更新，使舊的快取結果失效
+SECTION_TEMPLATE_VERSION = '2024-12-sections-v1'
+
+# (分析類型, 報告中的段落標題, GapAnalysis 欄位)，按報告順序排列
+SECTIONS = (
+    ('domain_history', '領域發展史', 'summary'),
+    ('core_problems', '核心研究問題', 'core_problems'),
+    ('method_evolution', '方法演進', 'method_evolution'),
+    ('research_gaps', '研究缺口', 'research_gaps'),
+    ('controversies', '學術爭議', 'controversies'),
+    ('research_directions', '研究方向建議', 'recommendations'),
+)
+
+SECTION_KEYS = tuple(key for key, _, _ in SECTIONS)
+
+# 可用的分析類型：comprehensive 生成全部段落，其他類型只生成對應的一段
+ANALYSIS_TYPES = ('comprehensive',) + SECTION_KEYS
+
+_LABELS = {key: label for key, label, _ in SECTIONS}
+_COLUMNS = {key: column for key, _, column in SECTIONS}
+
+
+def section_keys(analysis_type: str) -> List[str]:
+    """分析類型對應的段落（按報告順序）"""
+    return list(SECTION_KEYS) if analysis_type == 'comprehensive' else [analysis_type]
+
+
+def period_labels(years: Iterable) -> Tuple[str, str, str]:
+    """
+    按論文年份平均分為早期、中期、近期三段，用於方法演進提示
+
+    Returns:
+        (早期, 中期, 近期)，例如 ('1998–2005 年', '2006–2014 年', '2015–2023 年')；年份不足三個時皆為空字串
+    """
+    years = sorted({year for year in years if year})
+    if len(years) < 3:
+        return '', '', ''
+
+    def label(span):
+        return f'{span[0]} 年' if span[0] == span[-1] else f'{span[0]}–{span[-1]} 年'
+
+    third = len(years) // 3
+    return label(years[:third]), label(years[third:len(years) - third]), label(years[len(years) - third:])
+
+
+def build_section_prompts(papers_text: str, domain_name: str, years: Iterable, keys: List[str]) -> Dict[str, str]:
+    """
+    構建各段落的提示
+
+    研究方向不等待研究缺口的結果（各段互相獨立才能並行），由模型直接從論文集提出。
+
+    Args:
+        papers_text: AIPromptTemplates.format_papers_for_prompt() 的結果
+        domain_name: 研究領域名稱
+        years: 論文年份（用於方法演進的時期劃分）
+        keys: 要生成的段落
+
+    Returns:
+        {段落: 提示}
+    """
+    early, mid, recent = period_labels(years)
+    builders = {
+        'domain_history': lambda: AIPromptTemplates.domain_history_prompt(papers_text, domain_name),
+        'core_problems': lambda: AIPromptTemplates.core_problems_prompt(papers_text),
+        'method_evolution': lambda: AIPromptTemplates.method_evolution_prompt(papers_text, early, mid, recent),
+        'research_gaps': lambda: AIPromptTemplates.research_gaps_prompt(papers_text),
+        'controversies': lambda: AIPromptTemplates.controversies_prompt(papers_text),
+        'research_directions': lambda: AIPromptTemplates.research_directions_prompt(papers_text),
+    }
+    return {key: builders[key]() for key in keys}
+
+
+def _section_block(key: str, text: str, first: bool) -> str:
+    """報告中的一段（段落之間以空行分隔）"""
+    return ('' if first else '\n\n') + f'# {_LABELS[key]}\n\n{text.strip()}'
+
+
+def merge_sections(texts: Dict[str, str]) -> str:
+    """按報告順序合併各段落為完整報告"""
+    keys = [key for key in SECTION_KEYS if key in texts]
+    return ''.join(_section_block(key, texts[key], i == 0) for i, key in enumerate(keys))
+
+
+def split_sections(full_text: str, keys: List[str]) -> Dict[str, str]:
+    """
+    將 merge_sections() 合併的報告拆回各段落（用於快取命中時填入結構化欄位）
+
+    Args:
+        full_text: 合併後的報告
+        keys: 報告包含的段落（按報告順序）
+
+    Returns:
+        {段落: 內容}，找不到標題的段落省略
+    """
+    found = []
+    position = 0
+    for key in keys:
+        match = re.compile(rf'^# {re.escape(_LABELS[key])}\n\n', re.MULTILINE).search(full_text, position)
+        if match:
+            found.append((key, match.start(), match.end()))
+            position = match.end()
+
+    texts = {}
+    for i, (key, _, content_start) in enumerate(found):
+        content_end = found[i + 1][1] if i + 1 < len(found) else len(full_text)
+        texts[key] = full_text[content_start:content_end].strip()
+    return texts
+
+
+def section_columns(texts: Dict[str, str]) -> Dict:
+    """
+    各段落對應的 GapAnalysis 欄位值
+
+    summary 為文字欄位，直接保存領域發展史；其餘 JSON 欄位保存 {'title', 'content'}。
+    """
+    columns = {}
+    for key, text in texts.items():
+        column = _COLUMNS[key]
+        columns[column] = text if column == 'summary' else {'title': _LABELS[key], 'content': text}
+    return columns
+
+
+def run_sections(service: AIAnalysisService, prompts: Dict[str, str], on_text: Callable[[str], None],
+                 context, concurrency: int, interval: float) -> Dict:
+    """
+    並行生成各段落
+
+    段落按完成順序返回，但只有在前面的段落都完成後才寫出（on_text 收到的內容依序串接即為
+    merge_sections() 的完整報告，串流中的客戶端不需要重新排序）。生成期間每隔 interval 秒
+    檢查取消並回報進度。
+
+    Args:
+        service: AIAnalysisService
+        prompts: build_section_prompts() 的結果
+        on_text: 已完成段落的文字回呼
+        context: JobContext（回報進度、檢查取消；None 表示不回報）
+        concurrency: 同時進行的請求數
+        interval: 檢查取消與回報進度的間隔（秒）
+
+    Returns:
+        {'sections': {段落: 內容}, 'usage': 合計 token 用量}
+    """
+    order = [key for key in SECTION_KEYS if key in prompts]
+    texts: Dict[str, str] = {}
+    emitted = 0
+    generated = 0
+    last_heartbeat = time.monotonic()
+
+    def on_delta(key, text):
+        nonlocal generated, last_heartbeat
+        generated += len(text)
+        if context is not None and time.monotonic() - last_heartbeat >= interval:
+            last_heartbeat = time.monotonic()
+            context.check_cancelled()
+            context.report_progress(
+                0.1 + 0.8 * len(texts) / len(order),
+                f'並行生成 {len(order)} 個段落（已完成 {len(texts)} 段，已生成 {generated} 字）'
+            )
+
+    def on_complete(key, text):
+        nonlocal emitted
+        texts[key] = text
+        while emitted < len(order) and order[emitted] in texts:
+            on_text(_section_block(order[emitted], texts[order[emitted]], emitted == 0))
+            emitted += 1
+
+    output = service.run_concurrent(prompts, on_delta, on_complete, concurrency)
+    return {'sections': {key: texts[key].strip() for key in order}, 'usage': output['usage']}
@@ -0,0 +1,414 @@
+"""
+批次 AI 分析
+Analysis Batches - 以 Message Batches API 離線分析多個專案（例如每晚分析課程中所有學生的專案）：
+一次構建並提交所有專案的綜合分析請求，背景任務以遞增間隔輪詢批次狀態，批次結束後逐筆寫入 GapAnalysis；
+不佔用互動式分析的請求名額，且按批次價格計費
+"""
+
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import anthropic
+from flask import current_app
+
+from models import db, AnalysisBatch, BackgroundJob, GapAnalysis, Paper, Project, User
+from services.ai_analysis import PROMPT_TEMPLATE_VERSION, USAGE_FIELDS
+from services.ai_analyzer import AIAnalyzer
+from services.ai_cache import lookup_result, record_usage, store_result
+from services.analysis_jobs import MIN_PAPERS_FOR_ANALYSIS, plan_analysis, resolve_api_key
+from services.background_jobs import JobCancelled, cancel_job, submit_job
+
+# 批次 API 與提示快取的 beta 標頭（批次中的請求同樣使用可快取的 system 區塊）
+BATCH_BETA_HEADER = 'message-batches-2024-09-24,prompt-caching-2024-07-31'
+
+# 等待下一次輪詢期間檢查取消的間隔（秒）
+_CANCEL_CHECK_SECONDS = 5
+
+# 輪詢連續失敗（網路錯誤、服務端 5xx 或限流）超過此次數時停止任務，之後可以重新開始輪詢
+_MAX_POLL_FAILURES = 5
+
+
+class MessageBatchClient:
+    """
+    Message Batches API 的最小客戶端
+
+    目前固定的 anthropic SDK 版本尚未提供 batches 資源，這裡以 SDK 的底層請求方法呼叫，
+    沿用同一個 client 的 API Key、base_url（ANTHROPIC_BASE_URL）、逾時與重試設定。
+    """
+
+    def __init__(self, client: anthropic.Anthropic):
+        self.client = client
+
+    def create(self, requests: List[Dict]) -> Dict:
+        """
+        提交批次
+
+        Args:
+            requests: [{'custom_id', 'params'}]，params 為 messages API 的參數
+
+        Returns:
+            批次物件（id, processing_status, request_counts, ...）
+        """
+        return self.client.post('/v1/messages/batches', cast_to=object, body={'requests': requests},
+                                options=self._options())
+
+    def retrieve(self, provider_batch_id: str) -> Dict:
+        """查詢批次狀態"""
+        return self.client.get(f'/v1/messages/batches/{provider_batch_id}', cast_to=object,
+                               options=self._options())
+
+    def cancel(self, provider_batch_id: str) -> Dict:
+        """取消批次（已完成的請求仍保留結果，其餘請求標記為 canceled）"""
+        return self.client.post(f'/v1/messages/batches/{provider_batch_id}/cancel', cast_to=object,
+                                options=self._options())
+
+    def results(self, provider_batch_id: str) -> Iterator[Dict]:
+        """
+        已結束批次的結果（JSONL，每行一個請求）
+
+        Yields:
+            {'custom_id', 'result': {'type': succeeded / errored / canceled / expired, 'message' 或 'error'}}
+        """
+        text = self.client.get(f'/v1/messages/batches/{provider_batch_id}/results', cast_to=str,
+                               options=self._options())
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+    @staticmethod
+    def _options() -> Dict:
+        return {'headers': {'anthropic-beta': BATCH_BETA_HEADER}}
+
+
+def start_analysis_batch(user_id: int, project_ids: List[int], force_refresh: bool = False) -> AnalysisBatch:
+    """
+    建立批次並排程提交與輪詢的背景任務
+
+    Args:
+        user_id: 用戶 ID
+        project_ids: 要分析的專案 ID（呼叫方負責驗證權限）
+        force_refresh: 忽略結果快取，所有專案都重新分析
+
+    Returns:
+        AnalysisBatch（狀態為 pending）
+    """
+    batch = AnalysisBatch(
+        user_id=user_id,
+        status='pending',
+        analysis_type='comprehensive',
+        force_refresh=force_refresh,
+        project_ids=list(project_ids),
+        requests={},
+        results={}
+    )
+    db.session.add(batch)
+    db.session.commit()
+    return resume_analysis_batch(batch)
+
+
+def resume_analysis_batch(batch: AnalysisBatch) -> AnalysisBatch:
+    """
+    排程處理批次的背景任務（新批次，或輪詢任務被取消、失敗、伺服器重啟後重新開始輪詢）
+
+    已寫入的結果不會重複寫入。
+    """
+    job = submit_job('analysis_batch', batch.user_id, analysis_batch_job, params={'batch_id': batch.id})
+    batch.job_id = job.id
+    batch.error = None
+    db.session.commit()
+    return batch
+
+
+def cancel_analysis_batch(batch: AnalysisBatch) -> AnalysisBatch:
+    """
+    取消批次：已提交的批次請服務端取消（已完成的專案仍會寫入報告），尚未提交的批次直接停止
+
+    Args:
+        batch: 尚未結束的 AnalysisBatch
+
+    Returns:
+        更新後的批次
+    """
+    if batch.provider_batch_id:
+        api_key = resolve_api_key(User.query.get(batch.user_id))
+        if not api_key:
+            raise ValueError('未配置 AI API 金鑰')
+        provider = MessageBatchClient(AIAnalyzer(api_key=api_key).service.client).cancel(batch.provider_batch_id)
+        _apply_provider_status(batch, provider)
+    else:
+        job = BackgroundJob.query.get(batch.job_id) if batch.job_id else None
+        if job:
+            cancel_job(job)
+        batch.status = 'cancelled'
+    db.session.commit()
+    return batch
+
+
+def analysis_batch_job(context, batch_id: int) -> Dict:
+    """
+    背景任務：提交批次（尚未提交時），輪詢到批次結束後逐筆寫入分析報告
+
+    命中結果快取的專案在提交前直接寫入報告，不放入批次；論文不足的專案略過。
+    輪詢間隔從 ANALYSIS_BATCH_POLL_INTERVAL 開始每次放大 1.5 倍，最長 ANALYSIS_BATCH_POLL_MAX_INTERVAL，
+    等待期間定期檢查取消。取消此任務只停止輪詢（服務端的批次繼續處理，可以重新開始輪詢）；
+    要取消服務端的批次請使用 cancel_analysis_batch()。
+
+    Args:
+        context: JobContext
+        batch_id: AnalysisBatch ID
+
+    Returns:
+        {'batch_id', 'provider_batch_id', 'requests', 'succeeded', 'cached', 'failed', 'skipped'}
+    """
+    batch = AnalysisBatch.query.get(batch_id)
+    if batch is None:
+        raise ValueError('批次不存在')
+
+    api_key = resolve_api_key(User.query.get(batch.user_id))
+    if not api_key:
+        raise ValueError('未配置 AI API 金鑰')
+
+    analyzer = AIAnalyzer(api_key=api_key)
+    client = MessageBatchClient(analyzer.service.client)
+    config = current_app.config
+
+    try:
+        if batch.status == 'pending':
+            _submit(context, batch, analyzer, client, config)
+        if batch.provider_batch_id and not batch.is_finished:
+            _wait_until_ended(context, batch, client, config)
+            _write_results(context, batch, analyzer, client)
+    except JobCancelled:
+        db.session.rollback()
+        batch = AnalysisBatch.query.get(batch_id)
+        if batch.status == 'pending':
+            batch.status = 'cancelled'
+            db.session.commit()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        batch = AnalysisBatch.query.get(batch_id)
+        batch.error = str(e)
+        if batch.status == 'pending':
+            batch.status = 'failed'
+        db.session.commit()
+        raise
+
+    return _summary(batch)
+
+
+def _submit(context, batch: AnalysisBatch, analyzer: AIAnalyzer, client: MessageBatchClient, config):
+    """構建各專案的請求並提交批次（所有專案都命中快取或略過時不提交，批次直接完成）"""
+    projects = {
+        project.id: project
+        for project in Project.query.filter(
+            Project.id.in_(batch.project_ids or []), Project.user_id == batch.user_id
+        ).all()
+    }
+
+    requests = []
+    entries = {}
+    results = {}
+    for i, project_id in enumerate(batch.project_ids or [], start=1):
+        context.check_cancelled()
+        context.report_progress(0.1 * i / len(batch.project_ids), f'構建分析請求 {i}/{len(batch.project_ids)}')
+
+        project = projects.get(project_id)
+        if project is None:
+            results[str(project_id)] = {'status': 'skipped', 'error': '專案不存在或無權限'}
+            continue
+
+        # 固定順序，使相同的論文集得到與互動式分析相同的提示與快取鍵
+        papers = Paper.query.filter_by(project_id=project_id).order_by(Paper.year, Paper.id).all()
+        if len(papers) < MIN_PAPERS_FOR_ANALYSIS:
+            results[str(project_id)] = {
+                'status': 'skipped', 'error': f'論文數量不足，至少需要 {MIN_PAPERS_FOR_ANALYSIS} 篇'
+            }
+            continue
+
+        domain_name = project.domain or project.name
+        _, papers, plan = plan_analysis(analyzer, papers, domain_name, 'single', config)
+        cache_key = analyzer.cache_key(papers, domain_name)
+        title = f'{project.name} - AI 分析報告（批次）'
+
+        cached = None if batch.force_refresh else lookup_result(cache_key)
+        if cached:
+            usage = {'input_tokens': cached.input_tokens or 0, 'output_tokens': cached.output_tokens or 0}
+            analysis = _save_analysis(batch, project_id, title, cached.response_text, cached.model,
+                                      len(papers), usage, cache_hit=True)
+            record_usage(batch.user_id, True, usage)
+            db.session.commit()
+            results[str(project_id)] = {'status': 'succeeded', 'analysis_id': analysis.id, 'cache_hit': True}
+            continue
+
+        custom_id = f'project-{project_id}'
+        entries[custom_id] = {
+            'project_id': project_id,
+            'title': title,
+            'cache_key': cache_key,
+            'papers_analyzed': len(papers),
+            'compaction': plan['compaction']
+        }
+        requests.append({'custom_id': custom_id, 'params': analyzer.build_request(papers, domain_name)})
+
+    batch.requests = entries
+    batch.results = results
+
+    if not requests:
+        batch.status = 'completed'
+        batch.completed_at = datetime.utcnow()
+        db.session.commit()
+        return
+
+    context.check_cancelled()
+    context.report_progress(0.1, f'提交批次：{len(requests)} 個專案')
+    provider = client.create(requests)
+
+    batch.provider_batch_id = provider['id']
+    batch.submitted_at = datetime.utcnow()
+    _apply_provider_status(batch, provider)
+    db.session.commit()
+
+
+def _wait_until_ended(context, batch: AnalysisBatch, client: MessageBatchClient, config):
+    """以遞增間隔輪詢批次狀態，直到服務端回報 ended"""
+    interval = config.get('ANALYSIS_BATCH_POLL_INTERVAL', 60)
+    max_interval = config.get('ANALYSIS_BATCH_POLL_MAX_INTERVAL', 600)
+    failures = 0
+
+    while True:
+        try:
+            provider = client.retrieve(batch.provider_batch_id)
+        except (anthropic.APIConnectionError, anthropic.RateLimitError, anthropic.InternalServerError):
+            failures += 1
+            if failures >= _MAX_POLL_FAILURES:
+                raise
+            provider = None
+        else:
+            failures = 0
+            _apply_provider_status(batch, provider)
+            db.session.commit()
+
+        if provider is not None:
+            counts = batch.request_counts or {}
+            total = len(batch.requests or {})
+            done = total - counts.get('processing', 0)
+            if provider.get('processing_status') == 'ended':
+                return
+            context.report_progress(0.1 + 0.6 * done / max(total, 1), f'批次處理中：{done}/{total} 個專案完成')
+
+        _sleep(context, interval)
+        interval = min(interval * 1.5, max_interval)
+
+
+def _write_results(context, batch: AnalysisBatch, analyzer: AIAnalyzer, client: MessageBatchClient):
+    """逐筆寫入批次結果（每筆提交一次；重新開始輪詢時略過已寫入的專案）"""
+    entries = batch.requests or {}
+    model = analyzer.service.model
+
+    for done, item in enumerate(client.results(batch.provider_batch_id), start=1):
+        entry = entries.get(item.get('custom_id'))
+        if entry is None:
+            continue
+        key = str(entry['project_id'])
+        if key in (batch.results or {}):
+            continue
+
+        result = item.get('result') or {}
+        if result.get('type') != 'succeeded':
+            outcome = {'status': result.get('type', 'errored'), 'error': _result_error(result)}
+        elif Project.query.get(entry['project_id']) is None:
+            outcome = {'status': 'skipped', 'error': '專案已刪除'}
+        else:
+            message = result['message']
+            text = ''.join(block.get('text', '') for block in message.get('content', [])
+                           if block.get('type') == 'text')
+            usage = {field: (message.get('usage') or {}).get(field) or 0 for field in USAGE_FIELDS}
+            analysis = _save_analysis(batch, entry['project_id'], entry['title'], text,
+                                      message.get('model') or model, entry['papers_analyzed'], usage,
+                                      cache_hit=False)
+            record_usage(batch.user_id, False, usage)
+            outcome = {'status': 'succeeded', 'analysis_id': analysis.id, 'cache_hit': False}
+            if text:
+                store_result(entry['cache_key'], analysis.model_used, PROMPT_TEMPLATE_VERSION, text, usage)
+
+        # JSON 欄位需要重新賦值才會被標記為已修改
+        batch.results = dict(batch.results or {}, **{key: outcome})
+        db.session.commit()
+        context.report_progress(0.7 + 0.3 * done / max(len(entries), 1), f'寫入分析報告 {done}/{len(entries)}')
+
+    batch.status = 'completed'
+    batch.completed_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _save_analysis(batch: AnalysisBatch, project_id: int, title: str, text: str, model: str,
+                   papers_analyzed: int, usage: Dict, cache_hit: bool) -> GapAnalysis:
+    """新增一份已完成的綜合分析報告（不提交）"""
+    analysis = GapAnalysis(
+        project_id=project_id,
+        title=title,
+        analysis_type='comprehensive',
+        full_text=text,
+        summary=text,
+        model_used=model,
+        papers_analyzed=papers_analyzed,
+        status='completed',
+        batch_id=batch.id,
+        cache_hit=cache_hit,
+        input_tokens=usage.get('input_tokens', 0),
+        output_tokens=usage.get('output_tokens', 0),
+        cache_creation_input_tokens=usage.get('cache_creation_input_tokens', 0),
+        cache_read_input_tokens=usage.get('cache_read_input_tokens', 0)
+    )
+    db.session.add(analysis)
+    db.session.flush()
+    return analysis
+
+
+def _apply_provider_status(batch: AnalysisBatch, provider: Dict):
+    """以服務端的批次物件更新狀態與請求數（不提交）"""
+    batch.status = provider.get('processing_status', batch.status)
+    batch.request_counts = provider.get('request_counts')
+    if provider.get('processing_status') == 'ended' and batch.ended_at is None:
+        batch.ended_at = datetime.utcnow()
+
+
+def _result_error(result: Dict) -> Optional[str]:
+    """失敗結果的錯誤說明"""
+    if result.get('type') == 'errored':
+        error = (result.get('error') or {}).get('error') or result.get('error') or {}
+        return error.get('message') or error.get('type') or '請求失敗'
+    if result.get('type') == 'expired':
+        return '批次在 24 小時內未處理此請求'
+    if result.get('type') == 'canceled':
+        return '批次已取消'
+    return None
+
+
+def _sleep(context, seconds: float):
+    """等待下一次輪詢，期間定期檢查取消"""
+    deadline = time.monotonic() + seconds
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, _CANCEL_CHECK_SECONDS))
+        context.check_cancelled()
+
+
+def _summary(batch: AnalysisBatch) -> Dict:
+    """批次結果統計"""
+    outcomes = list((batch.results or {}).values())
+    succeeded = [outcome for outcome in outcomes if outcome['status'] == 'succeeded']
+    return {
+        'batch_id': batch.id,
+        'provider_batch_id': batch.provider_batch_id,
+        'requests': len(batch.requests or {}),
+        'succeeded': len(succeeded),
+        'cached': sum(1 for outcome in succeeded if outcome.get('cache_hit')),
+        'failed': sum(1 for outcome in outcomes if outcome['status'] in ('errored', 'canceled', 'expired')),
+        'skipped': sum(1 for outcome in outcomes if outcome['status'] == 'skipped')
+    }
@@ -0,0 +1,419 @@
+"""
+AI 分析背景任務
+Analysis Jobs - 在背景執行緒中以串流方式呼叫 Claude 進行研究缺口分析，生成中的文字定期寫入 GapAnalysis，
+並以 Server-Sent Events 轉發給客戶端（斷線後可從已收到的位置續傳）；相同輸入的分析直接使用快取結果
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import db, Project, Paper, GapAnalysis, User, BackgroundJob
+from services.ai_analysis import PROMPT_TEMPLATE_VERSION
+from services.ai_analyzer import AIAnalyzer
+from services.ai_cache import lookup_result, record_usage, store_result
+from services.ai_sections import SECTION_TEMPLATE_VERSION, section_columns, section_keys
+
+# 進行有效分析所需的最少論文數
+MIN_PAPERS_FOR_ANALYSIS = 3
+
+# 分析模式：auto（提示超出單次上限時改用 map-reduce）、single、map_reduce、sections（各段落並行生成）
+ANALYSIS_MODES = ('auto', 'single', 'map_reduce', 'sections')
+
+
+def resolve_api_key(user: Optional[User]) -> Optional[str]:
+    """
+    取得用戶的 Anthropic API Key，用戶未設定時使用環境變數（向後相容）
+
+    API Key 只在執行時讀取，不寫入任務參數。
+    """
+    api_key = user.get_anthropic_api_key() if user else None
+    return api_key or os.environ.get('ANTHROPIC_API_KEY')
+
+
+class PartialTextWriter:
+    """
+    累積串流文字並定期追加寫入 GapAnalysis.full_text（每次寫入後提交並檢查取消）
+
+    第一段文字立即寫入，之後每隔 interval 秒寫入一次，讓客戶端約一秒內即可看到內容。
+    """
+
+    def __init__(self, context, analysis_id: int, interval: float, progress: float = 0.1):
+        self.context = context
+        self.analysis_id = analysis_id
+        self.interval = interval
+        self.progress = progress
+        self.pending = []
+        self.written = 0
+        self.last_flush = 0.0
+
+    def __call__(self, text: str):
+        self.pending.append(text)
+        if time.monotonic() - self.last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """寫入累積的文字"""
+        if not self.pending:
+            return
+        chunk = ''.join(self.pending)
+        self.pending = []
+
+        GapAnalysis.query.filter_by(id=self.analysis_id).update(
+            {GapAnalysis.full_text: GapAnalysis.full_text + chunk}, synchronize_session=False
+        )
+        db.session.commit()
+        self.written += len(chunk)
+        self.last_flush = time.monotonic()
+
+        self.context.check_cancelled()
+        self.context.report_progress(self.progress, f'AI 正在生成報告（已生成 {self.written} 字）')
+
+
+def fail_stale_analyses(max_idle_seconds: int) -> int:
+    """
+    將中斷的分析標記為失敗（應用啟動時呼叫）
+
+    分析任務在執行此任務的程序內的執行緒中執行，程序結束（部署、重啟）後任務不會再更新。
+    執行中的分析每隔數秒就會寫入生成內容並回報進度，因此超過 max_idle_seconds 未更新的
+    queued / running 分析任務視為已中斷（多個 worker 時不影響其他 worker 正在執行的任務）；
+    其報告與沒有執行中任務的 generating 報告一併標記為 failed。
+
+    Args:
+        max_idle_seconds: 任務未更新多久後視為中斷
+
+    Returns:
+        標記為失敗的報告數
+    """
+    now = datetime.utcnow()
+    stale_jobs = BackgroundJob.query.filter(
+        BackgroundJob.job_type == 'gap_analysis',
+        BackgroundJob.status.in_(('queued', 'running')),
+        BackgroundJob.updated_at < now - timedelta(seconds=max_idle_seconds)
+    ).all()
+    for job in stale_jobs:
+        job.status = 'failed'
+        job.error = '伺服器重新啟動，分析已中斷'
+        job.finished_at = now
+
+    active_job_ids = db.select(BackgroundJob.id).where(BackgroundJob.status.in_(('queued', 'running')))
+    failed = GapAnalysis.query.filter(
+        GapAnalysis.status == 'generating',
+        db.or_(GapAnalysis.job_id.is_(None), GapAnalysis.job_id.not_in(active_job_ids))
+    ).update({GapAnalysis.status: 'failed'}, synchronize_session=False)
+
+    db.session.commit()
+    return failed
+
+
+def plan_analysis(analyzer: AIAnalyzer, papers: List, domain_name: str, mode: str, config,
+                  analysis_type: str = 'comprehensive') -> Tuple[str, List, Dict]:
+    """
+    在呼叫 API 前估算提示各段落的 token 數並決定分析方式
+
+    - auto：提示超出 ANALYSIS_SINGLE_PASS_MAX_TOKENS 時改用 map-reduce，否則單次分析
+    - single：超出上限時按引用數與年份覆蓋挑選論文，壓縮到上限內
+    - map_reduce：按 ANALYSIS_MAP_BATCH_TOKENS 切分批次
+    - sections：各段落一個請求並行生成，任一請求超出上限時同樣挑選論文壓縮
+
+    單一段落的分析類型（例如 research_gaps）一律使用 sections 模式，只生成該段落。
+
+    Args:
+        analyzer: AIAnalyzer
+        papers: Paper 模型列表（按年份排序）
+        domain_name: 研究領域名稱
+        mode: auto / single / map_reduce / sections
+        config: 應用配置
+        analysis_type: 分析類型
+
+    Returns:
+        (實際模式, 要分析的論文, {'mode', 'prompt', 'compaction', 'batches', 'sections'})
+    """
+    max_prompt_tokens = config.get('ANALYSIS_SINGLE_PASS_MAX_TOKENS', 150000)
+
+    if analysis_type != 'comprehensive':
+        mode = 'sections'
+
+    if mode == 'sections':
+        keys = section_keys(analysis_type)
+        report = analyzer.section_report(papers, domain_name, keys)
+        compaction = None
+        if report['largest_request'] > max_prompt_tokens:
+            papers, compaction = analyzer.fit_sections_to_budget(papers, domain_name, keys, max_prompt_tokens)
+            report = analyzer.section_report(papers, domain_name, keys)
+
+        return mode, papers, {
+            'mode': mode,
+            'prompt': report,
+            'max_prompt_tokens': max_prompt_tokens,
+            'compaction': compaction,
+            'batches': None,
+            'sections': keys
+        }
+
+    report = analyzer.prompt_report(papers, domain_name)
+
+    if mode == 'auto':
+        mode = 'map_reduce' if report['total'] > max_prompt_tokens else 'single'
+
+    compaction = None
+    if mode == 'single' and report['total'] > max_prompt_tokens:
+        papers, compaction = analyzer.fit_to_budget(papers, domain_name, max_prompt_tokens)
+        report = analyzer.prompt_report(papers, domain_name)
+
+    batches = None
+    if mode == 'map_reduce':
+        batches = analyzer.batch_report(papers, config.get('ANALYSIS_MAP_BATCH_TOKENS', 40000))
+
+    return mode, papers, {
+        'mode': mode,
+        'prompt': report,
+        'max_prompt_tokens': max_prompt_tokens,
+        'compaction': compaction,
+        'batches': batches,
+        'sections': None
+    }
+
+
+def gap_analysis_job(context, project_id: int, user_id: int, analysis_type: str = 'comprehensive',
+                     title: Optional[str] = None, force_refresh: bool = False, mode: str = 'auto') -> Dict:
+    """
+    背景任務：以串流方式執行專案的 AI 分析並保存報告
+
+    論文集、提示模板、模型與溫度都相同的分析直接使用快取的回應，不再呼叫 Claude（除非 force_refresh）。
+    呼叫 API 前先估算提示大小（見 plan_analysis），超出上限時分批摘要後再合併，或在 single 模式下壓縮論文集。
+    報告在呼叫 Claude 前以 generating 狀態建立，生成的文字定期追加到 full_text；
+    完成後寫入最終內容並標記為 completed。失敗或取消時刪除未完成的報告。
+
+    Args:
+        context: JobContext
+        project_id: 專案 ID
+        user_id: 用戶 ID（用於讀取 API Key）
+        analysis_type: 分析類型
+        title: 報告標題
+        force_refresh: 忽略快取，重新呼叫 Claude 並更新快取
+        mode: auto / single / map_reduce / sections
+
+    Returns:
+        {'analysis_id', 'papers_analyzed', 'model_used', 'cache_hit', 'mode', 'prompt', 'compaction', 'batches',
+         'sections'}
+    """
+    api_key = resolve_api_key(User.query.get(user_id))
+    if not api_key:
+        raise ValueError('未配置 AI API 金鑰')
+
+    context.report_progress(0.05, '載入論文')
+    project = Project.query.get(project_id)
+    # 固定順序，使相同的論文集得到相同的提示與快取鍵
+    papers = Paper.query.filter_by(project_id=project_id).order_by(Paper.year, Paper.id).all()
+    if len(papers) < MIN_PAPERS_FOR_ANALYSIS:
+        raise ValueError(f'論文數量不足，至少需要 {MIN_PAPERS_FOR_ANALYSIS} 篇')
+
+    context.check_cancelled()
+
+    config = current_app.config
+    analyzer = AIAnalyzer(api_key=api_key)
+    domain_name = project.domain or project.name
+
+    mode, papers, plan = plan_analysis(analyzer, papers, domain_name, mode, config, analysis_type)
+    if mode == 'map_reduce':
+        label = f"分批摘要 {len(plan['batches'])} 批"
+    elif mode == 'sections':
+        label = f"{len(plan['sections'])} 個段落並行生成"
+    else:
+        label = '單次分析'
+    context.report_progress(0.08, f"論文集約 {plan['prompt']['total']} tokens，{label}")
+
+    if mode == 'sections':
+        cache_key = analyzer.sections_cache_key(papers, domain_name, plan['sections'])
+        template_version = SECTION_TEMPLATE_VERSION
+    else:
+        cache_key = analyzer.cache_key(papers, domain_name, variant=mode)
+        template_version = PROMPT_TEMPLATE_VERSION
+    cached = None if force_refresh else lookup_result(cache_key)
+
+    gap_analysis = GapAnalysis(
+        project_id=project_id,
+        title=title or f'{project.name} - AI 分析報告',
+        analysis_type=analysis_type,
+        full_text=cached.response_text if cached else '',
+        status='generating',
+        job_id=context.job_id,
+        papers_analyzed=len(papers),
+        cache_hit=cached is not None
+    )
+    db.session.add(gap_analysis)
+    db.session.commit()
+    analysis_id = gap_analysis.id
+
+    if cached:
+        context.report_progress(0.9, '使用快取的分析結果')
+        if mode == 'sections':
+            result = analyzer.sections_result_from_text(
+                cached.response_text, cached.model, len(papers), plan['sections']
+            )
+        else:
+            result = analyzer.result_from_text(cached.response_text, cached.model, len(papers))
+        usage = {'input_tokens': cached.input_tokens or 0, 'output_tokens': cached.output_tokens or 0}
+    else:
+        context.report_progress(0.1, f'AI 正在分析 {len(papers)} 篇論文')
+
+        interval = config.get('ANALYSIS_STREAM_FLUSH_INTERVAL', 0.5)
+        try:
+            if mode == 'map_reduce':
+                result = analyzer.map_reduce_with_context(
+                    papers=papers,
+                    domain_name=domain_name,
+                    on_text=PartialTextWriter(context, analysis_id, interval, progress=0.8),
+                    context=context,
+                    batch_tokens=config.get('ANALYSIS_MAP_BATCH_TOKENS', 40000),
+                    concurrency=config.get('ANALYSIS_MAP_CONCURRENCY', 4),
+                    max_prompt_tokens=plan['max_prompt_tokens']
+                )
+            elif mode == 'sections':
+                # 段落依序完成後立即寫入（不等待間隔），客戶端可逐段看到報告
+                result = analyzer.sections_with_context(
+                    papers=papers,
+                    domain_name=domain_name,
+                    keys=plan['sections'],
+                    on_text=PartialTextWriter(context, analysis_id, 0, progress=0.5),
+                    context=context,
+                    concurrency=config.get('ANALYSIS_SECTION_CONCURRENCY', 6),
+                    interval=interval
+                )
+            else:
+                result = analyzer.stream_with_context(
+                    papers=papers,
+                    domain_name=domain_name,
+                    on_text=PartialTextWriter(context, analysis_id, interval),
+                    analysis_type=analysis_type
+                )
+            context.check_cancelled()
+        except Exception:
+            db.session.rollback()
+            GapAnalysis.query.filter_by(id=analysis_id).delete(synchronize_session=False)
+            db.session.commit()
+            raise
+        usage = result.get('usage') or {}
+
+    context.report_progress(0.95, '保存分析報告')
+
+    # 以完整回應覆蓋逐段寫入的內容
+    gap_analysis = GapAnalysis.query.get(analysis_id)
+    gap_analysis.full_text = result.get('full_text') or result.get('content', '')
+    gap_analysis.model_used = result.get('model')
+    gap_analysis.input_tokens = usage.get('input_tokens', 0)
+    gap_analysis.output_tokens = usage.get('output_tokens', 0)
+    gap_analysis.cache_creation_input_tokens = usage.get('cache_creation_input_tokens', 0)
+    gap_analysis.cache_read_input_tokens = usage.get('cache_read_input_tokens', 0)
+    gap_analysis.status = 'completed'
+
+    # 分段分析：各段落寫入對應的結構化欄位；單次綜合分析：summary 保存全文
+    if mode == 'sections':
+        for column, value in section_columns(result['sections']).items():
+            setattr(gap_analysis, column, value)
+    elif analysis_type == 'comprehensive' and 'full_text' in result:
+        gap_analysis.summary = result.get('full_text')
+
+    record_usage(user_id, cached is not None, usage)
+    db.session.commit()
+
+    if not cached and gap_analysis.full_text:
+        store_result(cache_key, gap_analysis.model_used, template_version, gap_analysis.full_text, usage)
+
+    return {
+        'analysis_id': analysis_id,
+        'papers_analyzed': len(papers),
+        'model_used': gap_analysis.model_used,
+        'cache_hit': cached is not None,
+        'mode': mode,
+        'prompt': plan['prompt'],
+        'compaction': plan['compaction'],
+        'batches': len(plan['batches']) if plan['batches'] else None,
+        'sections': plan['sections']
+    }
+
+
+def _sse(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    """格式化一個 Server-Sent Event"""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def analysis_stream_events(job_id: int, offset: int = 0) -> Iterator[str]:
+    """
+    以 SSE 轉發分析任務的生成內容
+
+    每次輪詢只從資料庫讀取 offset 之後的文字（事件 id 即新的 offset，斷線後以 Last-Event-ID 或
+    ?offset= 續傳）。事件：
+    - status: 任務狀態或進度說明變更
+    - delta: {'text', 'offset'} 新生成的文字
+    - done: {'analysis', 'offset'} 任務完成
+    - error: {'status', 'error'} 任務失敗或已取消
+    - reconnect: {'offset'} 連線達到最長時間，客戶端應從 offset 重新連線
+
+    Args:
+        job_id: 任務 ID（呼叫方負責驗證權限）
+        offset: 客戶端已收到的字元數
+    """
+    config = current_app.config
+    poll_interval = config.get('ANALYSIS_STREAM_POLL_INTERVAL', 0.25)
+    deadline = time.monotonic() + config.get('ANALYSIS_STREAM_MAX_SECONDS', 60)
+
+    jobs = BackgroundJob.__table__
+    analyses = GapAnalysis.__table__
+    last_status = None
+    last_sent = time.monotonic()
+
+    while True:
+        # 先讀任務狀態再讀文字：任務已結束時讀到的即為最終內容
+        with db.engine.connect() as connection:
+            job = connection.execute(
+                db.select(jobs.c.status, jobs.c.progress, jobs.c.message, jobs.c.error)
+                .where(jobs.c.id == job_id)
+            ).first()
+            partial = connection.execute(
+                db.select(analyses.c.id, func.substr(analyses.c.full_text, offset + 1))
+                .where(analyses.c.job_id == job_id)
+            ).first()
+
+        if job is None:
+            yield _sse('error', {'status': None, 'error': '任務不存在'})
+            return
+
+        if (job.status, job.message) != last_status:
+            last_status = (job.status, job.message)
+            yield _sse('status', {'status': job.status, 'progress': job.progress, 'message': job.message})
+            last_sent = time.monotonic()
+
+        if partial is not None and partial[1]:
+            offset += len(partial[1])
+            yield _sse('delta', {'text': partial[1], 'offset': offset}, event_id=offset)
+            last_sent = time.monotonic()
+
+        if job.status == 'succeeded':
+            analysis = GapAnalysis.query.get(partial[0]) if partial is not None else None
+            yield _sse('done', {'analysis': analysis.to_dict() if analysis else None, 'offset': offset})
+            return
+        if job.status in ('failed', 'cancelled'):
+            yield _sse('error', {'status': job.status, 'error': job.error or job.message})
+            return
+
+        if time.monotonic() >= deadline:
+            yield _sse('reconnect', {'offset': offset})
+            return
+
+        # 排隊等待時保持連線
+        if time.monotonic() - last_sent >= 15:
+            yield ': keep-alive\n\n'
+            last_sent = time.monotonic()
+
+        time.sleep(poll_interval)
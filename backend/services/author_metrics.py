@@ -0,0 +1,271 @@
+"""
+作者指標服務
+Author Metrics Service - 一次查詢載入作者的論文與引用數，以分組 NumPy 運算批次計算
+h-index、g-index、i10-index 與影響力分數，批次寫回作者表；論文變動後只重算受影響的作者
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import bindparam, case, func, or_, true
+
+from models import db, Author, Paper, PaperAuthor
+from services.network_analyzer import influence_scores
+
+# 增量更新時每批處理的作者數（SQLite 單一查詢的參數數量有限）
+_AUTHOR_CHUNK = 500
+
+# 背景任務每次提交的作者數
+_JOB_BATCH = 5000
+
+# 寫回作者表的欄位
+METRIC_FIELDS = (
+    'total_papers', 'total_citations', 'h_index', 'g_index', 'i10_index',
+    'first_author_count', 'corresponding_author_count',
+    'first_publication_year', 'last_publication_year', 'influence_score'
+)
+
+
+def _load_authorships(author_ids: Optional[List[int]] = None) -> Tuple[list, list]:
+    """
+    載入作者與論文的關聯及論文的引用數
+
+    直接以資料表欄位查詢（不經 ORM 實體、不做 JOIN），百萬筆關聯只需數秒；
+    論文在記憶體中以 ID 對應，避免每筆關聯重複傳回論文欄位。
+
+    Args:
+        author_ids: 只載入這些作者的論文（含論文的全部作者，用於計算合作者數）；省略時載入全部
+
+    Returns:
+        (關聯 [(author_id, paper_id, author_position, is_corresponding)],
+         論文 [(paper_id, 合併鍵, citation_count, year)]，按 paper_id 排序)
+    """
+    paper_authors = PaperAuthor.__table__
+    papers = Paper.__table__
+
+    authorships = db.select(
+        paper_authors.c.author_id,
+        paper_authors.c.paper_id,
+        paper_authors.c.author_position,
+        case((paper_authors.c.is_corresponding.is_(True), 1), else_=0)
+    )
+    paper_rows = db.select(
+        papers.c.id,
+        func.coalesce(func.lower(papers.c.doi), func.lower(papers.c.title)),
+        papers.c.citation_count,
+        papers.c.year
+    ).order_by(papers.c.id)
+
+    if author_ids is not None:
+        touched = paper_authors.alias()
+        touched_papers = db.select(touched.c.paper_id).where(touched.c.author_id.in_(author_ids))
+        authorships = authorships.where(paper_authors.c.paper_id.in_(touched_papers))
+        paper_rows = paper_rows.where(papers.c.id.in_(touched_papers))
+
+    connection = db.session.connection()
+    return connection.execute(authorships).fetchall(), connection.execute(paper_rows).fetchall()
+
+
+def compute_author_metrics(authorships: list, papers: list) -> Dict[str, np.ndarray]:
+    """
+    以分組運算計算作者指標
+
+    同一篇論文可能被導入多個專案（每個專案一筆 Paper），按 DOI（缺少時按標題）合併為一篇。
+    按（作者, 引用數降序）排序後，同一作者的論文連續排列、名次即論文在組內的位置：
+    h-index = 組內「引用數 >= 名次」的論文數；g-index = 最大的名次 g 使前 g 篇引用總和 >= g²；
+    合作者數由作者 × 論文關聯矩陣 B 的 B·Bᵀ 每列非零元素數求得。
+
+    Args:
+        authorships, papers: _load_authorships() 的結果
+
+    Returns:
+        {'author_id': 陣列, 各指標: 陣列}（每位作者一個元素）
+    """
+    if not authorships:
+        return {'author_id': np.array([], dtype=np.int64), **{field: np.array([]) for field in METRIC_FIELDS}}
+
+    # 論文（已按 ID 排序）以二分搜尋對應，合併鍵相同的論文共用第一筆的 ID
+    paper_ids, keys, paper_citations, paper_years = zip(*papers)
+    paper_ids = np.array(paper_ids, dtype=np.int64)
+    first_ids = {}
+    canonical_ids = np.array([
+        first_ids.setdefault(key, paper_id) if key else paper_id
+        for paper_id, key in zip(paper_ids.tolist(), keys)
+    ], dtype=np.int64)
+    paper_citations = np.array([count or 0 for count in paper_citations], dtype=np.int64)
+    paper_years = np.array(paper_years, dtype=np.float64)  # None 轉為 NaN
+
+    author_id, paper_id, position, corresponding = zip(*authorships)
+    author_id = np.array(author_id, dtype=np.int64)
+    paper_index = np.searchsorted(paper_ids, np.array(paper_id, dtype=np.int64))
+    paper_id = canonical_ids[paper_index]
+    citations = paper_citations[paper_index]
+    year = paper_years[paper_index]
+    position = np.array([p or 0 for p in position], dtype=np.int64)
+    corresponding = np.array(corresponding, dtype=np.int64)
+
+    # 按（作者, 論文, 引用數降序）排序，同一作者重複的論文只保留引用數最高的一筆；
+    # 作者資訊取各筆的聯集：任一筆為通訊作者即計入、作者順序取最前（0 表示未知）、年份保留最早與最晚
+    order = np.lexsort((-citations, paper_id, author_id))
+    author_id, paper_id, citations = author_id[order], paper_id[order], citations[order]
+    position, corresponding, year = position[order], corresponding[order], year[order]
+    unique = np.r_[True, (author_id[1:] != author_id[:-1]) | (paper_id[1:] != paper_id[:-1])]
+    duplicate_starts = np.flatnonzero(unique)
+
+    unknown_position = np.iinfo(np.int64).max
+    position = np.minimum.reduceat(np.where(position > 0, position, unknown_position), duplicate_starts)
+    position[position == unknown_position] = 0
+    corresponding = np.maximum.reduceat(corresponding, duplicate_starts)
+    first_year = np.fmin.reduceat(year, duplicate_starts)
+    last_year = np.fmax.reduceat(year, duplicate_starts)
+
+    order = np.lexsort((-citations[unique], author_id[unique]))
+    author_id, paper_id, citations = author_id[unique][order], paper_id[unique][order], citations[unique][order]
+    position, corresponding = position[order], corresponding[order]
+    first_year, last_year = first_year[order], last_year[order]
+
+    starts = np.flatnonzero(np.r_[True, author_id[1:] != author_id[:-1]])
+    sizes = np.diff(np.r_[starts, len(author_id)])
+    rank = np.arange(len(author_id)) - np.repeat(starts, sizes) + 1
+
+    cumulative = np.cumsum(citations)
+    group_cumulative = cumulative - np.repeat(cumulative[starts] - citations[starts], sizes)
+
+    # 合作者數：共同出現在任一論文的其他作者
+    group = np.repeat(np.arange(len(starts)), sizes)
+    _, paper_column = np.unique(paper_id, return_inverse=True)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(group), dtype=np.int32), (group, paper_column)),
+        shape=(len(starts), paper_column.max() + 1)
+    )
+    collaborators = np.diff((incidence @ incidence.T).tocsr().indptr) - 1
+
+    total_papers = sizes
+    total_citations = np.add.reduceat(citations, starts)
+    first_author_count = np.add.reduceat((position == 1).astype(np.int64), starts)
+
+    return {
+        'author_id': author_id[starts],
+        'total_papers': total_papers,
+        'total_citations': total_citations,
+        'h_index': np.add.reduceat((citations >= rank).astype(np.int64), starts),
+        'g_index': np.maximum.reduceat(np.where(group_cumulative >= rank * rank, rank, 0), starts),
+        'i10_index': np.add.reduceat((citations >= 10).astype(np.int64), starts),
+        'first_author_count': first_author_count,
+        'corresponding_author_count': np.add.reduceat(corresponding, starts),
+        'first_publication_year': np.fmin.reduceat(first_year, starts),
+        'last_publication_year': np.fmax.reduceat(last_year, starts),
+        'influence_score': influence_scores(total_papers, total_citations, collaborators, first_author_count)
+    }
+
+
+def _write_metrics(metrics: Dict[str, np.ndarray], only: Optional[set] = None) -> int:
+    """
+    批次寫回作者表（單一 executemany UPDATE，不提交）
+
+    Args:
+        metrics: compute_author_metrics() 的結果
+        only: 只寫入這些作者（增量模式下其餘作者只載入了部分論文）
+
+    Returns:
+        寫入的作者數
+    """
+    now = datetime.utcnow()
+    columns = {field: metrics[field].tolist() for field in METRIC_FIELDS}
+
+    mappings = []
+    for i, author_id in enumerate(metrics['author_id'].tolist()):
+        if only is not None and author_id not in only:
+            continue
+        mapping = {'_id': author_id, 'metrics_computed_at': now}
+        for field in METRIC_FIELDS:
+            mapping[field] = columns[field][i]
+        for field in ('first_publication_year', 'last_publication_year'):
+            value = mapping[field]
+            mapping[field] = None if value != value else int(value)  # NaN 表示沒有年份
+        mappings.append(mapping)
+
+    if mappings:
+        authors = Author.__table__
+        statement = authors.update().where(authors.c.id == bindparam('_id')).values(
+            {field: bindparam(field) for field in METRIC_FIELDS + ('metrics_computed_at',)}
+        )
+        db.session.connection().execute(statement, mappings)
+    return len(mappings)
+
+
+def _reset_metrics(author_filter) -> int:
+    """沒有任何論文的作者：指標歸零"""
+    values = {field: 0 for field in METRIC_FIELDS}
+    values.update({
+        'first_publication_year': None,
+        'last_publication_year': None,
+        'influence_score': 0.0,
+        'metrics_computed_at': datetime.utcnow()
+    })
+    return Author.query.filter(
+        author_filter, ~db.exists().where(PaperAuthor.author_id == Author.id)
+    ).update(values, synchronize_session=False)
+
+
+def refresh_author_metrics(author_ids: Optional[Iterable[int]] = None) -> Dict:
+    """
+    重新計算作者指標並批次寫回（不提交）
+
+    Args:
+        author_ids: 需要更新的作者；省略時更新全部作者
+
+    Returns:
+        {'authors_updated', 'mode'}
+    """
+    if author_ids is None:
+        updated = _write_metrics(compute_author_metrics(*_load_authorships()))
+        updated += _reset_metrics(true())
+        db.session.flush()
+        return {'authors_updated': updated, 'mode': 'full'}
+
+    author_ids = sorted(set(author_ids))
+    updated = 0
+    for i in range(0, len(author_ids), _AUTHOR_CHUNK):
+        chunk = author_ids[i:i + _AUTHOR_CHUNK]
+        updated += _write_metrics(compute_author_metrics(*_load_authorships(chunk)), only=set(chunk))
+        updated += _reset_metrics(Author.id.in_(chunk))
+
+    db.session.flush()
+    return {'authors_updated': updated, 'mode': 'incremental'}
+
+
+def stale_author_ids() -> List[int]:
+    """論文在上次計算後有變動（含新導入、引用數更新）或從未計算過的作者"""
+    rows = db.session.query(PaperAuthor.author_id).join(
+        Paper, Paper.id == PaperAuthor.paper_id
+    ).join(
+        Author, Author.id == PaperAuthor.author_id
+    ).filter(or_(
+        Author.metrics_computed_at.is_(None),
+        Paper.updated_at > Author.metrics_computed_at
+    )).distinct().all()
+    return [author_id for author_id, in rows]
+
+
+def author_metrics_job(context, full: bool = False) -> Dict:
+    """背景任務：重新計算作者指標（預設只處理過期的作者，分批提交）"""
+    if full:
+        context.report_progress(0.1, '計算全部作者的指標')
+        result = refresh_author_metrics()
+        context.check_cancelled()
+        db.session.commit()
+        return result
+
+    author_ids = stale_author_ids()
+    updated = 0
+    for i in range(0, len(author_ids), _JOB_BATCH):
+        context.check_cancelled()
+        updated += refresh_author_metrics(author_ids[i:i + _JOB_BATCH])['authors_updated']
+        db.session.commit()
+        done = min(i + _JOB_BATCH, len(author_ids))
+        context.report_progress(done / len(author_ids), f'更新作者指標 {done}/{len(author_ids)}')
+
+    return {'authors_updated': updated, 'mode': 'incremental'}
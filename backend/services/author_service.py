@@ -48,7 +48,7 @@ def link_paper_authors(paper_id: int, authors_data: List[Dict]):
 
     Args:
         paper_id: 論文 ID
-        authors_data: 作者數據列表，每個元素是字典包含 first_name, last_name, full_name
+        authors_data: 作者數據列表，每個元素是字典包含 first_name, last_name, full_name（可選 affiliation）
     """
     for position, author_data in enumerate(authors_data, start=1):
         author = create_or_get_author(author_data)
@@ -59,46 +59,8 @@ def link_paper_authors(paper_id: int, authors_data: List[Dict]):
                 paper_id=paper_id,
                 author_id=author.id,
                 author_position=position,
-                is_corresponding=False  # 預設為 False，之後可以手動更新
+                is_corresponding=False,  # 預設為 False，之後可以手動更新
+                affiliation=(author_data.get('affiliation') or '')[:500] or None
             )
             db.session.add(paper_author)
 
-
-def update_author_statistics(author_id: int):
-    """
-    更新作者的統計資訊
-
-    Args:
-        author_id: 作者 ID
-    """
-    author = Author.query.get(author_id)
-    if not author:
-        return
-
-    # 計算論文數量
-    paper_authors = PaperAuthor.query.filter_by(author_id=author_id).all()
-    author.total_papers = len(paper_authors)
-
-    # 計算第一作者論文數
-    author.first_author_count = sum(1 for pa in paper_authors if pa.author_position == 1)
-
-    # 計算通訊作者論文數
-    author.corresponding_author_count = sum(1 for pa in paper_authors if pa.is_corresponding)
-
-    # 計算總引用數
-    total_citations = 0
-    years = []
-    for pa in paper_authors:
-        if pa.paper:
-            total_citations += pa.paper.citation_count or 0
-            if pa.paper.year:
-                years.append(pa.paper.year)
-
-    author.total_citations = total_citations
-
-    # 更新研究時期
-    if years:
-        author.first_publication_year = min(years)
-        author.last_publication_year = max(years)
-
-    db.session.flush()
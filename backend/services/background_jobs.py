@@ -0,0 +1,155 @@
+"""
+背景任務服務
+Background Job Service - 在背景執行緒中執行長時間任務，請求執行緒立即返回
+"""
+
+import threading
+import traceback
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from flask import current_app
+from models import db, BackgroundJob
+
+
+class JobCancelled(Exception):
+    """任務已被取消"""
+    pass
+
+
+class JobContext:
+    """傳給任務函數的上下文，用於回報進度與檢查取消"""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def report_progress(self, progress: float, message: Optional[str] = None):
+        """
+        回報進度（使用獨立連線寫入，不影響任務本身的事務）
+
+        Args:
+            progress: 0.0 - 1.0
+            message: 進度說明
+        """
+        values = {'progress': max(0.0, min(progress, 1.0)), 'updated_at': datetime.utcnow()}
+        if message is not None:
+            values['message'] = message[:500]
+
+        with db.engine.begin() as connection:
+            connection.execute(
+                BackgroundJob.__table__.update()
+                .where(BackgroundJob.__table__.c.id == self.job_id)
+                .values(**values)
+            )
+
+    def is_cancelled(self) -> bool:
+        """是否已請求取消"""
+        with db.engine.connect() as connection:
+            return bool(connection.execute(
+                db.select(BackgroundJob.__table__.c.cancel_requested)
+                .where(BackgroundJob.__table__.c.id == self.job_id)
+            ).scalar())
+
+    def check_cancelled(self):
+        """已請求取消時拋出 JobCancelled"""
+        if self.is_cancelled():
+            raise JobCancelled()
+
+
+def submit_job(job_type: str, user_id: int, target: Callable[..., Dict],
+               project_id: Optional[int] = None, params: Optional[Dict] = None) -> BackgroundJob:
+    """
+    建立任務記錄並在背景執行緒中執行
+
+    Args:
+        job_type: 任務類型
+        user_id: 用戶 ID
+        target: 任務函數，簽名為 target(context, **params)，返回可 JSON 序列化的結果
+        project_id: 專案 ID（可選）
+        params: 任務參數
+
+    Returns:
+        BackgroundJob 記錄（狀態為 queued）
+    """
+    job = BackgroundJob(
+        user_id=user_id,
+        project_id=project_id,
+        job_type=job_type,
+        status='queued',
+        params=params or {}
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    thread = threading.Thread(target=_run_job, args=(app, job.id, target), daemon=True)
+    thread.start()
+
+    return job
+
+
+def cancel_job(job: BackgroundJob) -> BackgroundJob:
+    """
+    請求取消任務：排隊中的任務直接取消，執行中的任務在下一個檢查點停止
+
+    Args:
+        job: BackgroundJob 記錄
+
+    Returns:
+        更新後的記錄
+    """
+    if job.is_finished:
+        return job
+
+    job.cancel_requested = True
+    if job.status == 'queued':
+        job.status = 'cancelled'
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def _run_job(app, job_id: int, target: Callable[..., Dict]):
+    """背景執行緒入口"""
+    with app.app_context():
+        try:
+            job = BackgroundJob.query.get(job_id)
+            if not job or job.status != 'queued':
+                return
+
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            db.session.commit()
+
+            context = JobContext(job_id)
+            params = dict(job.params or {})
+
+            try:
+                result = target(context, **params)
+            except JobCancelled:
+                db.session.rollback()
+                _finish_job(job_id, 'cancelled', message='任務已取消')
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"背景任務 {job_id} 失敗：{e}\n{traceback.format_exc()}")
+                _finish_job(job_id, 'failed', error=str(e))
+            else:
+                _finish_job(job_id, 'succeeded', result=result)
+        finally:
+            db.session.remove()
+
+
+def _finish_job(job_id: int, status: str, result: Optional[Dict] = None,
+                error: Optional[str] = None, message: Optional[str] = None):
+    """寫入任務的最終狀態"""
+    job = BackgroundJob.query.get(job_id)
+    job.status = status
+    job.result = result
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    if status == 'succeeded':
+        job.progress = 1.0
+        job.message = message or '完成'
+    elif message:
+        job.message = message
+    db.session.commit()
@@ -0,0 +1,632 @@
+"""
+引用網絡服務
+Citation Network Service - 抓取並快取參考文獻列表（Crossref 或 PDF 文本），
+建立專案內論文的有向引用圖，計算被引次數、PageRank、主路徑與共被引
+"""
+
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+import requests
+from scipy import sparse
+from flask import current_app
+
+from models import db, Paper, BackgroundJob, NetworkArtifact, ReferenceCache, PaperCitation
+from services.network_state import get_or_compute_artifact
+
+CROSSREF_WORKS_API = 'https://api.crossref.org/works'
+CROSSREF_HEADERS = {'User-Agent': 'LitReviewTool/1.0 (mailto:contact@litreview.com)'}
+
+# SQLite 單一查詢的參數數量有限，IN 查詢分批執行
+_IN_CHUNK = 500
+
+_DOI_PATTERN = re.compile(r'10\.\d{4,9}/[-._;()/:A-Z0-9]+', re.IGNORECASE)
+_YEAR_PATTERN = re.compile(r'\b(19|20)\d{2}\b')
+_REFERENCES_HEADER = re.compile(r'^\s*(references|bibliography|literature cited|參考文獻)\s*$', re.IGNORECASE | re.MULTILINE)
+_NUMBERED_ENTRY = re.compile(r'\n\s*(?:\[\d{1,3}\]|\d{1,3}\.)\s+')
+_NON_WORD = re.compile(r'[^0-9a-z一-鿿]+')
+
+# 引用關係改變時需要清除的快取結果
+CITATION_ARTIFACT_KINDS = ('citation_network', 'citation_similarity')
+
+# 以標題前幾個字建立索引，從未結構化的參考文獻字串中比對專案內論文
+_TITLE_PREFIX_WORDS = 5
+
+
+def normalize_doi(doi: Optional[str]) -> Optional[str]:
+    """正規化 DOI（小寫、去除 URL 前綴與結尾標點）"""
+    if not doi:
+        return None
+    doi = doi.strip().lower()
+    for prefix in ('https://doi.org/', 'http://doi.org/', 'https://dx.doi.org/', 'http://dx.doi.org/', 'doi:'):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    doi = doi.strip().rstrip('.,;')
+    return doi or None
+
+
+def title_key(title: Optional[str]) -> str:
+    """標題比對鍵（小寫，只保留字母數字）"""
+    return _NON_WORD.sub(' ', (title or '').lower()).strip()
+
+
+def _parse_crossref_reference(reference: Dict) -> Dict:
+    """Crossref reference 欄位的單筆記錄"""
+    year = reference.get('year')
+    return {
+        'doi': normalize_doi(reference.get('DOI')),
+        'title': reference.get('article-title') or reference.get('volume-title'),
+        'year': int(year) if year and str(year).isdigit() else None,
+        'raw': reference.get('unstructured')
+    }
+
+
+def _fetch_crossref_batch(dois: List[str], timeout: int) -> Dict[str, Optional[List[Dict]]]:
+    """以單一請求抓取一批 DOI 的參考文獻（filter=doi:a,doi:b,...）"""
+    response = requests.get(
+        CROSSREF_WORKS_API,
+        params={
+            'filter': ','.join(f'doi:{doi}' for doi in dois),
+            'select': 'DOI,reference',
+            'rows': len(dois)
+        },
+        headers=CROSSREF_HEADERS,
+        timeout=timeout
+    )
+    response.raise_for_status()
+
+    found = {}
+    for item in response.json().get('message', {}).get('items', []):
+        doi = normalize_doi(item.get('DOI'))
+        references = item.get('reference')
+        found[doi] = [_parse_crossref_reference(r) for r in references] if references else None
+
+    # 查無此 DOI 也記錄下來，避免每次同步都重新查詢
+    return {doi: found.get(doi) for doi in dois}
+
+
+def fetch_crossref_references(dois: Iterable[str], batch_size: int = 20, max_workers: int = 4,
+                              timeout: int = 30,
+                              progress_callback: Optional[Callable[[int, int], None]] = None
+                              ) -> Dict[str, Optional[List[Dict]]]:
+    """
+    批次並行抓取 Crossref 參考文獻列表
+
+    Args:
+        dois: 正規化後的 DOI
+        batch_size: 每個請求包含的 DOI 數
+        max_workers: 同時進行的請求數
+        timeout: 單一請求逾時秒數
+        progress_callback: 進度回呼 (已完成批次, 總批次)
+
+    Returns:
+        字典，key 為 DOI，value 為參考文獻列表（查無或沒有參考文獻時為 None）；
+        請求失敗的批次不會出現在結果中，下次同步時重試
+    """
+    dois = sorted(set(dois))
+    batches = [dois[i:i + batch_size] for i in range(0, len(dois), batch_size)]
+    if not batches:
+        return {}
+
+    results = {}
+
+    def fetch(batch):
+        try:
+            return _fetch_crossref_batch(batch, timeout)
+        except (requests.RequestException, ValueError):
+            return {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for done, batch_result in enumerate(executor.map(fetch, batches), start=1):
+            results.update(batch_result)
+            if progress_callback:
+                progress_callback(done, len(batches))
+
+    return results
+
+
+def parse_references_from_text(text: Optional[str]) -> List[Dict]:
+    """
+    從論文全文中解析參考文獻（取最後一個 References 標題之後的內容）
+
+    Returns:
+        參考文獻列表 [{doi, title, year, raw}]（title 無法可靠解析，保留為 None）
+    """
+    if not text:
+        return []
+
+    headers = list(_REFERENCES_HEADER.finditer(text))
+    if not headers:
+        return []
+    section = '\n' + text[headers[-1].end():]
+
+    # 編號格式（[1] 或 1.）按編號切分，否則按段落切分
+    if len(_NUMBERED_ENTRY.findall(section)) >= 2:
+        entries = _NUMBERED_ENTRY.split(section)
+    else:
+        entries = re.split(r'\n\s*\n', section)
+
+    references = []
+    for entry in entries:
+        raw = ' '.join(entry.split())
+        if len(raw) < 20:
+            continue
+        doi = _DOI_PATTERN.search(raw)
+        year = _YEAR_PATTERN.search(raw)
+        references.append({
+            'doi': normalize_doi(doi.group(0)) if doi else None,
+            'title': None,
+            'year': int(year.group(0)) if year else None,
+            'raw': raw[:1000]
+        })
+
+    return references
+
+
+def _paper_text(paper: Paper) -> Optional[str]:
+    """論文的全文（資料庫中沒有時從已上傳的 PDF 提取）"""
+    if paper.full_text:
+        return paper.full_text
+    if paper.pdf_path and os.path.exists(paper.pdf_path):
+        from services.pdf_processor import PDFProcessor
+        return PDFProcessor().extract_text_from_pdf(paper.pdf_path)
+    return None
+
+
+def _load_caches(keys: List[str]) -> Dict[str, ReferenceCache]:
+    """分批載入參考文獻快取"""
+    caches = {}
+    for i in range(0, len(keys), _IN_CHUNK):
+        for cache in ReferenceCache.query.filter(ReferenceCache.cache_key.in_(keys[i:i + _IN_CHUNK])).all():
+            caches[cache.cache_key] = cache
+    return caches
+
+
+def _store_caches(entries: List[Dict]) -> Dict[str, ReferenceCache]:
+    """
+    寫入新的參考文獻快取（不提交）；並行的同步任務已寫入相同鍵時保留先寫入的結果（ON CONFLICT DO NOTHING）
+
+    Args:
+        entries: [{cache_key, source, status, references}]
+
+    Returns:
+        寫入後重新載入的快取，key 為 cache_key
+    """
+    if not entries:
+        return {}
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    for i in range(0, len(entries), _IN_CHUNK):
+        db.session.execute(
+            insert(ReferenceCache).values(entries[i:i + _IN_CHUNK]).on_conflict_do_nothing(
+                index_elements=['cache_key']
+            )
+        )
+    return _load_caches([entry['cache_key'] for entry in entries])
+
+
+def ensure_references(papers: List[Paper],
+                      progress_callback: Optional[Callable[[float, str], None]] = None
+                      ) -> Dict[int, List[Dict]]:
+    """
+    取得論文的參考文獻列表：先查快取，缺少的 DOI 批次向 Crossref 抓取，
+    Crossref 沒有資料的論文再從 PDF 文本解析；新結果寫入快取並提交（抓取成本高，
+    之後的比對或寫入失敗、任務取消時也保留）
+
+    Args:
+        papers: 論文列表
+        progress_callback: 進度回呼 (0-1, 說明)
+
+    Returns:
+        字典，key 為 paper_id，value 為參考文獻列表
+    """
+    dois = {paper.id: normalize_doi(paper.doi) for paper in papers}
+    keys = sorted({doi for doi in dois.values() if doi} | {f'paper:{paper.id}' for paper in papers})
+    caches = _load_caches(keys)
+
+    missing = sorted({doi for doi in dois.values() if doi and doi not in caches})
+    if missing:
+        config = current_app.config
+        fetched = fetch_crossref_references(
+            missing,
+            batch_size=config.get('CITATION_FETCH_BATCH_SIZE', 20),
+            max_workers=config.get('CITATION_FETCH_CONCURRENCY', 4),
+            progress_callback=(
+                lambda done, total: progress_callback(0.8 * done / total, f'抓取參考文獻 {done}/{total} 批')
+            ) if progress_callback else None
+        )
+        caches.update(_store_caches([
+            {'cache_key': doi, 'source': 'crossref',
+             'status': 'ok' if references else 'not_found', 'references': references or []}
+            for doi, references in fetched.items()
+        ]))
+
+    # Crossref 沒有參考文獻（或論文沒有 DOI）時改用 PDF 文本
+    pdf_entries = []
+    for paper in papers:
+        doi = dois[paper.id]
+        cache = caches.get(doi) if doi else None
+        pdf_key = f'paper:{paper.id}'
+        if (cache is None or cache.status != 'ok') and pdf_key not in caches:
+            references = parse_references_from_text(_paper_text(paper))
+            pdf_entries.append({
+                'cache_key': pdf_key, 'source': 'pdf',
+                'status': 'ok' if references else 'not_found', 'references': references
+            })
+    caches.update(_store_caches(pdf_entries))
+
+    result = {}
+    for paper in papers:
+        doi = dois[paper.id]
+        cache = caches.get(doi) if doi else None
+        if cache is None or cache.status != 'ok':
+            cache = caches.get(f'paper:{paper.id}')
+        result[paper.id] = (cache.references if cache is not None else None) or []
+
+    db.session.commit()
+    return result
+
+
+def cached_references(papers: List[Paper]) -> Dict[int, List[Dict]]:
+    """
+    只讀取已快取的參考文獻列表（不對外請求）；DOI 快取沒有資料時使用 PDF 解析的結果
+
+    Returns:
+        字典，key 為 paper_id，value 為參考文獻列表（沒有快取的論文不列出）
+    """
+    dois = {paper.id: normalize_doi(paper.doi) for paper in papers}
+    caches = _load_caches(sorted({doi for doi in dois.values() if doi} | {f'paper:{paper.id}' for paper in papers}))
+
+    result = {}
+    for paper in papers:
+        cache = caches.get(dois[paper.id]) if dois[paper.id] else None
+        if cache is None or cache.status != 'ok':
+            cache = caches.get(f'paper:{paper.id}')
+        if cache is not None and cache.references:
+            result[paper.id] = cache.references
+    return result
+
+
+class ReferenceMatcher:
+    """將參考文獻比對到專案內的論文（DOI 優先，其次標題）"""
+
+    def __init__(self, papers: Iterable[Paper]):
+        self.by_doi: Dict[str, int] = {}
+        self.by_title: Dict[str, int] = {}
+        self.by_prefix: Dict[Tuple[str, ...], List[Tuple[str, int]]] = defaultdict(list)
+
+        for paper in papers:
+            doi = normalize_doi(paper.doi)
+            if doi:
+                self.by_doi[doi] = paper.id
+            key = title_key(paper.title)
+            if key:
+                self.by_title[key] = paper.id
+                words = key.split()
+                # 過短的標題只接受完全相符，避免誤判
+                if len(words) >= _TITLE_PREFIX_WORDS:
+                    self.by_prefix[tuple(words[:_TITLE_PREFIX_WORDS])].append((key, paper.id))
+
+    def match(self, reference: Dict) -> Optional[Tuple[int, str]]:
+        """
+        Returns:
+            (paper_id, 比對方式)；無法比對時返回 None
+        """
+        doi = reference.get('doi')
+        if doi and doi in self.by_doi:
+            return self.by_doi[doi], 'doi'
+
+        key = title_key(reference.get('title'))
+        if key and key in self.by_title:
+            return self.by_title[key], 'title'
+
+        raw = title_key(reference.get('raw'))
+        if raw and self.by_prefix:
+            words = raw.split()
+            for i in range(len(words) - _TITLE_PREFIX_WORDS + 1):
+                for candidate, paper_id in self.by_prefix.get(tuple(words[i:i + _TITLE_PREFIX_WORDS]), ()):
+                    if ' '.join(words[i:i + len(candidate.split())]) == candidate:
+                        return paper_id, 'title'
+
+        return None
+
+
+def _match_edges(references: Dict[int, List[Dict]], matcher: ReferenceMatcher) -> Dict[Tuple[int, int], str]:
+    """比對參考文獻，返回 {(citing, cited): 比對方式}"""
+    edges = {}
+    for citing_id, paper_references in references.items():
+        for reference in paper_references:
+            matched = matcher.match(reference)
+            if matched and matched[0] != citing_id:
+                edges.setdefault((citing_id, matched[0]), matched[1])
+    return edges
+
+
+def sync_project_citations(project_id: int, paper_ids: Optional[List[int]] = None,
+                           progress_callback: Optional[Callable[[float, str], None]] = None,
+                           before_write: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    同步專案的引用關係
+
+    增量模式（指定 paper_ids）只處理新論文：新論文的參考文獻比對全部論文（引出），
+    既有論文已快取的參考文獻只比對新論文（引入），不重新處理其餘配對。
+
+    Args:
+        project_id: 專案 ID
+        paper_ids: 新加入的論文 ID（省略時完整重建）
+        progress_callback: 進度回呼 (0-1, 說明)
+        before_write: 寫入資料庫前的回呼（背景任務用於檢查取消）
+
+    Returns:
+        同步摘要
+    """
+    papers = Paper.query.options(db.defer(Paper.full_text)).filter_by(project_id=project_id).all()
+    by_id = {paper.id: paper for paper in papers}
+
+    if paper_ids is None:
+        new_papers = papers
+    else:
+        new_papers = [by_id[paper_id] for paper_id in paper_ids if paper_id in by_id]
+
+    references = ensure_references(new_papers, progress_callback=progress_callback)
+
+    if progress_callback:
+        progress_callback(0.85, '比對專案內的引用')
+
+    edges = _match_edges(references, ReferenceMatcher(papers))
+
+    if paper_ids is not None and new_papers:
+        # 既有論文引用新論文：只讀取已快取的參考文獻（不重新抓取或解析 PDF），並只以新論文建立比對索引
+        new_ids = {paper.id for paper in new_papers}
+        existing = [paper for paper in papers if paper.id not in new_ids]
+        existing_references = cached_references(existing) if existing else {}
+        edges.update(_match_edges(existing_references, ReferenceMatcher(new_papers)))
+
+    if before_write:
+        before_write()
+
+    if paper_ids is None:
+        PaperCitation.query.filter_by(project_id=project_id).delete()
+        existing_pairs = set()
+    else:
+        existing_pairs = set(db.session.query(
+            PaperCitation.citing_paper_id, PaperCitation.cited_paper_id
+        ).filter(PaperCitation.project_id == project_id).all())
+
+    new_edges = [(pair, matched_by) for pair, matched_by in edges.items() if pair not in existing_pairs]
+    db.session.bulk_insert_mappings(PaperCitation, [
+        {'project_id': project_id, 'citing_paper_id': citing, 'cited_paper_id': cited, 'matched_by': matched_by}
+        for (citing, cited), matched_by in new_edges
+    ])
+
+    # 引用關係改變後，快取的分析結果失效
+    NetworkArtifact.query.filter(
+        NetworkArtifact.project_id == project_id,
+        NetworkArtifact.kind.in_(CITATION_ARTIFACT_KINDS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+    return {
+        'papers_processed': len(new_papers),
+        'papers_with_references': sum(1 for refs in references.values() if refs),
+        'citations_added': len(new_edges),
+        'mode': 'full' if paper_ids is None else 'incremental'
+    }
+
+
+def citation_sync_job(context, project_id: int, paper_ids: Optional[List[int]] = None) -> Dict:
+    """背景任務：同步專案的引用關係"""
+    return sync_project_citations(
+        project_id, paper_ids=paper_ids,
+        progress_callback=lambda progress, message: context.report_progress(progress, message),
+        before_write=context.check_cancelled
+    )
+
+
+def clear_paper_citations(project_id: int, paper_id: int) -> int:
+    """
+    移除論文的引用關係與快取的引用分析結果（論文的 DOI 或標題修改後、重新增量同步前呼叫；不提交）
+
+    Returns:
+        移除的引用關係數
+    """
+    removed = PaperCitation.query.filter(
+        PaperCitation.project_id == project_id,
+        db.or_(PaperCitation.citing_paper_id == paper_id, PaperCitation.cited_paper_id == paper_id)
+    ).delete(synchronize_session=False)
+    NetworkArtifact.query.filter(
+        NetworkArtifact.project_id == project_id,
+        NetworkArtifact.kind.in_(CITATION_ARTIFACT_KINDS)
+    ).delete(synchronize_session=False)
+    return removed
+
+
+def schedule_citation_sync(project_id: int, user_id: int, paper_ids: List[int]) -> Optional[BackgroundJob]:
+    """
+    論文新增或 DOI、標題修改後排程增量同步（只在專案曾經同步過引用關係時執行，避免每次導入都對外請求）
+
+    Returns:
+        BackgroundJob，未排程時返回 None
+    """
+    if not paper_ids:
+        return None
+
+    synced = BackgroundJob.query.filter_by(
+        project_id=project_id, job_type='citation_sync', status='succeeded'
+    ).first()
+    if not synced:
+        return None
+
+    from services.background_jobs import submit_job
+    return submit_job(
+        'citation_sync', user_id, citation_sync_job,
+        project_id=project_id, params={'project_id': project_id, 'paper_ids': list(paper_ids)}
+    )
+
+
+def build_citation_graph(project_id: int) -> nx.DiGraph:
+    """構建專案的有向引用圖（邊由引用方指向被引方）"""
+    graph = nx.DiGraph()
+    for paper_id, title, year in db.session.query(Paper.id, Paper.title, Paper.year).filter(
+        Paper.project_id == project_id
+    ).all():
+        graph.add_node(paper_id, title=title, year=year)
+
+    graph.add_edges_from(db.session.query(
+        PaperCitation.citing_paper_id, PaperCitation.cited_paper_id
+    ).filter(PaperCitation.project_id == project_id).all())
+
+    return graph
+
+
+def main_path(graph: nx.DiGraph) -> Tuple[List[int], Dict[Tuple[int, int], int]]:
+    """
+    主路徑分析（Search Path Count + key-route 主路徑）
+
+    知識流向為被引 -> 引用。為確保無環，只保留被引論文在（年份, ID）排序上早於引用論文的邊。
+    每條邊的 SPC = 從任一起點到邊起點的路徑數 × 從邊終點到任一終點的路徑數；
+    從 SPC 最大的邊出發，向前後各自沿 SPC 最大的邊延伸。
+
+    Returns:
+        (主路徑上的論文 ID（按知識流向排序）, 各邊的 SPC {(cited, citing): spc})
+    """
+    order = {
+        node: (data.get('year') or 0, node) for node, data in graph.nodes(data=True)
+    }
+    flow = nx.DiGraph()
+    flow.add_edges_from(
+        (cited, citing) for citing, cited in graph.edges() if order[cited] < order[citing]
+    )
+    if flow.number_of_edges() == 0:
+        return [], {}
+
+    topological = sorted(flow.nodes(), key=order.get)
+
+    paths_from_source = {}
+    for node in topological:
+        predecessors = list(flow.predecessors(node))
+        paths_from_source[node] = sum(paths_from_source[p] for p in predecessors) if predecessors else 1
+
+    paths_to_sink = {}
+    for node in reversed(topological):
+        successors = list(flow.successors(node))
+        paths_to_sink[node] = sum(paths_to_sink[s] for s in successors) if successors else 1
+
+    spc = {(u, v): paths_from_source[u] * paths_to_sink[v] for u, v in flow.edges()}
+
+    start = max(spc, key=lambda edge: (spc[edge], -edge[0], -edge[1]))
+    path = [start[0], start[1]]
+    while True:
+        successors = list(flow.successors(path[-1]))
+        if not successors:
+            break
+        path.append(max(successors, key=lambda s: (spc[(path[-1], s)], -s)))
+    while True:
+        predecessors = list(flow.predecessors(path[0]))
+        if not predecessors:
+            break
+        path.insert(0, max(predecessors, key=lambda p: (spc[(p, path[0])], -p)))
+
+    return path, spc
+
+
+def co_citation_counts(graph: nx.DiGraph, top_n: int = 20) -> List[Dict]:
+    """
+    共被引次數：兩篇論文同時被同一篇專案內論文引用的次數
+
+    以引用鄰接矩陣 C（引用方 × 被引方）的稀疏乘積 Cᵀ·C 計算，不逐一列舉配對
+
+    Returns:
+        [{'paper1', 'paper2', 'count'}]，按次數降序取前 top_n
+    """
+    if graph.number_of_edges() == 0:
+        return []
+
+    nodes = sorted(graph.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    citing, cited = zip(*((index[u], index[v]) for u, v in graph.edges()))
+    adjacency = sparse.csr_matrix(
+        (np.ones(len(citing), dtype=np.int64), (citing, cited)), shape=(len(nodes), len(nodes))
+    )
+
+    counts = sparse.triu(adjacency.T @ adjacency, k=1).tocoo()
+    order = np.lexsort((counts.col, counts.row, -counts.data))[:top_n]
+
+    return [
+        {'paper1': nodes[counts.row[i]], 'paper2': nodes[counts.col[i]], 'count': int(counts.data[i])}
+        for i in order
+    ]
+
+
+def compute_citation_network(project_id: int, top_n: int = 20) -> Dict:
+    """
+    計算專案的引用網絡指標
+
+    Returns:
+        {'nodes', 'links', 'main_path', 'co_citations', 'statistics'}
+    """
+    graph = build_citation_graph(project_id)
+
+    pagerank = nx.pagerank(graph) if graph.number_of_edges() > 0 else {}
+    path, spc = main_path(graph)
+    on_path = set(path)
+
+    nodes = [
+        {
+            'id': node,
+            'title': data.get('title'),
+            'year': data.get('year'),
+            'in_degree': graph.in_degree(node),
+            'out_degree': graph.out_degree(node),
+            'pagerank': round(pagerank.get(node, 0), 6),
+            'on_main_path': node in on_path
+        }
+        for node, data in graph.nodes(data=True)
+    ]
+
+    most_cited = sorted(nodes, key=lambda n: (-n['in_degree'], -n['pagerank'], n['id']))[:top_n]
+
+    return {
+        'nodes': nodes,
+        'links': [{'source': citing, 'target': cited} for citing, cited in graph.edges()],
+        'main_path': [
+            {'id': node, 'title': graph.nodes[node].get('title'), 'year': graph.nodes[node].get('year')}
+            for node in path
+        ],
+        'main_path_links': [
+            # 路徑數可能超出 JavaScript 的整數精度，以浮點數輸出
+            {'source': u, 'target': v, 'spc': float(spc[(u, v)])} for u, v in zip(path, path[1:])
+        ],
+        'most_cited': [{'id': n['id'], 'title': n['title'], 'in_degree': n['in_degree']} for n in most_cited],
+        'co_citations': co_citation_counts(graph, top_n=top_n),
+        'statistics': {
+            'total_papers': graph.number_of_nodes(),
+            'total_citations': graph.number_of_edges(),
+            'cited_papers': sum(1 for node in graph.nodes() if graph.in_degree(node) > 0),
+            'citing_papers': sum(1 for node in graph.nodes() if graph.out_degree(node) > 0),
+            'density': nx.density(graph) if graph.number_of_nodes() > 1 else 0
+        }
+    }
+
+
+def get_citation_network(project_id: int, top_n: int = 20) -> Dict:
+    """
+    讀取或計算快取的引用網絡（論文增刪時按網絡版本失效，同步引用關係後清除）
+
+    Returns:
+        compute_citation_network() 的結果
+    """
+    return get_or_compute_artifact(
+        project_id, 'citation_network', {'top_n': top_n},
+        lambda _: compute_citation_network(project_id, top_n=top_n),
+        needs_analyzer=False
+    )
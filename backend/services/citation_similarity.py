@@ -0,0 +1,266 @@
+"""
+引用相似度服務
+Citation Similarity Service - 以論文 × 參考文獻的稀疏關聯矩陣 A 計算書目耦合（A·Aᵀ）與共被引（Aᵀ·A），
+並以向量化排序抽取每個節點的前 k 個鄰居
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from models import db, Paper
+from services.citation_network import ReferenceMatcher, cached_references, normalize_doi, title_key
+from services.network_state import get_or_compute_artifact
+
+SIMILARITY_KINDS = ('coupling', 'co_citation')
+SIMILARITY_MEASURES = ('cosine', 'count')
+
+# 參考文獻標籤的最大長度
+_LABEL_LENGTH = 120
+
+
+def _reference_identity(reference: Dict, matcher: ReferenceMatcher,
+                        titles: Dict[int, Dict]) -> Optional[Tuple[str, Dict]]:
+    """
+    參考文獻的識別鍵：能比對到專案內論文時以論文 ID 為準（合併 DOI 與標題的不同寫法），
+    否則依序使用 DOI、標題、原始字串
+
+    Returns:
+        (識別鍵, 節點資訊)；無法識別時返回 None
+    """
+    matched = matcher.match(reference)
+    if matched:
+        paper = titles[matched[0]]
+        return f'paper:{matched[0]}', {
+            'label': paper['title'], 'doi': paper['doi'], 'year': paper['year'], 'paper_id': matched[0]
+        }
+
+    info = {
+        'label': reference.get('title') or reference.get('raw') or reference.get('doi'),
+        'doi': normalize_doi(reference.get('doi')),
+        'year': reference.get('year'),
+        'paper_id': None
+    }
+    if info['doi']:
+        return f"doi:{info['doi']}", info
+    key = title_key(reference.get('title'))
+    if key:
+        return f'title:{key}', info
+    key = title_key(reference.get('raw'))
+    if key:
+        return f'raw:{key}', info
+    return None
+
+
+def build_incidence_matrix(project_id: int):
+    """
+    構建論文 × 參考文獻的二元關聯矩陣（只使用已快取的參考文獻列表）
+
+    Args:
+        project_id: 專案 ID
+
+    Returns:
+        (csr_matrix A, 列對應的論文資訊列表, 欄對應的參考文獻資訊列表)
+    """
+    papers = Paper.query.options(db.defer(Paper.full_text)).filter_by(
+        project_id=project_id
+    ).order_by(Paper.id).all()
+    references = cached_references(papers)
+    matcher = ReferenceMatcher(papers)
+    titles = {paper.id: {'title': paper.title, 'doi': paper.doi, 'year': paper.year} for paper in papers}
+
+    paper_rows: List[Dict] = []
+    reference_columns: Dict[str, int] = {}
+    reference_info: List[Dict] = []
+    rows: List[int] = []
+    columns: List[int] = []
+
+    # 同一筆參考文獻常出現在多篇論文的列表中，識別結果按內容快取
+    identities: Dict[Tuple, Optional[Tuple[str, Dict]]] = {}
+
+    for paper in papers:
+        if not references.get(paper.id):
+            continue
+        row = len(paper_rows)
+        paper_rows.append({'id': paper.id, 'title': paper.title, 'year': paper.year})
+
+        for reference in references[paper.id]:
+            content = (reference.get('doi'), reference.get('title'), reference.get('raw'))
+            if content not in identities:
+                identities[content] = _reference_identity(reference, matcher, titles)
+            identity = identities[content]
+            if identity is None or identity[1]['paper_id'] == paper.id:
+                continue
+            key, info = identity
+            column = reference_columns.get(key)
+            if column is None:
+                column = reference_columns[key] = len(reference_info)
+                info['label'] = (info['label'] or key)[:_LABEL_LENGTH]
+                reference_info.append({'id': key, **info})
+            rows.append(row)
+            columns.append(column)
+
+    incidence = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, columns)),
+        shape=(len(paper_rows), len(reference_info))
+    )
+    # 同一篇論文重複列出的參考文獻在轉換時被加總，二元化
+    incidence.data[:] = 1
+    return incidence, paper_rows, reference_info
+
+
+def top_k_neighbors(matrix: sparse.spmatrix, k: int, scores: Optional[np.ndarray] = None):
+    """
+    抽取對稱相似度矩陣每列的前 k 個鄰居（排除對角線）
+
+    一次穩定的 lexsort 按（列, 分數降序）排序（同分時保留欄的遞增順序），再以每列起點計算名次，不逐列處理
+
+    Args:
+        matrix: 相似度矩陣（共同參考文獻或共被引次數）
+        k: 每列保留的鄰居數
+        scores: 與 matrix 的非零元素對應的排序分數（省略時使用次數）
+
+    Returns:
+        (rows, cols, counts, scores) 四個等長陣列
+    """
+    matrix = matrix.tocoo()
+    if scores is None:
+        scores = matrix.data.astype(np.float64)
+
+    off_diagonal = matrix.row != matrix.col
+    rows, cols = matrix.row[off_diagonal], matrix.col[off_diagonal]
+    counts, scores = matrix.data[off_diagonal], scores[off_diagonal]
+    if len(rows) == 0:
+        # 沒有列或沒有非對角線的非零元素（例如專案沒有快取的參考文獻）
+        return rows, cols, counts, scores
+
+    order = np.lexsort((-scores, rows))
+    rows, cols, counts, scores = rows[order], cols[order], counts[order], scores[order]
+
+    # 排序後同一列連續排列，名次 = 位置 - 該列的起點
+    row_sizes = np.bincount(rows, minlength=matrix.shape[0])
+    row_starts = np.concatenate(([0], np.cumsum(row_sizes)[:-1]))
+    rank = np.arange(len(rows)) - np.repeat(row_starts, row_sizes)
+    keep = rank < k
+    return rows[keep], cols[keep], counts[keep], scores[keep]
+
+
+def _similarity_network(product: sparse.spmatrix, degrees: np.ndarray, node_info: List[Dict],
+                        k: int, measure: str, degree_field: str) -> Dict:
+    """
+    由相似度矩陣建立前 k 鄰居網絡
+
+    Args:
+        product: A·Aᵀ 或 Aᵀ·A
+        degrees: 各節點的參考文獻數（耦合）或被引次數（共被引），用於 Salton 餘弦正規化
+        node_info: 節點資訊
+        k: 每個節點保留的鄰居數
+        measure: cosine（共同數 / √(度數乘積)）或 count（共同數）
+        degree_field: 節點上度數欄位的名稱
+
+    Returns:
+        {'nodes', 'links'}
+    """
+    product = product.tocsr()
+    product.sort_indices()
+    product = product.tocoo()
+    cosine = product.data / np.sqrt(degrees[product.row].astype(np.float64) * degrees[product.col])
+    rows, cols, counts, cosines = top_k_neighbors(
+        product, k, scores=cosine if measure == 'cosine' else None
+    )
+    if measure == 'count':
+        # 排序使用次數，輸出仍附上餘弦相似度
+        cosines = counts / np.sqrt(degrees[rows].astype(np.float64) * degrees[cols])
+    cosines = np.round(cosines, 6)
+
+    nodes = [
+        {**info, degree_field: int(degrees[i]), 'neighbors': []}
+        for i, info in enumerate(node_info)
+    ]
+    for row, col, count, similarity in zip(rows.tolist(), cols.tolist(), counts.tolist(), cosines.tolist()):
+        nodes[row]['neighbors'].append({
+            'id': node_info[col]['id'], 'shared': count, 'similarity': similarity
+        })
+
+    # 前 k 鄰居關係不對稱，連線取聯集後去除重複方向
+    pairs = np.stack([np.minimum(rows, cols), np.maximum(rows, cols)])
+    links = []
+    if pairs.size:
+        _, first = np.unique(pairs, axis=1, return_index=True)
+        for i in np.sort(first).tolist():
+            links.append({
+                'source': node_info[pairs[0, i]]['id'],
+                'target': node_info[pairs[1, i]]['id'],
+                'shared': int(counts[i]),
+                'similarity': float(cosines[i])
+            })
+
+    return {'nodes': nodes, 'links': links}
+
+
+def compute_citation_similarity(project_id: int, kind: str = 'coupling', k: int = 10,
+                                measure: str = 'cosine', min_citations: int = 2) -> Dict:
+    """
+    計算書目耦合或共被引網絡
+
+    書目耦合：兩篇專案內論文共同引用的參考文獻數（A·Aᵀ），節點為論文；
+    共被引：兩筆參考文獻（含專案外文獻）被同一篇專案內論文同時引用的次數（Aᵀ·A），節點為參考文獻。
+
+    Args:
+        project_id: 專案 ID
+        kind: coupling 或 co_citation
+        k: 每個節點保留的鄰居數
+        measure: cosine 或 count（鄰居的排序依據）
+        min_citations: 共被引只納入被引次數達到此值的參考文獻
+
+    Returns:
+        {'kind', 'measure', 'k', 'nodes', 'links', 'statistics'}
+    """
+    incidence, paper_rows, reference_info = build_incidence_matrix(project_id)
+
+    statistics = {
+        'papers_with_references': len(paper_rows),
+        'distinct_references': len(reference_info),
+        'reference_links': int(incidence.nnz)
+    }
+
+    if kind == 'coupling':
+        references_per_paper = np.asarray(incidence.sum(axis=1)).ravel()
+        network = _similarity_network(
+            incidence @ incidence.T, references_per_paper, paper_rows, k, measure, 'references'
+        )
+    else:
+        citations = np.asarray(incidence.sum(axis=0)).ravel()
+        # 只被引一次的文獻只會形成次數 1 的配對，先行剔除以縮小 Aᵀ·A
+        kept = np.flatnonzero(citations >= min_citations)
+        reduced = incidence[:, kept]
+        network = _similarity_network(
+            (reduced.T @ reduced), citations[kept], [reference_info[i] for i in kept.tolist()],
+            k, measure, 'citations'
+        )
+        statistics['references_considered'] = int(len(kept))
+
+    statistics['nodes'] = len(network['nodes'])
+    statistics['links'] = len(network['links'])
+
+    return {'kind': kind, 'measure': measure, 'k': k, **network, 'statistics': statistics}
+
+
+def get_citation_similarity(project_id: int, kind: str = 'coupling', k: int = 10,
+                            measure: str = 'cosine', min_citations: int = 2) -> Dict:
+    """
+    讀取或計算按網絡版本快取的書目耦合 / 共被引網絡（同步引用關係後清除）
+
+    Returns:
+        compute_citation_similarity() 的結果
+    """
+    params = {'kind': kind, 'k': k, 'measure': measure}
+    if kind == 'co_citation':
+        params['min_citations'] = min_citations
+
+    return get_or_compute_artifact(
+        project_id, 'citation_similarity', params,
+        lambda _: compute_citation_similarity(project_id, kind, k, measure, min_citations),
+        needs_analyzer=False
+    )
@@ -0,0 +1,173 @@
+"""
+合作關係圖查詢服務
+Collaboration Graph Service - 以網絡狀態建立鄰接結構並按專案做 LRU 快取，
+提供最短合作路徑與 k 步鄰域（ego network）查詢
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import networkx as nx
+from flask import current_app
+from models import db, NetworkState
+from services.network_analyzer import AuthorNetworkAnalyzer
+
+# 熱門專案的鄰接快取：project_id -> (版本, 圖)
+_cache: 'OrderedDict[int, Tuple[Tuple, nx.Graph]]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _collaboration_version(project_id: int) -> Tuple:
+    """
+    合作關係的版本
+
+    網絡狀態在完整分析與每次增量同步（論文導入、修改、刪除）時都會遞增版本號，
+    以版本與更新時間判斷（單筆索引查詢，不需載入狀態）
+    """
+    row = db.session.query(NetworkState.revision, NetworkState.updated_at).filter(
+        NetworkState.project_id == project_id
+    ).first()
+    return tuple(row) if row else (None, None)
+
+
+def _build_graph(project_id: int) -> nx.Graph:
+    """
+    從增量維護的網絡狀態構建合作關係圖
+
+    Collaboration 表只在完整分析時寫入，增量導入或刪除論文後會過期；
+    網絡狀態則由同步掛鉤即時更新，邊的定義與 Collaboration 相同（略過 star 策略的論文虛擬節點）
+    """
+    state = db.session.query(NetworkState.state).filter(NetworkState.project_id == project_id).scalar()
+
+    graph = nx.Graph()
+    if not state:
+        return graph
+
+    for author1_id, author2_id, weight, papers in state.get('edges', []):
+        if AuthorNetworkAnalyzer.is_hub(author1_id) or AuthorNetworkAnalyzer.is_hub(author2_id):
+            continue
+        count = len(papers) or 1
+        strength = weight or count
+        # 合作越緊密距離越短，加權最短路徑使用 distance
+        graph.add_edge(author1_id, author2_id, count=count, strength=strength, distance=1 / strength)
+
+    for author_id, author in state.get('authors', []):
+        if author_id in graph:
+            graph.nodes[author_id]['name'] = author.get('name')
+
+    return graph
+
+
+def get_collaboration_graph(project_id: int) -> nx.Graph:
+    """
+    獲取專案的合作關係圖，版本未變時直接使用記憶體中的快取
+
+    Args:
+        project_id: 專案 ID
+
+    Returns:
+        nx.Graph（邊帶有 count, strength, distance；節點帶有 name）
+    """
+    version = _collaboration_version(project_id)
+
+    with _cache_lock:
+        cached = _cache.get(project_id)
+        if cached and cached[0] == version:
+            _cache.move_to_end(project_id)
+            return cached[1]
+
+    graph = _build_graph(project_id)
+
+    with _cache_lock:
+        _cache[project_id] = (version, graph)
+        _cache.move_to_end(project_id)
+        while len(_cache) > current_app.config.get('NETWORK_ADJACENCY_CACHE_SIZE', 8):
+            _cache.popitem(last=False)
+
+    return graph
+
+
+def shortest_collaboration_path(graph: nx.Graph, source: int, target: int,
+                                weighted: bool = False) -> Optional[Dict]:
+    """
+    兩位作者之間的最短合作路徑
+
+    Args:
+        graph: get_collaboration_graph() 的結果
+        source: 起點作者 ID
+        target: 終點作者 ID
+        weighted: False 時以雙向 BFS 求最少中間人路徑；
+                  True 時以雙向 Dijkstra 求最緊密路徑（邊長為合作強度的倒數）
+
+    Returns:
+        {'nodes': [...], 'links': [...], 'length': 步數, 'distance': 加權距離}，不連通時返回 None
+    """
+    try:
+        if weighted:
+            distance, path = nx.bidirectional_dijkstra(graph, source, target, weight='distance')
+        else:
+            path = nx.bidirectional_shortest_path(graph, source, target)
+            distance = None
+    except nx.NetworkXNoPath:
+        return None
+
+    return {
+        'nodes': [{'id': node, 'name': graph.nodes[node].get('name')} for node in path],
+        'links': [
+            {
+                'source': node1,
+                'target': node2,
+                'collaboration_count': graph[node1][node2]['count'],
+                'strength': graph[node1][node2]['strength']
+            }
+            for node1, node2 in zip(path, path[1:])
+        ],
+        'length': len(path) - 1,
+        'distance': round(distance, 6) if distance is not None else None
+    }
+
+
+def ego_network(graph: nx.Graph, center: int, radius: int = 1,
+                max_nodes: Optional[int] = None) -> Dict:
+    """
+    作者的 k 步鄰域
+
+    Args:
+        graph: get_collaboration_graph() 的結果
+        center: 中心作者 ID
+        radius: 步數
+        max_nodes: 節點數上限，超過時按距離保留最近的節點（同距離按合作強度）
+
+    Returns:
+        {'nodes': [...], 'links': [...], 'truncated': bool}
+    """
+    distances = nx.single_source_shortest_path_length(graph, center, cutoff=radius)
+
+    truncated = max_nodes is not None and len(distances) > max_nodes
+    if truncated:
+        strength = {
+            node: graph[center][node]['strength'] if graph.has_edge(center, node) else 0
+            for node in distances
+        }
+        ranked = sorted(distances, key=lambda node: (distances[node], -strength[node], node))
+        distances = {node: distances[node] for node in ranked[:max_nodes]}
+
+    subgraph = graph.subgraph(distances)
+
+    return {
+        'nodes': [
+            {'id': node, 'name': graph.nodes[node].get('name'), 'distance': distances[node]}
+            for node in sorted(distances, key=lambda node: (distances[node], node))
+        ],
+        'links': [
+            {
+                'source': node1,
+                'target': node2,
+                'collaboration_count': data['count'],
+                'strength': data['strength']
+            }
+            for node1, node2, data in subgraph.edges(data=True)
+        ],
+        'truncated': truncated
+    }
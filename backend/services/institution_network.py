@@ -0,0 +1,187 @@
+"""
+機構合作網絡服務
+Institution Network Service - 將作者合作邊按論文彙總到正規化後的機構，沿用 AuthorNetworkAnalyzer 的計算
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from models import db, Paper, Author, PaperAuthor
+from services.affiliation_normalizer import AffiliationNormalizer
+from services.network_analyzer import AuthorNetworkAnalyzer
+from services.network_state import get_or_compute_artifact
+
+# 別名索引只需建立一次，正規化結果在行程內共用
+_normalizer = AffiliationNormalizer()
+
+
+def build_institution_analyzer(project_id: int, author_analyzer: AuthorNetworkAnalyzer):
+    """
+    構建機構層級的網絡：按論文將作者合作邊映射到作者在該論文的機構並彙總權重
+
+    機構間的權重即跨機構作者邊的權重總和，大型論文的 cap / star / fractional 策略因此與作者網絡一致
+    （star 的論文虛擬節點保留，連到參與作者的機構）；同一機構內的合作不成邊，
+    列出多個單位的作者按單位數平分權重。
+    在 SQL 中先取不重複的 (論文, 作者, 單位) 組合（單位缺失時使用作者的 institution），
+    只對不重複的單位字串做正規化。
+
+    Args:
+        project_id: 專案 ID
+        author_analyzer: 專案的作者網絡
+
+    Returns:
+        (analyzer, 機構資訊 {id: {'key', 'name', 'authors'}}, 統計 {'papers', 'unresolved_authorships'})
+    """
+    affiliation = func.coalesce(func.nullif(PaperAuthor.affiliation, ''), Author.institution)
+    rows = db.session.query(
+        PaperAuthor.paper_id, PaperAuthor.author_id, affiliation
+    ).join(Paper, Paper.id == PaperAuthor.paper_id).join(
+        Author, Author.id == PaperAuthor.author_id
+    ).filter(Paper.project_id == project_id).distinct().all()
+
+    institution_ids: Dict[str, int] = {}
+    institutions: Dict[int, Dict] = {}
+    authorships: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    unresolved = 0
+
+    for paper_id, author_id, raw in rows:
+        # 同一作者可能列出多個單位
+        normalized = [_normalizer.normalize(part) for part in (raw or '').split(';')]
+        normalized = [n for n in normalized if n]
+        if not normalized:
+            unresolved += 1
+            continue
+
+        for key, name in normalized:
+            if key not in institution_ids:
+                institution_ids[key] = len(institution_ids) + 1
+                institutions[institution_ids[key]] = {'key': key, 'name': name, 'authors': set()}
+            institution_id = institution_ids[key]
+            institutions[institution_id]['authors'].add(author_id)
+            if institution_id not in authorships[(paper_id, author_id)]:
+                authorships[(paper_id, author_id)].append(institution_id)
+
+    paper_institutions: Dict[int, List[int]] = {}
+    edges: Dict[Tuple[int, int], Dict] = {}
+
+    for paper_id in sorted(author_analyzer.papers):
+        # 論文的機構按作者順序排列，第一位即第一作者的機構
+        members = []
+        for author in author_analyzer.paper_authors.get(paper_id, []):
+            for institution_id in authorships.get((paper_id, author['id']), []):
+                if institution_id not in members:
+                    members.append(institution_id)
+        if not members:
+            continue
+        paper_institutions[paper_id] = members
+
+        for node1, node2, weight in author_analyzer.paper_edges(paper_id):
+            ends1 = [node1] if AuthorNetworkAnalyzer.is_hub(node1) else authorships.get((paper_id, node1), [])
+            ends2 = [node2] if AuthorNetworkAnalyzer.is_hub(node2) else authorships.get((paper_id, node2), [])
+            if not ends1 or not ends2:
+                continue
+            share = weight / (len(ends1) * len(ends2))
+            for end1 in ends1:
+                for end2 in ends2:
+                    if end1 == end2:
+                        continue
+                    edge = edges.setdefault((min(end1, end2), max(end1, end2)), {'weight': 0, 'papers': []})
+                    edge['weight'] += share
+                    if paper_id not in edge['papers']:
+                        edge['papers'].append(paper_id)
+
+    collaborators: Dict[int, set] = defaultdict(set)
+    for node1, node2 in edges:
+        if not AuthorNetworkAnalyzer.is_hub(node1):
+            collaborators[node1].add(node2)
+            collaborators[node2].add(node1)
+
+    institution_papers: Dict[int, List[int]] = defaultdict(list)
+    for paper_id, members in paper_institutions.items():
+        for institution_id in members:
+            institution_papers[institution_id].append(paper_id)
+
+    # 以機構為「作者」組成分析器狀態，沿用作者網絡的指標、社群與佈局計算
+    analyzer = AuthorNetworkAnalyzer.from_state({
+        'papers': [[paper_id, author_analyzer.papers[paper_id]] for paper_id in paper_institutions],
+        'paper_authors': [
+            [paper_id, [
+                {'id': institution_id, 'name': institutions[institution_id]['name'], 'position': position}
+                for position, institution_id in enumerate(members, start=1)
+            ]]
+            for paper_id, members in paper_institutions.items()
+        ],
+        'authors': [
+            [institution_id, {
+                'id': institution_id,
+                'name': institutions[institution_id]['name'],
+                'papers': papers,
+                'citations': sum(author_analyzer.papers[p].get('citation_count', 0) for p in papers),
+                'first_author_count': sum(1 for p in papers if paper_institutions[p][0] == institution_id),
+                'corresponding_count': 0,
+                'collaborators': sorted(collaborators[institution_id])
+            }]
+            for institution_id, papers in institution_papers.items()
+        ],
+        'edges': [[node1, node2, edge['weight'], edge['papers']] for (node1, node2), edge in edges.items()]
+    })
+
+    stats = {'papers': len(paper_institutions), 'unresolved_authorships': unresolved}
+    return analyzer, institutions, stats
+
+
+def compute_institution_network(project_id: int, author_analyzer: AuthorNetworkAnalyzer,
+                                resolution: float = 1.0, seed: Optional[int] = 42) -> Dict:
+    """
+    計算機構合作網絡（中心性、社群、佈局）
+
+    Returns:
+        {'nodes', 'links', 'communities', 'statistics'}
+    """
+    analyzer, institutions, stats = build_institution_analyzer(project_id, author_analyzer)
+
+    metrics = analyzer.calculate_centrality_metrics()
+    communities = analyzer.detect_communities(resolution=resolution, seed=seed)
+    network_data = analyzer.export_network_data(positions=analyzer.compute_layout(), include_papers=False)
+
+    community_sizes = defaultdict(int)
+    for community_id in communities.values():
+        community_sizes[community_id] += 1
+
+    for node in network_data['nodes']:
+        institution = institutions.get(node['id'])
+        node_metrics = metrics.get(node['id'], {})
+        # 作者層級的欄位對機構沒有意義
+        node.pop('first_author_count', None)
+        if institution:
+            node['authors_count'] = len(institution['authors'])
+        node['degree_centrality'] = node_metrics.get('degree_centrality', 0)
+        node['betweenness_centrality'] = node_metrics.get('betweenness_centrality', 0)
+        node['pagerank'] = node_metrics.get('pagerank', 0)
+        node['community_id'] = communities.get(node['id'])
+
+    statistics = analyzer.get_network_statistics()
+    statistics['total_institutions'] = statistics.pop('total_authors', len(institutions))
+    statistics.update(stats)
+
+    network_data['communities'] = [
+        {'community_id': community_id, 'size': size}
+        for community_id, size in sorted(community_sizes.items())
+    ]
+    network_data['statistics'] = statistics
+    return network_data
+
+
+def get_institution_network(project_id: int, resolution: float = 1.0, seed: Optional[int] = 42) -> Dict:
+    """
+    讀取或計算按網絡版本快取的機構合作網絡
+
+    Returns:
+        compute_institution_network() 的結果
+    """
+    return get_or_compute_artifact(
+        project_id, 'institution_network', {'resolution': resolution, 'seed': seed},
+        lambda author_analyzer: compute_institution_network(project_id, author_analyzer, resolution, seed)
+    )
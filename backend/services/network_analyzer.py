@@ -4,18 +4,127 @@
 """
 
 import networkx as nx
-from typing import Dict, List, Tuple, Optional
-from collections import defaultdict
+import numpy as np
+from scipy.sparse import csgraph
+from typing import Callable, Dict, List, Tuple, Optional
+from collections import Counter, defaultdict
+from .parallel_centrality import parallel_centrality
+
+
+# 大型作者列表（如 ATLAS、大型聯盟論文）的處理策略（作者數未超過門檻的一般論文一律完整兩兩相連）
+# cap: 只有前 clique_cap 位作者兩兩相連，其餘作者連向第一作者
+# star: 作者連向代表該論文的虛擬節點（邊數與作者數成線性）
+# fractional: 完整 clique，但每條邊權重為 1/(n-1)
+HYPEREDGE_STRATEGIES = ('cap', 'star', 'fractional')
+
+
+def influence_scores(paper_counts, citations, collaborators, first_author_counts) -> np.ndarray:
+    """
+    影響力分數（向量化，一次計算所有作者）
+    綜合考慮：論文數量、引用數、合作者數量、第一作者比例等
+
+    Args:
+        paper_counts: 各作者的論文數
+        citations: 各作者的引用總數
+        collaborators: 各作者的合作者數
+        first_author_counts: 各作者的第一作者論文數
+
+    Returns:
+        與輸入等長的分數陣列（0-100）
+    """
+    paper_counts = np.asarray(paper_counts, dtype=np.float64)
+    first_author_ratio = np.asarray(first_author_counts, dtype=np.float64) / np.maximum(paper_counts, 1)
+
+    # 加權計算
+    score = (
+        paper_counts * 2 +  # 論文數量
+        np.minimum(np.asarray(citations, dtype=np.float64) / 100, 50) +  # 引用數（上限50分）
+        np.asarray(collaborators, dtype=np.float64) * 1.5 +  # 合作者數量
+        first_author_ratio * 10  # 第一作者比例
+    )
+
+    return np.minimum(score, 100)  # 限制在 0-100 之間
+
+
+def pivot_mds_layout(graph: nx.Graph, pivots: int = 50, seed: int = 42) -> Dict[int, np.ndarray]:
+    """
+    Pivot MDS 佈局（Brandes & Pich）：只計算 k 個樞紐節點到所有節點的跳數距離，
+    對 n × k 的雙中心化距離矩陣做 SVD 取前兩個成分作為座標
+
+    樞紐以最遠點策略選取（不連通的分量會優先被選到），不同分量之間的距離以最大距離 + 1 代替。
+
+    Args:
+        graph: 網絡圖
+        pivots: 樞紐節點數
+        seed: 第一個樞紐與微小擾動的隨機種子
+
+    Returns:
+        字典，key 為節點 ID，value 為 [x, y]
+    """
+    nodes = list(graph.nodes())
+    n = len(nodes)
+    adjacency = nx.to_scipy_sparse_array(graph, nodelist=nodes, weight=None, format='csr')
+    rng = np.random.default_rng(seed)
+
+    k = min(pivots, n)
+    distances = np.empty((n, k))
+    nearest = np.full(n, np.inf)
+    pivot = int(rng.integers(n))
+    for j in range(k):
+        distances[:, j] = csgraph.shortest_path(adjacency, directed=False, unweighted=True, indices=pivot)
+        nearest = np.minimum(nearest, distances[:, j])
+        pivot = int(np.argmax(nearest))
+
+    finite = np.isfinite(distances)
+    distances[~finite] = distances[finite].max() + 1
+
+    squared = distances ** 2
+    centered = -0.5 * (squared - squared.mean(axis=0) - squared.mean(axis=1, keepdims=True) + squared.mean())
+    left, singular, _ = np.linalg.svd(centered, full_matrices=False)
+    coordinates = left[:, :2] * singular[:2]
+
+    # 結構相同的節點（如同一篇論文的作者）距離完全相同，加入微小擾動避免重疊
+    spread = float(np.abs(coordinates).max()) or 1.0
+    coordinates += rng.normal(scale=0.01 * spread, size=coordinates.shape)
+    return dict(zip(nodes, coordinates))
 
 
 class AuthorNetworkAnalyzer:
     """作者網絡分析器"""
 
-    def __init__(self):
+    def __init__(self, large_paper_threshold: int = 50, large_paper_strategy: str = 'star',
+                 clique_cap: int = 20, max_clique_authors: int = 200):
+        """
+        Args:
+            large_paper_threshold: 作者數超過此值的論文視為大型合作論文
+            large_paper_strategy: 大型論文的處理策略（cap / star / fractional）
+            clique_cap: cap 策略下兩兩相連的作者數上限
+            max_clique_authors: fractional 策略允許的最大 clique 作者數，超過時改用 star
+        """
+        if large_paper_strategy not in HYPEREDGE_STRATEGIES:
+            raise ValueError(f"不支援的大型論文策略: {large_paper_strategy}")
+
+        self.large_paper_threshold = large_paper_threshold
+        self.large_paper_strategy = large_paper_strategy
+        self.clique_cap = clique_cap
+        self.max_clique_authors = max_clique_authors
+
         self.graph = nx.Graph()
         self.authors = {}  # author_id -> author_data
         self.papers = {}  # paper_id -> paper_data
 
+        # 論文-作者二部圖：paper_id -> authors（作者 -> 論文見 authors[id]['papers']）
+        self.paper_authors = {}
+        self.hyperedge_modes = {}  # paper_id -> 非 clique 的處理方式（刪除時按原方式回退）
+
+        # 連通分量（增量維護的 union-find，刪除論文後標記重算）
+        self._component_parent = {}
+        self._components_dirty = False
+
+        # 昂貴指標快取（介數、接近中心性、PageRank 等），圖變動時標記過期
+        self._metrics_cache = None
+        self._metrics_stale = True
+
     def add_paper(self, paper_id: int, paper_data: Dict, authors: List[Dict]):
         """
         添加論文和作者到網絡
@@ -25,7 +134,21 @@ class AuthorNetworkAnalyzer:
             paper_data: 論文數據（包含年份、引用數等）
             authors: 作者列表，每個作者包含 id, name, position 等
         """
+        # 重複添加視為更新：先移除舊記錄，避免邊權重重複累加
+        if paper_id in self.papers:
+            self.remove_paper(paper_id)
+
         self.papers[paper_id] = paper_data
+        self.paper_authors[paper_id] = [
+            {
+                'id': author['id'],
+                'name': author['name'],
+                'position': author.get('position'),
+                'is_corresponding': author.get('is_corresponding', False)
+            }
+            for author in authors
+        ]
+        self._metrics_stale = True
 
         # 添加作者節點
         for author in authors:
@@ -41,6 +164,7 @@ class AuthorNetworkAnalyzer:
                     'collaborators': set()
                 }
                 self.graph.add_node(author_id, **self.authors[author_id])
+                self._component_parent[author_id] = author_id
 
             # 更新作者統計
             self.authors[author_id]['papers'].append(paper_id)
@@ -51,53 +175,256 @@ class AuthorNetworkAnalyzer:
             if author.get('is_corresponding'):
                 self.authors[author_id]['corresponding_count'] += 1
 
-        # 建立合作關係（邊）
-        if len(authors) > 1:
-            for i in range(len(authors)):
-                for j in range(i + 1, len(authors)):
-                    author1_id = authors[i]['id']
-                    author2_id = authors[j]['id']
-
-                    # 添加合作關係
-                    self.authors[author1_id]['collaborators'].add(author2_id)
-                    self.authors[author2_id]['collaborators'].add(author1_id)
-
-                    # 添加或更新邊
-                    if self.graph.has_edge(author1_id, author2_id):
-                        self.graph[author1_id][author2_id]['weight'] += 1
-                        self.graph[author1_id][author2_id]['papers'].append(paper_id)
-                    else:
-                        self.graph.add_edge(
-                            author1_id,
-                            author2_id,
-                            weight=1,
-                            papers=[paper_id]
-                        )
+        # 建立合作關係（邊），大型論文按配置的策略處理
+        author_ids = [author['id'] for author in authors]
+        mode = self._hyperedge_mode(len(author_ids))
+        if mode != 'clique':
+            self.hyperedge_modes[paper_id] = mode
+        if mode == 'star':
+            self.graph.add_node(self.hub_node(paper_id), is_paper_hub=True, paper_id=paper_id)
+            self._component_parent[self.hub_node(paper_id)] = self.hub_node(paper_id)
 
-    def calculate_centrality_metrics(self) -> Dict[int, Dict]:
+        for node1, node2, weight in self._paper_edges(paper_id, author_ids, mode):
+            # 只有作者之間的直接邊才算合作者（star 的虛擬節點不計入）
+            if not self.is_hub(node1):
+                self.authors[node1]['collaborators'].add(node2)
+                self.authors[node2]['collaborators'].add(node1)
+
+            # 添加或更新邊
+            if self.graph.has_edge(node1, node2):
+                self.graph[node1][node2]['weight'] += weight
+                self.graph[node1][node2]['papers'].append(paper_id)
+            else:
+                self.graph.add_edge(
+                    node1,
+                    node2,
+                    weight=weight,
+                    papers=[paper_id]
+                )
+
+            self._union_components(node1, node2)
+
+    @staticmethod
+    def hub_node(paper_id: int) -> int:
+        """star 策略下代表論文的虛擬節點 ID（以負數區分作者節點）"""
+        return -paper_id
+
+    @staticmethod
+    def is_hub(node: int) -> bool:
+        """是否為論文虛擬節點"""
+        return node < 0
+
+    def author_nodes(self):
+        """圖中所有作者節點（排除論文虛擬節點）"""
+        return [node for node in self.graph.nodes() if not self.is_hub(node)]
+
+    def _hyperedge_mode(self, author_count: int) -> str:
+        """決定論文的連邊方式"""
+        if author_count <= self.large_paper_threshold:
+            return 'clique'
+        if self.large_paper_strategy == 'fractional' and author_count > self.max_clique_authors:
+            # 分數權重仍是完整 clique，過大時改用 star 以免記憶體爆炸
+            return 'star'
+        return self.large_paper_strategy
+
+    def _paper_edges(self, paper_id: int, author_ids: List[int], mode: str):
+        """
+        生成論文貢獻的邊
+
+        Yields:
+            (node1, node2, weight)
+        """
+        n = len(author_ids)
+
+        if mode == 'star':
+            hub = self.hub_node(paper_id)
+            for author_id in author_ids:
+                yield hub, author_id, 1
+            return
+
+        if mode == 'cap':
+            core = author_ids[:self.clique_cap]
+            for i in range(len(core)):
+                for j in range(i + 1, len(core)):
+                    yield core[i], core[j], 1
+            for author_id in author_ids[self.clique_cap:]:
+                yield author_ids[0], author_id, 1
+            return
+
+        weight = 1 / (n - 1) if mode == 'fractional' and n > 1 else 1
+        for i in range(n):
+            for j in range(i + 1, n):
+                yield author_ids[i], author_ids[j], weight
+
+    def paper_edges(self, paper_id: int):
+        """
+        已加入的論文貢獻的邊（按加入時的大型論文策略，供按論文重新彙總權重）
+
+        Yields:
+            (node1, node2, weight)
+        """
+        author_ids = [author['id'] for author in self.paper_authors.get(paper_id, [])]
+        return self._paper_edges(paper_id, author_ids, self.hyperedge_modes.get(paper_id, 'clique'))
+
+    def remove_paper(self, paper_id: int) -> bool:
+        """
+        從網絡中移除論文（增量更新）
+        遞減作者合作邊權重，權重歸零的邊與不再有論文的作者一併移除
+
+        Args:
+            paper_id: 論文 ID
+
+        Returns:
+            是否有論文被移除
+        """
+        if paper_id not in self.papers:
+            return False
+
+        paper_data = self.papers.pop(paper_id)
+        authors = self.paper_authors.pop(paper_id, [])
+        author_ids = [author['id'] for author in authors if author['id'] in self.authors]
+
+        # 回退作者統計
+        for author in authors:
+            author_stats = self.authors.get(author['id'])
+            if not author_stats:
+                continue
+            if paper_id in author_stats['papers']:
+                author_stats['papers'].remove(paper_id)
+            author_stats['citations'] -= paper_data.get('citation_count', 0)
+            if author.get('position') == 1:
+                author_stats['first_author_count'] -= 1
+            if author.get('is_corresponding'):
+                author_stats['corresponding_count'] -= 1
+
+        # 遞減合作邊權重（按添加時的方式回退）
+        mode = self.hyperedge_modes.pop(paper_id, 'clique')
+        for node1, node2, weight in self._paper_edges(paper_id, author_ids, mode):
+            if not self.graph.has_edge(node1, node2):
+                continue
+
+            edge_data = self.graph[node1][node2]
+            edge_data['weight'] -= weight
+            if paper_id in edge_data['papers']:
+                edge_data['papers'].remove(paper_id)
+            if edge_data['weight'] <= 1e-9 or not edge_data['papers']:
+                self.graph.remove_edge(node1, node2)
+
+        if mode == 'star' and self.hub_node(paper_id) in self.graph:
+            self.graph.remove_node(self.hub_node(paper_id))
+            self._component_parent.pop(self.hub_node(paper_id), None)
+
+        # 移除不再有論文的作者，並同步合作者集合
+        for author_id in set(author_ids):
+            author_stats = self.authors[author_id]
+            if not author_stats['papers']:
+                self.graph.remove_node(author_id)
+                del self.authors[author_id]
+                self._component_parent.pop(author_id, None)
+            else:
+                author_stats['collaborators'] = {
+                    neighbor for neighbor in self.graph.neighbors(author_id) if not self.is_hub(neighbor)
+                }
+                self.graph.nodes[author_id]['collaborators'] = author_stats['collaborators']
+
+        # 刪除可能拆分連通分量，延遲到下次查詢時重算
+        self._components_dirty = True
+        self._metrics_stale = True
+        return True
+
+    def _find_component(self, author_id: int) -> int:
+        """union-find 查找（路徑壓縮）"""
+        parent = self._component_parent
+        root = author_id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[author_id] != root:
+            parent[author_id], author_id = root, parent[author_id]
+        return root
+
+    def _union_components(self, author1_id: int, author2_id: int):
+        """合併兩位作者所在的連通分量"""
+        if self._components_dirty:
+            return
+        root1 = self._find_component(author1_id)
+        root2 = self._find_component(author2_id)
+        if root1 != root2:
+            self._component_parent[root2] = root1
+
+    def _rebuild_components(self):
+        """從圖重建連通分量"""
+        self._component_parent = {}
+        for component in nx.connected_components(self.graph):
+            root = next(iter(component))
+            for author_id in component:
+                self._component_parent[author_id] = root
+        self._components_dirty = False
+
+    def get_components(self) -> List[set]:
+        """
+        獲取所有連通分量（增量維護，無需每次遍歷全圖）
+
+        Returns:
+            作者 ID 集合的列表，按大小降序排列
+        """
+        if self._components_dirty:
+            self._rebuild_components()
+
+        components = defaultdict(set)
+        for node in self._component_parent:
+            if not self.is_hub(node):
+                components[self._find_component(node)].add(node)
+
+        return sorted(components.values(), key=len, reverse=True)
+
+    @property
+    def metrics_stale(self) -> bool:
+        """昂貴指標是否需要重新計算"""
+        return self._metrics_stale or self._metrics_cache is None
+
+    def calculate_centrality_metrics(self, processes: int = 1,
+                                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                                     check_cancelled: Optional[Callable[[], None]] = None
+                                     ) -> Dict[int, Dict]:
         """
         計算所有中心性指標
 
+        Args:
+            processes: 計算介數與接近中心性的行程數，大於 1 時按來源節點平行計算
+            progress_callback: 平行計算的進度回呼 (已完成批次, 總批次)
+            check_cancelled: 平行計算每完成一批後呼叫的取消檢查
+
         Returns:
             字典，key 為 author_id，value 為包含各種中心性指標的字典
         """
         if len(self.graph.nodes()) == 0:
             return {}
 
+        # 圖未變動時直接返回快取結果
+        if not self.metrics_stale:
+            return self._metrics_cache
+
         metrics = {}
 
         # 度中心性（Degree Centrality）
         degree_centrality = nx.degree_centrality(self.graph)
 
-        # 介數中心性（Betweenness Centrality）
-        betweenness_centrality = nx.betweenness_centrality(self.graph, weight='weight')
+        if processes > 1:
+            # 介數與接近中心性都可按來源節點分解，交給行程池平行計算
+            betweenness_centrality, closeness_centrality = parallel_centrality(
+                self.graph, processes=processes, weight='weight', progress_callback=progress_callback,
+                check_cancelled=check_cancelled
+            )
+        else:
+            # 介數中心性（Betweenness Centrality）
+            betweenness_centrality = nx.betweenness_centrality(self.graph, weight='weight')
 
-        # 接近中心性（Closeness Centrality）
-        # 只計算連通的節點
-        try:
-            closeness_centrality = nx.closeness_centrality(self.graph)
-        except:
-            closeness_centrality = {node: 0 for node in self.graph.nodes()}
+            # 接近中心性（Closeness Centrality）
+            # 只計算連通的節點
+            try:
+                closeness_centrality = nx.closeness_centrality(self.graph)
+            except:
+                closeness_centrality = {node: 0 for node in self.graph.nodes()}
 
         # PageRank（影響力評分）
         try:
@@ -105,47 +432,40 @@ class AuthorNetworkAnalyzer:
         except:
             pagerank = {node: 0 for node in self.graph.nodes()}
 
-        # 整合所有指標
-        for author_id in self.graph.nodes():
+        influence = self._influence_scores()
+
+        # 整合所有指標（論文虛擬節點只參與計算，不輸出）
+        for author_id in self.author_nodes():
             metrics[author_id] = {
                 'degree_centrality': degree_centrality.get(author_id, 0),
                 'betweenness_centrality': betweenness_centrality.get(author_id, 0),
                 'closeness_centrality': closeness_centrality.get(author_id, 0),
                 'pagerank': pagerank.get(author_id, 0),
                 'degree': self.graph.degree(author_id),  # 實際合作者數量
-                'influence_score': self._calculate_influence_score(author_id)
+                'influence_score': influence.get(author_id, 0)
             }
 
+        self._metrics_cache = metrics
+        self._metrics_stale = False
         return metrics
 
-    def _calculate_influence_score(self, author_id: int) -> float:
+    def _influence_scores(self) -> Dict[int, float]:
         """
-        計算作者的影響力分數
-        綜合考慮：論文數量、引用數、合作者數量、第一作者比例等
-
-        Args:
-            author_id: 作者 ID
+        計算所有作者的影響力分數（收集各作者的統計後一次向量化計算）
 
         Returns:
-            影響力分數（0-100）
-        """
-        author = self.authors.get(author_id, {})
-
-        # 基礎分數
-        paper_count = len(author.get('papers', []))
-        citations = author.get('citations', 0)
-        collaborators = len(author.get('collaborators', set()))
-        first_author_ratio = author.get('first_author_count', 0) / max(paper_count, 1)
-
-        # 加權計算
-        score = (
-            paper_count * 2 +  # 論文數量
-            min(citations / 100, 50) +  # 引用數（上限50分）
-            collaborators * 1.5 +  # 合作者數量
-            first_author_ratio * 10  # 第一作者比例
-        )
+            字典，key 為 author_id，value 為影響力分數（0-100）
+        """
+        author_ids = self.author_nodes()
+        authors = [self.authors.get(author_id, {}) for author_id in author_ids]
 
-        return min(score, 100)  # 限制在 0-100 之間
+        scores = influence_scores(
+            [len(author.get('papers', [])) for author in authors],
+            [author.get('citations', 0) for author in authors],
+            [len(author.get('collaborators', set())) for author in authors],
+            [author.get('first_author_count', 0) for author in authors]
+        )
+        return dict(zip(author_ids, scores.tolist()))
 
     def identify_key_people(self, top_n: int = 10) -> List[Tuple[int, Dict]]:
         """
@@ -168,30 +488,137 @@ class AuthorNetworkAnalyzer:
 
         return ranked_authors[:top_n]
 
-    def detect_communities(self) -> Dict[int, int]:
+    def detect_communities(self, resolution: float = 1.0, seed: Optional[int] = 42,
+                           method: str = 'louvain') -> Dict[int, int]:
         """
         檢測研究社群（學術陣營）
 
+        Args:
+            resolution: 解析度參數，大於 1 傾向產生較多較小的社群
+            seed: 隨機種子，固定後結果可重現
+            method: louvain（預設）或 greedy（舊的 greedy modularity 算法，用於比較）
+
         Returns:
-            字典，key 為 author_id，value 為社群 ID
+            字典，key 為 author_id，value 為社群 ID（按社群大小降序編號，0 為最大社群）
         """
         if len(self.graph.nodes()) < 2:
             return {}
 
-        try:
-            # 使用 Louvain 社群檢測算法（需要 python-louvain 庫）
-            # 這裡使用 NetworkX 內建的 greedy modularity 算法
-            communities = nx.community.greedy_modularity_communities(self.graph, weight='weight')
+        if method == 'louvain':
+            communities = nx.community.louvain_communities(
+                self.graph, weight='weight', resolution=resolution, seed=seed
+            )
+        elif method == 'greedy':
+            communities = nx.community.greedy_modularity_communities(
+                self.graph, weight='weight', resolution=resolution
+            )
+        else:
+            raise ValueError(f"不支援的社群檢測方法: {method}")
 
-            # 轉換為 author_id -> community_id 的字典
-            community_map = {}
-            for community_id, community in enumerate(communities):
-                for author_id in community:
-                    community_map[author_id] = community_id
+        # 只保留作者節點，並按社群大小排序以獲得穩定的編號
+        author_communities = [
+            sorted(author_id for author_id in community if not self.is_hub(author_id))
+            for community in communities
+        ]
+        author_communities = [community for community in author_communities if community]
+        author_communities.sort(key=lambda community: (-len(community), community[0]))
 
-            return community_map
-        except:
-            return {}
+        # 轉換為 author_id -> community_id 的字典
+        community_map = {}
+        for community_id, community in enumerate(author_communities):
+            for author_id in community:
+                community_map[author_id] = community_id
+
+        return community_map
+
+    def temporal_snapshots(self, window: Optional[int] = None, top_n: int = 10) -> List[Dict]:
+        """
+        按年份一次掃描生成網絡演化快照
+        論文按年份排序後逐年加入同一個分析器（滑動視窗模式下同時移除過期論文），
+        在每個年份邊界記錄度、PageRank 與連通分量，避免每年重建整個網絡
+
+        Args:
+            window: 滑動視窗年數（None 為累積模式）
+            top_n: 每年記錄的前 N 位作者
+
+        Returns:
+            按年份排序的快照列表
+        """
+        papers_by_year = defaultdict(list)
+        for paper_id, paper_data in self.papers.items():
+            if paper_data.get('year'):
+                papers_by_year[paper_data['year']].append(paper_id)
+
+        if not papers_by_year:
+            return []
+
+        sweep = AuthorNetworkAnalyzer(
+            large_paper_threshold=self.large_paper_threshold,
+            large_paper_strategy=self.large_paper_strategy,
+            clique_cap=self.clique_cap,
+            max_clique_authors=self.max_clique_authors
+        )
+
+        snapshots = []
+        pagerank = {}
+        first_year, last_year = min(papers_by_year), max(papers_by_year)
+
+        for year in range(first_year, last_year + 1):
+            changed = False
+
+            for paper_id in papers_by_year.get(year, []):
+                sweep.add_paper(paper_id, self.papers[paper_id], self.paper_authors.get(paper_id, []))
+                changed = True
+
+            if window:
+                for paper_id in papers_by_year.get(year - window, []):
+                    changed = sweep.remove_paper(paper_id) or changed
+
+            # 網絡沒有變化的年份沿用上一年的快照
+            if not changed and snapshots:
+                snapshots.append({**snapshots[-1], 'year': year})
+                continue
+
+            snapshots.append(sweep._snapshot(year, top_n, pagerank))
+
+        return snapshots
+
+    def _snapshot(self, year: int, top_n: int, pagerank: Dict[int, float]) -> Dict:
+        """記錄目前網絡的快照（pagerank 為上一年的結果，用作暖啟動並就地更新）"""
+        stats = self.get_network_statistics()
+        authors = self.author_nodes()
+
+        if self.graph.number_of_nodes() > 0:
+            # 以上一年的 PageRank 暖啟動，相鄰年份的網絡相似，迭代次數大幅減少
+            nstart = {node: pagerank.get(node, 1.0) for node in self.graph.nodes()}
+            try:
+                current = nx.pagerank(self.graph, weight='weight', nstart=nstart)
+            except nx.PowerIterationFailedConvergence:
+                current = nx.pagerank(self.graph, weight='weight')
+        else:
+            current = {}
+        pagerank.clear()
+        pagerank.update(current)
+
+        top_degree = sorted(authors, key=lambda a: self.graph.degree(a), reverse=True)[:top_n]
+        top_pagerank = sorted(authors, key=lambda a: current.get(a, 0), reverse=True)[:top_n]
+
+        return {
+            'year': year,
+            'paper_count': len(self.papers),
+            'total_authors': stats['total_authors'],
+            'total_collaborations': stats['total_collaborations'],
+            'component_count': stats.get('component_count', 0),
+            'largest_component_size': stats['largest_component_size'],
+            'top_degree': [
+                {'id': a, 'name': self.authors[a]['name'], 'degree': self.graph.degree(a)}
+                for a in top_degree
+            ],
+            'top_pagerank': [
+                {'id': a, 'name': self.authors[a]['name'], 'pagerank': round(current.get(a, 0), 6)}
+                for a in top_pagerank
+            ]
+        }
 
     def get_author_collaborations(self, author_id: int) -> List[Dict]:
         """
@@ -208,6 +635,8 @@ class AuthorNetworkAnalyzer:
 
         collaborations = []
         for neighbor in self.graph.neighbors(author_id):
+            if self.is_hub(neighbor):
+                continue
             edge_data = self.graph[author_id][neighbor]
             collaborations.append({
                 'collaborator_id': neighbor,
@@ -236,21 +665,20 @@ class AuthorNetworkAnalyzer:
                 'largest_component_size': 0
             }
 
-        # 基本統計
-        total_authors = self.graph.number_of_nodes()
-        total_edges = self.graph.number_of_edges()
-        degrees = [d for n, d in self.graph.degree()]
-        avg_degree = sum(degrees) / len(degrees) if degrees else 0
+        # 基本統計（只統計作者之間的邊，大型論文的虛擬節點不計入）
+        total_authors = len(self.authors)
+        total_edges = sum(
+            1 for author1, author2 in self.graph.edges()
+            if not self.is_hub(author1) and not self.is_hub(author2)
+        )
+        avg_degree = 2 * total_edges / total_authors if total_authors else 0
 
         # 網絡密度
-        density = nx.density(self.graph)
+        density = 2 * total_edges / (total_authors * (total_authors - 1)) if total_authors > 1 else 0
 
-        # 最大連通分量
-        if nx.is_connected(self.graph):
-            largest_component_size = total_authors
-        else:
-            largest_component = max(nx.connected_components(self.graph), key=len)
-            largest_component_size = len(largest_component)
+        # 最大連通分量（使用增量維護的分量）
+        components = self.get_components()
+        largest_component_size = len(components[0])
 
         return {
             'total_authors': total_authors,
@@ -258,18 +686,316 @@ class AuthorNetworkAnalyzer:
             'avg_collaborators': round(avg_degree, 2),
             'network_density': round(density, 4),
             'largest_component_size': largest_component_size,
-            'is_connected': nx.is_connected(self.graph)
+            'component_count': len(components),
+            'is_connected': len(components) == 1
         }
 
-    def export_network_data(self) -> Dict:
+    def filter_network(self, min_weight: Optional[float] = None, year_from: Optional[int] = None,
+                       year_to: Optional[int] = None, min_papers: Optional[int] = None,
+                       k_core: Optional[int] = None, top_k: Optional[int] = None,
+                       rank_by: str = 'degree', scores: Optional[Dict[int, float]] = None) -> nx.Graph:
+        """
+        按條件篩選網絡，返回子圖（不修改原圖）
+
+        篩選順序：年份範圍 → 最小邊權重 → 作者最少論文數 → k-core → 前 K 位作者。
+        年份範圍只用範圍內的論文重新生成邊，權重與完整網絡的計算方式一致；
+        設定最小邊權重時，失去所有連線的節點一併移除。
+
+        Args:
+            min_weight: 最小邊權重
+            year_from: 起始年份（含）
+            year_to: 結束年份（含）
+            min_papers: 作者最少論文數（年份範圍內）
+            k_core: 只保留 k-core（每個節點至少有 k 個鄰居的最大子圖）
+            top_k: 只保留排名前 K 位的作者
+            rank_by: 排名指標（degree / pagerank / influence），按完整網絡計算
+            scores: 預先計算的排名分數（省略時按 rank_by 計算）
+
+        Returns:
+            篩選後的 nx.Graph
+        """
+        if rank_by not in ('degree', 'pagerank', 'influence'):
+            raise ValueError(f'未知的排名指標: {rank_by}')
+
+        if year_from is None and year_to is None:
+            papers = None
+            graph = self.graph.copy()
+        else:
+            papers = {
+                paper_id for paper_id, paper in self.papers.items()
+                if paper.get('year') is not None
+                and (year_from is None or paper['year'] >= year_from)
+                and (year_to is None or paper['year'] <= year_to)
+            }
+            graph = nx.Graph()
+            for paper_id in sorted(papers):
+                graph.add_nodes_from(author['id'] for author in self.paper_authors.get(paper_id, []))
+                for node1, node2, weight in self.paper_edges(paper_id):
+                    if graph.has_edge(node1, node2):
+                        graph[node1][node2]['weight'] += weight
+                        graph[node1][node2]['papers'].append(paper_id)
+                    else:
+                        graph.add_edge(node1, node2, weight=weight, papers=[paper_id])
+            for node in graph.nodes():
+                if self.is_hub(node):
+                    graph.nodes[node].update(self.graph.nodes[node])
+
+        if min_weight is not None:
+            graph.remove_edges_from([
+                (u, v) for u, v, weight in graph.edges(data='weight') if weight < min_weight
+            ])
+            graph.remove_nodes_from([node for node in list(graph.nodes()) if graph.degree(node) == 0])
+
+        if min_papers is not None:
+            graph.remove_nodes_from([
+                node for node in list(graph.nodes())
+                if not self.is_hub(node) and sum(
+                    1 for paper_id in self.authors[node]['papers'] if papers is None or paper_id in papers
+                ) < min_papers
+            ])
+
+        if k_core is not None:
+            graph = nx.k_core(graph, k_core).copy()
+
+        if top_k is not None:
+            if scores is None:
+                scores = self.ranking_scores(rank_by)
+            authors = [node for node in graph.nodes() if not self.is_hub(node)]
+            keep = set(sorted(authors, key=lambda a: (-scores.get(a, 0), a))[:top_k])
+            graph.remove_nodes_from([node for node in authors if node not in keep])
+
+        # 移除失去所有作者連線的論文虛擬節點
+        graph.remove_nodes_from([
+            node for node in list(graph.nodes()) if self.is_hub(node) and graph.degree(node) == 0
+        ])
+
+        return graph
+
+    def ranking_scores(self, rank_by: str = 'degree') -> Dict[int, float]:
+        """
+        作者排名分數（完整網絡）
+
+        Args:
+            rank_by: degree / pagerank / influence
+
+        Returns:
+            字典，key 為 author_id，value 為分數
+        """
+        if rank_by == 'degree':
+            return {author_id: self.graph.degree(author_id) for author_id in self.author_nodes()}
+        if rank_by == 'influence':
+            return self._influence_scores()
+        if rank_by == 'pagerank':
+            # 中心性指標未過期時直接使用快取，避免重新計算
+            if not self.metrics_stale:
+                return {author_id: m['pagerank'] for author_id, m in self._metrics_cache.items()}
+            if self.graph.number_of_nodes() == 0:
+                return {}
+            pagerank = nx.pagerank(self.graph, weight='weight')
+            return {author_id: pagerank.get(author_id, 0) for author_id in self.author_nodes()}
+        raise ValueError(f'未知的排名指標: {rank_by}')
+
+    def _node_communities(self, community_map: Dict[int, int]) -> Dict[int, int]:
+        """
+        所有節點（含論文虛擬節點）所屬的社群
+
+        論文虛擬節點歸入其作者中最多人所屬的社群；不在 community_map 中的作者（例如孤立作者）略過。
+        """
+        node_communities = {}
+        for node in self.graph.nodes():
+            if not self.is_hub(node):
+                if node in community_map:
+                    node_communities[node] = community_map[node]
+                continue
+
+            counts = Counter(
+                community_map[neighbor] for neighbor in self.graph.neighbors(node) if neighbor in community_map
+            )
+            if counts:
+                node_communities[node] = min(counts, key=lambda c: (-counts[c], c))
+
+        return node_communities
+
+    def community_overview(self, community_map: Dict[int, int], top_members: int = 3) -> Dict:
+        """
+        將每個社群收合為一個超節點，社群之間的邊權重相加（層級式瀏覽的最上層）
+
+        Args:
+            community_map: detect_communities() 的結果
+            top_members: 每個超節點附帶的代表作者數（按合作者數量排序）
+
+        Returns:
+            {'nodes': [超節點], 'links': [超邊]}，超節點帶有 x, y 座標
+        """
+        node_communities = self._node_communities(community_map)
+
+        members = {}
+        for node, community_id in node_communities.items():
+            members.setdefault(community_id, []).append(node)
+
+        internal = Counter()
+        internal_edges = Counter()
+        links = {}
+        for node1, node2, weight in self.graph.edges(data='weight'):
+            community1 = node_communities.get(node1)
+            community2 = node_communities.get(node2)
+            if community1 is None or community2 is None:
+                continue
+            if community1 == community2:
+                internal[community1] += weight
+                internal_edges[community1] += 1
+                continue
+
+            key = (min(community1, community2), max(community1, community2))
+            link = links.setdefault(key, {'source': key[0], 'target': key[1], 'weight': 0, 'edge_count': 0})
+            link['weight'] += weight
+            link['edge_count'] += 1
+
+        supergraph = nx.Graph()
+        supergraph.add_nodes_from(members)
+        supergraph.add_weighted_edges_from((l['source'], l['target'], l['weight']) for l in links.values())
+        positions = self.compute_layout(graph=supergraph)
+
+        nodes = []
+        for community_id in sorted(members):
+            authors = [node for node in members[community_id] if not self.is_hub(node)]
+            papers = {paper_id for author_id in authors for paper_id in self.authors[author_id]['papers']}
+            top = sorted(authors, key=lambda a: (-self.graph.degree(a), a))[:top_members]
+            x, y = positions.get(community_id, [0.0, 0.0])
+            nodes.append({
+                'id': community_id,
+                'size': len(authors),
+                'papers_count': len(papers),
+                'internal_weight': round(internal[community_id], 4),
+                'internal_edges': internal_edges[community_id],
+                'top_members': [
+                    {'id': a, 'name': self.authors[a]['name'], 'degree': self.graph.degree(a)} for a in top
+                ],
+                'x': x,
+                'y': y
+            })
+
+        return {
+            'nodes': nodes,
+            'links': [
+                dict(link, weight=round(link['weight'], 4))
+                for _, link in sorted(links.items())
+            ]
+        }
+
+    def community_members(self, community_map: Dict[int, int], community_id: int) -> Optional[Dict]:
+        """
+        展開單一超節點：社群內部的作者子圖，以及連向其他社群的彙總邊
+
+        Args:
+            community_map: detect_communities() 的結果
+            community_id: 要展開的社群 ID
+
+        Returns:
+            {'community_id', 'nodes', 'links', 'external_links'}，社群不存在時返回 None
+        """
+        node_communities = self._node_communities(community_map)
+        members = {node for node, community in node_communities.items() if community == community_id}
+        if not members:
+            return None
+
+        subgraph = self.graph.subgraph(members)
+        network_data = self.export_network_data(
+            positions=self.compute_layout(graph=subgraph), include_papers=False, graph=subgraph
+        )
+
+        external = {}
+        for node in members:
+            for neighbor, edge_data in self.graph[node].items():
+                other = node_communities.get(neighbor)
+                if other is None or other == community_id:
+                    continue
+                link = external.setdefault(other, {'community_id': other, 'weight': 0, 'edge_count': 0})
+                link['weight'] += edge_data['weight']
+                link['edge_count'] += 1
+
+        network_data['community_id'] = community_id
+        network_data['external_links'] = [
+            dict(link, weight=round(link['weight'], 4))
+            for _, link in sorted(external.items())
+        ]
+        return network_data
+
+    def compute_layout(self, method: str = 'auto', seed: int = 42, iterations: int = 50,
+                       spring_node_limit: int = 300, graph: Optional[nx.Graph] = None) -> Dict[int, List[float]]:
+        """
+        在伺服器端計算節點座標，前端可直接繪製而無需在瀏覽器執行力導向模擬
+
+        Args:
+            method: spring（Fruchterman-Reingold，每次迭代 O(n²)）、spectral、
+                    pivot_mds（以少數樞紐節點的最短路徑距離近似 MDS，O(k·(n+m))），或 auto（依規模選擇）
+            seed: 隨機種子，確保同一版本的網絡佈局穩定
+            iterations: spring 佈局的迭代次數
+            spring_node_limit: auto 模式下使用 spring 佈局的最大節點數，超過時改用 pivot_mds
+            graph: 要佈局的圖（例如社群超節點圖），預設為完整網絡
+
+        Returns:
+            字典，key 為節點 ID，value 為 [x, y]（範圍 -1 到 1）
+        """
+        if graph is None:
+            graph = self.graph
+
+        n = graph.number_of_nodes()
+        if n == 0:
+            return {}
+        if n == 1:
+            return {node: [0.0, 0.0] for node in graph.nodes()}
+
+        if method == 'auto':
+            method = 'spring' if n <= spring_node_limit else 'pivot_mds'
+
+        if method == 'spring':
+            positions = nx.spring_layout(graph, weight='weight', seed=seed, iterations=iterations)
+        elif method == 'spectral':
+            positions = nx.spectral_layout(graph, weight='weight')
+        elif method == 'pivot_mds':
+            positions = pivot_mds_layout(graph, seed=seed)
+        else:
+            raise ValueError(f"不支援的佈局方法: {method}")
+
+        # 正規化到 [-1, 1]，並四捨五入以縮小傳輸與快取體積
+        scale = float(max((max(abs(x), abs(y)) for x, y in positions.values()), default=1.0)) or 1.0
+        return {
+            node: [round(float(x) / scale, 4), round(float(y) / scale, 4)]
+            for node, (x, y) in positions.items()
+        }
+
+    def export_network_data(self, positions: Optional[Dict[int, List[float]]] = None,
+                            include_papers: bool = True, graph: Optional[nx.Graph] = None) -> Dict:
         """
         導出網絡數據，用於前端可視化
 
+        Args:
+            positions: compute_layout() 的結果，提供時其中的節點帶有 x, y 座標
+            include_papers: 連線是否附帶共同論文列表（可改由 API 按需獲取）
+            graph: 要導出的圖（例如 filter_network() 的結果），預設為完整網絡
+
         Returns:
             包含 nodes 和 links 的字典
         """
+        if graph is None:
+            graph = self.graph
+
         nodes = []
-        for author_id in self.graph.nodes():
+        for author_id in graph.nodes():
+            if self.is_hub(author_id):
+                # 大型合作論文以單一論文節點呈現
+                paper_id = graph.nodes[author_id]['paper_id']
+                nodes.append({
+                    'id': author_id,
+                    'name': self.papers.get(paper_id, {}).get('title') or f'Paper {paper_id}',
+                    'is_paper_hub': True,
+                    'paper_id': paper_id,
+                    'papers_count': 1,
+                    'degree': graph.degree(author_id)
+                })
+                continue
+
             author = self.authors[author_id]
             nodes.append({
                 'id': author_id,
@@ -277,19 +1003,97 @@ class AuthorNetworkAnalyzer:
                 'papers_count': len(author['papers']),
                 'citations': author['citations'],
                 'first_author_count': author['first_author_count'],
-                'degree': self.graph.degree(author_id)
+                'degree': graph.degree(author_id)
             })
 
+        if positions:
+            # 沿用上一版本佈局時新增的節點沒有座標，由前端放置
+            for node in nodes:
+                if node['id'] in positions:
+                    node['x'], node['y'] = positions[node['id']]
+
         links = []
-        for author1, author2, edge_data in self.graph.edges(data=True):
-            links.append({
+        for author1, author2, edge_data in graph.edges(data=True):
+            link = {
                 'source': author1,
                 'target': author2,
-                'weight': edge_data['weight'],
-                'papers': edge_data['papers']
-            })
+                'weight': edge_data['weight']
+            }
+            if include_papers:
+                link['papers'] = edge_data['papers']
+            links.append(link)
 
         return {
             'nodes': nodes,
             'links': links
         }
+
+    def to_state(self) -> Dict:
+        """
+        導出可持久化的分析器狀態（JSON 可序列化）
+
+        Returns:
+            包含論文、作者、邊與指標快取的字典
+        """
+        return {
+            'config': {
+                'large_paper_threshold': self.large_paper_threshold,
+                'large_paper_strategy': self.large_paper_strategy,
+                'clique_cap': self.clique_cap,
+                'max_clique_authors': self.max_clique_authors
+            },
+            'hyperedge_modes': [[paper_id, mode] for paper_id, mode in self.hyperedge_modes.items()],
+            'papers': [[paper_id, data] for paper_id, data in self.papers.items()],
+            'paper_authors': [[paper_id, authors] for paper_id, authors in self.paper_authors.items()],
+            'authors': [
+                [author_id, {**author, 'collaborators': sorted(author['collaborators'])}]
+                for author_id, author in self.authors.items()
+            ],
+            'edges': [
+                [author1, author2, edge_data['weight'], edge_data['papers']]
+                for author1, author2, edge_data in self.graph.edges(data=True)
+            ],
+            'metrics': None if self.metrics_stale else [
+                [author_id, author_metrics] for author_id, author_metrics in self._metrics_cache.items()
+            ]
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'AuthorNetworkAnalyzer':
+        """
+        從持久化狀態還原分析器（不重建合作 clique）
+
+        Args:
+            state: to_state() 導出的字典
+
+        Returns:
+            AuthorNetworkAnalyzer 實例
+        """
+        if not state:
+            return cls()
+
+        analyzer = cls(**state.get('config', {}))
+        analyzer.hyperedge_modes = {paper_id: mode for paper_id, mode in state.get('hyperedge_modes', [])}
+
+        analyzer.papers = {paper_id: data for paper_id, data in state.get('papers', [])}
+        analyzer.paper_authors = {paper_id: authors for paper_id, authors in state.get('paper_authors', [])}
+
+        for author_id, author in state.get('authors', []):
+            author['collaborators'] = set(author.get('collaborators', []))
+            analyzer.authors[author_id] = author
+            analyzer.graph.add_node(author_id, **author)
+
+        analyzer.graph.add_edges_from(
+            (author1, author2, {'weight': weight, 'papers': papers})
+            for author1, author2, weight, papers in state.get('edges', [])
+        )
+        for node in analyzer.graph.nodes():
+            if analyzer.is_hub(node):
+                analyzer.graph.nodes[node].update(is_paper_hub=True, paper_id=-node)
+        analyzer._rebuild_components()
+
+        if state.get('metrics') is not None:
+            analyzer._metrics_cache = {author_id: m for author_id, m in state['metrics']}
+            analyzer._metrics_stale = False
+
+        return analyzer
@@ -0,0 +1,105 @@
+"""
+網絡數據匯出格式
+Network Export Formats - 精簡 JSON（欄式陣列）與二進位（typed arrays）格式
+"""
+
+import math
+import struct
+import sys
+from array import array
+from typing import Dict
+
+# 二進位格式標頭：magic, 版本, 保留位, 節點數, 邊數, 名稱區塊位元組數（共 20 bytes，後續陣列 4-byte 對齊）
+BINARY_MAGIC = b'LRNW'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHIII')
+
+# 節點旗標
+FLAG_KEY_PERSON = 1
+FLAG_PAPER_HUB = 2
+
+
+def compact_network(network_data: Dict) -> Dict:
+    """
+    轉換為欄式 JSON：每個欄位一個陣列，連線以節點索引表示且不含論文列表
+
+    Args:
+        network_data: export_network_data() 的輸出（可含 x, y, community_id 等欄位）
+
+    Returns:
+        {'nodes': {欄位: [...]}, 'links': {'source': [...], 'target': [...], 'weight': [...]}}
+    """
+    nodes = network_data['nodes']
+    index = {node['id']: i for i, node in enumerate(nodes)}
+
+    columns = ['id', 'name', 'x', 'y', 'papers_count', 'degree', 'community_id', 'is_key_person', 'is_paper_hub']
+    node_columns = {
+        column: [node.get(column) for node in nodes]
+        for column in columns
+        if any(column in node for node in nodes)
+    }
+
+    links = network_data['links']
+    return {
+        'nodes': node_columns,
+        'links': {
+            'source': [index[link['source']] for link in links],
+            'target': [index[link['target']] for link in links],
+            'weight': [round(link['weight'], 4) for link in links]
+        },
+        'communities': network_data.get('communities', [])
+    }
+
+
+def encode_network_binary(network_data: Dict) -> bytes:
+    """
+    編碼為二進位 payload（little-endian），前端可直接以 typed arrays 讀取：
+
+        header       20 bytes（見 BINARY_HEADER）
+        Int32[N]     節點 ID
+        Float32[N]   x（NaN 表示沒有座標）
+        Float32[N]   y（NaN 表示沒有座標）
+        Int32[N]     論文數
+        Int32[N]     社群 ID（-1 表示無）
+        Int32[N]     旗標（1 = 關鍵人物，2 = 論文虛擬節點）
+        Uint32[E]    連線起點（節點索引）
+        Uint32[E]    連線終點（節點索引）
+        Float32[E]   權重
+        UTF-8        節點名稱，以換行分隔
+
+    Args:
+        network_data: export_network_data() 的輸出
+
+    Returns:
+        bytes
+    """
+    nodes = network_data['nodes']
+    links = network_data['links']
+    index = {node['id']: i for i, node in enumerate(nodes)}
+
+    def flags(node):
+        return (FLAG_KEY_PERSON if node.get('is_key_person') else 0) | \
+               (FLAG_PAPER_HUB if node.get('is_paper_hub') else 0)
+
+    community = [node.get('community_id') for node in nodes]
+    arrays = [
+        array('i', [node['id'] for node in nodes]),
+        array('f', [node.get('x', math.nan) for node in nodes]),
+        array('f', [node.get('y', math.nan) for node in nodes]),
+        array('i', [node.get('papers_count', 0) for node in nodes]),
+        array('i', [-1 if c is None else c for c in community]),
+        array('i', [flags(node) for node in nodes]),
+        array('I', [index[link['source']] for link in links]),
+        array('I', [index[link['target']] for link in links]),
+        array('f', [link['weight'] for link in links])
+    ]
+
+    if sys.byteorder != 'little':
+        for values in arrays:
+            values.byteswap()
+
+    names = '\n'.join(node.get('name', '').replace('\n', ' ') for node in nodes).encode('utf-8')
+    header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(nodes), len(links), len(names))
+
+    return header + b''.join(values.tobytes() for values in arrays) + names
+
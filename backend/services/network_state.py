@@ -0,0 +1,570 @@
+"""
+網絡狀態服務
+Network State Service - 載入、保存並增量更新專案的作者網絡，執行並保存網絡分析
+"""
+
+from flask import current_app
+from models import (
+    db, BackgroundJob, Paper, Author, PaperAuthor, NetworkState, NetworkArtifact, Collaboration,
+    ProjectAuthorCommunity, ProjectAuthorMetric
+)
+from services.network_analyzer import AuthorNetworkAnalyzer
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+
+# 影響力分數超過此值的作者標記為關鍵人物（閾值可調整）
+KEY_PERSON_THRESHOLD = 20
+
+
+def _paper_data(paper: Paper) -> Dict:
+    """論文在網絡分析器中保存的數據"""
+    return {
+        'year': paper.year,
+        'citation_count': paper.citation_count or 0,
+        'title': paper.title
+    }
+
+
+def _analyzer_options() -> Dict:
+    """從應用配置讀取網絡分析器參數"""
+    return {
+        'large_paper_threshold': current_app.config.get('NETWORK_LARGE_PAPER_THRESHOLD', 50),
+        'large_paper_strategy': current_app.config.get('NETWORK_LARGE_PAPER_STRATEGY', 'star')
+    }
+
+
+def collect_paper_authors(paper_ids: List[int]) -> Dict[int, List[Dict]]:
+    """
+    以單一查詢獲取多篇論文的作者列表
+
+    Args:
+        paper_ids: 論文 ID 列表
+
+    Returns:
+        字典，key 為 paper_id，value 為按作者順序排列的作者列表
+    """
+    if not paper_ids:
+        return {}
+
+    rows = db.session.query(
+        PaperAuthor.paper_id,
+        PaperAuthor.author_id,
+        PaperAuthor.author_position,
+        PaperAuthor.is_corresponding,
+        Author.name
+    ).join(Author, Author.id == PaperAuthor.author_id).filter(
+        PaperAuthor.paper_id.in_(paper_ids)
+    ).order_by(PaperAuthor.paper_id, PaperAuthor.author_position).all()
+
+    authors_by_paper = defaultdict(list)
+    for paper_id, author_id, position, is_corresponding, name in rows:
+        authors_by_paper[paper_id].append({
+            'id': author_id,
+            'name': name,
+            'position': position,
+            'is_corresponding': is_corresponding
+        })
+
+    return authors_by_paper
+
+
+def build_project_analyzer(project_id: int) -> AuthorNetworkAnalyzer:
+    """
+    從資料庫完整構建專案的作者網絡
+
+    Args:
+        project_id: 專案 ID
+
+    Returns:
+        AuthorNetworkAnalyzer 實例
+    """
+    analyzer = AuthorNetworkAnalyzer(**_analyzer_options())
+
+    papers = Paper.query.filter_by(project_id=project_id).all()
+    authors_by_paper = collect_paper_authors([paper.id for paper in papers])
+
+    for paper in papers:
+        analyzer.add_paper(paper.id, _paper_data(paper), authors_by_paper.get(paper.id, []))
+
+    return analyzer
+
+
+def load_project_analyzer(project_id: int) -> Tuple[AuthorNetworkAnalyzer, NetworkState]:
+    """
+    載入專案的持久化網絡狀態，不存在時從資料庫構建並保存
+
+    Args:
+        project_id: 專案 ID
+
+    Returns:
+        (analyzer, network_state)
+    """
+    network_state = NetworkState.query.filter_by(project_id=project_id).first()
+
+    if network_state and network_state.state is not None:
+        return AuthorNetworkAnalyzer.from_state(network_state.state), network_state
+
+    analyzer = build_project_analyzer(project_id)
+    network_state = save_project_analyzer(project_id, analyzer, network_state=network_state)
+    return analyzer, network_state
+
+
+def save_project_analyzer(project_id: int, analyzer: AuthorNetworkAnalyzer,
+                          network_state: Optional[NetworkState] = None,
+                          bump_revision: bool = False) -> NetworkState:
+    """
+    保存分析器狀態（不提交，由呼叫方控制事務）
+
+    Args:
+        project_id: 專案 ID
+        analyzer: 網絡分析器
+        network_state: 已載入的狀態記錄（可選）
+        bump_revision: 是否遞增版本號（網絡結構有變動時）
+
+    Returns:
+        NetworkState 記錄
+    """
+    if network_state is None:
+        network_state = NetworkState.query.filter_by(project_id=project_id).first()
+
+    if network_state is None:
+        network_state = NetworkState(project_id=project_id, revision=1)
+        db.session.add(network_state)
+    elif bump_revision:
+        network_state.revision = (network_state.revision or 0) + 1
+
+    network_state.state = analyzer.to_state()
+    db.session.flush()
+    return network_state
+
+
+def get_or_compute_artifact(project_id: int, kind: str, params: Dict,
+                            compute: Callable[[Optional[AuthorNetworkAnalyzer]], Any],
+                            analyzer: Optional[AuthorNetworkAnalyzer] = None,
+                            network_state: Optional[NetworkState] = None,
+                            needs_analyzer: bool = True) -> Any:
+    """
+    讀取按網絡版本快取的衍生結果，版本不一致或不存在時重新計算並保存（不提交）
+
+    Args:
+        project_id: 專案 ID
+        kind: 結果類型（如 timeline）
+        params: 計算參數（作為快取鍵的一部分）
+        compute: 計算函數，接收 AuthorNetworkAnalyzer，返回可 JSON 序列化的結果
+        analyzer: 已載入的分析器（可選，避免重複反序列化）
+        network_state: 已載入的狀態記錄（可選）
+        needs_analyzer: 計算是否需要作者網絡（False 時不反序列化，compute 收到 None）
+
+    Returns:
+        計算結果
+    """
+    if network_state is None:
+        # 命中快取時只需要版本號，延遲載入體積較大的 state 欄位
+        network_state = NetworkState.query.options(
+            db.defer(NetworkState.state)
+        ).filter_by(project_id=project_id).first()
+    if network_state is None:
+        analyzer, network_state = load_project_analyzer(project_id)
+
+    params_key = json.dumps(params, sort_keys=True)
+    artifact = NetworkArtifact.query.filter_by(
+        project_id=project_id, kind=kind, params_key=params_key
+    ).first()
+
+    if artifact and artifact.revision == network_state.revision:
+        return artifact.data
+
+    if analyzer is None and needs_analyzer:
+        analyzer = AuthorNetworkAnalyzer.from_state(network_state.state)
+
+    data = compute(analyzer)
+
+    if artifact is None:
+        artifact = NetworkArtifact(project_id=project_id, kind=kind, params_key=params_key)
+        db.session.add(artifact)
+    artifact.revision = network_state.revision
+    artifact.data = data
+    db.session.flush()
+
+    return data
+
+
+def get_cached_layout(project_id: int, method: str = 'auto',
+                      analyzer: Optional[AuthorNetworkAnalyzer] = None,
+                      network_state: Optional[NetworkState] = None) -> Optional[Dict[int, List[float]]]:
+    """
+    讀取或計算按網絡版本快取的節點座標
+
+    Args:
+        project_id: 專案 ID
+        method: 佈局方法（auto / spring / spectral / pivot_mds / none）
+
+    Returns:
+        字典，key 為節點 ID，value 為 [x, y]；method 為 none 時返回 None
+    """
+    if method == 'none':
+        return None
+
+    # JSON 物件的 key 只能是字串，因此以 [node, x, y] 列表保存
+    rows = get_or_compute_artifact(
+        project_id, 'layout', {'method': method},
+        lambda a: [[node, x, y] for node, (x, y) in a.compute_layout(method=method).items()],
+        analyzer=analyzer, network_state=network_state
+    )
+    return {node: [x, y] for node, x, y in rows}
+
+
+def read_cached_layout(project_id: int, method: str,
+                       network_state: NetworkState) -> Tuple[Optional[Dict[int, List[float]]], bool]:
+    """
+    只讀取已快取的節點座標（不計算）
+
+    Returns:
+        (座標, 是否為目前版本)；從未計算過時返回 (None, False)，
+        版本過期時返回上一版本的座標（新增的節點沒有座標）
+    """
+    artifact = NetworkArtifact.query.filter_by(
+        project_id=project_id, kind='layout', params_key=json.dumps({'method': method}, sort_keys=True)
+    ).first()
+    if artifact is None:
+        return None, False
+    return {node: [x, y] for node, x, y in artifact.data}, artifact.revision == network_state.revision
+
+
+def network_layout_job(context, project_id: int, method: str = 'auto') -> Dict:
+    """背景任務：計算並快取目前版本的節點座標"""
+    context.report_progress(0.0, '計算網絡佈局')
+    positions = get_cached_layout(project_id, method)
+    db.session.commit()
+    return {'method': method, 'nodes': len(positions or {})}
+
+
+def schedule_layout(project_id: int, user_id: int, method: str = 'auto') -> BackgroundJob:
+    """
+    排程計算節點座標（同一專案已有相同方法的佈局任務在排隊或執行時直接返回該任務）
+
+    Returns:
+        BackgroundJob
+    """
+    for job in BackgroundJob.query.filter(
+        BackgroundJob.project_id == project_id,
+        BackgroundJob.job_type == 'network_layout',
+        BackgroundJob.status.in_(('queued', 'running'))
+    ).all():
+        if (job.params or {}).get('method') == method:
+            return job
+
+    from services.background_jobs import submit_job
+    return submit_job(
+        'network_layout', user_id, network_layout_job,
+        project_id=project_id, params={'project_id': project_id, 'method': method}
+    )
+
+
+def get_community_map(project_id: int, resolution: float = 1.0, seed: Optional[int] = 42,
+                      analyzer: Optional[AuthorNetworkAnalyzer] = None,
+                      network_state: Optional[NetworkState] = None,
+                      communities: Optional[Dict[int, int]] = None) -> Dict[int, int]:
+    """
+    讀取或計算按網絡版本快取的社群劃分
+
+    Args:
+        project_id: 專案 ID
+        resolution: 社群檢測解析度
+        seed: 社群檢測隨機種子
+        communities: 已計算好的結果（分析流程中傳入，直接寫入快取）
+
+    Returns:
+        字典，key 為 author_id，value 為社群 ID
+    """
+    rows = get_or_compute_artifact(
+        project_id, 'communities', {'resolution': resolution, 'seed': seed},
+        lambda a: [
+            [author_id, community_id] for author_id, community_id in (
+                communities if communities is not None else a.detect_communities(resolution=resolution, seed=seed)
+            ).items()
+        ],
+        analyzer=analyzer, network_state=network_state
+    )
+    return {author_id: community_id for author_id, community_id in rows}
+
+
+def get_community_overview(project_id: int, resolution: float = 1.0, seed: Optional[int] = 42,
+                           analyzer: Optional[AuthorNetworkAnalyzer] = None,
+                           network_state: Optional[NetworkState] = None) -> Dict:
+    """
+    讀取或計算按網絡版本快取的社群超節點圖（層級式瀏覽的最上層）
+
+    Returns:
+        community_overview() 的結果
+    """
+    params = {'resolution': resolution, 'seed': seed}
+    return get_or_compute_artifact(
+        project_id, 'community_overview', params,
+        lambda a: a.community_overview(
+            get_community_map(project_id, resolution, seed, analyzer=a, network_state=network_state)
+        ),
+        analyzer=analyzer, network_state=network_state
+    )
+
+
+def get_community_members(project_id: int, community_id: int, resolution: float = 1.0,
+                          seed: Optional[int] = 42) -> Optional[Dict]:
+    """
+    讀取或計算按網絡版本快取的單一社群展開結果
+
+    Returns:
+        community_members() 的結果，社群不存在時返回 None
+    """
+    params = {'community_id': community_id, 'resolution': resolution, 'seed': seed}
+    return get_or_compute_artifact(
+        project_id, 'community_members', params,
+        lambda a: a.community_members(get_community_map(project_id, resolution, seed, analyzer=a), community_id)
+    )
+
+
+def _mark_metrics_stale(project_id: int):
+    """網絡結構改變後，將上次分析保存的專案作者指標標記為過期（不提交）"""
+    ProjectAuthorMetric.query.filter_by(project_id=project_id, is_stale=False).update(
+        {ProjectAuthorMetric.is_stale: True}, synchronize_session=False
+    )
+
+
+def _lock_network_state(project_id: int) -> Optional[NetworkState]:
+    """
+    以列鎖載入網絡狀態（SELECT ... FOR UPDATE，鎖持續到事務提交）
+
+    增量同步讀取、修改並寫回整份狀態，同一專案並行的導入或刪除必須依序執行，
+    否則後寫入者會以舊狀態覆蓋前者的變更
+    """
+    return NetworkState.query.filter_by(project_id=project_id).with_for_update().populate_existing().first()
+
+
+def _sync_analyzer(project_id: int, network_state: NetworkState,
+                   expected_ids: set) -> Tuple[AuthorNetworkAnalyzer, bool]:
+    """
+    還原增量同步使用的分析器；保存的論文與預期不一致時（狀態曾被覆蓋、或論文在同步之外被修改）從資料庫重建
+
+    Args:
+        project_id: 專案 ID
+        network_state: 已鎖定的狀態記錄
+        expected_ids: 此次增量更新前狀態應包含的論文 ID
+
+    Returns:
+        (analyzer, 是否從資料庫重建)
+    """
+    analyzer = AuthorNetworkAnalyzer.from_state(network_state.state)
+    if set(analyzer.papers) == expected_ids:
+        return analyzer, False
+
+    current_app.logger.warning(f"專案 {project_id} 的網絡狀態與論文不一致，從資料庫重建")
+    return build_project_analyzer(project_id), True
+
+
+def _project_paper_ids(project_id: int) -> set:
+    """專案目前的論文 ID（含同一事務中已 flush 的變更）"""
+    return {paper_id for paper_id, in db.session.query(Paper.id).filter(Paper.project_id == project_id)}
+
+
+def sync_papers_added(project_id: int, papers: List[Paper]):
+    """
+    論文新增後增量更新網絡（需在作者關聯 flush 之後呼叫）
+    若專案尚未建立網絡狀態則略過，首次分析時再完整構建
+
+    Args:
+        project_id: 專案 ID
+        papers: 新增的 Paper 列表
+    """
+    if not papers:
+        return
+    network_state = _lock_network_state(project_id)
+    if not network_state or network_state.state is None:
+        return
+
+    new_ids = {paper.id for paper in papers}
+    analyzer, rebuilt = _sync_analyzer(project_id, network_state, _project_paper_ids(project_id) - new_ids)
+    if not rebuilt:
+        authors_by_paper = collect_paper_authors(list(new_ids))
+        for paper in papers:
+            analyzer.add_paper(paper.id, _paper_data(paper), authors_by_paper.get(paper.id, []))
+
+    save_project_analyzer(project_id, analyzer, network_state=network_state, bump_revision=True)
+    _mark_metrics_stale(project_id)
+
+
+def sync_paper_updated(project_id: int, paper: Paper):
+    """
+    論文的年份或標題修改後更新網絡中的論文數據，並遞增版本號使快取的衍生結果（時間線、引用網絡等）失效；
+    作者與合作關係不變，不標記作者指標過期（狀態不一致而重建時除外）
+
+    Args:
+        project_id: 專案 ID
+        paper: 修改後的 Paper
+    """
+    network_state = _lock_network_state(project_id)
+    if not network_state or network_state.state is None:
+        return
+
+    analyzer, rebuilt = _sync_analyzer(project_id, network_state, _project_paper_ids(project_id))
+    if not rebuilt:
+        analyzer.add_paper(paper.id, _paper_data(paper), collect_paper_authors([paper.id]).get(paper.id, []))
+
+    save_project_analyzer(project_id, analyzer, network_state=network_state, bump_revision=True)
+    if rebuilt:
+        _mark_metrics_stale(project_id)
+
+
+def sync_paper_removed(project_id: int, paper_id: int):
+    """
+    論文刪除後增量更新網絡（需在刪除前呼叫）
+
+    Args:
+        project_id: 專案 ID
+        paper_id: 被刪除的論文 ID
+    """
+    network_state = _lock_network_state(project_id)
+    if not network_state or network_state.state is None:
+        return
+
+    analyzer, rebuilt = _sync_analyzer(project_id, network_state, _project_paper_ids(project_id))
+    if analyzer.remove_paper(paper_id) or rebuilt:
+        save_project_analyzer(project_id, analyzer, network_state=network_state, bump_revision=True)
+        _mark_metrics_stale(project_id)
+
+
+def run_project_analysis(project_id: int, resolution: float = 1.0, seed: Optional[int] = 42,
+                         processes: int = 1,
+                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                         before_write: Optional[Callable[[], None]] = None,
+                         check_cancelled: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    執行專案的網絡分析並保存結果（作者指標、研究社群、合作關係、網絡狀態）
+
+    Args:
+        project_id: 專案 ID
+        resolution: 社群檢測解析度
+        seed: 社群檢測隨機種子
+        processes: 中心性計算的行程數
+        progress_callback: 中心性計算進度回呼 (已完成批次, 總批次)
+        before_write: 寫入資料庫前的回呼（背景任務用於檢查取消）
+        check_cancelled: 中心性計算每完成一批後的取消檢查
+
+    Returns:
+        分析摘要（statistics, key_people_count, total_authors, community_count）
+    """
+    # 載入持久化的網絡狀態（不存在時從資料庫構建）
+    analyzer, network_state = load_project_analyzer(project_id)
+
+    # 計算中心性指標
+    metrics = analyzer.calculate_centrality_metrics(
+        processes=processes, progress_callback=progress_callback, check_cancelled=check_cancelled
+    )
+
+    # 識別關鍵人物
+    key_people = analyzer.identify_key_people(top_n=10)
+
+    # 檢測研究社群
+    communities = analyzer.detect_communities(resolution=resolution, seed=seed)
+    community_sizes = Counter(communities.values())
+
+    if before_write:
+        before_write()
+
+    # 保存專案內的作者指標（整批替換，不覆蓋其他專案的結果）
+    ProjectAuthorMetric.query.filter_by(project_id=project_id).delete()
+    db.session.bulk_insert_mappings(ProjectAuthorMetric, [
+        {
+            'project_id': project_id,
+            'author_id': author_id,
+            'papers_in_project': len(analyzer.authors[author_id]['papers']),
+            'citations_in_project': analyzer.authors[author_id]['citations'],
+            'first_author_count': analyzer.authors[author_id]['first_author_count'],
+            'degree': author_metrics['degree'],
+            'degree_centrality': author_metrics['degree_centrality'],
+            'betweenness_centrality': author_metrics['betweenness_centrality'],
+            'closeness_centrality': author_metrics['closeness_centrality'],
+            'pagerank': author_metrics['pagerank'],
+            'influence_score': author_metrics['influence_score'],
+            'is_key_person': author_metrics['influence_score'] > KEY_PERSON_THRESHOLD
+        }
+        for author_id, author_metrics in metrics.items()
+    ])
+
+    # 保存研究社群（整批替換專案的社群結果）
+    ProjectAuthorCommunity.query.filter_by(project_id=project_id).delete()
+    db.session.bulk_insert_mappings(ProjectAuthorCommunity, [
+        {
+            'project_id': project_id,
+            'author_id': author_id,
+            'community_id': community_id,
+            'community_size': community_sizes[community_id]
+        }
+        for author_id, community_id in communities.items()
+    ])
+
+    # 更新或創建合作關係（一次載入專案現有的合作記錄）
+    existing_collaborations = {
+        (c.author1_id, c.author2_id): c
+        for c in Collaboration.query.filter_by(project_id=project_id).all()
+    }
+
+    for author1_id, author2_id, edge_data in analyzer.graph.edges(data=True):
+        # 大型合作論文的虛擬節點不是作者
+        if analyzer.is_hub(author1_id) or analyzer.is_hub(author2_id):
+            continue
+
+        # 確保 author1_id < author2_id
+        if author1_id > author2_id:
+            author1_id, author2_id = author2_id, author1_id
+
+        # 論文年份直接取自分析器，無需逐篇查詢
+        years = [
+            analyzer.papers[pid]['year'] for pid in edge_data['papers']
+            if pid in analyzer.papers and analyzer.papers[pid].get('year')
+        ]
+
+        collaboration = existing_collaborations.pop((author1_id, author2_id), None)
+        if collaboration:
+            collaboration.collaboration_count = len(edge_data['papers'])
+            collaboration.collaboration_strength = edge_data['weight']
+            collaboration.first_collaboration_year = min(years) if years else None
+            collaboration.last_collaboration_year = max(years) if years else None
+        else:
+            collaboration = Collaboration(
+                author1_id=author1_id,
+                author2_id=author2_id,
+                project_id=project_id,
+                collaboration_count=len(edge_data['papers']),
+                first_collaboration_year=min(years) if years else None,
+                last_collaboration_year=max(years) if years else None,
+                collaboration_strength=edge_data['weight']
+            )
+            db.session.add(collaboration)
+
+    # 移除論文刪除後已不存在的合作關係
+    for collaboration in existing_collaborations.values():
+        db.session.delete(collaboration)
+
+    # 保存指標快取，下次分析若網絡未變動可直接重用
+    save_project_analyzer(project_id, analyzer, network_state=network_state)
+
+    # 預先計算預設佈局、社群超節點圖與年度演化序列，相關端點可直接讀取
+    get_cached_layout(project_id, 'auto', analyzer=analyzer, network_state=network_state)
+    get_community_map(project_id, resolution, seed, analyzer=analyzer, network_state=network_state,
+                      communities=communities)
+    get_community_overview(project_id, resolution, seed, analyzer=analyzer, network_state=network_state)
+    get_or_compute_artifact(
+        project_id, 'timeline', {'window': None, 'top_n': 10},
+        lambda a: a.temporal_snapshots(window=None, top_n=10),
+        analyzer=analyzer, network_state=network_state
+    )
+
+    db.session.commit()
+
+    return {
+        'statistics': analyzer.get_network_statistics(),
+        'key_people_count': len(key_people),
+        'total_authors': len(metrics),
+        'community_count': len(community_sizes)
+    }
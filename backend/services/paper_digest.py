@@ -0,0 +1,263 @@
+"""
+論文 AI 結構化摘要
+Paper Digest - 導入論文時以背景任務為每篇論文生成一次精簡的結構化摘要（研究問題、方法、資料、發現、限制），
+之後的每次分析都以摘要取代原始摘要構建提示，重複分析大型專案時不必重新閱讀每篇論文的全文摘要
+"""
+
+import hashlib
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import current_app
+
+from models import db, Paper, User, BackgroundJob
+from services.background_jobs import JobCancelled
+from services.prompt_budget import clean_abstract, clip_text, normalize_whitespace
+
+# 摘要提示模板版本：修改 AIPromptTemplates.paper_digest_prompt 或欄位定義時必須更新，使舊摘要失效
+DIGEST_TEMPLATE_VERSION = '2024-11-paper-digest-v1'
+
+# 摘要欄位與在提示中顯示的名稱
+DIGEST_FIELDS = (
+    ('problem', '問題'),
+    ('method', '方法'),
+    ('dataset', '資料'),
+    ('finding', '發現'),
+    ('limitation', '限制'),
+)
+
+# 生成摘要時引言與結論各取的 token 上限
+_SECTION_MAX_TOKENS = 600
+
+# 單一欄位的 token 上限
+_FIELD_MAX_TOKENS = 80
+
+_JSON_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+
+# 所有摘要任務共用的 API 請求名額（多次導入同時排程時，總並行數仍不超過 PAPER_DIGEST_CONCURRENCY）
+_request_slots = None
+_request_slots_lock = threading.Lock()
+
+
+def digest_source(paper) -> Dict:
+    """
+    生成摘要所用的論文內容（標題、清理後的摘要、引言與結論節錄）
+
+    Args:
+        paper: Paper 模型
+
+    Returns:
+        {'title', 'abstract', 'introduction', 'conclusion'}
+    """
+    return {
+        'title': normalize_whitespace(paper.title),
+        'abstract': clean_abstract(paper.abstract),
+        'introduction': clip_text(normalize_whitespace(paper.introduction), _SECTION_MAX_TOKENS),
+        'conclusion': clip_text(normalize_whitespace(paper.conclusion), _SECTION_MAX_TOKENS),
+    }
+
+
+def digest_source_hash(source: Dict) -> str:
+    """論文內容與摘要模板版本的 SHA-256"""
+    payload = dict(source, template_version=DIGEST_TEMPLATE_VERSION)
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def has_digest_source(source: Dict) -> bool:
+    """只有標題的論文不生成摘要（內容不足，摘要只會是臆測）"""
+    return any(source[field] for field in ('abstract', 'introduction', 'conclusion'))
+
+
+def current_digest(paper) -> Optional[Dict]:
+    """
+    論文目前有效的摘要（論文內容或模板版本改變後返回 None）
+
+    Args:
+        paper: Paper 模型
+
+    Returns:
+        摘要字典或 None
+    """
+    if not paper.digest or not paper.digest_hash:
+        return None
+    if paper.digest_hash != digest_source_hash(digest_source(paper)):
+        return None
+    return paper.digest
+
+
+def format_digest(digest: Dict) -> str:
+    """將摘要格式化為一行提示文字，例如「問題：…｜方法：…」"""
+    return '｜'.join(
+        f'{label}：{digest[field]}' for field, label in DIGEST_FIELDS if digest.get(field)
+    )
+
+
+def parse_digest(response_text: str) -> Dict:
+    """
+    解析 AI 回應中的 JSON 摘要
+
+    Args:
+        response_text: AI 回應
+
+    Returns:
+        {欄位: 文字}，未提及的欄位為空字串
+
+    Raises:
+        ValueError: 回應中沒有可用的摘要
+    """
+    match = _JSON_OBJECT.search(response_text or '')
+    try:
+        data = json.loads(match.group(0)) if match else None
+    except json.JSONDecodeError:
+        data = None
+    if not isinstance(data, dict):
+        raise ValueError('AI 回應不是有效的 JSON 摘要')
+
+    digest = {
+        field: clip_text(normalize_whitespace(str(data.get(field) or '')), _FIELD_MAX_TOKENS)
+        for field, _ in DIGEST_FIELDS
+    }
+    if not any(digest.values()):
+        raise ValueError('AI 回應的摘要欄位皆為空')
+    return digest
+
+
+def _slots(concurrency: int) -> threading.BoundedSemaphore:
+    """取得共用的請求名額（第一次使用時按設定建立）"""
+    global _request_slots
+    with _request_slots_lock:
+        if _request_slots is None:
+            _request_slots = threading.BoundedSemaphore(max(1, concurrency))
+        return _request_slots
+
+
+def paper_digest_job(context, project_id: int, user_id: int, paper_ids: Optional[List[int]] = None) -> Dict:
+    """
+    背景任務：為專案中缺少有效摘要的論文生成結構化摘要
+
+    每篇摘要完成後立即寫入（任務中途取消或失敗時，已完成的摘要保留，下次只處理剩餘的論文）。
+
+    Args:
+        context: JobContext
+        project_id: 專案 ID
+        user_id: 用戶 ID（用於取得 API Key）
+        paper_ids: 只處理這些論文（None 表示整個專案）
+
+    Returns:
+        {'papers_digested', 'papers_failed', 'papers_skipped', 'usage'}
+    """
+    from services.ai_analysis import AIAnalysisService
+    from services.analysis_jobs import resolve_api_key
+
+    api_key = resolve_api_key(User.query.get(user_id))
+    if not api_key:
+        raise ValueError('未設置 Anthropic API Key')
+
+    query = Paper.query.filter_by(project_id=project_id)
+    if paper_ids is not None:
+        query = query.filter(Paper.id.in_(paper_ids))
+
+    # 在主執行緒讀出論文內容，工作執行緒只呼叫 API、不存取資料庫
+    pending = []
+    skipped = 0
+    for paper in query.order_by(Paper.id).all():
+        source = digest_source(paper)
+        source_hash = digest_source_hash(source)
+        if not has_digest_source(source) or paper.digest_hash == source_hash:
+            skipped += 1
+            continue
+        pending.append((paper.id, source, source_hash))
+    db.session.commit()
+
+    if not pending:
+        return {'papers_digested': 0, 'papers_failed': 0, 'papers_skipped': skipped, 'usage': {}}
+
+    service = AIAnalysisService(api_key=api_key)
+    concurrency = current_app.config.get('PAPER_DIGEST_CONCURRENCY', 4)
+    slots = _slots(concurrency)
+
+    def digest_one(source):
+        with slots:
+            return service.digest_paper(source)
+
+    usage = {'input_tokens': 0, 'output_tokens': 0}
+    failures: Dict[int, str] = {}
+    context.report_progress(0.05, f'生成論文摘要：{len(pending)} 篇')
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(digest_one, source): (paper_id, source_hash)
+                   for paper_id, source, source_hash in pending}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                paper_id, source_hash = futures[future]
+                try:
+                    output = future.result()
+                except Exception as e:
+                    failures[paper_id] = str(e)
+                    continue
+
+                Paper.query.filter_by(id=paper_id).update({
+                    Paper.digest: output['digest'],
+                    Paper.digest_hash: source_hash,
+                    Paper.digest_model: service.model,
+                    Paper.digested_at: datetime.utcnow()
+                }, synchronize_session=False)
+                db.session.commit()
+                for field in usage:
+                    usage[field] += output['usage'].get(field, 0)
+
+                context.report_progress(0.05 + 0.95 * done / len(pending), f'生成論文摘要 {done}/{len(pending)}')
+                context.check_cancelled()
+        except JobCancelled:
+            for future in futures:
+                future.cancel()
+            raise
+
+    if len(failures) == len(pending):
+        raise ValueError(f'{len(failures)} 篇論文摘要全部失敗：{failures[min(failures)]}')
+
+    return {
+        'papers_digested': len(pending) - len(failures),
+        'papers_failed': len(failures),
+        'papers_skipped': skipped,
+        'usage': usage
+    }
+
+
+def schedule_paper_digests(project_id: int, user_id: int,
+                           paper_ids: Optional[List[int]] = None) -> Optional[BackgroundJob]:
+    """
+    排程生成論文摘要（論文導入後呼叫；未開啟 PAPER_DIGEST_ON_IMPORT 或用戶沒有 API Key 時不排程）
+
+    Args:
+        project_id: 專案 ID
+        user_id: 用戶 ID
+        paper_ids: 新增的論文 ID（None 表示補齊整個專案）
+
+    Returns:
+        BackgroundJob，未排程時返回 None
+    """
+    if paper_ids is not None and not paper_ids:
+        return None
+    if not current_app.config.get('PAPER_DIGEST_ON_IMPORT', True):
+        return None
+
+    from services.analysis_jobs import resolve_api_key
+    if not resolve_api_key(User.query.get(user_id)):
+        return None
+
+    from services.background_jobs import submit_job
+    return submit_job(
+        'paper_digest', user_id, paper_digest_job,
+        project_id=project_id,
+        params={
+            'project_id': project_id,
+            'user_id': user_id,
+            'paper_ids': list(paper_ids) if paper_ids is not None else None
+        }
+    )
@@ -0,0 +1,125 @@
+"""
+平行中心性計算
+Parallel Centrality - 按來源節點切分，在多個行程上計算介數與接近中心性後合併
+"""
+
+import multiprocessing
+import os
+import networkx as nx
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 工作行程中的共享圖（由 initializer 設置，每個行程只反序列化一次）
+_worker_graph = None
+
+
+def _init_worker(graph: nx.Graph):
+    """工作行程初始化"""
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _centrality_chunk(sources: List[int], weight: Optional[str]) -> Tuple[Dict[int, float], Dict[int, float]]:
+    """
+    計算一批來源節點的部分結果
+
+    Returns:
+        (未正規化的部分介數中心性, 這批節點的接近中心性)
+    """
+    graph = _worker_graph
+    betweenness = nx.betweenness_centrality_subset(
+        graph, sources, list(graph.nodes()), normalized=False, weight=weight
+    )
+    closeness = {source: nx.closeness_centrality(graph, u=source) for source in sources}
+    return betweenness, closeness
+
+
+def _compact_graph(graph: nx.Graph, weight: Optional[str]) -> nx.Graph:
+    """只保留計算所需的邊權重，減少傳給工作行程的數據量"""
+    compact = nx.Graph()
+    compact.add_nodes_from(graph.nodes())
+    if weight:
+        compact.add_weighted_edges_from(
+            (u, v, data.get(weight, 1)) for u, v, data in graph.edges(data=True)
+        )
+    else:
+        compact.add_edges_from(graph.edges())
+    return compact
+
+
+def _process_context():
+    """
+    工作行程的啟動方式：forkserver（不支援時用 spawn）
+
+    請求處理與背景任務在多執行緒中執行，fork 會複製其他執行緒持有的鎖與資料庫連線
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def default_process_count() -> int:
+    """預設行程數（CPU 核心數）"""
+    return os.cpu_count() or 1
+
+
+def parallel_centrality(graph: nx.Graph, processes: Optional[int] = None, weight: Optional[str] = 'weight',
+                        chunks_per_process: int = 4,
+                        progress_callback: Optional[Callable[[int, int], None]] = None,
+                        check_cancelled: Optional[Callable[[], None]] = None
+                        ) -> Tuple[Dict[int, float], Dict[int, float]]:
+    """
+    以行程池計算精確的介數中心性與接近中心性
+
+    介數中心性可按來源節點分解：各行程對分到的來源節點做單源最短路徑累加，
+    主行程將部分結果相加後再正規化，結果與 nx.betweenness_centrality 相同。
+
+    Args:
+        graph: 網絡圖
+        processes: 行程數（預設為 CPU 核心數）
+        weight: 介數中心性使用的邊權重屬性（與單核版本一致）
+        chunks_per_process: 每個行程分到的批次數，越多進度回報越細、負載越平均
+        progress_callback: 進度回呼 (已完成批次, 總批次)
+        check_cancelled: 每完成一批後呼叫，拋出例外時取消尚未開始的批次並向上拋出（背景任務用於檢查取消）
+
+    Returns:
+        (betweenness_centrality, closeness_centrality)
+    """
+    nodes = list(graph.nodes())
+    n = len(nodes)
+    if n == 0:
+        return {}, {}
+
+    processes = max(1, processes or default_process_count())
+    chunk_count = min(n, processes * chunks_per_process)
+    chunks = [nodes[i::chunk_count] for i in range(chunk_count)]
+
+    betweenness = dict.fromkeys(nodes, 0.0)
+    closeness = {}
+
+    compact = _compact_graph(graph, weight)
+    with ProcessPoolExecutor(max_workers=processes, mp_context=_process_context(),
+                             initializer=_init_worker, initargs=(compact,)) as executor:
+        futures = [executor.submit(_centrality_chunk, chunk, weight) for chunk in chunks]
+
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                partial_betweenness, partial_closeness = future.result()
+                for node, value in partial_betweenness.items():
+                    betweenness[node] += value
+                closeness.update(partial_closeness)
+
+                if progress_callback:
+                    progress_callback(done, chunk_count)
+                if check_cancelled and done < chunk_count:
+                    check_cancelled()
+        except BaseException:
+            # 不等待排隊中的批次（離開 with 時只等待執行中的批次）
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    # 與 nx.betweenness_centrality(normalized=True) 相同的無向圖正規化
+    scale = 2 / ((n - 1) * (n - 2)) if n > 2 else None
+    if scale is not None:
+        betweenness = {node: value * scale for node, value in betweenness.items()}
+
+    return betweenness, closeness
@@ -175,7 +175,11 @@ class DOIResolver:
                 authors.append({
                     'first_name': author.get('given', ''),
                     'last_name': author.get('family', ''),
-                    'full_name': f"{author.get('given', '')} {author.get('family', '')}".strip()
+                    'full_name': f"{author.get('given', '')} {author.get('family', '')}".strip(),
+                    # 作者在此論文中的單位（Crossref 可能提供多個）
+                    'affiliation': '; '.join(
+                        a['name'] for a in author.get('affiliation', []) if a.get('name')
+                    ) or None
                 })
 
         # 提取年份
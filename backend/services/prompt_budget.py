@@ -0,0 +1,145 @@
+"""
+提示 token 預算
+Prompt Budget - 不呼叫 API 的本地 token 估算，以及把提示壓縮到預算內的工具：
+清理摘要樣板文字、截斷過長摘要、按引用數與年份覆蓋挑選論文、回報各段落的 token 數
+"""
+
+import math
+import re
+from typing import Dict, List
+
+# 英文與程式碼約 4 個字元一個 token；中日韓文字約每字一個 token
+_ASCII_CHARS_PER_TOKEN = 4.0
+_NON_ASCII_TOKENS_PER_CHAR = 1.0
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文字的 token 數（偏保守，寧可高估）
+
+    Args:
+        text: 文字
+
+    Returns:
+        估算的 token 數
+    """
+    if not text:
+        return 0
+    non_ascii = len(_NON_ASCII.findall(text))
+    ascii_chars = len(text) - non_ascii
+    return math.ceil(ascii_chars / _ASCII_CHARS_PER_TOKEN + non_ascii * _NON_ASCII_TOKENS_PER_CHAR)
+
+
+# 摘要中常見、對分析沒有幫助的樣板文字
+_BOILERPLATE = [
+    re.compile(r'<[^>]+>'),  # JATS / HTML 標籤（Crossref 摘要常見）
+    re.compile(r'^\s*(?:abstract|摘要)\s*[:：.\-]?\s*', re.IGNORECASE),
+    re.compile(r'(?:©|\(c\)\s*\d{4}|copyright\s*(?:©|\d{4}))[^.。]*(?:[.。]|$)', re.IGNORECASE),
+    re.compile(r'all rights reserved\.?', re.IGNORECASE),
+    re.compile(r'published by [^\n]{0,80}$', re.IGNORECASE),
+    re.compile(r'this article is protected by copyright\.?', re.IGNORECASE),
+    re.compile(r'\s*(?:keywords?|index terms|關鍵詞|關鍵字)\s*[:：—-].*$', re.IGNORECASE | re.DOTALL),
+]
+
+# 截斷時優先停在句子結尾
+_SENTENCE_END = re.compile(r'[.!?。！？；;](?:\s|$)')
+
+
+def normalize_whitespace(text: str) -> str:
+    """合併連續空白"""
+    return ' '.join((text or '').split())
+
+
+def clean_abstract(text: str) -> str:
+    """
+    清理摘要：移除 HTML 標籤、版權聲明、「Abstract:」前綴與關鍵詞列表，並合併空白
+
+    Args:
+        text: 原始摘要
+
+    Returns:
+        清理後的摘要
+    """
+    if not text:
+        return ''
+    for pattern in _BOILERPLATE:
+        text = pattern.sub(' ', text)
+    return normalize_whitespace(text)
+
+
+def clip_text(text: str, max_tokens: int) -> str:
+    """
+    將文字截斷到 token 上限內，盡量停在句子結尾
+
+    Args:
+        text: 文字
+        max_tokens: token 上限
+
+    Returns:
+        未超出上限時返回原文，否則返回截斷後加上「…」的文字
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # 二分搜尋不超出上限的最長前綴（保留「…」的一個 token）
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens - 1:
+            low = middle
+        else:
+            high = middle - 1
+    clipped = text[:low]
+
+    # 句子結尾在後 40% 內時停在句尾，否則直接截斷
+    ends = [match.end() for match in _SENTENCE_END.finditer(clipped)]
+    if ends and ends[-1] >= len(clipped) * 0.6:
+        clipped = clipped[:ends[-1]]
+    return clipped.rstrip() + '…'
+
+
+def select_within_budget(papers: List[Dict], sizes: List[int], budget: int) -> List[int]:
+    """
+    論文總量超出預算時，按優先順序挑選保留的論文
+
+    先保留每個年份被引用最多的一篇（維持時間覆蓋，年份代表論文本身超出預算時按引用數取捨），
+    再按引用數由高到低（同引用數時較新的優先）填滿預算。
+
+    Args:
+        papers: 論文列表（含 year, citation_count）
+        sizes: 每篇論文的 token 數
+        budget: token 預算
+
+    Returns:
+        保留的論文索引（按原始順序）
+    """
+    def priority(i):
+        return (-(papers[i].get('citation_count') or 0), -(papers[i].get('year') or 0), i)
+
+    by_year: Dict = {}
+    for i in sorted(range(len(papers)), key=priority):
+        by_year.setdefault(papers[i].get('year'), i)
+
+    kept = set()
+    used = 0
+    for i in sorted(by_year.values(), key=priority) + sorted(range(len(papers)), key=priority):
+        if i not in kept and used + sizes[i] <= budget:
+            kept.add(i)
+            used += sizes[i]
+    return sorted(kept)
+
+
+def token_report(sections: Dict[str, str]) -> Dict:
+    """
+    各段落的 token 估算
+
+    Args:
+        sections: {段落名稱: 文字}
+
+    Returns:
+        {'sections': {段落名稱: token 數}, 'total': 總數}
+    """
+    counts = {name: estimate_tokens(text) for name, text in sections.items()}
+    return {'sections': counts, 'total': sum(counts.values())}
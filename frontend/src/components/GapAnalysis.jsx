@@ -1,8 +1,10 @@
 import { useState, useEffect } from 'react'
 import api from '../services/api'
+import { analysisService } from '../services/analysis'
 
 export default function GapAnalysis({ projectId, paperCount }) {
   const [analyzing, setAnalyzing] = useState(false)
+  const [progressMessage, setProgressMessage] = useState('')
   const [analyses, setAnalyses] = useState([])
   const [currentAnalysis, setCurrentAnalysis] = useState(null)
   const [error, setError] = useState('')
@@ -36,20 +38,17 @@ export default function GapAnalysis({ projectId, paperCount }) {
 
     try {
       const title = `AI 分析報告`
-      const response = await api.post(`/api/analysis/projects/${projectId}/analyze`, {
-        analysis_type: 'comprehensive',
-        title
-      })
+      const job = await analysisService.startAnalysis(projectId, { analysisType: 'comprehensive', title })
+      const analysis = await analysisService.waitForAnalysis(job.id, (current) => setProgressMessage(current.message || ''))
 
-      if (response.data.success) {
-        setCurrentAnalysis(response.data.analysis)
-        loadAnalyses()
-        alert('AI 分析完成！')
-      }
+      setCurrentAnalysis(analysis)
+      loadAnalyses()
+      alert('AI 分析完成！')
     } catch (err) {
-      setError(err.response?.data?.error || err.response?.data?.message || '分析失敗')
+      setError(err.response?.data?.error || err.response?.data?.message || err.message || '分析失敗')
     } finally {
       setAnalyzing(false)
+      setProgressMessage('')
     }
   }
 
@@ -79,7 +78,7 @@ export default function GapAnalysis({ projectId, paperCount }) {
           disabled={analyzing || paperCount < 3}
           className="bg-purple-600 text-white px-6 py-3 rounded-lg hover:bg-purple-700 transition disabled:opacity-50"
         >
-          {analyzing ? '分析中...' : '🤖 開始 AI 分析'}
+          {analyzing ? (progressMessage || '分析中...') : '🤖 開始 AI 分析'}
         </button>
       </div>
 
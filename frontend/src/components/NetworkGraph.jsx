@@ -1,6 +1,7 @@
 /**
  * 網絡圖組件
- * Network Graph Component - 使用 D3.js 繪製力導向圖
+ * Network Graph Component - 使用 D3.js 繪製合作網絡
+ * 節點帶有伺服器端預先計算的座標時直接繪製，否則退回瀏覽器端力導向模擬
  */
 
 import { useEffect, useRef } from 'react';
@@ -30,20 +31,52 @@ export default function NetworkGraph({ data, onNodeClick }) {
       .attr('height', height)
       .attr('viewBox', [0, 0, width, height]);
 
-    // 創建力導向模擬
-    const simulation = d3
-      .forceSimulation(data.nodes)
-      .force(
-        'link',
-        d3
-          .forceLink(data.links)
-          .id((d) => d.id)
-          .distance(100)
-          .strength(0.5)
-      )
-      .force('charge', d3.forceManyBody().strength(-300))
-      .force('center', d3.forceCenter(width / 2, height / 2))
-      .force('collision', d3.forceCollide().radius(30));
+    // 社群顏色
+    const communityColor = d3.scaleOrdinal(d3.schemeTableau10);
+
+    // 複製節點與連線，避免 D3 修改傳入的數據
+    const nodes = data.nodes.map((d) => ({ ...d }));
+    const links = data.links.map((d) => ({ ...d }));
+
+    // 伺服器端座標範圍為 [-1, 1]，縮放到畫布內並保留邊距；沒有座標的節點交給力導向模擬放置
+    const positioned = (d) => Number.isFinite(d.x) && Number.isFinite(d.y);
+    const hasLayout = nodes.every(positioned);
+    const margin = 30;
+    const scaleX = d3.scaleLinear().domain([-1, 1]).range([margin, width - margin]);
+    const scaleY = d3.scaleLinear().domain([-1, 1]).range([margin, height - margin]);
+    nodes.forEach((d) => {
+      if (positioned(d)) {
+        d.x = scaleX(d.x);
+        d.y = scaleY(d.y);
+      } else {
+        delete d.x;
+        delete d.y;
+      }
+    });
+
+    // 連線端點指向節點物件
+    const nodeById = new Map(nodes.map((d) => [d.id, d]));
+    links.forEach((d) => {
+      d.source = nodeById.get(d.source) || d.source;
+      d.target = nodeById.get(d.target) || d.target;
+    });
+
+    // 沒有預先計算的座標時才建立力導向模擬
+    const simulation = hasLayout
+      ? null
+      : d3
+          .forceSimulation(nodes)
+          .force(
+            'link',
+            d3
+              .forceLink(links)
+              .id((d) => d.id)
+              .distance(100)
+              .strength(0.5)
+          )
+          .force('charge', d3.forceManyBody().strength(-300))
+          .force('center', d3.forceCenter(width / 2, height / 2))
+          .force('collision', d3.forceCollide().radius(30));
 
     // 創建縮放行為
     const zoom = d3.zoom()
@@ -61,7 +94,7 @@ export default function NetworkGraph({ data, onNodeClick }) {
     const link = g
       .append('g')
       .selectAll('line')
-      .data(data.links)
+      .data(links)
       .join('line')
       .attr('stroke', '#999')
       .attr('stroke-opacity', 0.6)
@@ -71,7 +104,7 @@ export default function NetworkGraph({ data, onNodeClick }) {
     const node = g
       .append('g')
       .selectAll('circle')
-      .data(data.nodes)
+      .data(nodes)
       .join('circle')
       .attr('r', (d) => {
         // 根據論文數量調整節點大小
@@ -80,18 +113,26 @@ export default function NetworkGraph({ data, onNodeClick }) {
         return Math.min(size, 20); // 最大半徑 20
       })
       .attr('fill', (d) => {
+        // 大型合作論文的虛擬節點
+        if (d.is_paper_hub) {
+          return '#9ca3af'; // 灰色
+        }
+        // 按研究社群（學術陣營）著色
+        if (d.community_id !== null && d.community_id !== undefined) {
+          return communityColor(d.community_id);
+        }
         // 關鍵人物使用不同顏色
         if (d.is_key_person) {
           return '#f59e0b'; // 琥珀色
         }
         return '#3b82f6'; // 藍色
       })
-      .attr('stroke', '#fff')
+      .attr('stroke', (d) => (d.is_key_person && d.community_id != null ? '#f59e0b' : '#fff'))
       .attr('stroke-width', 2)
       .style('cursor', 'pointer')
       .on('click', (event, d) => {
         event.stopPropagation();
-        if (onNodeClick) {
+        if (onNodeClick && !d.is_paper_hub) {
           onNodeClick(d.id);
         }
       })
@@ -114,8 +155,9 @@ export default function NetworkGraph({ data, onNodeClick }) {
             `
             <div class="font-semibold">${d.name}</div>
             <div class="text-xs mt-1">論文: ${d.papers_count || 0}</div>
-            <div class="text-xs">引用: ${d.citations || 0}</div>
-            <div class="text-xs">第一作者: ${d.first_author_count || 0}</div>
+            ${d.citations != null ? `<div class="text-xs">引用: ${d.citations}</div>` : ''}
+            ${d.first_author_count != null ? `<div class="text-xs">第一作者: ${d.first_author_count}</div>` : ''}
+            ${d.community_id != null ? `<div class="text-xs">社群: #${d.community_id + 1}${d.community_size != null ? `（${d.community_size} 人）` : ''}</div>` : ''}
             ${d.is_key_person ? '<div class="text-xs text-yellow-600 font-semibold mt-1">關鍵人物</div>' : ''}
           `
           )
@@ -149,7 +191,7 @@ export default function NetworkGraph({ data, onNodeClick }) {
     const label = g
       .append('g')
       .selectAll('text')
-      .data(data.nodes)
+      .data(nodes)
       .join('text')
       .text((d) => {
         // 只顯示關鍵人物或論文數 >= 3 的作者名字
@@ -183,7 +225,7 @@ export default function NetworkGraph({ data, onNodeClick }) {
       .style('z-index', '1000');
 
     // 更新位置
-    simulation.on('tick', () => {
+    function render() {
       link
         .attr('x1', (d) => d.source.x)
         .attr('y1', (d) => d.source.y)
@@ -193,21 +235,35 @@ export default function NetworkGraph({ data, onNodeClick }) {
       node.attr('cx', (d) => d.x).attr('cy', (d) => d.y);
 
       label.attr('x', (d) => d.x).attr('y', (d) => d.y);
-    });
+    }
+
+    if (simulation) {
+      simulation.on('tick', render);
+    } else {
+      render();
+    }
 
-    // 拖拽函數
+    // 拖拽函數（使用預先計算的座標時直接移動節點）
     function dragStarted(event) {
+      if (!simulation) return;
       if (!event.active) simulation.alphaTarget(0.3).restart();
       event.subject.fx = event.subject.x;
       event.subject.fy = event.subject.y;
     }
 
     function dragged(event) {
+      if (!simulation) {
+        event.subject.x = event.x;
+        event.subject.y = event.y;
+        render();
+        return;
+      }
       event.subject.fx = event.x;
       event.subject.fy = event.y;
     }
 
     function dragEnded(event) {
+      if (!simulation) return;
       if (!event.active) simulation.alphaTarget(0);
       event.subject.fx = null;
       event.subject.fy = null;
@@ -215,7 +271,7 @@ export default function NetworkGraph({ data, onNodeClick }) {
 
     // 清理函數
     return () => {
-      simulation.stop();
+      if (simulation) simulation.stop();
       tooltip.remove();
     };
   }, [data, onNodeClick]);
@@ -6,6 +6,7 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import api from '../services/api';
+import { analysisService } from '../services/analysis';
 import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
 
@@ -18,8 +19,11 @@ export default function AIAnalysis() {
   const [currentAnalysis, setCurrentAnalysis] = useState(null);
   const [loading, setLoading] = useState(true);
   const [analyzing, setAnalyzing] = useState(false);
+  const [analysisJob, setAnalysisJob] = useState(null);
   const [apiKeyConfigured, setApiKeyConfigured] = useState(false);
   const [showAnalyzeModal, setShowAnalyzeModal] = useState(false);
+  const [forceRefresh, setForceRefresh] = useState(false);
+  const [estimate, setEstimate] = useState(null);
 
   useEffect(() => {
     fetchProject();
@@ -55,6 +59,16 @@ export default function AIAnalysis() {
     }
   };
 
+  const openAnalyzeModal = async () => {
+    setShowAnalyzeModal(true);
+    setEstimate(null);
+    try {
+      setEstimate(await analysisService.estimate(projectId));
+    } catch (error) {
+      console.error('估算 token 失敗:', error);
+    }
+  };
+
   const checkApiKey = async () => {
     try {
       const response = await api.get('/api/analysis/check-api-key');
@@ -64,27 +78,56 @@ export default function AIAnalysis() {
     }
   };
 
-  const handleAnalyze = async (analysisType = 'comprehensive', title = '') => {
+  const handleAnalyze = async (analysisType = 'comprehensive', title = '', mode = 'auto') => {
     try {
       setAnalyzing(true);
       setShowAnalyzeModal(false);
 
-      const response = await api.post(`/api/analysis/projects/${projectId}/analyze`, {
-        analysis_type: analysisType,
-        title: title || `${project.name} - AI 分析報告`
+      // 分析在背景執行，以 SSE 即時顯示生成中的內容
+      const reportTitle = title || `${project.name} - AI 分析報告`;
+      const job = await analysisService.startAnalysis(projectId, {
+        analysisType,
+        title: reportTitle,
+        forceRefresh,
+        mode
+      });
+      setAnalysisJob(job);
+      setCurrentAnalysis({
+        id: null,
+        title: reportTitle,
+        full_text: '',
+        status: 'generating',
+        generated_at: new Date().toISOString(),
+        papers_analyzed: project.paper_count
       });
 
-      if (response.data.success) {
-        alert('AI 分析完成！');
-        await fetchAnalyses();
-        setCurrentAnalysis(response.data.analysis);
-      }
+      const analysis = await analysisService.streamAnalysis(job.id, {
+        onText: (text) => setCurrentAnalysis((current) => ({ ...current, full_text: text })),
+        onStatus: (status) => setAnalysisJob((current) => ({ ...current, ...status }))
+      });
+      alert('AI 分析完成！');
+      await fetchAnalyses();
+      setCurrentAnalysis(analysis);
     } catch (error) {
       console.error('AI 分析失敗:', error);
-      const errorMsg = error.response?.data?.error || error.response?.data?.message || '分析失敗';
+      const errorMsg = error.response?.data?.error || error.response?.data?.message || error.message || '分析失敗';
       alert('AI 分析失敗：' + errorMsg);
+      // 移除未完成的報告
+      setCurrentAnalysis(null);
+      await fetchAnalyses();
     } finally {
       setAnalyzing(false);
+      setAnalysisJob(null);
+    }
+  };
+
+  const handleCancelAnalysis = async () => {
+    if (!analysisJob) return;
+
+    try {
+      setAnalysisJob(await analysisService.cancelJob(analysisJob.id));
+    } catch (error) {
+      console.error('取消分析失敗:', error);
     }
   };
 
@@ -177,7 +220,7 @@ export default function AIAnalysis() {
                 </div>
               )}
               <button
-                onClick={() => setShowAnalyzeModal(true)}
+                onClick={openAnalyzeModal}
                 disabled={analyzing || !apiKeyConfigured}
                 className={`px-6 py-2 rounded-lg font-medium transition-colors ${
                   analyzing || !apiKeyConfigured
@@ -185,8 +228,16 @@ export default function AIAnalysis() {
                     : 'bg-blue-600 text-white hover:bg-blue-700'
                 }`}
               >
-                {analyzing ? '分析中...' : '+ 新增分析'}
+                {analyzing ? (analysisJob?.message || '分析中...') : '+ 新增分析'}
               </button>
+              {analyzing && analysisJob && !analysisJob.cancel_requested && (
+                <button
+                  onClick={handleCancelAnalysis}
+                  className="px-4 py-2 rounded-lg font-medium text-gray-600 hover:text-gray-800 border border-gray-300"
+                >
+                  取消
+                </button>
+              )}
             </div>
           </div>
         </div>
@@ -247,7 +298,7 @@ export default function AIAnalysis() {
                   <div className="p-8 text-center text-gray-500">
                     <p className="mb-2">尚無分析報告</p>
                     <button
-                      onClick={() => setShowAnalyzeModal(true)}
+                      onClick={openAnalyzeModal}
                       disabled={!apiKeyConfigured}
                       className="text-blue-600 hover:text-blue-700 text-sm"
                     >
@@ -275,19 +326,33 @@ export default function AIAnalysis() {
                         <span>分析論文：{currentAnalysis.papers_analyzed} 篇</span>
                         <span>•</span>
                         <span>模型：{currentAnalysis.model_used || 'Claude'}</span>
+                        {currentAnalysis.status === 'generating' && (
+                          <>
+                            <span>•</span>
+                            <span className="text-amber-600" title="報告尚未生成完成，完成前無法匯出">生成中</span>
+                          </>
+                        )}
+                        {currentAnalysis.cache_hit && (
+                          <>
+                            <span>•</span>
+                            <span className="text-green-600" title="論文集與設定未變更，直接使用先前的分析結果">快取結果</span>
+                          </>
+                        )}
                       </div>
                     </div>
                     <div className="flex items-center space-x-2 ml-4">
                       <button
                         onClick={handleExportMarkdown}
-                        className="px-4 py-2 text-sm font-medium text-gray-700 bg-white border border-gray-300 rounded-lg hover:bg-gray-50 transition-colors"
+                        disabled={currentAnalysis.status === 'generating'}
+                        className="px-4 py-2 text-sm font-medium text-gray-700 bg-white border border-gray-300 rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
                         title="匯出 Markdown"
                       >
                         📝 Markdown
                       </button>
                       <button
                         onClick={handleExportDocx}
-                        className="px-4 py-2 text-sm font-medium text-white bg-blue-600 border border-blue-600 rounded-lg hover:bg-blue-700 transition-colors"
+                        disabled={currentAnalysis.status === 'generating'}
+                        className="px-4 py-2 text-sm font-medium text-white bg-blue-600 border border-blue-600 rounded-lg hover:bg-blue-700 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
                         title="匯出 Word 文件"
                       >
                         📄 Word
@@ -354,12 +419,34 @@ export default function AIAnalysis() {
               選擇分析類型
             </h3>
 
+            {estimate && (
+              <div className="mb-4 p-3 bg-gray-50 border border-gray-200 rounded-lg text-sm text-gray-600">
+                <div>
+                  預估輸入約 <strong>{estimate.prompt.total.toLocaleString()}</strong> tokens
+                  （指示 {estimate.prompt.sections.instructions.toLocaleString()}、
+                  專案 {estimate.prompt.sections.project.toLocaleString()}、
+                  論文 {estimate.prompt.sections.papers.toLocaleString()}），
+                  輸出上限 {estimate.prompt.max_output_tokens.toLocaleString()} tokens
+                </div>
+                {estimate.mode === 'map_reduce' && (
+                  <div className="mt-1">
+                    論文集超出單次分析上限，將分 {estimate.batches.length} 批摘要後合併
+                  </div>
+                )}
+              </div>
+            )}
+
             <div className="space-y-3">
               <AnalysisTypeOption
                 title="綜合分析（推薦）"
                 description="一次性完整分析：領域發展史、核心問題、方法演進、研究缺口、學術爭議、研究方向建議"
                 onClick={() => handleAnalyze('comprehensive')}
               />
+              <AnalysisTypeOption
+                title="綜合分析（分段並行）"
+                description="六個段落同時生成後合併，速度較快、每段篇幅更完整，但論文集會隨每個段落重複送出"
+                onClick={() => handleAnalyze('comprehensive', '', 'sections')}
+              />
               <AnalysisTypeOption
                 title="領域發展史"
                 description="分析研究領域的起源、發展階段、重要突破和當前狀態"
@@ -385,9 +472,22 @@ export default function AIAnalysis() {
                 description="識別領域內的爭議點和不同學派的觀點"
                 onClick={() => handleAnalyze('controversies')}
               />
+              <AnalysisTypeOption
+                title="研究方向建議"
+                description="提出具體、可行且能填補缺口的未來研究方向"
+                onClick={() => handleAnalyze('research_directions')}
+              />
             </div>
 
-            <div className="mt-6 flex justify-end">
+            <div className="mt-6 flex items-center justify-between">
+              <label className="flex items-center gap-2 text-sm text-gray-600">
+                <input
+                  type="checkbox"
+                  checked={forceRefresh}
+                  onChange={(e) => setForceRefresh(e.target.checked)}
+                />
+                重新生成（不使用快取的結果）
+              </label>
               <button
                 onClick={() => setShowAnalyzeModal(false)}
                 className="px-4 py-2 text-gray-700 hover:text-gray-900"
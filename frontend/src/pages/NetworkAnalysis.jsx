@@ -6,8 +6,13 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import api from '../services/api';
+import { networkService } from '../services/network';
 import NetworkGraph from '../components/NetworkGraph';
 
+// 佈局仍在背景計算時重新獲取網絡的間隔（毫秒）與次數上限
+const LAYOUT_RETRY_DELAY = 5000;
+const MAX_LAYOUT_RETRIES = 12;
+
 export default function NetworkAnalysis() {
   const { projectId } = useParams();
   const navigate = useNavigate();
@@ -15,6 +20,7 @@ export default function NetworkAnalysis() {
   const [project, setProject] = useState(null);
   const [networkData, setNetworkData] = useState(null);
   const [keyPeople, setKeyPeople] = useState([]);
+  const [keyPeopleStale, setKeyPeopleStale] = useState(false);
   const [statistics, setStatistics] = useState(null);
   const [loading, setLoading] = useState(true);
   const [analyzing, setAnalyzing] = useState(false);
@@ -39,12 +45,15 @@ export default function NetworkAnalysis() {
     }
   };
 
-  const fetchNetworkData = async () => {
+  const fetchNetworkData = async (retries = 0) => {
     try {
-      setLoading(true);
-      const response = await api.get(`/api/network/projects/${projectId}/network`);
-      if (response.data.success) {
-        setNetworkData(response.data.network);
+      if (retries === 0) setLoading(true);
+      // 二進位格式，節點座標由伺服器端預先計算
+      const network = await networkService.getNetwork(projectId);
+      setNetworkData(network);
+      // 大型網絡的佈局在背景計算：稍後重新獲取座標
+      if (network.layoutPending && retries < MAX_LAYOUT_RETRIES) {
+        setTimeout(() => fetchNetworkData(retries + 1), LAYOUT_RETRY_DELAY);
       }
     } catch (error) {
       console.error('獲取網絡數據失敗:', error);
@@ -58,6 +67,7 @@ export default function NetworkAnalysis() {
       const response = await api.get(`/api/network/projects/${projectId}/key-people`);
       if (response.data.success) {
         setKeyPeople(response.data.key_people);
+        setKeyPeopleStale(response.data.stale);
       }
     } catch (error) {
       console.error('獲取關鍵人物失敗:', error);
@@ -98,7 +108,10 @@ export default function NetworkAnalysis() {
 
   const handleNodeClick = async (authorId) => {
     try {
-      const response = await api.get(`/api/network/authors/${authorId}`);
+      // 使用本專案的網絡指標；回應帶 ETag，重複開啟時由瀏覽器快取重新驗證
+      const response = await api.get(`/api/network/authors/${authorId}`, {
+        params: { project_id: projectId, include: 'author' }
+      });
       if (response.data.success) {
         setSelectedAuthor(response.data.author);
       }
@@ -233,6 +246,11 @@ export default function NetworkAnalysis() {
                 <p className="text-sm text-gray-500 mt-1">
                   按影響力排序
                 </p>
+                {keyPeopleStale && (
+                  <p className="text-sm text-amber-600 mt-1">
+                    分析後論文已有變動，請重新分析以更新指標
+                  </p>
+                )}
               </div>
               <div className="divide-y max-h-[600px] overflow-y-auto">
                 {keyPeople.length > 0 ? (
@@ -6,6 +6,7 @@
 import { useState, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
 import api from '../services/api'
+import { analysisService } from '../services/analysis'
 
 export default function Settings() {
   const navigate = useNavigate()
@@ -19,6 +20,7 @@ export default function Settings() {
   const [showApiKey, setShowApiKey] = useState(false)
   const [hasApiKey, setHasApiKey] = useState(false)
   const [apiKeyMessage, setApiKeyMessage] = useState('')
+  const [usage, setUsage] = useState(null)
 
   // 個人資料
   const [fullName, setFullName] = useState('')
@@ -44,6 +46,9 @@ export default function Settings() {
         setHasApiKey(userData.has_anthropic_api_key || false)
       }
 
+      // 載入 AI 用量統計（失敗不影響其他設定）
+      analysisService.getUsage().then(setUsage).catch((error) => console.error('載入用量統計失敗:', error))
+
     } catch (error) {
       console.error('載入設定失敗:', error)
       alert('載入設定失敗')
@@ -246,6 +251,51 @@ export default function Settings() {
             </div>
           </div>
 
+          {/* AI 用量統計 */}
+          {usage && (
+            <div className="bg-white rounded-lg shadow p-6">
+              <h2 className="text-xl font-semibold text-gray-800 mb-4">📊 AI 分析用量</h2>
+
+              <div className="grid grid-cols-2 md:grid-cols-4 gap-4 text-center">
+                <div>
+                  <div className="text-2xl font-bold text-gray-900">{usage.analyses}</div>
+                  <div className="text-sm text-gray-500">分析次數</div>
+                </div>
+                <div>
+                  <div className="text-2xl font-bold text-green-600">{(usage.hit_rate * 100).toFixed(0)}%</div>
+                  <div className="text-sm text-gray-500">快取命中率（{usage.cache_hits} 次）</div>
+                </div>
+                <div>
+                  <div className="text-2xl font-bold text-gray-900">{(usage.input_tokens + usage.cache_creation_input_tokens + usage.cache_read_input_tokens + usage.output_tokens).toLocaleString()}</div>
+                  <div className="text-sm text-gray-500">已使用 tokens</div>
+                </div>
+                <div>
+                  <div className="text-2xl font-bold text-green-600">{usage.saved_tokens.toLocaleString()}</div>
+                  <div className="text-sm text-gray-500">快取節省 tokens</div>
+                </div>
+              </div>
+
+              <div className="mt-4 pt-4 border-t border-gray-100 grid grid-cols-3 gap-4 text-center">
+                <div>
+                  <div className="text-lg font-semibold text-gray-900">{usage.cache_creation_input_tokens.toLocaleString()}</div>
+                  <div className="text-xs text-gray-500">提示快取寫入 tokens</div>
+                </div>
+                <div>
+                  <div className="text-lg font-semibold text-green-600">{usage.cache_read_input_tokens.toLocaleString()}</div>
+                  <div className="text-xs text-gray-500">提示快取讀取 tokens</div>
+                </div>
+                <div>
+                  <div className="text-lg font-semibold text-green-600">{(usage.prompt_cache_read_rate * 100).toFixed(0)}%</div>
+                  <div className="text-xs text-gray-500">輸入來自提示快取</div>
+                </div>
+              </div>
+
+              <p className="mt-4 text-xs text-gray-500">
+                論文集與分析設定未變更時，重新分析會直接使用先前的結果，不再重複計費；分析指示與專案資訊會由 AI 服務端快取，讀取快取的輸入按較低費率計費。
+              </p>
+            </div>
+          )}
+
           {/* 個人資料 */}
           <div className="bg-white rounded-lg shadow p-6">
             <h2 className="text-xl font-semibold text-gray-800 mb-4">👤 個人資料</h2>
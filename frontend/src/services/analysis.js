@@ -0,0 +1,190 @@
+/**
+ * AI 分析服務
+ * Analysis service - 建立背景分析任務，輪詢狀態或以 SSE 即時接收生成內容
+ */
+
+import api from './api'
+
+// 輪詢間隔（毫秒）
+const POLL_INTERVAL = 2000
+
+// 串流斷線後重連的等待時間（毫秒）與連續失敗的上限
+const RECONNECT_DELAY = 1000
+const MAX_RECONNECT_FAILURES = 5
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms))
+
+export const analysisService = {
+  /**
+   * 建立 AI 分析任務（立即返回任務記錄）
+   */
+  async startAnalysis(projectId, { analysisType = 'comprehensive', title, forceRefresh = false, mode = 'auto' } = {}) {
+    const response = await api.post(`/api/analysis/projects/${projectId}/analyze`, {
+      analysis_type: analysisType,
+      title,
+      force_refresh: forceRefresh,
+      mode
+    })
+    return response.data.job
+  },
+
+  /**
+   * 分析前估算提示各段落的 token 數與分析方式（不呼叫 AI）
+   */
+  async estimate(projectId, mode = 'auto') {
+    const response = await api.get(`/api/analysis/projects/${projectId}/estimate`, { params: { mode } })
+    return response.data.plan
+  },
+
+  /**
+   * 獲取用戶的 AI 用量與快取命中統計
+   */
+  async getUsage() {
+    const response = await api.get('/api/analysis/usage')
+    return response.data.usage
+  },
+
+  /**
+   * 以批次 API 離線分析多個專案（未指定 projectIds 時分析所有專案）
+   */
+  async startBatch({ projectIds, forceRefresh = false } = {}) {
+    const response = await api.post('/api/analysis/batches', {
+      project_ids: projectIds,
+      force_refresh: forceRefresh
+    })
+    return response.data.batch
+  },
+
+  /**
+   * 獲取最近的批次分析
+   */
+  async getBatches() {
+    const response = await api.get('/api/analysis/batches')
+    return response.data.batches
+  },
+
+  /**
+   * 獲取批次分析的狀態與各專案的結果
+   */
+  async getBatch(batchId) {
+    const response = await api.get(`/api/analysis/batches/${batchId}`)
+    return response.data
+  },
+
+  /**
+   * 取消批次分析（已完成的專案仍會寫入報告）
+   */
+  async cancelBatch(batchId) {
+    const response = await api.post(`/api/analysis/batches/${batchId}/cancel`)
+    return response.data.batch
+  },
+
+  /**
+   * 獲取任務狀態（完成時附帶分析報告）
+   */
+  async getJob(jobId) {
+    const response = await api.get(`/api/analysis/jobs/${jobId}`)
+    return response.data
+  },
+
+  /**
+   * 取消任務
+   */
+  async cancelJob(jobId) {
+    const response = await api.post(`/api/analysis/jobs/${jobId}/cancel`)
+    return response.data.job
+  },
+
+  /**
+   * 輪詢直到任務結束，返回分析報告；失敗或取消時拋出錯誤
+   */
+  async waitForAnalysis(jobId, onProgress) {
+    for (;;) {
+      const { job, analysis } = await this.getJob(jobId)
+      if (onProgress) onProgress(job)
+
+      if (job.status === 'succeeded') return analysis
+      if (job.status === 'failed') throw new Error(job.error || '分析失敗')
+      if (job.status === 'cancelled') throw new Error('分析已取消')
+
+      await sleep(POLL_INTERVAL)
+    }
+  },
+
+  /**
+   * 以 Server-Sent Events 接收生成中的報告，斷線時從已收到的位置續傳
+   *
+   * @param {number} jobId 任務 ID
+   * @param {object} handlers { onText(fullText), onStatus(status) }
+   * @returns 完成的分析報告；失敗或取消時拋出錯誤
+   */
+  async streamAnalysis(jobId, { onText, onStatus } = {}) {
+    let text = ''
+    let failures = 0
+
+    for (;;) {
+      let finished = null
+      try {
+        const response = await fetch(
+          `${api.defaults.baseURL}/api/analysis/jobs/${jobId}/stream?offset=${text.length}`,
+          { headers: { Authorization: `Bearer ${localStorage.getItem('access_token')}` } }
+        )
+        if (!response.ok) {
+          const data = await response.json().catch(() => ({}))
+          throw new Error(data.error || `HTTP ${response.status}`)
+        }
+
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+
+        while (!finished) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true })
+
+          let boundary
+          while (!finished && (boundary = buffer.indexOf('\n\n')) >= 0) {
+            const event = parseEvent(buffer.slice(0, boundary))
+            buffer = buffer.slice(boundary + 2)
+            if (!event) continue
+
+            if (event.type === 'delta') {
+              text += event.data.text
+              failures = 0
+              if (onText) onText(text)
+            } else if (event.type === 'status') {
+              if (onStatus) onStatus(event.data)
+            } else if (event.type === 'done' || event.type === 'error') {
+              finished = event
+            }
+          }
+        }
+        if (finished) reader.cancel()
+      } catch (error) {
+        if (++failures > MAX_RECONNECT_FAILURES) throw error
+      }
+
+      if (finished?.type === 'done') return finished.data.analysis
+      if (finished?.type === 'error') {
+        throw new Error(finished.data.status === 'cancelled' ? '分析已取消' : (finished.data.error || '分析失敗'))
+      }
+
+      // 連線中斷或達到最長時間：從已收到的位置重連
+      await sleep(RECONNECT_DELAY)
+    }
+  }
+}
+
+/**
+ * 解析一個 SSE 事件區塊（忽略註解行）
+ */
+function parseEvent(block) {
+  let type = 'message'
+  const data = []
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event: ')) type = line.slice(7)
+    else if (line.startsWith('data: ')) data.push(line.slice(6))
+  }
+  return data.length ? { type, data: JSON.parse(data.join('\n')) } : null
+}
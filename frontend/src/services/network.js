@@ -0,0 +1,98 @@
+/**
+ * 網絡分析服務
+ * Network service - 以二進位格式獲取合作網絡並解碼
+ */
+
+import api from './api'
+
+// 與 backend/services/network_export.py 的格式一致
+const BINARY_MAGIC = 'LRNW'
+const BINARY_VERSION = 1
+const HEADER_BYTES = 20
+const FLAG_KEY_PERSON = 1
+const FLAG_PAPER_HUB = 2
+
+/**
+ * 解碼二進位網絡 payload 為 { nodes, links, revision }
+ * 節點座標為伺服器預先計算的 [-1, 1] 範圍數值（NaN 表示沒有座標）
+ */
+export function decodeBinaryNetwork(buffer) {
+  const view = new DataView(buffer)
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4))
+  const version = view.getUint16(4, true)
+  if (magic !== BINARY_MAGIC || version !== BINARY_VERSION) {
+    throw new Error('不支援的網絡數據格式')
+  }
+
+  const nodeCount = view.getUint32(8, true)
+  const linkCount = view.getUint32(12, true)
+  const namesBytes = view.getUint32(16, true)
+
+  // 各陣列皆為 4 bytes 元素，起始位置保持 4-byte 對齊，可直接建立 typed array 視圖
+  let offset = HEADER_BYTES
+  const take = (ArrayType, length) => {
+    const values = new ArrayType(buffer, offset, length)
+    offset += length * 4
+    return values
+  }
+
+  const ids = take(Int32Array, nodeCount)
+  const xs = take(Float32Array, nodeCount)
+  const ys = take(Float32Array, nodeCount)
+  const papersCount = take(Int32Array, nodeCount)
+  const communities = take(Int32Array, nodeCount)
+  const flags = take(Int32Array, nodeCount)
+  const sources = take(Uint32Array, linkCount)
+  const targets = take(Uint32Array, linkCount)
+  const weights = take(Float32Array, linkCount)
+
+  const names = new TextDecoder('utf-8')
+    .decode(new Uint8Array(buffer, offset, namesBytes))
+    .split('\n')
+
+  const nodes = Array.from(ids, (id, i) => ({
+    id,
+    name: names[i] || '',
+    x: xs[i],
+    y: ys[i],
+    papers_count: papersCount[i],
+    community_id: communities[i] >= 0 ? communities[i] : null,
+    is_key_person: (flags[i] & FLAG_KEY_PERSON) !== 0,
+    is_paper_hub: (flags[i] & FLAG_PAPER_HUB) !== 0
+  }))
+
+  const links = Array.from(sources, (source, i) => ({
+    source: ids[source],
+    target: ids[targets[i]],
+    weight: weights[i]
+  }))
+
+  return { nodes, links }
+}
+
+export const networkService = {
+  /**
+   * 獲取專案合作網絡（二進位格式，含伺服器端佈局座標）
+   */
+  async getNetwork(projectId, params = {}) {
+    const response = await api.get(`/api/network/projects/${projectId}/network`, {
+      params: { format: 'binary', ...params },
+      responseType: 'arraybuffer'
+    })
+    const network = decodeBinaryNetwork(response.data)
+    network.revision = Number(response.headers['x-network-revision'])
+    // 大型網絡的佈局仍在背景計算（座標為上一版本或缺少）
+    network.layoutPending = response.headers['x-network-layout-pending'] === '1'
+    return network
+  },
+
+  /**
+   * 按需獲取兩位作者的共同論文
+   */
+  async getCollaborationPapers(projectId, author1Id, author2Id) {
+    const response = await api.get(
+      `/api/network/projects/${projectId}/collaborations/${author1Id}/${author2Id}/papers`
+    )
+    return response.data
+  }
+}